@@ -0,0 +1,149 @@
+"""
+Fixtures for the end-to-end API benchmarks. The benchmarks require
+pytest-benchmark and by default are run against the MySQL database of
+``datastore/docker-compose.yml``, e.g.::
+
+    pytest benchmarks --fleet-sites 10 --benchmark-json=benchmarks.json
+
+A synthetic fleet is loaded at the start of the session and deleted at
+the end, unless the IDs of a previously loaded fleet are given with
+--fleet-file. The JSON written by --benchmark-json, or to .benchmarks by
+--benchmark-autosave, contains the p50 and p99 latency, throughput, and
+MySQL rows examined per call of each benchmark in extra_info so it can be
+compared across commits with ``pytest-benchmark compare``.
+"""
+import json
+
+
+from flask import _request_ctx_stack
+import numpy as np
+import pymysql
+import pytest
+
+
+from sfa_api import create_app
+from sfa_api.utils import storage_interface
+from sfa_api.utils.storage import get_storage
+
+
+import fleet as fleet_module
+
+
+# calls of each benchmark used to find MySQL rows examined per call
+ROWS_EXAMINED_CALLS = 5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('fleet', 'synthetic fleet benchmarks')
+    group.addoption('--fleet-sites', type=int, default=5,
+                    help='Number of sites in the synthetic fleet')
+    group.addoption('--fleet-days', type=int,
+                    default=fleet_module.FLEET_DAYS,
+                    help='Days of values for each object of the fleet')
+    group.addoption('--fleet-file', default=None,
+                    help='JSON file of the IDs of a fleet loaded by '
+                    'benchmarks/fleet.py to use instead of loading a fleet')
+    group.addoption('--fleet-storage', choices=('mysql', 'demo'),
+                    default='mysql',
+                    help='Storage backend to benchmark, demo is the '
+                    'in-memory backend of sfa_api.demo')
+
+
+@pytest.fixture(scope='session')
+def app(request):
+    app = create_app('TestingConfig')
+    storage = request.config.getoption('--fleet-storage')
+    app.config['SFA_API_STATIC_DATA'] = storage == 'demo'
+    with app.app_context():
+        if storage == 'mysql':
+            try:
+                storage_interface.mysql_connection()
+            except pymysql.err.OperationalError:
+                pytest.skip('No connection to test database')
+        yield app
+
+
+@pytest.fixture(scope='session')
+def fleet(app, request):
+    """The IDs of the objects of the fleet, see fleet.load_fleet"""
+    fleet_file = request.config.getoption('--fleet-file')
+    if fleet_file is not None:
+        with open(fleet_file) as f:
+            yield json.load(f)
+        return
+    with fleet_module.as_user(app):
+        ids = fleet_module.load_fleet(
+            fleet_module.make_fleet(
+                request.config.getoption('--fleet-sites')),
+            days=request.config.getoption('--fleet-days'))
+    yield ids
+    with fleet_module.as_user(app):
+        storage = get_storage()
+        storage.delete_aggregate(ids['aggregate'])
+        for forecast_id in ids['forecasts']:
+            storage.delete_forecast(forecast_id)
+        for observation_id in ids['observations']:
+            storage.delete_observation(observation_id)
+        for site_id in ids['sites']:
+            storage.delete_site(site_id)
+
+
+@pytest.fixture()
+def api(app, mocker):
+    def add_user():
+        _request_ctx_stack.top.user = fleet_module.BENCHMARK_USER
+        return True
+
+    verify = mocker.patch('sfa_api.utils.auth.verify_access_token')
+    verify.side_effect = add_user
+    # the fake Redis queue of TestingConfig would run validation jobs,
+    # which call the API over HTTP, in the request
+    mocker.patch('rq.Queue.enqueue', autospec=True)
+    yield app.test_client()
+
+
+def _rows_read(app):
+    """Innodb_rows_read of the server, or None if it can't be read"""
+    if app.config['SFA_API_STATIC_DATA']:
+        return None
+    config = app.config
+    try:
+        conn = pymysql.connect(
+            host=config['MYSQL_HOST'], port=int(config['MYSQL_PORT']),
+            user=config['MYSQL_USER'], password=config['MYSQL_PASSWORD'],
+            database=config['MYSQL_DATABASE'])
+    except pymysql.err.OperationalError:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_rows_read'")
+            return int(cursor.fetchone()[1])
+    finally:
+        conn.close()
+
+
+@pytest.fixture()
+def run_benchmark(benchmark, app):
+    """
+    Benchmark fn and record the p50 and p99 latency, calls per second,
+    and MySQL rows examined per call in the extra_info of the benchmark.
+
+    Rows examined is the change in the Innodb_rows_read status of the
+    server over ROWS_EXAMINED_CALLS calls, so it includes rows read by
+    any other clients of the server.
+    """
+    def run(fn, *args, **kwargs):
+        result = benchmark(fn, *args, **kwargs)
+        data = np.asarray(benchmark.stats.stats.data)
+        benchmark.extra_info['p50_ms'] = float(np.percentile(data, 50) * 1e3)
+        benchmark.extra_info['p99_ms'] = float(np.percentile(data, 99) * 1e3)
+        benchmark.extra_info['calls_per_second'] = float(
+            len(data) / data.sum())
+        before = _rows_read(app)
+        if before is not None:
+            for _ in range(ROWS_EXAMINED_CALLS):
+                fn(*args, **kwargs)
+            benchmark.extra_info['rows_examined_per_call'] = (
+                _rows_read(app) - before) / ROWS_EXAMINED_CALLS
+        return result
+    return run
@@ -0,0 +1,241 @@
+"""
+Generate a synthetic fleet of sites, each with a GHI observation and
+forecast, and load it with a year of values into the storage of the API.
+The interval lengths of the observations and forecasts cycle through
+:py:data:`INTERVAL_LENGTHS`, from 1 to 60 minutes, so the fleet covers
+the range of data densities seen in practice. All observations are also
+part of one hourly aggregate. The values are generated from a fixed
+seed so that the same fleet is produced for every run.
+
+Objects are stored with the storage backend of the app as the
+``auth0|5be343df7025406237820b85`` user of the test database, normally
+the MySQL database of ``datastore/docker-compose.yml``. To load a fleet
+and record the IDs of its objects for :py:mod:`locustfile`, run::
+
+    python benchmarks/fleet.py --sites 10 --output fleet.json
+
+from the repository root with the MYSQL_* environment variables pointing
+at the database.
+"""
+import argparse
+from contextlib import contextmanager
+import datetime as dt
+import json
+import logging
+
+
+from flask import _request_ctx_stack
+import numpy as np
+import pandas as pd
+
+
+from sfa_api import create_app
+from sfa_api.utils.storage import get_storage
+
+
+logger = logging.getLogger(__name__)
+BENCHMARK_USER = 'auth0|5be343df7025406237820b85'
+INTERVAL_LENGTHS = (1, 5, 15, 30, 60)
+FLEET_START = pd.Timestamp('2019-01-01T00:00Z')
+FLEET_DAYS = 365
+# the values of an object are stored in chunks of this many days
+CHUNK_DAYS = 30
+
+
+def _ghi(index, rng, scale=1000.):
+    """A smooth diurnal shape centered on 19:00 UTC with noise"""
+    hours = (index.hour + index.minute / 60).values
+    shape = np.clip(np.cos((hours - 19) / 24 * 2 * np.pi), 0, None) ** 2
+    values = scale * shape + rng.normal(0, 10, len(index))
+    return np.clip(values, 0, None).round(2)
+
+
+def make_fleet(sites, seed=0):
+    """
+    Make the metadata of a fleet.
+
+    Parameters
+    ----------
+    sites : int
+        Number of sites in the fleet.
+    seed : int
+        Seed of the random locations of the sites.
+
+    Returns
+    -------
+    list of dict
+        A dict for each site with keys site, observation, and forecast
+        containing the metadata to store each object. The site_id of the
+        observation and forecast are filled in when loaded.
+    """
+    rng = np.random.default_rng(seed)
+    out = []
+    for number in range(sites):
+        interval_length = INTERVAL_LENGTHS[number % len(INTERVAL_LENGTHS)]
+        site = {
+            'name': f'Benchmark Site {number}',
+            'latitude': round(float(rng.uniform(30, 45)), 4),
+            'longitude': round(float(rng.uniform(-120, -80)), 4),
+            'elevation': round(float(rng.uniform(0, 2000)), 1),
+            'timezone': 'Etc/GMT+7',
+            'extra_parameters': '{"benchmark": true}',
+            'modeling_parameters': {},
+        }
+        observation = {
+            'name': f'Benchmark Site {number} ghi',
+            'variable': 'ghi',
+            'interval_label': 'beginning',
+            'interval_length': interval_length,
+            'interval_value_type': 'interval_mean',
+            'uncertainty': 0.1,
+            'extra_parameters': '{"benchmark": true}',
+        }
+        forecast = {
+            'name': f'Benchmark Site {number} ghi forecast',
+            'variable': 'ghi',
+            'interval_label': 'beginning',
+            'interval_length': interval_length,
+            'interval_value_type': 'interval_mean',
+            'issue_time_of_day': '00:00',
+            'lead_time_to_start': 0,
+            'run_length': 1440,
+            'extra_parameters': '{"benchmark": true}',
+        }
+        out.append({'site': site, 'observation': observation,
+                    'forecast': forecast})
+    return out
+
+
+def make_values(interval_length, start, end, seed, quality_flag=False):
+    """
+    Make the values of an object between start (inclusive) and end
+    (exclusive).
+
+    Parameters
+    ----------
+    interval_length : int
+        Minutes between values.
+    start, end : pandas.Timestamp
+    seed : int
+        Seed of the noise added to the values.
+    quality_flag : bool
+        Include a quality_flag column of zeros, as for observations.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    periods = int((end - start) / pd.Timedelta(minutes=interval_length))
+    index = pd.date_range(start, freq=f'{interval_length}min',
+                          periods=periods, name='timestamp')
+    df = pd.DataFrame({'value': _ghi(index, rng)}, index=index)
+    if quality_flag:
+        df['quality_flag'] = 0
+    return df
+
+
+def _chunks(start, days):
+    end = start + pd.Timedelta(days=days)
+    while start < end:
+        stop = min(start + pd.Timedelta(days=CHUNK_DAYS), end)
+        yield start, stop
+        start = stop
+
+
+@contextmanager
+def as_user(app, auth0_id=BENCHMARK_USER):
+    """Run storage functions of the app as auth0_id"""
+    with app.test_request_context():
+        _request_ctx_stack.top.user = auth0_id
+        yield
+
+
+def load_fleet(fleet, start=FLEET_START, days=FLEET_DAYS):
+    """
+    Store the objects of a fleet and their values with the storage of the
+    current app. Must be run as a user, see :py:func:`as_user`.
+
+    Parameters
+    ----------
+    fleet : list of dict
+        From :py:func:`make_fleet`.
+    start : pandas.Timestamp
+        Time of the first value.
+    days : int
+        Days of values to store for each object.
+
+    Returns
+    -------
+    dict
+        The IDs of the stored objects with keys sites, observations,
+        forecasts, and aggregate, and the start and end of the values.
+    """
+    storage = get_storage()
+    ids = {'sites': [], 'observations': [], 'forecasts': [],
+           'interval_lengths': {}}
+    aggregate_id = storage.store_aggregate({
+        'name': 'Benchmark Aggregate ghi',
+        'description': 'All benchmark observations',
+        'variable': 'ghi',
+        'timezone': 'Etc/GMT+7',
+        'interval_label': 'ending',
+        'interval_length': 60,
+        'aggregate_type': 'sum',
+        'extra_parameters': '{"benchmark": true}',
+    })
+    for number, objects in enumerate(fleet):
+        site_id = storage.store_site(objects['site'])
+        observation_id = storage.store_observation(
+            dict(objects['observation'], site_id=site_id))
+        forecast_id = storage.store_forecast(
+            dict(objects['forecast'], site_id=site_id))
+        storage.add_observation_to_aggregate(aggregate_id, observation_id,
+                                             start.to_pydatetime())
+        interval_length = objects['observation']['interval_length']
+        for chunk, (chunk_start, chunk_end) in enumerate(
+                _chunks(start, days)):
+            seed = number * 1000 + chunk
+            storage.store_observation_values(observation_id, make_values(
+                interval_length, chunk_start, chunk_end, seed,
+                quality_flag=True))
+            storage.store_forecast_values(forecast_id, make_values(
+                interval_length, chunk_start, chunk_end, seed + 500))
+        logger.info('Loaded site %s of %s', number + 1, len(fleet))
+        ids['sites'].append(site_id)
+        ids['observations'].append(observation_id)
+        ids['forecasts'].append(forecast_id)
+        ids['interval_lengths'][observation_id] = interval_length
+        ids['interval_lengths'][forecast_id] = interval_length
+    ids['aggregate'] = aggregate_id
+    ids['start'] = start.isoformat()
+    ids['end'] = (start + pd.Timedelta(days=days)).isoformat()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=10,
+                        help='Number of sites in the fleet')
+    parser.add_argument('--days', type=int, default=FLEET_DAYS,
+                        help='Days of values for each object')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', default='TestingConfig',
+                        help='Name of the sfa_api.config class to use')
+    parser.add_argument('--output', default='fleet.json',
+                        help='File to write the IDs of the fleet to')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    app = create_app(args.config)
+    begin = dt.datetime.now()
+    with as_user(app):
+        ids = load_fleet(make_fleet(args.sites, args.seed), days=args.days)
+    logger.info('Loaded fleet in %s', dt.datetime.now() - begin)
+    with open(args.output, 'w') as f:
+        json.dump(ids, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
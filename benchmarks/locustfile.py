@@ -0,0 +1,105 @@
+"""
+Load test of a running API with locust against a synthetic fleet loaded
+by fleet.py, e.g.::
+
+    python benchmarks/fleet.py --sites 50 --output fleet.json
+    SFA_FLEET_FILE=fleet.json SFA_API_TOKEN=<access token> \\
+        locust -f benchmarks/locustfile.py --headless -u 20 -r 5 -t 5m \\
+        --host https://localhost:5000
+
+The token must be for the user that loaded the fleet. The throughput,
+p50, and p99 latency of each endpoint are written as JSON to the file in
+SFA_LOCUST_RESULTS, locust_results.json by default, when the test stops.
+"""
+import json
+import os
+import random
+
+
+from locust import HttpUser, between, events, task
+import pandas as pd
+
+
+import fleet as fleet_module
+
+
+with open(os.getenv('SFA_FLEET_FILE', 'fleet.json')) as f:
+    FLEET = json.load(f)
+END = pd.Timestamp(FLEET['end'])
+READ_RANGE = {'start': (END - pd.Timedelta(days=1)).isoformat(),
+              'end': END.isoformat()}
+
+
+class FleetUser(HttpUser):
+    """A data provider uploading and reading values of the fleet"""
+    wait_time = between(0.1, 1)
+
+    def on_start(self):
+        self.client.headers['Authorization'] = (
+            f'Bearer {os.environ["SFA_API_TOKEN"]}')
+
+    @task(2)
+    def upload_observation_values(self):
+        observation_id = random.choice(FLEET['observations'])
+        interval_length = FLEET['interval_lengths'][observation_id]
+        # an hour of values before the end of the fleet
+        values = fleet_module.make_values(
+            interval_length, END - pd.Timedelta(hours=1), END,
+            random.randrange(1000), quality_flag=True)
+        values.index = values.index.strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.client.post(
+            f'/observations/{observation_id}/values',
+            json={'values': values.reset_index().to_dict(orient='records')},
+            name='/observations/[id]/values')
+
+    @task(4)
+    def read_observation_values(self):
+        self.client.get(
+            f'/observations/{random.choice(FLEET["observations"])}/values',
+            params=READ_RANGE, name='/observations/[id]/values')
+
+    @task(4)
+    def read_forecast_values(self):
+        self.client.get(
+            f'/forecasts/single/{random.choice(FLEET["forecasts"])}/values',
+            params=READ_RANGE, name='/forecasts/single/[id]/values')
+
+    @task(1)
+    def read_aggregate_values(self):
+        self.client.get(f'/aggregates/{FLEET["aggregate"]}/values',
+                        params=READ_RANGE, name='/aggregates/[id]/values')
+
+    @task(1)
+    def list_observations(self):
+        self.client.get('/observations/')
+
+    @task(4)
+    def latest_observation_value(self):
+        self.client.get(
+            f'/observations/{random.choice(FLEET["observations"])}'
+            '/values/latest', name='/observations/[id]/values/latest')
+
+    @task(2)
+    def observation_gaps(self):
+        self.client.get(
+            f'/observations/{random.choice(FLEET["observations"])}'
+            '/values/gaps', params=READ_RANGE,
+            name='/observations/[id]/values/gaps')
+
+
+@events.quitting.add_listener
+def write_results(environment, **kwargs):
+    results = []
+    for entry in environment.stats.entries.values():
+        results.append({
+            'name': entry.name,
+            'method': entry.method,
+            'requests': entry.num_requests,
+            'failures': entry.num_failures,
+            'requests_per_second': entry.total_rps,
+            'p50_ms': entry.get_response_time_percentile(0.5),
+            'p99_ms': entry.get_response_time_percentile(0.99),
+        })
+    with open(os.getenv('SFA_LOCUST_RESULTS', 'locust_results.json'),
+              'w') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,81 @@
+"""
+Compare the time to hydrate and serialize a list of 10,000 forecasts and
+observations using a schema instance per row and Schema(many=True).dump
+against the precomputed field tuples and
+:py:func:`sfa_api.utils.serialization.dump_list`.
+
+Run with ``python benchmarks/metadata_hydration.py`` from the repository
+root. No database is required.
+"""
+import argparse
+import time
+import uuid
+
+
+from sfa_api import create_app, schema
+from sfa_api.conftest import demo_forecasts, demo_observations
+from sfa_api.utils import storage_interface
+from sfa_api.utils.serialization import dump_list
+
+
+def _per_row_hydration(schema_class):
+    def hydrate(row):
+        out = {}
+        for key in schema_class().fields.keys():
+            if key in ('_links',):
+                continue
+            out[key] = row[key]
+        return out
+    return hydrate
+
+
+def _rows(template, id_field, number):
+    rows = []
+    for _ in range(number):
+        row = dict(template)
+        row[id_field] = str(uuid.uuid1())
+        rows.append(row)
+    return rows
+
+
+def _time(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main(number):
+    app = create_app('TestingConfig')
+    cases = [
+        ('forecasts', schema.ForecastSchema,
+         storage_interface._set_forecast_parameters,
+         _rows(next(iter(demo_forecasts.values())), 'forecast_id', number)),
+        ('observations', schema.ObservationSchema,
+         storage_interface._set_observation_parameters,
+         _rows(next(iter(demo_observations.values())), 'observation_id',
+               number)),
+    ]
+    with app.test_request_context(
+            base_url='https://api.solarforecastarbiter.org'):
+        for name, schema_class, hydrate, rows in cases:
+            old_hydrate, objects = _time(
+                lambda: [_per_row_hydration(schema_class)(r) for r in rows])
+            new_hydrate, _ = _time(lambda: [hydrate(r) for r in rows])
+            old_dump, expected = _time(
+                lambda: schema_class(many=True).dump(objects))
+            new_dump, out = _time(lambda: dump_list(schema_class, objects))
+            assert out == expected
+            print(f'{number} {name}')
+            print(f'  hydrate: {old_hydrate:.3f} s -> {new_hydrate:.3f} s')
+            print(f'  dump:    {old_dump:.3f} s -> {new_dump:.3f} s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--number', type=int, default=10000,
+                        help='Number of objects to list')
+    args = parser.parse_args()
+    main(args.number)
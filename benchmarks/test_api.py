@@ -0,0 +1,117 @@
+"""
+End-to-end benchmarks of the API endpoints most used by the
+fleets of data providers, run against the synthetic fleet of
+fleet.py. See conftest.py for how to run them.
+"""
+import pandas as pd
+import pytest
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+import fleet as fleet_module  # NOQA: E402
+
+
+BASE_URL = 'https://localhost'
+# length of the time range of read, aggregate, and gap requests
+READ_DAYS = 7
+
+
+def _check(response):
+    assert response.status_code < 300, response.data
+    return response
+
+
+def _object_id(fleet, kind, interval_length):
+    for object_id in fleet[kind]:
+        if fleet['interval_lengths'][object_id] == interval_length:
+            return object_id
+    pytest.skip(f'No {interval_length} minute objects in the fleet')
+
+
+def _read_range(fleet):
+    end = pd.Timestamp(fleet['end'])
+    start = end - pd.Timedelta(days=READ_DAYS)
+    return {'start': start.isoformat(), 'end': end.isoformat()}
+
+
+@pytest.fixture(params=fleet_module.INTERVAL_LENGTHS,
+                ids=lambda x: f'{x}min')
+def interval_length(request):
+    return request.param
+
+
+@pytest.fixture()
+def observation_id(fleet, interval_length):
+    return _object_id(fleet, 'observations', interval_length)
+
+
+@pytest.fixture()
+def forecast_id(fleet, interval_length):
+    return _object_id(fleet, 'forecasts', interval_length)
+
+
+@pytest.mark.benchmark(group='upload')
+def test_upload_observation_values(api, run_benchmark, fleet,
+                                   observation_id, interval_length):
+    # overwrite the first day of values with the same values
+    start = pd.Timestamp(fleet['start'])
+    values = fleet_module.make_values(
+        interval_length, start, start + pd.Timedelta(days=1), 0,
+        quality_flag=True)
+    values.index = values.index.strftime('%Y-%m-%dT%H:%M:%SZ')
+    payload = {'values': values.reset_index().to_dict(orient='records')}
+    run_benchmark(lambda: _check(api.post(
+        f'/observations/{observation_id}/values', json=payload,
+        base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='read')
+def test_read_observation_values(api, run_benchmark, fleet,
+                                 observation_id):
+    run_benchmark(lambda: _check(api.get(
+        f'/observations/{observation_id}/values',
+        query_string=_read_range(fleet), base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='read')
+def test_read_forecast_values(api, run_benchmark, fleet, forecast_id):
+    run_benchmark(lambda: _check(api.get(
+        f'/forecasts/single/{forecast_id}/values',
+        query_string=_read_range(fleet), base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='aggregate')
+def test_read_aggregate_values(api, run_benchmark, fleet):
+    run_benchmark(lambda: _check(api.get(
+        f'/aggregates/{fleet["aggregate"]}/values',
+        query_string=_read_range(fleet), base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='list')
+@pytest.mark.parametrize('path', [
+    '/sites/', '/observations/', '/forecasts/single/', '/aggregates/'])
+def test_list(api, run_benchmark, fleet, path):
+    run_benchmark(lambda: _check(api.get(path, base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='latest')
+def test_latest_observation_value(api, run_benchmark, observation_id):
+    run_benchmark(lambda: _check(api.get(
+        f'/observations/{observation_id}/values/latest',
+        base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='latest')
+def test_latest_forecast_value(api, run_benchmark, forecast_id):
+    run_benchmark(lambda: _check(api.get(
+        f'/forecasts/single/{forecast_id}/values/latest',
+        base_url=BASE_URL)))
+
+
+@pytest.mark.benchmark(group='gaps')
+def test_observation_gaps(api, run_benchmark, fleet, observation_id):
+    run_benchmark(lambda: _check(api.get(
+        f'/observations/{observation_id}/values/gaps',
+        query_string=_read_range(fleet), base_url=BASE_URL)))
@@ -0,0 +1,121 @@
+CREATE OR REPLACE VIEW user_objects AS
+SELECT users.auth0_id as auth0_id, pom.object_id as object_id, permissions.object_type as object_type FROM permission_object_mapping as pom, users, permissions WHERE pom.permission_id IN (
+    SELECT permission_id FROM role_permission_mapping WHERE role_id IN (
+        SELECT role_id FROM user_role_mapping WHERE user_id = users.id
+    )
+) AND pom.permission_id = permissions.id AND permissions.action = 'read';
+
+
+DROP FUNCTION can_user_perform_action;
+CREATE DEFINER = 'select_rbac'@'localhost' FUNCTION can_user_perform_action (auth0id VARCHAR(32), objectid BINARY(16), theaction VARCHAR(32))
+RETURNS BOOLEAN
+COMMENT 'Can the user perform the action on the object?'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE isin BOOL DEFAULT 0;
+    DECLARE uid BINARY(16);
+    SELECT id INTO uid FROM users WHERE auth0_id = auth0id;
+    SET isin = (
+        SELECT 1 FROM permission_object_mapping WHERE permission_id IN (
+            SELECT permission_id FROM role_permission_mapping WHERE role_id IN (
+                SELECT role_id FROM user_role_mapping WHERE user_id = uid
+            )
+        ) AND permission_id IN (
+            SELECT id FROM permissions WHERE action = theaction
+        ) AND object_id = objectid LIMIT 1
+    );
+    IF isin IS NOT NULL AND isin THEN
+       RETURN TRUE;
+    ELSE
+        RETURN FALSE;
+    END IF;
+END;
+GRANT EXECUTE ON FUNCTION `arbiter_data`.`can_user_perform_action` TO `select_rbac`@`localhost`;
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'insert_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'select_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'update_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'delete_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'insert_rbac'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'delete_rbac'@'localhost';
+
+
+DROP PROCEDURE list_objects_user_can_read;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE list_objects_user_can_read (IN auth0id VARCHAR(32), IN objtype VARCHAR(32))
+COMMENT 'List the objects a user can read'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE uid BINARY(16);
+    SELECT id INTO uid FROM users WHERE auth0_id = auth0id;
+    SELECT object_id FROM permission_object_mapping WHERE permission_id IN (
+        SELECT permission_id FROM role_permission_mapping WHERE role_id IN (
+           SELECT role_id FROM user_role_mapping WHERE user_id = uid
+         )
+    ) AND permission_id IN (
+        SELECT id FROM permissions WHERE action = 'read' AND object_type = objtype
+    );
+END;
+GRANT EXECUTE ON PROCEDURE `arbiter_data`.`list_objects_user_can_read` TO `select_rbac`@`localhost`;
+
+
+DROP PROCEDURE get_user_actions_on_object;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE get_user_actions_on_object(
+    IN auth0id VARCHAR(32), IN strobjectid CHAR(36))
+COMMENT 'Get a list of all of the actions the user can take on an object.'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE userid BINARY(16);
+    DECLARE objectid BINARY(16);
+    SET userid = (SELECT id FROM users WHERE auth0_id = auth0id);
+    SET objectid = UUID_TO_BIN(strobjectid, 1);
+
+    SELECT perm.action from permissions as perm WHERE perm.id IN(
+        SELECT permission_id from permission_object_mapping
+            WHERE object_id = objectid AND permission_id IN (
+                SELECT permission_id FROM role_permission_mapping
+                    WHERE role_id IN(
+                        SELECT role_id FROM user_role_mapping
+                            WHERE user_id = userid
+                )
+        )
+    );
+END;
+GRANT EXECUTE ON PROCEDURE get_user_actions_on_object TO 'select_rbac'@'localhost';
+GRANT EXECUTE ON PROCEDURE get_user_actions_on_object TO 'apiuser'@'%';
+
+
+DROP PROCEDURE list_actions_on_all_objects_of_type;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE list_actions_on_all_objects_of_type(
+    IN auth0id VARCHAR(32), IN objecttype VARCHAR(32))
+COMMENT 'List the uuids and actions users can take on all objects of a given type'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE userid BINARY(16);
+    SET userid = (SELECT id FROM users WHERE auth0_id = auth0id);
+
+      SELECT bin_to_uuid(object_id, 1) as object_id, JSON_KEYS(JSON_OBJECTAGG(action, '')) as actions
+		FROM permission_object_mapping
+        INNER JOIN permissions ON (permission_object_mapping.permission_id=permissions.id)
+		WHERE object_type=objecttype AND permission_id IN(
+			SELECT permission_id
+			FROM role_permission_mapping
+			WHERE role_id in (
+				SELECT role_id
+				FROM user_role_mapping
+				WHERE user_id = userid
+			)
+		) group by permission_object_mapping.object_id;
+END;
+GRANT EXECUTE ON PROCEDURE list_actions_on_all_objects_of_type TO 'select_rbac'@'localhost';
+GRANT EXECUTE ON PROCEDURE list_actions_on_all_objects_of_type TO 'apiuser'@'%';
+
+
+DROP TRIGGER add_user_object_perms_on_user_role_insert;
+DROP TRIGGER remove_user_object_perms_on_user_role_delete;
+DROP TRIGGER add_user_object_perms_on_role_perm_insert;
+DROP TRIGGER remove_user_object_perms_on_role_perm_delete;
+DROP TRIGGER add_user_object_perms_on_perm_object_insert;
+DROP TRIGGER remove_user_object_perms_on_perm_object_delete;
+REVOKE SELECT, TRIGGER ON arbiter_data.user_role_mapping FROM 'permission_trig'@'localhost';
+REVOKE SELECT, TRIGGER ON arbiter_data.role_permission_mapping FROM 'permission_trig'@'localhost';
+REVOKE TRIGGER ON arbiter_data.permission_object_mapping FROM 'permission_trig'@'localhost';
+DROP TABLE arbiter_data.user_object_permissions;
@@ -0,0 +1,175 @@
+-- Materialize the user -> object permissions that are otherwise resolved through
+-- nested user_role_mapping/role_permission_mapping/permission_object_mapping subqueries.
+-- role_id and permission_id are kept so that rows can be removed precisely when a single
+-- mapping is removed while the same access is still granted through another role or permission.
+CREATE TABLE arbiter_data.user_object_permissions (
+  user_id BINARY(16) NOT NULL,
+  object_id BINARY(16) NOT NULL,
+  action VARCHAR(32) NOT NULL,
+  object_type VARCHAR(32) NOT NULL,
+  role_id BINARY(16) NOT NULL,
+  permission_id BINARY(16) NOT NULL,
+
+  PRIMARY KEY (user_id, action, object_id, role_id, permission_id),
+  KEY (user_id, action, object_type, object_id),
+  KEY (user_id, object_id),
+  KEY (role_id, user_id),
+  KEY (permission_id, object_id),
+  -- foreign key cascades do not fire triggers, so rely on cascades when
+  -- users, roles, or permissions are deleted
+  FOREIGN KEY (user_id)
+    REFERENCES users(id)
+    ON DELETE CASCADE ON UPDATE RESTRICT,
+  FOREIGN KEY (role_id)
+    REFERENCES roles(id)
+    ON DELETE CASCADE ON UPDATE RESTRICT,
+  FOREIGN KEY (permission_id)
+    REFERENCES permissions(id)
+    ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE=INNODB ENCRYPTION='Y' ROW_FORMAT=COMPRESSED;
+
+
+-- populate from the existing mappings
+INSERT INTO arbiter_data.user_object_permissions (
+    user_id, object_id, action, object_type, role_id, permission_id)
+SELECT urm.user_id, pom.object_id, perm.action, perm.object_type, urm.role_id, perm.id
+    FROM arbiter_data.user_role_mapping AS urm
+    JOIN arbiter_data.role_permission_mapping AS rpm ON rpm.role_id = urm.role_id
+    JOIN arbiter_data.permissions AS perm ON perm.id = rpm.permission_id
+    JOIN arbiter_data.permission_object_mapping AS pom ON pom.permission_id = perm.id;
+
+
+GRANT SELECT, TRIGGER ON arbiter_data.user_role_mapping TO 'permission_trig'@'localhost';
+GRANT SELECT, TRIGGER ON arbiter_data.role_permission_mapping TO 'permission_trig'@'localhost';
+GRANT TRIGGER ON arbiter_data.permission_object_mapping TO 'permission_trig'@'localhost';
+GRANT INSERT, SELECT, DELETE ON arbiter_data.user_object_permissions TO 'permission_trig'@'localhost';
+
+
+-- a role is given to a user
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER add_user_object_perms_on_user_role_insert AFTER INSERT ON arbiter_data.user_role_mapping
+FOR EACH ROW INSERT INTO arbiter_data.user_object_permissions (
+    user_id, object_id, action, object_type, role_id, permission_id)
+    SELECT NEW.user_id, pom.object_id, perm.action, perm.object_type, NEW.role_id, perm.id
+        FROM arbiter_data.role_permission_mapping AS rpm
+        JOIN arbiter_data.permissions AS perm ON perm.id = rpm.permission_id
+        JOIN arbiter_data.permission_object_mapping AS pom ON pom.permission_id = perm.id
+        WHERE rpm.role_id = NEW.role_id;
+
+
+-- a role is removed from a user
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER remove_user_object_perms_on_user_role_delete AFTER DELETE ON arbiter_data.user_role_mapping
+FOR EACH ROW DELETE FROM arbiter_data.user_object_permissions WHERE role_id = OLD.role_id AND user_id = OLD.user_id;
+
+
+-- a permission is added to a role
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER add_user_object_perms_on_role_perm_insert AFTER INSERT ON arbiter_data.role_permission_mapping
+FOR EACH ROW INSERT INTO arbiter_data.user_object_permissions (
+    user_id, object_id, action, object_type, role_id, permission_id)
+    SELECT urm.user_id, pom.object_id, perm.action, perm.object_type, NEW.role_id, NEW.permission_id
+        FROM arbiter_data.user_role_mapping AS urm
+        JOIN arbiter_data.permissions AS perm ON perm.id = NEW.permission_id
+        JOIN arbiter_data.permission_object_mapping AS pom ON pom.permission_id = NEW.permission_id
+        WHERE urm.role_id = NEW.role_id;
+
+
+-- a permission is removed from a role
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER remove_user_object_perms_on_role_perm_delete AFTER DELETE ON arbiter_data.role_permission_mapping
+FOR EACH ROW DELETE FROM arbiter_data.user_object_permissions WHERE role_id = OLD.role_id AND permission_id = OLD.permission_id;
+
+
+-- an object is added to a permission, including by the object insert triggers
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER add_user_object_perms_on_perm_object_insert AFTER INSERT ON arbiter_data.permission_object_mapping
+FOR EACH ROW INSERT INTO arbiter_data.user_object_permissions (
+    user_id, object_id, action, object_type, role_id, permission_id)
+    SELECT urm.user_id, NEW.object_id, perm.action, perm.object_type, urm.role_id, NEW.permission_id
+        FROM arbiter_data.role_permission_mapping AS rpm
+        JOIN arbiter_data.user_role_mapping AS urm ON urm.role_id = rpm.role_id
+        JOIN arbiter_data.permissions AS perm ON perm.id = NEW.permission_id
+        WHERE rpm.permission_id = NEW.permission_id;
+
+
+-- an object is removed from a permission, including by the object delete triggers
+CREATE DEFINER = 'permission_trig'@'localhost' TRIGGER remove_user_object_perms_on_perm_object_delete AFTER DELETE ON arbiter_data.permission_object_mapping
+FOR EACH ROW DELETE FROM arbiter_data.user_object_permissions WHERE permission_id = OLD.permission_id AND object_id = OLD.object_id;
+
+
+-- use the materialized table for lists of readable objects
+CREATE OR REPLACE VIEW user_objects AS
+SELECT users.auth0_id AS auth0_id, uop.object_id AS object_id, uop.object_type AS object_type
+    FROM user_object_permissions AS uop
+    JOIN users ON users.id = uop.user_id
+    WHERE uop.action = 'read';
+
+
+GRANT SELECT ON arbiter_data.user_object_permissions TO 'select_rbac'@'localhost';
+
+
+DROP FUNCTION can_user_perform_action;
+CREATE DEFINER = 'select_rbac'@'localhost' FUNCTION can_user_perform_action (auth0id VARCHAR(32), objectid BINARY(16), theaction VARCHAR(32))
+RETURNS BOOLEAN
+COMMENT 'Can the user perform the action on the object?'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE uid BINARY(16);
+    SELECT id INTO uid FROM users WHERE auth0_id = auth0id;
+    RETURN EXISTS(
+        SELECT 1 FROM user_object_permissions
+            WHERE user_id = uid AND action = theaction AND object_id = objectid
+    );
+END;
+GRANT EXECUTE ON FUNCTION `arbiter_data`.`can_user_perform_action` TO `select_rbac`@`localhost`;
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'insert_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'select_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'update_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'delete_objects'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'insert_rbac'@'localhost';
+GRANT EXECUTE ON FUNCTION arbiter_data.can_user_perform_action TO 'delete_rbac'@'localhost';
+
+
+DROP PROCEDURE list_objects_user_can_read;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE list_objects_user_can_read (IN auth0id VARCHAR(32), IN objtype VARCHAR(32))
+COMMENT 'List the objects a user can read'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE uid BINARY(16);
+    SELECT id INTO uid FROM users WHERE auth0_id = auth0id;
+    SELECT DISTINCT object_id FROM user_object_permissions
+        WHERE user_id = uid AND action = 'read' AND object_type = objtype;
+END;
+GRANT EXECUTE ON PROCEDURE `arbiter_data`.`list_objects_user_can_read` TO `select_rbac`@`localhost`;
+
+
+DROP PROCEDURE get_user_actions_on_object;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE get_user_actions_on_object(
+    IN auth0id VARCHAR(32), IN strobjectid CHAR(36))
+COMMENT 'Get a list of all of the actions the user can take on an object.'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE userid BINARY(16);
+    DECLARE objectid BINARY(16);
+    SET userid = (SELECT id FROM users WHERE auth0_id = auth0id);
+    SET objectid = UUID_TO_BIN(strobjectid, 1);
+
+    SELECT DISTINCT action FROM user_object_permissions
+        WHERE user_id = userid AND object_id = objectid;
+END;
+GRANT EXECUTE ON PROCEDURE get_user_actions_on_object TO 'select_rbac'@'localhost';
+GRANT EXECUTE ON PROCEDURE get_user_actions_on_object TO 'apiuser'@'%';
+
+
+DROP PROCEDURE list_actions_on_all_objects_of_type;
+CREATE DEFINER = 'select_rbac'@'localhost' PROCEDURE list_actions_on_all_objects_of_type(
+    IN auth0id VARCHAR(32), IN objecttype VARCHAR(32))
+COMMENT 'List the uuids and actions users can take on all objects of a given type'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE userid BINARY(16);
+    SET userid = (SELECT id FROM users WHERE auth0_id = auth0id);
+
+    SELECT BIN_TO_UUID(object_id, 1) AS object_id, JSON_KEYS(JSON_OBJECTAGG(action, '')) AS actions
+        FROM user_object_permissions
+        WHERE user_id = userid AND object_type = objecttype
+        GROUP BY object_id;
+END;
+GRANT EXECUTE ON PROCEDURE list_actions_on_all_objects_of_type TO 'select_rbac'@'localhost';
+GRANT EXECUTE ON PROCEDURE list_actions_on_all_objects_of_type TO 'apiuser'@'%';
@@ -0,0 +1,3 @@
+DROP PROCEDURE list_observations_filtered;
+DROP PROCEDURE list_forecasts_filtered;
+DROP PROCEDURE list_cdf_forecasts_groups_filtered;
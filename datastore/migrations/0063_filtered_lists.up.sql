@@ -0,0 +1,129 @@
+-- Procedures to list a page of objects, filtered in the database instead of in the API.
+-- Pages are ordered by id, and the next page starts after the id given as the cursor.
+-- extra_parameters is only returned when withextra is true.
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE list_observations_filtered (
+    IN auth0id VARCHAR(32), IN strsiteid CHAR(36), IN thevariable VARCHAR(32),
+    IN strcursor CHAR(36), IN maxrows INT, IN withextra BOOLEAN)
+COMMENT 'List a page of observations the user can read, optionally filtered by site and variable'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binsiteid BINARY(16) DEFAULT NULL;
+    DECLARE bincursor BINARY(16) DEFAULT NULL;
+    DECLARE lim BIGINT UNSIGNED DEFAULT 18446744073709551615;
+    IF strsiteid IS NOT NULL THEN
+        SET binsiteid = UUID_TO_BIN(strsiteid, 1);
+        IF NOT can_user_perform_action(auth0id, binsiteid, 'read') THEN
+            SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'User does not have permission to read site', MYSQL_ERRNO = 1143;
+        END IF;
+    END IF;
+    IF strcursor IS NOT NULL THEN
+        SET bincursor = UUID_TO_BIN(strcursor, 1);
+    END IF;
+    IF maxrows IS NOT NULL THEN
+        SET lim = maxrows;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as observation_id, get_organization_name(organization_id) as provider,
+        BIN_TO_UUID(site_id, 1) as site_id, name, variable, interval_label, interval_length, interval_value_type,
+        uncertainty, IF(withextra, extra_parameters, NULL) as extra_parameters, created_at, modified_at
+    FROM observations WHERE id IN (
+        SELECT object_id FROM user_objects WHERE auth0_id = auth0id AND object_type = 'observations')
+        AND (binsiteid IS NULL OR site_id = binsiteid)
+        AND (thevariable IS NULL OR variable = thevariable)
+        AND (bincursor IS NULL OR id > bincursor)
+    ORDER BY id LIMIT lim;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_observations_filtered TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_observations_filtered TO 'apiuser'@'%';
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE list_forecasts_filtered (
+    IN auth0id VARCHAR(32), IN strsiteid CHAR(36), IN straggregateid CHAR(36), IN thevariable VARCHAR(32),
+    IN strcursor CHAR(36), IN maxrows INT, IN withextra BOOLEAN)
+COMMENT 'List a page of forecasts the user can read, optionally filtered by site, aggregate, and variable'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binsiteid BINARY(16) DEFAULT NULL;
+    DECLARE binaggregateid BINARY(16) DEFAULT NULL;
+    DECLARE bincursor BINARY(16) DEFAULT NULL;
+    DECLARE lim BIGINT UNSIGNED DEFAULT 18446744073709551615;
+    IF strsiteid IS NOT NULL THEN
+        SET binsiteid = UUID_TO_BIN(strsiteid, 1);
+        IF NOT can_user_perform_action(auth0id, binsiteid, 'read') THEN
+            SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'User does not have permission to read site', MYSQL_ERRNO = 1143;
+        END IF;
+    END IF;
+    IF straggregateid IS NOT NULL THEN
+        SET binaggregateid = UUID_TO_BIN(straggregateid, 1);
+        IF NOT can_user_perform_action(auth0id, binaggregateid, 'read') THEN
+            SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'User does not have permission to read aggregate', MYSQL_ERRNO = 1143;
+        END IF;
+    END IF;
+    IF strcursor IS NOT NULL THEN
+        SET bincursor = UUID_TO_BIN(strcursor, 1);
+    END IF;
+    IF maxrows IS NOT NULL THEN
+        SET lim = maxrows;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as forecast_id, get_organization_name(organization_id) as provider,
+        BIN_TO_UUID(site_id, 1) as site_id, BIN_TO_UUID(aggregate_id, 1) as aggregate_id,
+        name, variable, issue_time_of_day, lead_time_to_start,
+        interval_label, interval_length, run_length, interval_value_type,
+        IF(withextra, extra_parameters, NULL) as extra_parameters, created_at, modified_at
+    FROM forecasts WHERE id IN (
+        SELECT object_id FROM user_objects WHERE auth0_id = auth0id AND object_type = 'forecasts')
+        AND (binsiteid IS NULL OR site_id = binsiteid)
+        AND (binaggregateid IS NULL OR aggregate_id = binaggregateid)
+        AND (thevariable IS NULL OR variable = thevariable)
+        AND (bincursor IS NULL OR id > bincursor)
+    ORDER BY id LIMIT lim;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_forecasts_filtered TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_forecasts_filtered TO 'apiuser'@'%';
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE list_cdf_forecasts_groups_filtered (
+    IN auth0id VARCHAR(32), IN strsiteid CHAR(36), IN straggregateid CHAR(36), IN thevariable VARCHAR(32),
+    IN strcursor CHAR(36), IN maxrows INT, IN withextra BOOLEAN)
+COMMENT 'List a page of cdf forecast groups the user can read, optionally filtered by site, aggregate, and variable'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binsiteid BINARY(16) DEFAULT NULL;
+    DECLARE binaggregateid BINARY(16) DEFAULT NULL;
+    DECLARE bincursor BINARY(16) DEFAULT NULL;
+    DECLARE lim BIGINT UNSIGNED DEFAULT 18446744073709551615;
+    IF strsiteid IS NOT NULL THEN
+        SET binsiteid = UUID_TO_BIN(strsiteid, 1);
+        IF NOT can_user_perform_action(auth0id, binsiteid, 'read') THEN
+            SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'User does not have permission to read site', MYSQL_ERRNO = 1143;
+        END IF;
+    END IF;
+    IF straggregateid IS NOT NULL THEN
+        SET binaggregateid = UUID_TO_BIN(straggregateid, 1);
+        IF NOT can_user_perform_action(auth0id, binaggregateid, 'read') THEN
+            SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'User does not have permission to read aggregate', MYSQL_ERRNO = 1143;
+        END IF;
+    END IF;
+    IF strcursor IS NOT NULL THEN
+        SET bincursor = UUID_TO_BIN(strcursor, 1);
+    END IF;
+    IF maxrows IS NOT NULL THEN
+        SET lim = maxrows;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as forecast_id, get_organization_name(organization_id) as provider,
+        BIN_TO_UUID(site_id, 1) as site_id, BIN_TO_UUID(aggregate_id, 1) as aggregate_id,
+        name, variable, issue_time_of_day, lead_time_to_start,
+        interval_label, interval_length, run_length, interval_value_type,
+        IF(withextra, extra_parameters, NULL) as extra_parameters, axis,
+        created_at, modified_at, get_constant_values(id) as constant_values
+    FROM cdf_forecasts_groups WHERE id IN (
+        SELECT object_id FROM user_objects WHERE auth0_id = auth0id AND object_type = 'cdf_forecasts')
+        AND (binsiteid IS NULL OR site_id = binsiteid)
+        AND (binaggregateid IS NULL OR aggregate_id = binaggregateid)
+        AND (thevariable IS NULL OR variable = thevariable)
+        AND (bincursor IS NULL OR id > bincursor)
+    ORDER BY id LIMIT lim;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_cdf_forecasts_groups_filtered TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_cdf_forecasts_groups_filtered TO 'apiuser'@'%';
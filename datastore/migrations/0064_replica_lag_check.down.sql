@@ -0,0 +1 @@
+REVOKE REPLICATION CLIENT ON *.* FROM 'apiuser'@'%';
@@ -0,0 +1,2 @@
+-- allow the API to read the replication lag of read replicas with SHOW SLAVE STATUS
+GRANT REPLICATION CLIENT ON *.* TO 'apiuser'@'%';
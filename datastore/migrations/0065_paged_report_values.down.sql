@@ -0,0 +1 @@
+DROP PROCEDURE read_report_values_page;
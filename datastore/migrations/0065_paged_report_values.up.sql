@@ -0,0 +1,33 @@
+-- Read a page of the processed values of a report so that reports with many objects
+-- can be read without loading every processed_values blob at once.
+-- Pages are ordered by id, and the next page starts after the id given as the cursor.
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE read_report_values_page (
+    IN auth0id VARCHAR(32), IN strid CHAR(36), IN strcursor CHAR(36), IN maxrows INT)
+COMMENT 'Read a page of the processed report values the user can read'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binid BINARY(16);
+    DECLARE bincursor BINARY(16) DEFAULT NULL;
+    DECLARE lim BIGINT UNSIGNED DEFAULT 18446744073709551615;
+    SET binid = UUID_TO_BIN(strid, 1);
+    IF NOT can_user_perform_action(auth0id, binid, 'read_values') THEN
+        SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'Access denied to user on "read report values"',
+        MYSQL_ERRNO = 1142;
+    END IF;
+    IF strcursor IS NOT NULL THEN
+        SET bincursor = UUID_TO_BIN(strcursor, 1);
+    END IF;
+    IF maxrows IS NOT NULL THEN
+        SET lim = maxrows;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as id, BIN_TO_UUID(object_id, 1) as object_id,
+        processed_values
+    FROM arbiter_data.report_values WHERE report_id = binid
+        AND is_read_values_any_allowed(auth0id, object_id)
+        AND (bincursor IS NULL OR id > bincursor)
+    ORDER BY id LIMIT lim;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_values_page TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_values_page TO 'apiuser'@'%';
@@ -0,0 +1,2 @@
+DROP PROCEDURE read_report_object_values;
+DROP PROCEDURE read_report_values_manifest;
@@ -0,0 +1,47 @@
+-- Read the processed values of a single object of a report, using the object_id key
+-- of report_values, and a manifest of the processed values of a report with the size
+-- of each that does not return the processed values themselves.
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE read_report_object_values (
+    IN auth0id VARCHAR(32), IN strid CHAR(36), IN strobjectid CHAR(36))
+COMMENT 'Read the processed report values of one object of a report'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binid BINARY(16);
+    DECLARE binobjectid BINARY(16);
+    SET binid = UUID_TO_BIN(strid, 1);
+    SET binobjectid = UUID_TO_BIN(strobjectid, 1);
+    IF NOT can_user_perform_action(auth0id, binid, 'read_values') OR
+            NOT is_read_values_any_allowed(auth0id, binobjectid) THEN
+        SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'Access denied to user on "read report values"',
+        MYSQL_ERRNO = 1142;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as id, BIN_TO_UUID(object_id, 1) as object_id,
+        processed_values
+    FROM arbiter_data.report_values WHERE report_id = binid AND object_id = binobjectid
+    ORDER BY id;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_object_values TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_object_values TO 'apiuser'@'%';
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE read_report_values_manifest (
+    IN auth0id VARCHAR(32), IN strid CHAR(36))
+COMMENT 'List the processed report values the user can read with their size in bytes'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binid BINARY(16);
+    SET binid = UUID_TO_BIN(strid, 1);
+    IF NOT can_user_perform_action(auth0id, binid, 'read_values') THEN
+        SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'Access denied to user on "read report values"',
+        MYSQL_ERRNO = 1142;
+    END IF;
+    SELECT BIN_TO_UUID(id, 1) as id, BIN_TO_UUID(object_id, 1) as object_id,
+        LENGTH(processed_values) as size
+    FROM arbiter_data.report_values WHERE report_id = binid
+        AND is_read_values_any_allowed(auth0id, object_id)
+    ORDER BY id;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_values_manifest TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_values_manifest TO 'apiuser'@'%';
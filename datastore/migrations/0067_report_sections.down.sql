@@ -0,0 +1,15 @@
+DROP PROCEDURE store_raw_report_sections;
+DROP PROCEDURE read_report_sections;
+
+UPDATE arbiter_data.reports SET modified_at = modified_at, raw_report = JSON_MERGE_PRESERVE(
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'summary'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'metrics'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'plots'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'data_checksum'))
+WHERE id IN (SELECT report_id FROM arbiter_data.report_sections);
+
+DROP TABLE arbiter_data.report_sections;
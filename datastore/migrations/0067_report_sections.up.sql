@@ -0,0 +1,60 @@
+-- Store the raw report as separately compressed sections so that parts of it,
+-- like the metrics, can be read without reading the much larger plots. Each
+-- section is a JSON object of the keys of the raw report in that section
+-- compressed with the format of COMPRESS. The raw_report column is read in
+-- place of the sections while it is set, so existing reports are moved to
+-- sections by 0070 once no API process reads raw_report.
+CREATE TABLE arbiter_data.report_sections(
+    report_id BINARY(16) NOT NULL,
+    section ENUM('summary', 'metrics', 'plots', 'data_checksum') NOT NULL,
+    data LONGBLOB NOT NULL,
+
+    PRIMARY KEY (report_id, section),
+    FOREIGN KEY (report_id)
+        REFERENCES arbiter_data.reports(id)
+        ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE=INNODB ENCRYPTION='Y';
+
+GRANT SELECT ON arbiter_data.report_sections TO 'select_objects'@'localhost';
+GRANT INSERT, UPDATE ON arbiter_data.report_sections TO 'insert_objects'@'localhost';
+
+
+CREATE DEFINER = 'insert_objects'@'localhost' PROCEDURE store_raw_report_sections(
+    IN auth0id VARCHAR(32), IN strid CHAR(36), IN summary LONGBLOB,
+    IN metrics LONGBLOB, IN plots LONGBLOB, IN datachecksum LONGBLOB)
+COMMENT 'Store the compressed sections of the raw report'
+MODIFIES SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binid BINARY(16);
+    SET binid = UUID_TO_BIN(strid, 1);
+    IF NOT can_user_perform_action(auth0id, binid, 'update') THEN
+        SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'Access denied to user on "store raw report"',
+        MYSQL_ERRNO = 1142;
+    END IF;
+    INSERT INTO arbiter_data.report_sections (report_id, section, data) VALUES
+        (binid, 'summary', summary), (binid, 'metrics', metrics),
+        (binid, 'plots', plots), (binid, 'data_checksum', datachecksum)
+        ON DUPLICATE KEY UPDATE data = VALUES(data);
+    UPDATE arbiter_data.reports SET raw_report = NULL, modified_at = CURRENT_TIMESTAMP
+    WHERE id = binid;
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.store_raw_report_sections TO 'insert_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.store_raw_report_sections TO 'apiuser'@'%';
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE read_report_sections (
+    IN auth0id VARCHAR(32), IN strid CHAR(36), IN strsections VARCHAR(255))
+COMMENT 'Read the compressed sections of the raw report in the comma separated strsections'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    DECLARE binid BINARY(16);
+    SET binid = UUID_TO_BIN(strid, 1);
+    IF NOT can_user_perform_action(auth0id, binid, 'read') THEN
+        SIGNAL SQLSTATE '42000' SET MESSAGE_TEXT = 'Access denied to user on "read report"',
+        MYSQL_ERRNO = 1142;
+    END IF;
+    SELECT section, data FROM arbiter_data.report_sections
+    WHERE report_id = binid AND FIND_IN_SET(section, strsections);
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_sections TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_report_sections TO 'apiuser'@'%';
@@ -0,0 +1 @@
+DROP PROCEDURE read_pair_metadata;
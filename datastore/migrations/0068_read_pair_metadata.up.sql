@@ -0,0 +1,45 @@
+-- Read the metadata used to check the compatibility of the forecasts, observations
+-- and aggregates of report object pairs for all of the objects of a report in one
+-- call. Objects that do not exist or that the user can not read are left out.
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE read_pair_metadata (
+    IN auth0id VARCHAR(32), IN strids JSON)
+COMMENT 'Read the metadata of the forecasts, observations and aggregates in the JSON array strids'
+READS SQL DATA SQL SECURITY DEFINER
+BEGIN
+    WITH ids AS (
+        SELECT DISTINCT UUID_TO_BIN(jsonids.id, 1) as binid
+        FROM JSON_TABLE(strids, '$[*]' COLUMNS (
+            id CHAR(36) PATH '$' ERROR ON EMPTY ERROR ON ERROR)) as jsonids
+    )
+    SELECT 'forecasts' as object_type, BIN_TO_UUID(f.id, 1) as id, f.variable,
+        f.interval_label, f.interval_length, BIN_TO_UUID(f.site_id, 1) as site_id,
+        BIN_TO_UUID(f.aggregate_id, 1) as aggregate_id, NULL as parent, NULL as axis,
+        NULL as constant_value
+    FROM arbiter_data.forecasts as f JOIN ids ON f.id = ids.binid
+    WHERE can_user_perform_action(auth0id, f.id, 'read')
+    UNION ALL
+    SELECT 'cdf_forecasts', BIN_TO_UUID(cfg.id, 1), cfg.variable, cfg.interval_label,
+        cfg.interval_length, BIN_TO_UUID(cfg.site_id, 1), BIN_TO_UUID(cfg.aggregate_id, 1),
+        NULL, cfg.axis, NULL
+    FROM arbiter_data.cdf_forecasts_groups as cfg JOIN ids ON cfg.id = ids.binid
+    WHERE can_user_perform_action(auth0id, cfg.id, 'read')
+    UNION ALL
+    SELECT 'cdf_forecasts_singles', BIN_TO_UUID(cfs.id, 1), cfg.variable, cfg.interval_label,
+        cfg.interval_length, BIN_TO_UUID(cfg.site_id, 1), BIN_TO_UUID(cfg.aggregate_id, 1),
+        BIN_TO_UUID(cfg.id, 1), cfg.axis, cfs.constant_value
+    FROM arbiter_data.cdf_forecasts_singles as cfs JOIN ids ON cfs.id = ids.binid
+    JOIN arbiter_data.cdf_forecasts_groups as cfg ON cfg.id = cfs.cdf_forecast_group_id
+    WHERE can_user_perform_action(auth0id, cfg.id, 'read')
+    UNION ALL
+    SELECT 'observations', BIN_TO_UUID(o.id, 1), o.variable, o.interval_label,
+        o.interval_length, BIN_TO_UUID(o.site_id, 1), NULL, NULL, NULL, NULL
+    FROM arbiter_data.observations as o JOIN ids ON o.id = ids.binid
+    WHERE can_user_perform_action(auth0id, o.id, 'read')
+    UNION ALL
+    SELECT 'aggregates', BIN_TO_UUID(a.id, 1), a.variable, a.interval_label,
+        a.interval_length, NULL, BIN_TO_UUID(a.id, 1), NULL, NULL, NULL
+    FROM arbiter_data.aggregates as a JOIN ids ON a.id = ids.binid
+    WHERE can_user_perform_action(auth0id, a.id, 'read');
+END;
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_pair_metadata TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.read_pair_metadata TO 'apiuser'@'%';
@@ -0,0 +1,3 @@
+DROP PROCEDURE jobs_checksum;
+DROP PROCEDURE list_jobs_modified_since;
+ALTER TABLE arbiter_data.scheduled_jobs DROP INDEX modified_at_idx;
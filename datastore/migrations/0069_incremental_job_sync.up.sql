@@ -0,0 +1,29 @@
+-- Let the scheduler read only the jobs modified since its last sync and
+-- check for deleted jobs with a checksum instead of listing every job.
+ALTER TABLE arbiter_data.scheduled_jobs ADD INDEX modified_at_idx (modified_at);
+
+
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE list_jobs_modified_since (
+    IN since TIMESTAMP)
+COMMENT 'List the jobs modified at or after since'
+READS SQL DATA SQL SECURITY DEFINER
+SELECT BIN_TO_UUID(id, 1) as id, get_organization_name(organization_id) as organization_name,
+    BIN_TO_UUID(organization_id, 1) as organization_id,
+    BIN_TO_UUID(user_id, 1) as user_id, name, job_type, parameters, schedule, version,
+    created_at, modified_at FROM arbiter_data.scheduled_jobs WHERE modified_at >= since;
+
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_jobs_modified_since TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.list_jobs_modified_since TO 'job_executor'@'%';
+
+
+-- The checksum is the XOR of the CRC32 of '<id>:<unix modified_at>' of each
+-- job, so it changes when a job is added, modified or deleted.
+CREATE DEFINER = 'select_objects'@'localhost' PROCEDURE jobs_checksum ()
+COMMENT 'Count the jobs and compute a checksum of their ids and modified_at'
+READS SQL DATA SQL SECURITY DEFINER
+SELECT COUNT(*) as count, BIT_XOR(CRC32(CONCAT(
+    BIN_TO_UUID(id, 1), ':', UNIX_TIMESTAMP(modified_at)))) as checksum
+FROM arbiter_data.scheduled_jobs;
+
+GRANT EXECUTE ON PROCEDURE arbiter_data.jobs_checksum TO 'select_objects'@'localhost';
+GRANT EXECUTE ON PROCEDURE arbiter_data.jobs_checksum TO 'job_executor'@'%';
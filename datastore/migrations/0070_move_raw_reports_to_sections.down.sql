@@ -0,0 +1,13 @@
+-- Restore the raw_report column so that API processes from before 0067
+-- can read the reports again. The sections are kept for
+-- read_report_sections.
+UPDATE arbiter_data.reports SET modified_at = modified_at, raw_report = JSON_MERGE_PRESERVE(
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'summary'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'metrics'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'plots'),
+    (SELECT CAST(CONVERT(UNCOMPRESS(data) USING utf8mb4) AS JSON) FROM arbiter_data.report_sections
+     WHERE report_id = reports.id AND section = 'data_checksum'))
+WHERE raw_report IS NULL AND id IN (SELECT report_id FROM arbiter_data.report_sections);
@@ -0,0 +1,34 @@
+-- Move the raw reports still stored in the raw_report column to
+-- report_sections. API processes from before 0067 only read raw_report, so
+-- this must be applied once every API process reads the sections, e.g. with
+-- `migrate goto 69` before deploying the API and `migrate up` after. The
+-- sections of a report with raw_report set are replaced since raw_report was
+-- stored after them.
+DELETE FROM arbiter_data.report_sections WHERE report_id IN (
+    SELECT id FROM arbiter_data.reports WHERE raw_report IS NOT NULL);
+
+INSERT INTO arbiter_data.report_sections (report_id, section, data)
+SELECT id, 'summary', COMPRESS(CAST(
+    JSON_REMOVE(raw_report, '$.metrics', '$.plots', '$.data_checksum') AS CHAR))
+FROM arbiter_data.reports WHERE raw_report IS NOT NULL
+UNION ALL
+SELECT id, 'metrics', COMPRESS(CAST(IF(
+    JSON_CONTAINS_PATH(raw_report, 'one', '$.metrics'),
+    JSON_OBJECT('metrics', JSON_EXTRACT(raw_report, '$.metrics')),
+    JSON_OBJECT()) AS CHAR))
+FROM arbiter_data.reports WHERE raw_report IS NOT NULL
+UNION ALL
+SELECT id, 'plots', COMPRESS(CAST(IF(
+    JSON_CONTAINS_PATH(raw_report, 'one', '$.plots'),
+    JSON_OBJECT('plots', JSON_EXTRACT(raw_report, '$.plots')),
+    JSON_OBJECT()) AS CHAR))
+FROM arbiter_data.reports WHERE raw_report IS NOT NULL
+UNION ALL
+SELECT id, 'data_checksum', COMPRESS(CAST(IF(
+    JSON_CONTAINS_PATH(raw_report, 'one', '$.data_checksum'),
+    JSON_OBJECT('data_checksum', JSON_EXTRACT(raw_report, '$.data_checksum')),
+    JSON_OBJECT()) AS CHAR))
+FROM arbiter_data.reports WHERE raw_report IS NOT NULL;
+
+UPDATE arbiter_data.reports SET raw_report = NULL, modified_at = modified_at
+WHERE raw_report IS NOT NULL;
@@ -1387,6 +1387,39 @@ def test_store_raw_report_no_update(
     assert e.value.args[0] == 1142
 
 
+def test_store_raw_report_sections(
+        dictcursor, insertuser, allow_read_reports,
+        allow_update_reports):
+    user, _, _, obs, org, role, _, report, _ = insertuser
+    for data in (b'first', b'second'):
+        dictcursor.callproc(
+            'store_raw_report_sections',
+            (user['auth0_id'], str(bin_to_uuid(report['id'])),
+             data + b'summary', data + b'metrics', data + b'plots',
+             data + b'checksum'))
+    dictcursor.execute(
+        'SELECT section, data FROM arbiter_data.report_sections '
+        'WHERE report_id = %s', (report['id'],))
+    res = {r['section']: r['data'] for r in dictcursor.fetchall()}
+    assert res == {'summary': b'secondsummary', 'metrics': b'secondmetrics',
+                   'plots': b'secondplots', 'data_checksum': b'secondchecksum'}
+    dictcursor.execute(
+        'SELECT raw_report FROM arbiter_data.reports WHERE id = %s',
+        (report['id'],))
+    assert dictcursor.fetchone()['raw_report'] is None
+
+
+def test_store_raw_report_sections_no_update(
+        dictcursor, insertuser, allow_read_reports):
+    user, _, _, obs, org, role, _, report, _ = insertuser
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'store_raw_report_sections',
+            (user['auth0_id'], str(bin_to_uuid(report['id'])),
+             b'summary', b'metrics', b'plots', b'checksum'))
+    assert e.value.args[0] == 1142
+
+
 @pytest.mark.parametrize('new_status', [
     'pending', 'complete', 'failed'])
 def test_store_report_status(
@@ -1,7 +1,9 @@
 import json
 from random import shuffle
+import zlib
 
 
+import pymysql
 import pytest
 
 
@@ -195,6 +197,178 @@ def test_list_cdf_forecast_groups(dictcursor, twosets):
         == set(cdf[0].keys()) - set(('organization_id', 'id')))
 
 
+def _ids(objs):
+    return [str(bin_to_uuid(obj['id'])) for obj in objs]
+
+
+def test_list_observations_filtered(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    obs = twosets[5]
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, None, None, True))
+    res = dictcursor.fetchall()
+    # other organization's observations are not listed
+    assert [r['observation_id'] for r in res] == _ids(obs)
+    assert res[0]['extra_parameters'] == ''
+    assert (
+        set(res[0].keys()) - set(
+            ('created_at', 'modified_at', 'provider', 'observation_id')) ==
+        set(obs[0].keys()) - set(('organization_id', 'id')))
+
+
+def test_list_observations_filtered_no_extra(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, None, None, False))
+    res = dictcursor.fetchall()
+    assert len(res) == 4
+    assert all(r['extra_parameters'] is None for r in res)
+
+
+def test_list_observations_filtered_paged(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    ids = _ids(twosets[5])
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, None, 3, False))
+    assert [r['observation_id'] for r in dictcursor.fetchall()] == ids[:3]
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, ids[2], 3, False))
+    assert [r['observation_id'] for r in dictcursor.fetchall()] == ids[3:]
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, ids[-1], 3, False))
+    assert len(dictcursor.fetchall()) == 0
+
+
+def test_list_observations_filtered_site_variable(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    sites = twosets[3]
+    obs = twosets[5]
+    dictcursor.execute(
+        'UPDATE observations SET variable = "ghi" WHERE id = %s',
+        obs[1]['id'])
+    siteid = str(bin_to_uuid(sites[0]['id']))
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, siteid, None, None, None, False))
+    assert [r['observation_id'] for r in dictcursor.fetchall()] == _ids(
+        obs[:2])
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, 'ghi', None, None, False))
+    assert [r['observation_id'] for r in dictcursor.fetchall()] == _ids(
+        obs[1:2])
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, siteid, 'power', None, None, False))
+    assert [r['observation_id'] for r in dictcursor.fetchall()] == _ids(
+        obs[:1])
+
+
+def test_list_observations_filtered_site_denied(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    other_site = twosets[-1][3][0]
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'list_observations_filtered',
+            (authid, str(bin_to_uuid(other_site['id'])), None, None, None,
+             False))
+    assert e.value.args[0] == 1143
+
+
+def test_list_observations_filtered_no_read(dictcursor, twosets):
+    authid = twosets[0]['auth0_id']
+    perm = [p for p in twosets[2] if p['object_type'] == 'observations'][0]
+    dictcursor.execute(
+        'DELETE FROM role_permission_mapping WHERE permission_id = %s',
+        perm['id'])
+    dictcursor.callproc('list_observations_filtered',
+                        (authid, None, None, None, None, False))
+    assert len(dictcursor.fetchall()) == 0
+
+
+@pytest.mark.parametrize('proc,index', [
+    ('list_forecasts_filtered', 4),
+    ('list_cdf_forecasts_groups_filtered', 6),
+])
+def test_list_forecasts_filtered(dictcursor, twosets, proc, index):
+    authid = twosets[0]['auth0_id']
+    fxs = twosets[index]
+    dictcursor.callproc(proc, (authid, None, None, None, None, None, True))
+    res = dictcursor.fetchall()
+    assert [r['forecast_id'] for r in res] == _ids(fxs)
+    assert (
+        set(res[0].keys()) - set(
+            ('created_at', 'modified_at', 'provider', 'forecast_id')) ==
+        set(fxs[0].keys()) - set(('organization_id', 'id')))
+
+
+@pytest.mark.parametrize('proc,index', [
+    ('list_forecasts_filtered', 4),
+    ('list_cdf_forecasts_groups_filtered', 6),
+])
+def test_list_forecasts_filtered_paged(dictcursor, twosets, proc, index):
+    authid = twosets[0]['auth0_id']
+    ids = _ids(twosets[index])
+    dictcursor.callproc(proc, (authid, None, None, None, None, 1, False))
+    assert [r['forecast_id'] for r in dictcursor.fetchall()] == ids[:1]
+    dictcursor.callproc(proc, (authid, None, None, None, ids[0], 1, False))
+    assert [r['forecast_id'] for r in dictcursor.fetchall()] == ids[1:]
+
+
+@pytest.mark.parametrize('proc,index', [
+    ('list_forecasts_filtered', 4),
+    ('list_cdf_forecasts_groups_filtered', 6),
+])
+def test_list_forecasts_filtered_site_aggregate(dictcursor, twosets, proc,
+                                                index):
+    authid = twosets[0]['auth0_id']
+    fxs = twosets[index]
+    siteid = str(bin_to_uuid(fxs[0]['site_id']))
+    aggid = str(bin_to_uuid(fxs[1]['aggregate_id']))
+    dictcursor.callproc(proc, (authid, siteid, None, None, None, None,
+                               False))
+    assert [r['forecast_id'] for r in dictcursor.fetchall()] == _ids(
+        fxs[:1])
+    dictcursor.callproc(proc, (authid, None, aggid, None, None, None,
+                               False))
+    assert [r['forecast_id'] for r in dictcursor.fetchall()] == _ids(
+        fxs[1:])
+    # filters are combined with AND, and a forecast is made for either a
+    # site or an aggregate
+    dictcursor.callproc(proc, (authid, siteid, aggid, None, None, None,
+                               False))
+    assert len(dictcursor.fetchall()) == 0
+
+
+@pytest.mark.parametrize('proc,index', [
+    ('list_forecasts_filtered', 4),
+    ('list_cdf_forecasts_groups_filtered', 6),
+])
+def test_list_forecasts_filtered_variable(dictcursor, twosets, proc, index):
+    authid = twosets[0]['auth0_id']
+    fxs = twosets[index]
+    table = ('forecasts' if proc == 'list_forecasts_filtered'
+             else 'cdf_forecasts_groups')
+    dictcursor.execute(
+        f'UPDATE {table} SET variable = "ghi" WHERE id = %s', fxs[1]['id'])
+    dictcursor.callproc(proc, (authid, None, None, 'ghi', None, None,
+                               False))
+    assert [r['forecast_id'] for r in dictcursor.fetchall()] == _ids(
+        fxs[1:])
+
+
+@pytest.mark.parametrize('proc', [
+    'list_forecasts_filtered', 'list_cdf_forecasts_groups_filtered'])
+@pytest.mark.parametrize('filter_', ['site', 'aggregate'])
+def test_list_forecasts_filtered_denied(dictcursor, twosets, proc, filter_):
+    authid = twosets[0]['auth0_id']
+    dummy = twosets[-1]
+    if filter_ == 'site':
+        args = (str(bin_to_uuid(dummy[3][0]['id'])), None)
+    else:
+        args = (None, str(bin_to_uuid(dummy[-1][0]['id'])))
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(proc, (authid, *args, None, None, None, False))
+    assert e.value.args[0] == 1143
+
+
 def test_list_cdf_forecast_groups_no_singles(dictcursor, twosets):
     authid = twosets[0]['auth0_id']
     cdf = twosets[6]
@@ -273,3 +447,40 @@ def test_list_jobs(dictcursor, new_job, new_user):
     out_job_ids = {o['id'] for o in out}
     for j in (job0, job1, job2, job3):
         assert bin_to_uuid(j['id']) in out_job_ids
+
+
+def test_list_jobs_modified_since(dictcursor, new_job, new_user):
+    user = new_user()
+    job0 = new_job(user, 'job0')
+    job1 = new_job(user, 'job1')
+    dictcursor.execute(
+        'UPDATE scheduled_jobs SET modified_at = "2019-01-01 00:00:00" '
+        'WHERE id = %s', job0['id'])
+
+    dictcursor.callproc('list_jobs_modified_since', ('2019-06-01 00:00:00',))
+    out = dictcursor.fetchall()
+    out_job_ids = {o['id'] for o in out}
+    assert bin_to_uuid(job1['id']) in out_job_ids
+    assert bin_to_uuid(job0['id']) not in out_job_ids
+
+    dictcursor.callproc('list_jobs_modified_since', ('2019-01-01 00:00:00',))
+    out_job_ids = {o['id'] for o in dictcursor.fetchall()}
+    assert bin_to_uuid(job0['id']) in out_job_ids
+
+
+def test_jobs_checksum(dictcursor, new_job, new_user):
+    dictcursor.execute('DELETE FROM scheduled_jobs')
+    dictcursor.callproc('jobs_checksum')
+    assert dictcursor.fetchall()[0]['count'] == 0
+    user = new_user()
+    jobs = [new_job(user, 'job0'), new_job(user, 'job1')]
+    dictcursor.callproc('jobs_checksum')
+    out = dictcursor.fetchall()[0]
+    dictcursor.execute(
+        'SELECT BIN_TO_UUID(id, 1) as id, UNIX_TIMESTAMP(modified_at) as ts '
+        'FROM scheduled_jobs')
+    checksum = 0
+    for row in dictcursor.fetchall():
+        checksum ^= zlib.crc32(f'{row["id"]}:{row["ts"]}'.encode())
+    assert out['count'] == len(jobs)
+    assert out['checksum'] == checksum
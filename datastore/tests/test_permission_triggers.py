@@ -196,3 +196,120 @@ def test_update_user_perm_on_org_change(
          'description = CONCAT("DEFAULT Read User Role ", %s)'),
         str(bin_to_uuid(user['id'])))
     assert dictcursor.fetchone()['organization_id'] == org['id']
+
+
+@pytest.fixture()
+def user_object_permissions(cursor):
+    def fcn(user, objid):
+        cursor.execute(
+            'SELECT action FROM user_object_permissions WHERE user_id = %s '
+            'AND object_id = %s', (user['id'], objid))
+        return [r[0] for r in cursor.fetchall()]
+    return fcn
+
+
+@pytest.fixture()
+def user_with_role_permission(cursor, new_organization, new_user, new_role,
+                              new_permission, new_forecast):
+    org = new_organization()
+    user = new_user(org=org)
+    role = new_role(org=org)
+    perm = new_permission('read', 'forecasts', False, org=org)
+    fx = new_forecast(org=org)
+    return {'org': org, 'user': user, 'role': role, 'permission': perm,
+            'forecast': fx}
+
+
+def _add_mappings(cursor, urp, order):
+    stmts = {
+        'user_role': (
+            'INSERT INTO user_role_mapping (user_id, role_id) '
+            'VALUES (%s, %s)', (urp['user']['id'], urp['role']['id'])),
+        'role_permission': (
+            'INSERT INTO role_permission_mapping (role_id, permission_id) '
+            'VALUES (%s, %s)', (urp['role']['id'], urp['permission']['id'])),
+        'permission_object': (
+            'INSERT INTO permission_object_mapping (permission_id, object_id)'
+            ' VALUES (%s, %s)', (urp['permission']['id'],
+                                 urp['forecast']['id']))
+    }
+    for key in order:
+        cursor.execute(*stmts[key])
+
+
+@pytest.mark.parametrize('order', [
+    ('user_role', 'role_permission', 'permission_object'),
+    ('permission_object', 'role_permission', 'user_role'),
+    ('role_permission', 'permission_object', 'user_role'),
+])
+def test_user_object_permissions_insert(
+        cursor, user_with_role_permission, user_object_permissions, order):
+    """The materialized table is complete regardless of insert order"""
+    urp = user_with_role_permission
+    assert user_object_permissions(
+        urp['user'], urp['forecast']['id']) == []
+    _add_mappings(cursor, urp, order)
+    assert user_object_permissions(
+        urp['user'], urp['forecast']['id']) == ['read']
+
+
+@pytest.mark.parametrize('stmt,key', [
+    ('DELETE FROM user_role_mapping WHERE role_id = %s', 'role'),
+    ('DELETE FROM role_permission_mapping WHERE role_id = %s', 'role'),
+    ('DELETE FROM permission_object_mapping WHERE permission_id = %s',
+     'permission'),
+    ('DELETE FROM roles WHERE id = %s', 'role'),
+    ('DELETE FROM permissions WHERE id = %s', 'permission'),
+    ('DELETE FROM users WHERE id = %s', 'user'),
+    ('DELETE FROM forecasts WHERE id = %s', 'forecast'),
+])
+def test_user_object_permissions_delete(
+        cursor, user_with_role_permission, user_object_permissions, stmt,
+        key):
+    urp = user_with_role_permission
+    _add_mappings(cursor, urp, ('user_role', 'role_permission',
+                                'permission_object'))
+    assert user_object_permissions(
+        urp['user'], urp['forecast']['id']) == ['read']
+    cursor.execute(stmt, urp[key]['id'])
+    assert user_object_permissions(
+        urp['user'], urp['forecast']['id']) == []
+
+
+def test_user_object_permissions_other_role_remains(
+        cursor, user_with_role_permission, user_object_permissions,
+        new_role):
+    """Removing one role keeps access granted through another role"""
+    urp = user_with_role_permission
+    _add_mappings(cursor, urp, ('user_role', 'role_permission',
+                                'permission_object'))
+    role = new_role(org=urp['org'])
+    cursor.execute(
+        'INSERT INTO role_permission_mapping (role_id, permission_id) '
+        'VALUES (%s, %s)', (role['id'], urp['permission']['id']))
+    cursor.execute(
+        'INSERT INTO user_role_mapping (user_id, role_id) VALUES (%s, %s)',
+        (urp['user']['id'], role['id']))
+    cursor.execute('DELETE FROM user_role_mapping WHERE role_id = %s',
+                   urp['role']['id'])
+    assert user_object_permissions(
+        urp['user'], urp['forecast']['id']) == ['read']
+
+
+def test_user_object_permissions_applies_to_all(
+        cursor, new_organization, new_user, new_role, new_permission,
+        new_forecast, user_object_permissions):
+    """Objects created after the permission are added by the object
+    triggers"""
+    org = new_organization()
+    user = new_user(org=org)
+    role = new_role(org=org)
+    perm = new_permission('update', 'forecasts', True, org=org)
+    cursor.execute(
+        'INSERT INTO role_permission_mapping (role_id, permission_id) '
+        'VALUES (%s, %s)', (role['id'], perm['id']))
+    cursor.execute(
+        'INSERT INTO user_role_mapping (user_id, role_id) VALUES (%s, %s)',
+        (user['id'], role['id']))
+    fx = new_forecast(org=org)
+    assert user_object_permissions(user, fx['id']) == ['update']
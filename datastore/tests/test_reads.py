@@ -3,13 +3,14 @@ import datetime as dt
 import itertools
 import json
 import random
+from uuid import UUID, uuid1
 
 
 import pytest
 import pymysql
 
 
-from conftest import bin_to_uuid
+from conftest import bin_to_uuid, uuid_to_bin
 
 
 @pytest.fixture()
@@ -720,6 +721,36 @@ def test_read_report_denied(dictcursor, new_report, valueset, insertuser):
     assert e.value.args[0] == 1142
 
 
+@pytest.mark.parametrize('sections', [
+    'metrics', 'summary,plots', 'summary,metrics,plots,data_checksum', ''])
+def test_read_report_sections(
+        dictcursor, valueset, allow_read_reports, insertuser, sections):
+    user = insertuser[0]
+    report = insertuser[7]
+    for section in ('summary', 'metrics', 'plots', 'data_checksum'):
+        dictcursor.execute(
+            'INSERT INTO arbiter_data.report_sections (report_id, section, '
+            'data) VALUES (%s, %s, %s)',
+            (report['id'], section, section.encode()))
+    dictcursor.callproc(
+        'read_report_sections',
+        (user['auth0_id'], str(bin_to_uuid(report['id'])), sections))
+    res = {r['section']: r['data'] for r in dictcursor.fetchall()}
+    assert res == {section: section.encode()
+                   for section in sections.split(',') if section}
+
+
+def test_read_report_sections_denied(
+        dictcursor, new_report, valueset, insertuser):
+    user = insertuser[0]
+    report = new_report()
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'read_report_sections',
+            (user['auth0_id'], str(bin_to_uuid(report['id'])), 'metrics'))
+    assert e.value.args[0] == 1142
+
+
 def test_read_report_values(
         dictcursor, valueset, new_report, allow_read_reports,
         allow_read_observations, allow_read_observation_values,
@@ -808,6 +839,106 @@ def test_read_report_values_denied(
     assert e.value.args[0] == 1142
 
 
+def test_read_report_values_page(
+        dictcursor, valueset, new_report, allow_read_reports,
+        allow_read_observations, allow_read_observation_values,
+        allow_read_forecasts, allow_read_forecast_values,
+        allow_read_cdf_forecast_values, allow_read_cdf_forecasts,
+        allow_read_report_values, insertuser):
+    user = insertuser[0]
+    report_id = str(bin_to_uuid(insertuser[7]['id']))
+    dictcursor.callproc('read_report_values', (user['auth0_id'], report_id))
+    expected = sorted(dictcursor.fetchall(),
+                      key=lambda r: uuid_to_bin(UUID(r['id'])))
+    assert len(expected) > 2
+    dictcursor.callproc('read_report_values_page',
+                        (user['auth0_id'], report_id, None, 2))
+    first = dictcursor.fetchall()
+    assert first == expected[:2]
+    dictcursor.callproc('read_report_values_page',
+                        (user['auth0_id'], report_id, first[-1]['id'], None))
+    assert dictcursor.fetchall() == expected[2:]
+
+
+def test_read_report_object_values(
+        dictcursor, valueset, new_report, allow_read_reports,
+        allow_read_observations, allow_read_observation_values,
+        allow_read_forecasts, allow_read_forecast_values,
+        allow_read_cdf_forecast_values, allow_read_cdf_forecasts,
+        allow_read_report_values, insertuser):
+    user = insertuser[0]
+    report_id = str(bin_to_uuid(insertuser[7]['id']))
+    dictcursor.callproc('read_report_values', (user['auth0_id'], report_id))
+    values = dictcursor.fetchall()
+    object_id = values[0]['object_id']
+    dictcursor.callproc('read_report_object_values',
+                        (user['auth0_id'], report_id, object_id))
+    res = dictcursor.fetchall()
+    assert len(res) > 0
+    assert res == sorted([v for v in values if v['object_id'] == object_id],
+                         key=lambda r: uuid_to_bin(UUID(r['id'])))
+
+
+def test_read_report_object_values_no_data_access(
+        dictcursor, valueset, new_report, allow_read_reports,
+        insertuser, allow_read_report_values):
+    user = insertuser[0]
+    report = insertuser[7]
+    object_id = json.loads(report['report_parameters'])['object_pairs'][0][0]
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'read_report_object_values',
+            (user['auth0_id'], str(bin_to_uuid(report['id'])), object_id))
+    assert e.value.args[0] == 1142
+
+
+def test_read_report_values_manifest(
+        dictcursor, valueset, new_report, allow_read_reports,
+        allow_read_observations, allow_read_observation_values,
+        allow_read_forecasts, allow_read_forecast_values,
+        allow_read_cdf_forecast_values, allow_read_cdf_forecasts,
+        allow_read_report_values, insertuser):
+    user = insertuser[0]
+    report_id = str(bin_to_uuid(insertuser[7]['id']))
+    dictcursor.callproc('read_report_values', (user['auth0_id'], report_id))
+    values = {v['id']: v for v in dictcursor.fetchall()}
+    dictcursor.callproc('read_report_values_manifest',
+                        (user['auth0_id'], report_id))
+    res = dictcursor.fetchall()
+    assert len(res) == len(values)
+    for row in res:
+        value = values[row['id']]
+        assert row['object_id'] == value['object_id']
+        assert row['size'] == len(value['processed_values'])
+
+
+def test_read_report_values_manifest_denied(
+        dictcursor, valueset, new_report, allow_read_report_values,
+        insertuser):
+    user = insertuser[0]
+    report = new_report()
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'read_report_values_manifest',
+            (user['auth0_id'], str(bin_to_uuid(report['id']))))
+    assert e.value.args[0] == 1142
+
+
+def test_read_report_values_page_denied(
+        dictcursor, valueset, new_report, allow_read_report_values,
+        allow_read_observations, allow_read_observation_values,
+        allow_read_forecasts, allow_read_forecast_values,
+        insertuser):
+    user = insertuser[0]
+    report = new_report()
+    with pytest.raises(pymysql.err.OperationalError) as e:
+        dictcursor.callproc(
+            'read_report_values_page',
+            (user['auth0_id'], str(bin_to_uuid(report['id'])), None, None)
+        )
+    assert e.value.args[0] == 1142
+
+
 def test_read_aggregate(
         dictcursor, allow_read_aggregates, insertuser):
     org = insertuser[4]
@@ -835,6 +966,51 @@ def test_read_aggregate(
         assert obsd['observation_deleted_at'] is None
 
 
+def test_read_pair_metadata(
+        dictcursor, allow_read_forecasts, allow_read_observations,
+        allow_read_cdf_forecasts, allow_read_aggregates, insertuser):
+    cdf_single = list(insertuser.cdf['constant_values'].keys())[0]
+    agg_id = str(bin_to_uuid(insertuser.agg['id']))
+    dictcursor.callproc(
+        'read_pair_metadata',
+        (insertuser.auth0id, json.dumps([
+            insertuser.fx['strid'], insertuser.obs['strid'],
+            insertuser.cdf['strid'], cdf_single, agg_id,
+            insertuser.fx['strid'], str(uuid1())])))
+    res = {(r['object_type'], r['id']): r for r in dictcursor.fetchall()}
+    assert set(res) == {
+        ('forecasts', insertuser.fx['strid']),
+        ('observations', insertuser.obs['strid']),
+        ('cdf_forecasts', insertuser.cdf['strid']),
+        ('cdf_forecasts_singles', cdf_single),
+        ('aggregates', agg_id)}
+    fx = res[('forecasts', insertuser.fx['strid'])]
+    for key in ('variable', 'interval_label', 'interval_length'):
+        assert fx[key] == insertuser.fx[key]
+    assert fx['site_id'] == str(bin_to_uuid(insertuser.fx['site_id']))
+    single = res[('cdf_forecasts_singles', cdf_single)]
+    assert single['parent'] == insertuser.cdf['strid']
+    assert single['axis'] == insertuser.cdf['axis']
+    assert single['constant_value'] == insertuser.cdf[
+        'constant_values'][cdf_single]
+    obs = res[('observations', insertuser.obs['strid'])]
+    assert obs['aggregate_id'] is None
+    agg = res[('aggregates', agg_id)]
+    assert agg['aggregate_id'] == agg_id
+    assert agg['site_id'] is None
+
+
+def test_read_pair_metadata_denied(
+        dictcursor, allow_read_observations, insertuser):
+    dictcursor.callproc(
+        'read_pair_metadata',
+        (insertuser.auth0id, json.dumps([
+            insertuser.fx['strid'], insertuser.obs['strid']])))
+    res = dictcursor.fetchall()
+    assert [(r['object_type'], r['id']) for r in res] == [
+        ('observations', insertuser.obs['strid'])]
+
+
 def test_read_aggregate_obs_deleted(
         dictcursor, allow_read_aggregates, insertuser):
     org = insertuser[4]
@@ -17,6 +17,8 @@ EXTRAS_REQUIRE = {
 }
 EXTRAS_REQUIRE['all'] = [
     vv for v in EXTRAS_REQUIRE.values() for vv in v]
+# tools to run the benchmarks in benchmarks/, not included in all
+EXTRAS_REQUIRE['benchmark'] = ['pytest-benchmark', 'locust']
 
 
 setup(
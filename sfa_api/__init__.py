@@ -16,6 +16,9 @@ from sentry_sdk.integrations.flask import FlaskIntegration  # NOQA
 from sfa_api.spec import spec  # NOQA
 from sfa_api.error_handlers import register_error_handlers  # NOQA
 from sfa_api.utils.auth import requires_auth  # NOQA
+from sfa_api.utils.profiling import (  # NOQA
+    register_profiling, start_profiling)
+from sfa_api.utils.timing import register_request_timing  # NOQA
 from sfa_api.utils.url_converters import (  # NOQA
     UUIDStringConverter, ZoneStringConverter)
 
@@ -40,6 +43,8 @@ def create_app(config_name='ProductionConfig'):
         app.config.from_envvar('REDIS_SETTINGS')
     ma.init_app(app)
     register_error_handlers(app)
+    register_request_timing(app)
+    register_profiling(app)
     redoc_script = f"https://cdn.jsdelivr.net/npm/redoc@{app.config['REDOC_VERSION']}/bundles/redoc.standalone.js"  # NOQA
     talisman.init_app(app,
                       content_security_policy={
@@ -71,6 +76,7 @@ def create_app(config_name='ProductionConfig'):
     for blp in (obs_blp, forecast_blp, site_blp, user_blp, user_email_blp,
                 role_blp, permission_blp, reports_blp, agg_blp, zone_blp):
         blp.before_request(protect_endpoint)
+        blp.before_request(start_profiling)
         app.register_blueprint(blp)
 
     with app.test_request_context():
@@ -184,6 +184,21 @@ def list_users(**kwargs):
             user['organization_name'], user['organization_id']))
 
 
+@admin_cli.command('refresh-emails')
+@config_opt
+def refresh_emails(**kwargs):
+    """
+    Stores the emails of all users in the Auth0 tenant in Redis so that
+    they are not requested one user at a time. AUTH0_CLIENT_ID and
+    AUTH0_CLIENT_SECRET must be properly set.
+    """
+    from sfa_api.utils.auth0_info import refresh_email_directory
+    emails = refresh_email_directory()
+    if not emails:
+        fail('Failed to retrieve emails from Auth0')
+    click.echo(f'Stored the emails of {len(emails)} users.')
+
+
 @admin_cli.command('list-organizations')
 @with_default_options
 def list_organizations(**kwargs):
@@ -233,6 +248,11 @@ def delete_user(user_id, **kwargs):
     Remove a user from the framework.
     """
     import sfa_api.utils.storage_interface as storage
+    from sfa_api.utils.auth import user_existence_cache
+    auth0_ids = [
+        u['auth0_id'] for u in storage._call_procedure(
+            'list_all_users', with_current_user=False)
+        if u['id'] == str(user_id)]
     try:
         storage._call_procedure(
             'delete_user', str(user_id),
@@ -243,6 +263,10 @@ def delete_user(user_id, **kwargs):
         else:  # pragma: no cover
             raise
     else:
+        # only reaches API workers if the cache is shared with Redis,
+        # otherwise the cached entry expires after the TTL
+        for auth0_id in auth0_ids:
+            user_existence_cache().delete(auth0_id)
         click.echo(f'User {user_id} deleted successfully.')
 
 
@@ -12,6 +12,7 @@ from solarforecastarbiter.utils import compute_aggregate
 from sfa_api import spec
 from sfa_api.utils.request_handling import validate_start_end
 from sfa_api.utils.errors import BadAPIRequest, BaseAPIException
+from sfa_api.utils.serialization import dump_list
 from sfa_api.utils.storage import get_storage
 from sfa_api.schema import (AggregateSchema,
                             AggregatePostSchema,
@@ -44,7 +45,7 @@ class AllAggregatesView(MethodView):
         """
         storage = get_storage()
         aggregates = storage.list_aggregates()
-        return jsonify(AggregateSchema(many=True).dump(aggregates))
+        return jsonify(dump_list(AggregateSchema, aggregates))
 
     def post(self, *args):
         """
@@ -402,7 +403,7 @@ class AggregateForecasts(MethodView):
         """
         storage = get_storage()
         forecasts = storage.list_forecasts(aggregate_id=aggregate_id)
-        return jsonify(ForecastSchema(many=True).dump(forecasts))
+        return jsonify(dump_list(ForecastSchema, forecasts))
 
 
 class AggregateCDFForecastGroups(MethodView):
@@ -433,7 +434,7 @@ class AggregateCDFForecastGroups(MethodView):
         """
         storage = get_storage()
         forecasts = storage.list_cdf_forecast_groups(aggregate_id=aggregate_id)
-        return jsonify(CDFForecastGroupSchema(many=True).dump(forecasts))
+        return jsonify(dump_list(CDFForecastGroupSchema, forecasts))
 
 
 class AggregateObservationView(MethodView):
@@ -3,7 +3,7 @@ from pathlib import Path
 
 
 import click
-from flask import Config
+from flask import Config, Flask
 import sentry_sdk
 
 
@@ -83,7 +83,10 @@ def worker(verbose, queues, worker_ttl, job_monitoring_interval, config_file):
     # perhaps as custom worker class
     # if possible, get len report obj, time range
     red = make_redis_connection(config)
-    with Connection(red):
+    # jobs may read the config from current_app, e.g. IN_PROCESS_API
+    app = Flask('worker')
+    app.config.update(config)
+    with Connection(red), app.app_context():
         w = Worker(queues,
                    default_worker_ttl=worker_ttl,
                    job_monitoring_interval=job_monitoring_interval)
@@ -102,6 +105,30 @@ def devserver(port, config_name):
     app.run(port=port)
 
 
+@cli.command()
+@click.option('-c', '--config-name', default='ProductionConfig',
+              help='Name of the config the API runs with')
+@click.argument('profile_id')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+def profile(config_name, profile_id, output):
+    """
+    Write the profile of a request with ID PROFILE_ID, from the
+    X-Profile-Id response header, to OUTPUT. Read it with pstats.
+    """
+    from sfa_api import create_app
+    from sfa_api.utils.profiling import load_profile
+    app = create_app(config_name)
+    with app.app_context():
+        try:
+            data = load_profile(profile_id)
+        except ValueError:
+            raise click.BadParameter('must be a UUID',
+                                     param_hint='PROFILE_ID')
+    if data is None:
+        raise click.ClickException(f'No profile with ID {profile_id}')
+    Path(output).write_bytes(data)
+
+
 @cli.command()
 @verbose_opt
 @click.argument('config_file')
@@ -2,7 +2,6 @@ import os
 
 
 import pandas as pd
-import requests
 
 
 from sfa_api import __version__
@@ -16,19 +15,94 @@ class Config(object):
     AUTH0_CLIENT_ID = os.getenv('AUTH0_CLIENT_ID', '')
     AUTH0_CLIENT_SECRET = os.getenv('AUTH0_CLIENT_SECRET', '')
     AUTH0_REDIS_DB = os.getenv('AUTH0_REDIS_DB', 1)
-    JWT_KEY = requests.get(
-        AUTH0_BASE_URL + '/.well-known/jwks.json').json()
+    # number of verified access tokens to keep in memory per process
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 1024))
+    # share verified access tokens between processes in AUTH0_REDIS_DB
+    JWT_CACHE_USE_REDIS = bool(os.getenv('JWT_CACHE_USE_REDIS', ''))
+    # number of users known to exist in the database to keep in memory
+    # per process and the seconds to remember that they exist
+    USER_EXISTS_CACHE_SIZE = int(os.getenv('USER_EXISTS_CACHE_SIZE', 4096))
+    USER_EXISTS_CACHE_TTL = int(os.getenv('USER_EXISTS_CACHE_TTL', 300))
+    USER_EXISTS_CACHE_USE_REDIS = bool(
+        os.getenv('USER_EXISTS_CACHE_USE_REDIS', ''))
+    # number of (user, object) metadata reads to keep in memory per
+    # process and the seconds they are valid for, 0 disables the cache
+    METADATA_CACHE_SIZE = int(os.getenv('METADATA_CACHE_SIZE', 4096))
+    METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', 30))
+    # keys to verify tokens, when None the JWKS is loaded from
+    # AUTH0_BASE_URL on first use, see sfa_api.utils.jwks
+    JWT_KEY = None
+    # file to seed the JWKS from and save fetched keys to
+    JWKS_FILE = os.getenv('JWKS_FILE', None)
+    # share the JWKS between processes in AUTH0_REDIS_DB
+    JWKS_USE_REDIS = bool(os.getenv('JWKS_USE_REDIS', ''))
     MYSQL_HOST = os.getenv('MYSQL_HOST', '127.0.0.1')
     MYSQL_PORT = os.getenv('MYSQL_PORT', '3306')
     MYSQL_USER = os.getenv('MYSQL_USER', None)
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', None)
     MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', None)
+    # comma separated hosts of read replicas that read-only procedures
+    # are sent to, MYSQL_REPLICA_HOST may be used for a single replica
+    MYSQL_REPLICA_HOSTS = os.getenv('MYSQL_REPLICA_HOSTS',
+                                    os.getenv('MYSQL_REPLICA_HOST', ''))
+    # replicas more than this many seconds behind the primary are not used
+    MYSQL_REPLICA_MAX_LAG = float(os.getenv('MYSQL_REPLICA_MAX_LAG', 5))
+    # seconds between checks of the lag of each replica
+    MYSQL_REPLICA_LAG_CHECK_INTERVAL = float(
+        os.getenv('MYSQL_REPLICA_LAG_CHECK_INTERVAL', 10))
+    # return the time of each phase of a request in a Server-Timing
+    # header to everyone if True, otherwise only to the comma separated
+    # auth0 ids in SERVER_TIMING_USERS
+    SERVER_TIMING = bool(os.getenv('SERVER_TIMING', ''))
+    SERVER_TIMING_USERS = os.getenv('SERVER_TIMING_USERS', '')
+    # comma separated auth0 ids of users that may profile their requests
+    # with the X-Profile header, see sfa_api.utils.profiling
+    PROFILE_USERS = os.getenv('PROFILE_USERS', '')
+    # directory to store profiles in, when None they are stored in Redis
+    # for PROFILE_TTL seconds
+    PROFILE_DIR = os.getenv('PROFILE_DIR', None)
+    PROFILE_TTL = int(os.getenv('PROFILE_TTL', 86400))
+    # requests profiled at the same time by each worker
+    PROFILE_MAX_CONCURRENT = int(os.getenv('PROFILE_MAX_CONCURRENT', 1))
+    # use the non-persistent, in-memory storage backend of sfa_api.demo
+    # instead of MySQL when set
     SFA_API_STATIC_DATA = os.getenv('SFA_API_STATIC_DATA', False)
     # limit requests to 16MB
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     JOB_BASE_URL = os.getenv('JOB_BASE_URL', None)
+    # name of a class in sfa_api.config to create the app that serves
+    # the API requests of jobs in the worker process with, see
+    # sfa_api.utils.in_process_api. Requests are sent over the network
+    # when None.
+    IN_PROCESS_API = os.getenv('IN_PROCESS_API', None)
+    # seconds between checks of the scheduler for jobs deleted from MySQL,
+    # modified jobs are synced every time jobs are enqueued
+    JOB_SYNC_CHECK_INTERVAL = int(os.getenv('JOB_SYNC_CHECK_INTERVAL', 300))
+    # share the access tokens of job users between workers, encrypted with
+    # TOKEN_ENCRYPTION_KEY, unless set to false
+    JOB_TOKEN_USE_REDIS = (
+        os.getenv('JOB_TOKEN_USE_REDIS', 'true').lower() != 'false')
+    # seconds before they expire that the access tokens of job users are
+    # dropped so a job does not start with a token about to expire
+    JOB_TOKEN_EXPIRY_MARGIN = int(os.getenv('JOB_TOKEN_EXPIRY_MARGIN', 300))
+    # seconds a worker waits for another worker exchanging the token of
+    # the same job user before exchanging it itself
+    JOB_TOKEN_LOCK_TIMEOUT = int(os.getenv('JOB_TOKEN_LOCK_TIMEOUT', 30))
     REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 600))
+    # Fernet key encrypting the access tokens of jobs. The API also
+    # needs it to store the token of a request to compute a report while
+    # the report is being computed, and must use the same key as the
+    # workers of the reports queue. Without it such requests are skipped.
+    TOKEN_ENCRYPTION_KEY = os.getenv('TOKEN_ENCRYPTION_KEY', None)
     VALIDATION_JOB_TIMEOUT = int(os.getenv('VALIDATION_JOB_TIMEOUT', 150))
+    # number of observations validated by each job that daily observation
+    # validation is split into, 0 validates all of them in the scheduled
+    # job, see sfa_api.jobs.fan_out_validation
+    VALIDATION_CHUNK_SIZE = int(os.getenv('VALIDATION_CHUNK_SIZE', 0))
+    # seconds each chunk may run and the times the observations of a chunk
+    # that failed or timed out are retried
+    VALIDATION_CHUNK_TIMEOUT = int(os.getenv('VALIDATION_CHUNK_TIMEOUT', 900))
+    VALIDATION_CHUNK_RETRIES = int(os.getenv('VALIDATION_CHUNK_RETRIES', 2))
     MAX_POST_DATAPOINTS = int(os.getenv('MAX_POST_DATAPOINTS',
                                         200000))
     MAX_DATA_RANGE_DAYS = pd.Timedelta(os.getenv('MAX_DATA_RANGE_DAYS', '366')
@@ -55,6 +129,10 @@ class TestingConfig(Config):
     USE_FAKE_REDIS = True
     AUTH0_CLIENT_ID = 'clientid'
     AUTH0_CLIENT_SECRET = 'secret'
+    TOKEN_ENCRYPTION_KEY = b'eKfeo832hn8nQ_3K69YDniBbHqbqpIxUNRstrv225c8='
+    # tests roll back changes made through the API, which would leave
+    # stale entries in the cache
+    METADATA_CACHE_SIZE = 0
 
 
 class AdminTestConfig(TestingConfig):
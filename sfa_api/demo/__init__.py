@@ -0,0 +1,1660 @@
+"""
+A non-persistent, in-memory implementation of the storage interface for
+developing and testing against when it is not feasible to use a MySQL
+instance. It is used instead of :py:mod:`sfa_api.utils.storage_interface`
+when config['SFA_API_STATIC_DATA'] is set.
+
+Every public function has the same signature, return values and
+exceptions as the function of the same name in
+:py:mod:`sfa_api.utils.storage_interface`, see there for the full
+documentation. Access is controlled by the same model as the database:
+users belong to an organization and are granted roles, roles contain
+permissions to perform an action on a set of objects, and a permission
+that applies to all objects of a type includes objects of that type
+created later in its organization.
+
+The values of each observation, forecast and CDF forecast are stored as
+sorted numpy arrays. The store is created for each application on
+first use and seeded with the objects in :py:mod:`sfa_api.demo.data`
+and a user, 'auth0|5be343df7025406237820b85', in 'Organization 1' with
+the permissions of :py:data:`DEMO_USER_ACTIONS` on the objects of the
+organization.
+"""
+from copy import deepcopy
+import datetime as dt
+from functools import wraps
+import secrets
+from threading import RLock
+
+
+from flask import current_app
+import numpy as np
+import pandas as pd
+
+
+from sfa_api.demo import data
+from sfa_api.utils.auth import current_user, user_existence_cache
+from sfa_api.utils.errors import (StorageAuthError, DeleteRestrictionError,
+                                  BadAPIRequest)
+from sfa_api.utils.report_values import (encode_processed_values,
+                                         decode_processed_values,
+                                         ensure_encoded)
+from sfa_api.utils.report_sections import (
+    RAW_REPORT_SECTIONS, split_raw_report, compress_section,
+    decompress_section)
+from sfa_api.utils.storage_interface import (
+    generate_uuid, dump_json_replace_nan, load_json_replace_nan,
+    _decode_report_parameters, _project, POWER_VARIABLES,
+    MODELING_PARAMETERS_FIELDS, SITE_FIELDS, OBSERVATION_FIELDS,
+    FORECAST_FIELDS, CDF_FORECAST_GROUP_FIELDS, AGGREGATE_FIELDS,
+    PAIR_METADATA_FIELDS)
+
+
+DEMO_ORGANIZATION_ID = 'b76ab62e-4fe1-11e9-9e44-64006a511e6f'
+DEMO_USER_ID = '0c90950a-7cca-11e9-a81f-54bf64606445'
+DEMO_AUTH0_ID = 'auth0|5be343df7025406237820b85'
+UNAFFILIATED = 'Unaffiliated'
+_OBJECT_ACTIONS = ('create', 'read', 'update', 'delete')
+_VALUE_ACTIONS = ('read_values', 'write_values', 'delete_values')
+# actions the demo user may take on all objects of each type, the same
+# as the user of the test database
+DEMO_USER_ACTIONS = {
+    'sites': _OBJECT_ACTIONS,
+    'aggregates': _OBJECT_ACTIONS + _VALUE_ACTIONS,
+    'cdf_forecasts': _OBJECT_ACTIONS + _VALUE_ACTIONS,
+    'forecasts': _OBJECT_ACTIONS + _VALUE_ACTIONS,
+    'observations': _OBJECT_ACTIONS + _VALUE_ACTIONS,
+    'roles': _OBJECT_ACTIONS + ('grant', 'revoke'),
+    'permissions': _OBJECT_ACTIONS,
+    'reports': _OBJECT_ACTIONS + ('read_values', 'write_values'),
+    'users': ('read', 'update'),
+}
+EPOCH = dt.datetime(1970, 1, 1, 0, 0, 1, tzinfo=dt.timezone.utc)
+
+
+def _now():
+    return dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+
+
+def _to_datetime64(timestamp):
+    """Convert a datetime, assumed to be UTC if naive, to a naive UTC
+    numpy datetime64"""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.to_datetime64()
+
+
+def _to_datetime(value):
+    return pd.Timestamp(value).tz_localize('UTC').to_pydatetime()
+
+
+def _sort_key(object_id):
+    """Order UUIDs as the database does, by the swapped binary form
+    used as the primary key"""
+    return (object_id[14:18] + object_id[9:13] + object_id[:8] +
+            object_id[19:23] + object_id[24:])
+
+
+class ValueStore:
+    """The values of one object as numpy arrays sorted by timestamp.
+    Timestamps are stored as naive UTC datetime64 with second
+    precision, like the database.
+    """
+    def __init__(self, quality_flags=False):
+        self.timestamps = np.array([], dtype='datetime64[ns]')
+        self.values = np.array([], dtype='float64')
+        self.quality_flags = (np.array([], dtype='int64') if quality_flags
+                              else None)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def write(self, df):
+        """Insert the values of df, replacing any existing values at the
+        same times"""
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        # reversed so that np.unique keeps the last of duplicate times
+        new_times = index.tz_convert('UTC').tz_localize(None).values.astype(
+            'datetime64[s]').astype('datetime64[ns]')[::-1]
+        times, first = np.unique(
+            np.concatenate([new_times, self.timestamps]), return_index=True)
+        self.values = np.concatenate([
+            df['value'].values.astype('float64')[::-1], self.values])[first]
+        if self.quality_flags is not None:
+            self.quality_flags = np.concatenate([
+                df['quality_flag'].values.astype('int64')[::-1],
+                self.quality_flags])[first]
+        self.timestamps = times
+
+    def _slice(self, start, end):
+        left = (0 if start is None else
+                np.searchsorted(self.timestamps, _to_datetime64(start),
+                                side='left'))
+        right = (len(self) if end is None else
+                 np.searchsorted(self.timestamps, _to_datetime64(end),
+                                 side='right'))
+        return slice(left, right)
+
+    def _frame(self, selection):
+        columns = {'value': self.values[selection]}
+        if self.quality_flags is not None:
+            columns['quality_flag'] = self.quality_flags[selection]
+        index = pd.DatetimeIndex(self.timestamps[selection],
+                                 name='timestamp').tz_localize('UTC')
+        return pd.DataFrame(columns, index=index)
+
+    def read(self, start=None, end=None):
+        """DataFrame of the values between start and end inclusive"""
+        return self._frame(self._slice(start, end))
+
+    def times(self, start=None, end=None):
+        return self.timestamps[self._slice(start, end)]
+
+    def latest(self):
+        return self._frame(slice(max(len(self) - 1, 0), len(self)))
+
+    def time_range(self):
+        if len(self) == 0:
+            return {'min_timestamp': None, 'max_timestamp': None}
+        return {'min_timestamp': _to_datetime(self.timestamps[0]),
+                'max_timestamp': _to_datetime(self.timestamps[-1])}
+
+    def previous_time(self, start):
+        """The most recent time before start or None"""
+        position = np.searchsorted(self.timestamps, _to_datetime64(start),
+                                   side='left')
+        if position == 0:
+            return None
+        return pd.Timestamp(self.timestamps[position - 1], tz='UTC')
+
+
+def _find_gaps(times, interval_length):
+    """Gaps between sorted unique times longer than interval_length
+    minutes"""
+    if len(times) < 2:
+        return []
+    minutes = np.diff(times).astype('timedelta64[m]').astype('int64')
+    return [{'timestamp': _to_datetime(times[i]),
+             'next_timestamp': _to_datetime(times[i + 1])}
+            for i in np.nonzero(minutes > interval_length)[0]]
+
+
+def _point_in_polygon(longitude, latitude, ring):
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > latitude) != (y2 > latitude):
+            cross = (x2 - x1) * (latitude - y1) / (y2 - y1) + x1
+            if longitude < cross:
+                inside = not inside
+    return inside
+
+
+def _in_geojson(longitude, latitude, geojson):
+    geometries = [feature['geometry']
+                  for feature in geojson.get('features', [geojson])]
+    for geometry in geometries:
+        polygons = (geometry['coordinates']
+                    if geometry['type'] == 'MultiPolygon'
+                    else [geometry['coordinates']])
+        for exterior, *holes in polygons:
+            if (
+                    _point_in_polygon(longitude, latitude, exterior) and
+                    not any(_point_in_polygon(longitude, latitude, hole)
+                            for hole in holes)
+            ):
+                return True
+    return False
+
+
+class DemoStore:
+    """All of the objects, values and RBAC information of the in-memory
+    backend"""
+    def __init__(self):
+        self.lock = RLock()
+        self.organizations = {}
+        self.users = {}
+        self.roles = {}
+        self.permissions = {}
+        # object_id: (object_type, organization_id) of every object,
+        # including users, roles and permissions
+        self.owners = {}
+        self.objects = {object_type: {} for object_type in (
+            'sites', 'observations', 'forecasts', 'cdf_forecasts',
+            'aggregates', 'reports')}
+        self.cdf_singles = {}
+        self.values = {}
+        self.report_values = {}
+        # report_id: {section: compressed section} of stored raw reports
+        self.report_sections = {}
+        self.zones = {}
+        self._seed()
+
+    def organization_id(self, name):
+        for org_id, org in self.organizations.items():
+            if org['name'] == name:
+                return org_id
+        raise KeyError(name)
+
+    def add_organization(self, name, accepted_tou=True, org_id=None):
+        org_id = org_id or generate_uuid()
+        self.organizations[org_id] = {'name': name,
+                                      'accepted_tou': accepted_tou}
+        return org_id
+
+    def add_object(self, object_type, object_id, organization_id,
+                   metadata=None):
+        """Add an object and include it in the permissions of its
+        organization that apply to all objects of its type"""
+        self.owners[object_id] = (object_type, organization_id)
+        if metadata is not None:
+            self.objects[object_type][object_id] = metadata
+        created_at = _now()
+        for perm in self.permissions.values():
+            if (
+                    perm['applies_to_all'] and perm['action'] != 'create' and
+                    perm['object_type'] == object_type and
+                    perm['organization_id'] == organization_id
+            ):
+                perm['objects'][object_id] = created_at
+
+    def remove_object(self, object_id):
+        object_type, _ = self.owners.pop(object_id)
+        self.objects.get(object_type, {}).pop(object_id, None)
+        self.values.pop(object_id, None)
+        for perm in self.permissions.values():
+            perm['objects'].pop(object_id, None)
+        for rows in self.report_values.values():
+            for value_id in [key for key, row in rows.items()
+                             if row['object_id'] == object_id]:
+                del rows[value_id]
+
+    def add_user(self, auth0_id, organization_id, user_id=None):
+        user_id = user_id or generate_uuid()
+        now = _now()
+        self.users[user_id] = {
+            'user_id': user_id, 'auth0_id': auth0_id,
+            'organization_id': organization_id, 'created_at': now,
+            'modified_at': now, 'roles': {}}
+        self.add_object('users', user_id, organization_id)
+        return user_id
+
+    def add_role(self, name, description, organization_id):
+        role_id = generate_uuid()
+        now = _now()
+        self.roles[role_id] = {
+            'role_id': role_id, 'name': name, 'description': description,
+            'organization_id': organization_id, 'created_at': now,
+            'modified_at': now, 'permissions': {}}
+        self.add_object('roles', role_id, organization_id)
+        return role_id
+
+    def add_permission(self, description, action, object_type,
+                       applies_to_all, organization_id):
+        permission_id = generate_uuid()
+        now = _now()
+        objects = {}
+        if applies_to_all and action != 'create':
+            objects = {
+                object_id: now for object_id, (type_, org_id)
+                in self.owners.items()
+                if type_ == object_type and org_id == organization_id}
+        self.permissions[permission_id] = {
+            'permission_id': permission_id, 'description': description,
+            'organization_id': organization_id, 'action': action,
+            'object_type': object_type,
+            'applies_to_all': bool(applies_to_all), 'created_at': now,
+            'modified_at': now, 'objects': objects}
+        self.add_object('permissions', permission_id, organization_id)
+        return permission_id
+
+    def add_default_role(self, user_id):
+        """Grant the user a role that allows them to read themselves and
+        the role"""
+        org_id = self.users[user_id]['organization_id']
+        role_id = self.add_role(f'DEFAULT User role {user_id}',
+                                'Default role', org_id)
+        self.users[user_id]['roles'][role_id] = _now()
+        for description, object_type, object_id in (
+                (f'DEFAULT Read Self User {user_id}', 'users', user_id),
+                (f'DEFAULT Read User Role {user_id}', 'roles', role_id)):
+            perm_id = self.add_permission(description, 'read', object_type,
+                                          False, org_id)
+            self.permissions[perm_id]['objects'][object_id] = _now()
+            self.roles[role_id]['permissions'][perm_id] = _now()
+
+    def _seed(self):
+        org_id = self.add_organization('Organization 1',
+                                       org_id=DEMO_ORGANIZATION_ID)
+        self.add_organization(UNAFFILIATED, accepted_tou=False)
+        role_id = self.add_role('Test user role',
+                                'Role for the demo user', org_id)
+        for object_type, actions in DEMO_USER_ACTIONS.items():
+            for action in actions:
+                perm_id = self.add_permission(
+                    f'{action} all {object_type}', action, object_type,
+                    True, org_id)
+                self.roles[role_id]['permissions'][perm_id] = _now()
+        user_id = self.add_user(DEMO_AUTH0_ID, org_id, DEMO_USER_ID)
+        self.users[user_id]['roles'][role_id] = _now()
+        self.add_default_role(user_id)
+        metadata = (
+            ('sites', 'site_id', data.demo_sites),
+            ('observations', 'observation_id', data.demo_observations),
+            ('forecasts', 'forecast_id', data.demo_forecasts),
+            ('cdf_forecasts', 'forecast_id', data.demo_group_cdf),
+            ('aggregates', 'aggregate_id', data.demo_aggregates),
+        )
+        for object_type, id_field, objects in metadata:
+            for object_id, obj in objects.items():
+                obj = deepcopy(obj)
+                obj.pop('constant_values', None)
+                self.add_object(object_type, object_id, org_id, obj)
+                if object_type in ('observations', 'forecasts'):
+                    self.values[object_id] = ValueStore(
+                        object_type == 'observations')
+        for single_id, single in data.demo_single_cdf.items():
+            parent = self.objects['cdf_forecasts'][single['parent']]
+            self.cdf_singles[single_id] = {
+                'forecast_id': single_id, 'parent': single['parent'],
+                'constant_value': single['constant_value'],
+                'created_at': parent['created_at']}
+            self.values[single_id] = ValueStore()
+        for report_id, report in data.demo_reports.items():
+            report = deepcopy(report)
+            self.report_sections[report_id] = _compress_raw_report(
+                report['raw_report'])
+            report['raw_report'] = None
+            self.add_object('reports', report_id, org_id, report)
+            self.report_values[report_id] = {
+                row['id']: dict(row, processed_values=encode_processed_values(
+                    row['processed_values']))
+                for row in data.demo_report_values.get(report_id, [])}
+
+
+def _compress_raw_report(raw_report):
+    sections = split_raw_report(raw_report)
+    return {section: compress_section(dump_json_replace_nan(value))
+            for section, value in sections.items()}
+
+
+def demo_store():
+    """Get the in-memory store of the application, creating and seeding
+    it on first use"""
+    if not hasattr(current_app, 'demo_store'):
+        setattr(current_app, 'demo_store', DemoStore())
+    return getattr(current_app, 'demo_store')
+
+
+def _synchronized(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with demo_store().lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# RBAC
+def _caller():
+    store = demo_store()
+    for user in store.users.values():
+        if user['auth0_id'] == str(current_user):
+            return user
+    return None
+
+
+def _caller_permissions():
+    user = _caller()
+    if user is None:
+        return []
+    store = demo_store()
+    return [store.permissions[perm_id]
+            for role_id in user['roles']
+            for perm_id in store.roles[role_id]['permissions']]
+
+
+def _rbac_id(object_id):
+    """The id permissions are checked against, the parent group for a
+    single CDF forecast"""
+    single = demo_store().cdf_singles.get(str(object_id))
+    if single is not None:
+        return single['parent']
+    return str(object_id)
+
+
+def _allowed(object_id, action):
+    object_id = _rbac_id(object_id)
+    return any(perm['action'] == action and object_id in perm['objects']
+               for perm in _caller_permissions())
+
+
+def _check(object_id, action):
+    if not _allowed(object_id, action):
+        raise StorageAuthError()
+
+
+def _check_type(object_id, object_type):
+    object_id = str(object_id)
+    if object_type == 'cdf_forecasts_singles':
+        exists = object_id in demo_store().cdf_singles
+    else:
+        owner = demo_store().owners.get(object_id)
+        exists = owner is not None and owner[0] == object_type
+    if not exists:
+        raise StorageAuthError()
+
+
+def _actions(object_id):
+    object_id = _rbac_id(object_id)
+    return {perm['action'] for perm in _caller_permissions()
+            if object_id in perm['objects']}
+
+
+def _creatable_types():
+    user = _caller()
+    if user is None:
+        return set()
+    return {perm['object_type'] for perm in _caller_permissions()
+            if perm['action'] == 'create' and
+            perm['organization_id'] == user['organization_id']}
+
+
+def _create(object_type, object_id, metadata=None):
+    """Add a new object in the organization of the caller"""
+    user = _caller()
+    if object_type not in _creatable_types():
+        raise StorageAuthError()
+    store = demo_store()
+    org_id = user['organization_id']
+    if metadata is not None:
+        now = _now()
+        metadata['provider'] = store.organizations[org_id]['name']
+        metadata['created_at'] = now
+        metadata['modified_at'] = now
+    store.add_object(object_type, object_id, org_id, metadata)
+
+
+def _update(object_type, object_id, **kwargs):
+    _check_type(object_id, object_type)
+    _check(object_id, 'update')
+    obj = demo_store().objects[object_type][object_id]
+    obj.update({key: value for key, value in kwargs.items()
+                if value is not None})
+    obj['modified_at'] = _now()
+
+
+def _delete(object_type, object_id):
+    _check_type(object_id, object_type)
+    _check(object_id, 'delete')
+    demo_store().remove_object(object_id)
+
+
+def _readable(object_type):
+    """Readable objects of object_type ordered like the database"""
+    objects = demo_store().objects[object_type]
+    return [objects[object_id]
+            for object_id in sorted(objects, key=_sort_key)
+            if _allowed(object_id, 'read')]
+
+
+def _organization_name(organization_id):
+    return demo_store().organizations[organization_id]['name']
+
+
+def _read_object(object_type, object_id):
+    object_id = str(object_id)
+    _check_type(object_id, object_type)
+    _check(object_id, 'read')
+    return demo_store().objects[object_type][object_id]
+
+
+def _filter_list(objects, id_field, site_id=None, aggregate_id=None,
+                 variable=None, limit=None, cursor=None):
+    if site_id is not None:
+        _read_object('sites', site_id)
+        objects = [obj for obj in objects
+                   if obj['site_id'] == str(site_id)]
+    if aggregate_id is not None:
+        _read_object('aggregates', aggregate_id)
+        objects = [obj for obj in objects
+                   if obj.get('aggregate_id') == str(aggregate_id)]
+    if variable is not None:
+        objects = [obj for obj in objects if obj['variable'] == variable]
+    if cursor is not None:
+        objects = [obj for obj in objects
+                   if _sort_key(obj[id_field]) > _sort_key(str(cursor))]
+    if limit is not None:
+        objects = objects[:limit]
+    return objects
+
+
+# Values
+def _values(object_type, object_id, action):
+    object_id = str(object_id)
+    _check_type(object_id, object_type)
+    _check(object_id, action)
+    return demo_store().values[object_id]
+
+
+def _gaps(object_type, object_id, start, end):
+    object_id = str(object_id)
+    store = _values(object_type, object_id, 'read_values')
+    _check(object_id, 'read')
+    if object_type == 'cdf_forecasts_singles':
+        metadata = demo_store().objects['cdf_forecasts'][
+            demo_store().cdf_singles[object_id]['parent']]
+    else:
+        metadata = demo_store().objects[object_type][object_id]
+    return _find_gaps(store.times(start, end), metadata['interval_length'])
+
+
+def _metadata_for_write(object_type, object_id, start):
+    store = _values(object_type, object_id, 'write_values')
+    if object_type == 'cdf_forecasts_singles':
+        metadata = demo_store().objects['cdf_forecasts'][
+            _rbac_id(object_id)]
+    else:
+        metadata = demo_store().objects[object_type][str(object_id)]
+    return (metadata['interval_length'], store.previous_time(start),
+            metadata['extra_parameters'], metadata['variable'] == 'event')
+
+
+@_synchronized
+def store_observation_values(observation_id, observation_df):
+    """Store observation data."""
+    _values('observations', observation_id, 'write_values').write(
+        observation_df)
+    return observation_id
+
+
+@_synchronized
+def read_observation_values(observation_id, start=None, end=None):
+    """Read observation values between start and end."""
+    return _values('observations', observation_id, 'read_values').read(
+        start, end)
+
+
+@_synchronized
+def read_latest_observation_value(observation_id):
+    """Read the most recent observation value."""
+    return _values('observations', observation_id, 'read_values').latest()
+
+
+@_synchronized
+def read_observation_time_range(observation_id):
+    """Get the time range of values for a observation."""
+    return _values('observations', observation_id,
+                   'read_values').time_range()
+
+
+@_synchronized
+def store_forecast_values(forecast_id, forecast_df):
+    """Store Forecast data"""
+    _values('forecasts', forecast_id, 'write_values').write(forecast_df)
+    return forecast_id
+
+
+@_synchronized
+def read_forecast_values(forecast_id, start=None, end=None):
+    """Read forecast values between start and end."""
+    return _values('forecasts', forecast_id, 'read_values').read(start, end)
+
+
+@_synchronized
+def read_latest_forecast_value(forecast_id):
+    """Read the most recent forecast value."""
+    return _values('forecasts', forecast_id, 'read_values').latest()
+
+
+@_synchronized
+def read_forecast_time_range(forecast_id):
+    """Get the time range of values for a forecast."""
+    return _values('forecasts', forecast_id, 'read_values').time_range()
+
+
+@_synchronized
+def store_cdf_forecast_values(forecast_id, forecast_df):
+    """Store CDF Forecast data"""
+    _values('cdf_forecasts_singles', forecast_id, 'write_values').write(
+        forecast_df)
+    return forecast_id
+
+
+@_synchronized
+def read_cdf_forecast_values(forecast_id, start=None, end=None):
+    """Read CDF forecast values between start and end."""
+    return _values('cdf_forecasts_singles', forecast_id,
+                   'read_values').read(start, end)
+
+
+@_synchronized
+def read_latest_cdf_forecast_value(forecast_id):
+    """Read the most recent CDF forecast value."""
+    return _values('cdf_forecasts_singles', forecast_id,
+                   'read_values').latest()
+
+
+@_synchronized
+def read_cdf_forecast_time_range(forecast_id):
+    """Get the time range of values for a CDF forecast."""
+    return _values('cdf_forecasts_singles', forecast_id,
+                   'read_values').time_range()
+
+
+@_synchronized
+def read_metadata_for_observation_values(observation_id, start):
+    """Reads necessary metadata to process observation values
+    before storing them."""
+    return _metadata_for_write('observations', observation_id, start)
+
+
+@_synchronized
+def read_metadata_for_forecast_values(forecast_id, start):
+    """Reads necessary metadata to process forecast values
+    before storing them."""
+    return _metadata_for_write('forecasts', forecast_id, start)
+
+
+@_synchronized
+def read_metadata_for_cdf_forecast_values(forecast_id, start):
+    """Reads necessary metadata to process CDF forecast values
+    before storing them."""
+    return _metadata_for_write('cdf_forecasts_singles', forecast_id, start)
+
+
+@_synchronized
+def find_unflagged_observation_dates(
+        observation_id, start, end, flag, timezone='UTC'):
+    """List the dates between start and end (in timezone) where the
+    observations values are not flagged with the given flag."""
+    store = _values('observations', observation_id, 'read_values')
+    selection = store._slice(start, end)
+    unflagged = (store.quality_flags[selection] & flag) != flag
+    times = pd.DatetimeIndex(
+        store.timestamps[selection][unflagged]).tz_localize('UTC')
+    return sorted(set(times.tz_convert(timezone).date))
+
+
+@_synchronized
+def find_observation_gaps(observation_id, start, end):
+    """Find gaps in the observation values between start and end"""
+    return _gaps('observations', observation_id, start, end)
+
+
+@_synchronized
+def find_forecast_gaps(forecast_id, start, end):
+    """Find gaps in the forecast values between start and end"""
+    return _gaps('forecasts', forecast_id, start, end)
+
+
+@_synchronized
+def find_cdf_forecast_gaps(cdf_forecast_id, start, end):
+    """Find gaps in the single CDF forecast values between start and
+    end"""
+    return _gaps('cdf_forecasts_singles', cdf_forecast_id, start, end)
+
+
+@_synchronized
+def find_cdf_forecast_group_gaps(cdf_group_id, start, end):
+    """Find gaps in the CDF forecast group values between start and
+    end"""
+    group = _read_object('cdf_forecasts', cdf_group_id)
+    _check(cdf_group_id, 'read_values')
+    store = demo_store()
+    times = [store.values[single_id].times(start, end)
+             for single_id, single in store.cdf_singles.items()
+             if single['parent'] == str(cdf_group_id)]
+    times = np.unique(np.concatenate(
+        times or [np.array([], dtype='datetime64[ns]')]))
+    return _find_gaps(times, group['interval_length'])
+
+
+# Sites
+def _site_has_modeling_params(site_id):
+    modeling_parameters = read_site(site_id)['modeling_parameters']
+    return all(modeling_parameters.get(key) is not None
+               for key in ('ac_capacity', 'dc_capacity', 'ac_loss_factor',
+                           'dc_loss_factor', 'temperature_coefficient',
+                           'tracking_type'))
+
+
+def _check_for_power_variables(variable, site_id):
+    # objects may only be made for sites the user can read
+    _read_object('sites', site_id)
+    if variable in POWER_VARIABLES and not _site_has_modeling_params(
+            site_id):
+        raise BadAPIRequest(
+            site="Site must have modeling parameters to create "
+                 f"{', '.join(POWER_VARIABLES)} records.")
+
+
+def _assert_variable_matches_aggregate(variable, aggregate_id):
+    if variable != read_aggregate(aggregate_id)['variable']:
+        raise BadAPIRequest(variable="Forecast variable must match aggregate.")
+
+
+@_synchronized
+def read_site(site_id):
+    """Read Site metadata."""
+    return deepcopy(_read_object('sites', site_id))
+
+
+@_synchronized
+def store_site(site):
+    """Store Site metadata."""
+    site_id = generate_uuid()
+    metadata = {key: site.get(key) for key in SITE_FIELDS}
+    metadata['site_id'] = site_id
+    metadata['modeling_parameters'] = {
+        key: site.get('modeling_parameters', {}).get(key)
+        for key in MODELING_PARAMETERS_FIELDS}
+    metadata['climate_zones'] = _climate_zone_names(
+        site['latitude'], site['longitude'])
+    _create('sites', site_id, metadata)
+    return site_id
+
+
+@_synchronized
+def update_site(
+        site_id, *,
+        ac_capacity, dc_capacity, temperature_coefficient,
+        tracking_type, surface_tilt, surface_azimuth,
+        axis_tilt, axis_azimuth, ground_coverage_ratio,
+        backtrack, max_rotation_angle, dc_loss_factor,
+        ac_loss_factor, name=None, latitude=None, longitude=None,
+        elevation=None, timezone=None, extra_parameters=None
+):
+    """Update site metadata."""
+    _update('sites', site_id, name=name, latitude=latitude,
+            longitude=longitude, elevation=elevation, timezone=timezone,
+            extra_parameters=extra_parameters)
+    site = demo_store().objects['sites'][site_id]
+    # 'noupdate' is the sentinel used when no modeling parameters are
+    # provided, see SiteUpdateSchema
+    if tracking_type != 'noupdate':
+        site['modeling_parameters'] = {
+            'ac_capacity': ac_capacity, 'dc_capacity': dc_capacity,
+            'temperature_coefficient': temperature_coefficient,
+            'tracking_type': tracking_type, 'surface_tilt': surface_tilt,
+            'surface_azimuth': surface_azimuth, 'axis_tilt': axis_tilt,
+            'axis_azimuth': axis_azimuth,
+            'ground_coverage_ratio': ground_coverage_ratio,
+            'backtrack': backtrack, 'max_rotation_angle': max_rotation_angle,
+            'dc_loss_factor': dc_loss_factor,
+            'ac_loss_factor': ac_loss_factor}
+    if latitude is not None or longitude is not None:
+        site['climate_zones'] = _climate_zone_names(
+            site['latitude'], site['longitude'])
+
+
+@_synchronized
+def delete_site(site_id):
+    """Remove a Site from storage."""
+    _check_type(site_id, 'sites')
+    _check(site_id, 'delete')
+    objects = demo_store().objects
+    if any(obj.get('site_id') == site_id
+           for object_type in ('observations', 'forecasts', 'cdf_forecasts')
+           for obj in objects[object_type].values()):
+        raise DeleteRestrictionError()
+    demo_store().remove_object(site_id)
+
+
+@_synchronized
+def list_sites():
+    """List all sites."""
+    return deepcopy(_readable('sites'))
+
+
+@_synchronized
+def list_sites_in_zone(zone):
+    """List all sites within the given zone"""
+    return deepcopy([site for site in _readable('sites')
+                     if zone in site['climate_zones']])
+
+
+# Observations
+@_synchronized
+def store_observation(observation):
+    """Store Observation metadata."""
+    observation_id = generate_uuid()
+    _check_for_power_variables(observation['variable'],
+                               str(observation['site_id']))
+    metadata = {key: observation.get(key) for key in OBSERVATION_FIELDS}
+    metadata['observation_id'] = observation_id
+    metadata['site_id'] = str(observation['site_id'])
+    _create('observations', observation_id, metadata)
+    demo_store().values[observation_id] = ValueStore(quality_flags=True)
+    return observation_id
+
+
+@_synchronized
+def update_observation(observation_id, *, name=None, uncertainty=None,
+                       extra_parameters=None, null_uncertainty=False):
+    """Update observation metadata."""
+    _update('observations', observation_id, name=name,
+            uncertainty=uncertainty, extra_parameters=extra_parameters)
+    if null_uncertainty:
+        demo_store().objects['observations'][observation_id][
+            'uncertainty'] = None
+
+
+@_synchronized
+def read_observation(observation_id):
+    """Read Observation metadata."""
+    return deepcopy(_read_object('observations', observation_id))
+
+
+@_synchronized
+def delete_observation(observation_id):
+    """Remove an Observation from storage."""
+    _delete('observations', observation_id)
+    now = _now()
+    for aggregate in demo_store().objects['aggregates'].values():
+        for obs in aggregate['observations']:
+            if obs['observation_id'] == observation_id:
+                obs['observation_deleted_at'] = now
+
+
+@_synchronized
+def list_observations(site_id=None, variable=None, limit=None, cursor=None,
+                      fields=None):
+    """Lists all observations a user has access to."""
+    observations = _filter_list(
+        _readable('observations'), 'observation_id', site_id=site_id,
+        variable=variable, limit=limit, cursor=cursor)
+    return _project(deepcopy(observations), fields, 'observation_id')
+
+
+# Forecasts
+def _store_forecast_metadata(object_type, fields, forecast):
+    forecast_id = generate_uuid()
+    if forecast.get('site_id') is not None:
+        _check_for_power_variables(forecast['variable'],
+                                   str(forecast['site_id']))
+    else:
+        _assert_variable_matches_aggregate(forecast['variable'],
+                                           str(forecast['aggregate_id']))
+    metadata = {key: forecast.get(key) for key in fields}
+    metadata['forecast_id'] = forecast_id
+    for key in ('site_id', 'aggregate_id'):
+        if metadata[key] is not None:
+            metadata[key] = str(metadata[key])
+    _create(object_type, forecast_id, metadata)
+    return forecast_id
+
+
+@_synchronized
+def store_forecast(forecast):
+    """Store Forecast metadata."""
+    forecast_id = _store_forecast_metadata('forecasts', FORECAST_FIELDS,
+                                           forecast)
+    demo_store().values[forecast_id] = ValueStore()
+    return forecast_id
+
+
+@_synchronized
+def update_forecast(forecast_id, *, name=None, extra_parameters=None):
+    """Update forecast metadata."""
+    _update('forecasts', forecast_id, name=name,
+            extra_parameters=extra_parameters)
+
+
+@_synchronized
+def read_forecast(forecast_id):
+    """Read Forecast metadata."""
+    return deepcopy(_read_object('forecasts', forecast_id))
+
+
+@_synchronized
+def delete_forecast(forecast_id):
+    """Remove a Forecast from storage."""
+    _delete('forecasts', forecast_id)
+
+
+@_synchronized
+def list_forecasts(site_id=None, aggregate_id=None, variable=None,
+                   limit=None, cursor=None, fields=None):
+    """Lists all Forecasts a user has access to."""
+    forecasts = _filter_list(
+        _readable('forecasts'), 'forecast_id', site_id=site_id,
+        aggregate_id=aggregate_id, variable=variable, limit=limit,
+        cursor=cursor)
+    return _project(deepcopy(forecasts), fields, 'forecast_id')
+
+
+# CDF Forecasts
+def _cdf_forecast(single):
+    group = demo_store().objects['cdf_forecasts'][single['parent']]
+    out = {key: group[key] for key in CDF_FORECAST_GROUP_FIELDS}
+    out.update(single)
+    out['modified_at'] = single['created_at']
+    return deepcopy(out)
+
+
+def _cdf_forecast_group(group):
+    out = deepcopy(group)
+    out['constant_values'] = [
+        {'forecast_id': single_id, 'constant_value': single[
+            'constant_value']}
+        for single_id, single in demo_store().cdf_singles.items()
+        if single['parent'] == group['forecast_id']]
+    return out
+
+
+@_synchronized
+def store_cdf_forecast(cdf_forecast):
+    """Store CDF Forecast Single metadata."""
+    forecast_id = generate_uuid()
+    parent = str(cdf_forecast['parent'])
+    _check_type(parent, 'cdf_forecasts')
+    _check(parent, 'update')
+    demo_store().cdf_singles[forecast_id] = {
+        'forecast_id': forecast_id, 'parent': parent,
+        'constant_value': cdf_forecast['constant_value'],
+        'created_at': _now()}
+    demo_store().values[forecast_id] = ValueStore()
+    return forecast_id
+
+
+@_synchronized
+def read_cdf_forecast(forecast_id):
+    """Read CDF Forecast metadata."""
+    _check_type(forecast_id, 'cdf_forecasts_singles')
+    _check(forecast_id, 'read')
+    return _cdf_forecast(demo_store().cdf_singles[str(forecast_id)])
+
+
+@_synchronized
+def delete_cdf_forecast(forecast_id):
+    """Remove a CDF Forecast from storage."""
+    _check_type(forecast_id, 'cdf_forecasts_singles')
+    _check(forecast_id, 'delete')
+    store = demo_store()
+    del store.cdf_singles[forecast_id]
+    store.values.pop(forecast_id, None)
+
+
+@_synchronized
+def list_cdf_forecasts(parent_forecast_id=None):
+    """Lists all Forecasts a user has access to."""
+    if parent_forecast_id is not None:
+        read_cdf_forecast_group(parent_forecast_id)
+    return [_cdf_forecast(single)
+            for single in demo_store().cdf_singles.values()
+            if _allowed(single['parent'], 'read') and (
+                parent_forecast_id is None or
+                single['parent'] == parent_forecast_id)]
+
+
+@_synchronized
+def store_cdf_forecast_group(cdf_forecast_group):
+    """Store CDF Forecast Group metadata."""
+    forecast_id = _store_forecast_metadata(
+        'cdf_forecasts', CDF_FORECAST_GROUP_FIELDS, cdf_forecast_group)
+    for cv in cdf_forecast_group['constant_values']:
+        store_cdf_forecast({'parent': forecast_id, 'constant_value': cv})
+    return forecast_id
+
+
+@_synchronized
+def update_cdf_forecast_group(
+        forecast_id, *, name=None, extra_parameters=None):
+    """Update CDF forecast metadata."""
+    _update('cdf_forecasts', forecast_id, name=name,
+            extra_parameters=extra_parameters)
+
+
+@_synchronized
+def read_cdf_forecast_group(forecast_id):
+    """Read CDF Group Forecast metadata."""
+    return _cdf_forecast_group(_read_object('cdf_forecasts', forecast_id))
+
+
+@_synchronized
+def delete_cdf_forecast_group(forecast_id):
+    """Remove a CDF Forecast Group from storage."""
+    _delete('cdf_forecasts', forecast_id)
+    store = demo_store()
+    for single_id in [single_id for single_id, single
+                      in store.cdf_singles.items()
+                      if single['parent'] == forecast_id]:
+        del store.cdf_singles[single_id]
+        store.values.pop(single_id, None)
+
+
+@_synchronized
+def list_cdf_forecast_groups(site_id=None, aggregate_id=None, variable=None,
+                             limit=None, cursor=None, fields=None):
+    """Lists all CDF Forecast Groups a user has access to."""
+    groups = _filter_list(
+        _readable('cdf_forecasts'), 'forecast_id', site_id=site_id,
+        aggregate_id=aggregate_id, variable=variable, limit=limit,
+        cursor=cursor)
+    return _project([_cdf_forecast_group(group) for group in groups],
+                    fields, 'forecast_id')
+
+
+# Aggregates
+@_synchronized
+def store_aggregate(aggregate):
+    """Store Aggregate metadata."""
+    aggregate_id = generate_uuid()
+    metadata = {key: aggregate.get(key) for key in AGGREGATE_FIELDS}
+    metadata['aggregate_id'] = aggregate_id
+    metadata['interval_value_type'] = 'interval_mean'
+    metadata['observations'] = []
+    _create('aggregates', aggregate_id, metadata)
+    return aggregate_id
+
+
+@_synchronized
+def update_aggregate(aggregate_id, *, name=None, description=None,
+                     timezone=None, extra_parameters=None):
+    """Update aggregate metadata."""
+    _update('aggregates', aggregate_id, name=name, description=description,
+            timezone=timezone, extra_parameters=extra_parameters)
+
+
+@_synchronized
+def read_aggregate(aggregate_id):
+    """Read Aggregate metadata."""
+    return deepcopy(_read_object('aggregates', aggregate_id))
+
+
+@_synchronized
+def delete_aggregate(aggregate_id):
+    """Remove an Aggregate from storage."""
+    _check_type(aggregate_id, 'aggregates')
+    _check(aggregate_id, 'delete')
+    objects = demo_store().objects
+    if any(obj.get('aggregate_id') == aggregate_id
+           for object_type in ('forecasts', 'cdf_forecasts')
+           for obj in objects[object_type].values()):
+        raise DeleteRestrictionError()
+    demo_store().remove_object(aggregate_id)
+
+
+@_synchronized
+def list_aggregates():
+    """Lists all aggregates a user has access to."""
+    return deepcopy(_readable('aggregates'))
+
+
+def _aggregate_for_update(aggregate_id):
+    _check_type(aggregate_id, 'aggregates')
+    _check(aggregate_id, 'update')
+    return demo_store().objects['aggregates'][aggregate_id]
+
+
+@_synchronized
+def add_observation_to_aggregate(
+        aggregate_id, observation_id,
+        effective_from=dt.datetime(
+            1970, 1, 1, 0, 0, 1, tzinfo=dt.timezone.utc)):
+    """Add an Observation to an Aggregate"""
+    aggregate = _aggregate_for_update(aggregate_id)
+    _read_object('observations', observation_id)
+    if any(obs['observation_id'] == observation_id and
+           obs['effective_until'] is None
+           for obs in aggregate['observations']):
+        raise StorageAuthError()
+    aggregate['observations'].append({
+        'observation_id': observation_id, 'created_at': _now(),
+        'effective_from': effective_from, 'effective_until': None,
+        'observation_deleted_at': None})
+
+
+@_synchronized
+def remove_observation_from_aggregate(
+        aggregate_id, observation_id,
+        effective_until=dt.datetime.now(dt.timezone.utc)):
+    """Remove an Observation from an Aggregate"""
+    aggregate = _aggregate_for_update(aggregate_id)
+    for obs in aggregate['observations']:
+        if (
+                obs['observation_id'] == observation_id and
+                obs['effective_until'] is None
+        ):
+            obs['effective_until'] = effective_until
+
+
+@_synchronized
+def delete_observation_from_aggregate(aggregate_id, observation_id):
+    """Delete all instances of Observation from an Aggregate"""
+    aggregate = _aggregate_for_update(aggregate_id)
+    aggregate['observations'] = [
+        obs for obs in aggregate['observations']
+        if obs['observation_id'] != observation_id]
+
+
+@_synchronized
+def read_aggregate_values(aggregate_id, start=None, end=None):
+    """Read aggregate values between start and end."""
+    aggregate = _read_object('aggregates', aggregate_id)
+    _check(aggregate_id, 'read_values')
+    store = demo_store()
+    frames = {}
+    for obs in aggregate['observations']:
+        values = store.values.get(obs['observation_id'])
+        if values is None:
+            continue
+        obs_start = max(pd.Timestamp(start or EPOCH),
+                        pd.Timestamp(obs['effective_from']))
+        obs_end = pd.Timestamp(end) if end is not None else None
+        if obs['effective_until'] is not None:
+            until = pd.Timestamp(obs['effective_until'])
+            obs_end = until if obs_end is None else min(obs_end, until)
+        frame = values.read(obs_start, obs_end)
+        if len(frame):
+            frames.setdefault(obs['observation_id'], []).append(frame)
+    return {obs_id: pd.concat(dfs).reset_index().drop_duplicates(
+                ).set_index('timestamp').sort_index()
+            for obs_id, dfs in frames.items()}
+
+
+# Users, roles and permissions
+def _user(user):
+    out = {key: user[key] for key in ('user_id', 'auth0_id', 'created_at',
+                                      'modified_at')}
+    out['organization'] = _organization_name(user['organization_id'])
+    out['roles'] = dict(user['roles'])
+    return out
+
+
+def _role(role):
+    out = {key: role[key] for key in ('role_id', 'name', 'description',
+                                      'created_at', 'modified_at')}
+    out['organization'] = _organization_name(role['organization_id'])
+    out['permissions'] = dict(role['permissions'])
+    out['users'] = {user_id: user['roles'][role['role_id']]
+                    for user_id, user in demo_store().users.items()
+                    if role['role_id'] in user['roles']}
+    return out
+
+
+def _permission(perm):
+    out = {key: perm[key] for key in (
+        'permission_id', 'description', 'action', 'object_type',
+        'applies_to_all', 'created_at', 'modified_at')}
+    out['organization'] = _organization_name(perm['organization_id'])
+    out['objects'] = dict(perm['objects'])
+    return out
+
+
+def _readable_rbac(records, dump):
+    return [dump(records[object_id])
+            for object_id in sorted(records, key=_sort_key)
+            if _allowed(object_id, 'read')]
+
+
+def _tou_accepted(user):
+    return demo_store().organizations[user['organization_id']][
+        'accepted_tou']
+
+
+@_synchronized
+def list_users():
+    """List all users that calling user has access to."""
+    return _readable_rbac(demo_store().users, _user)
+
+
+@_synchronized
+def read_user(user_id):
+    """Read user information."""
+    _check_type(user_id, 'users')
+    _check(user_id, 'read')
+    return _user(demo_store().users[str(user_id)])
+
+
+@_synchronized
+def get_current_user_info():
+    user = _caller()
+    if user is None:
+        raise StorageAuthError()
+    return read_user(user['user_id'])
+
+
+@_synchronized
+def create_new_user():
+    store = demo_store()
+    if _caller() is None:
+        org_id = store.organization_id(UNAFFILIATED)
+        user_id = store.add_user(str(current_user), org_id)
+        store.add_default_role(user_id)
+    user_existence_cache().set(str(current_user), True)
+    return {'user_id': _caller()['user_id']}
+
+
+@_synchronized
+def user_exists():
+    return _caller() is not None
+
+
+@_synchronized
+def read_user_id(auth0_id):
+    """Gets the user id for a given auth0 id"""
+    caller = _caller()
+    for user in demo_store().users.values():
+        if (
+                user['auth0_id'] == auth0_id and caller is not None and
+                _tou_accepted(caller) and _tou_accepted(user)
+        ):
+            return user['user_id']
+    raise StorageAuthError()
+
+
+@_synchronized
+def read_auth0id(user_id):
+    """Read the auth0 id of another user. Only allowed if both users are
+    affiliated with organizations that have accepted the TOU."""
+    caller = _caller()
+    user = demo_store().users.get(str(user_id))
+    if (
+            user is None or caller is None or
+            not (_tou_accepted(caller) and _tou_accepted(user))
+    ):
+        raise StorageAuthError()
+    return user['auth0_id']
+
+
+@_synchronized
+def create_job_user(username, passwd, org_id, encryption_key):
+    """
+    Create a job user. No Auth0 user or refresh token is created for
+    the in-memory backend, the auth0 id is random.
+    """
+    if org_id not in demo_store().organizations:
+        raise StorageAuthError()
+    auth0_id = f'auth0|{secrets.token_hex(12)}'
+    user_id = demo_store().add_user(auth0_id, org_id)
+    return user_id, auth0_id
+
+
+def _role_for(role_id, action):
+    _check_type(role_id, 'roles')
+    _check(role_id, action)
+    return demo_store().roles[str(role_id)]
+
+
+@_synchronized
+def add_role_to_user(user_id, role_id):
+    """Grant a role to a user."""
+    role = _role_for(role_id, 'grant')
+    caller = _caller()
+    user = demo_store().users.get(str(user_id))
+    if (
+            user is None or
+            role['organization_id'] != caller['organization_id'] or
+            not _tou_accepted(user)
+    ):
+        raise StorageAuthError()
+    if role_id in user['roles']:
+        raise BadAPIRequest(user="User already granted role.")
+    user['roles'][role_id] = _now()
+
+
+@_synchronized
+def remove_role_from_user(user_id, role_id):
+    """Remove a role from a user."""
+    _role_for(role_id, 'revoke')
+    user = demo_store().users.get(str(user_id))
+    if user is not None:
+        user['roles'].pop(role_id, None)
+
+
+@_synchronized
+def list_roles():
+    """List all roles a user has access to."""
+    return _readable_rbac(demo_store().roles, _role)
+
+
+@_synchronized
+def store_role(role):
+    """Create a new role."""
+    if 'roles' not in _creatable_types():
+        raise StorageAuthError()
+    store = demo_store()
+    org_id = _caller()['organization_id']
+    if any(existing['name'] == role['name'] and
+           existing['organization_id'] == org_id
+           for existing in store.roles.values()):
+        raise BadAPIRequest(role=f"Role '{role['name']}' already exists.")
+    role_id = store.add_role(role['name'], role['description'], org_id)
+    # users with the role may read it
+    perm_id = store.add_permission(f'Read Role {role_id}', 'read', 'roles',
+                                   False, org_id)
+    store.permissions[perm_id]['objects'][role_id] = _now()
+    store.roles[role_id]['permissions'][perm_id] = _now()
+    return role_id
+
+
+@_synchronized
+def read_role(role_id):
+    """Read role information."""
+    return _role(_role_for(role_id, 'read'))
+
+
+@_synchronized
+def delete_role(role_id):
+    """Delete a role."""
+    _role_for(role_id, 'delete')
+    store = demo_store()
+    del store.roles[role_id]
+    for user in store.users.values():
+        user['roles'].pop(role_id, None)
+    store.remove_object(role_id)
+
+
+def _permission_for(permission_id, action):
+    _check_type(permission_id, 'permissions')
+    _check(permission_id, action)
+    return demo_store().permissions[str(permission_id)]
+
+
+@_synchronized
+def add_permission_to_role(role_id, permission_id):
+    """Add a permission to a role."""
+    role = _role_for(role_id, 'update')
+    perm = _permission_for(permission_id, 'read')
+    if perm['organization_id'] != role['organization_id']:
+        raise StorageAuthError()
+    if permission_id in role['permissions']:
+        raise BadAPIRequest(role="Role already contains permission.")
+    role['permissions'][permission_id] = _now()
+
+
+@_synchronized
+def remove_permission_from_role(role_id, permission_id):
+    """Remove a permission from a role."""
+    role = _role_for(role_id, 'update')
+    role['permissions'].pop(str(permission_id), None)
+
+
+@_synchronized
+def read_permission(permission_id):
+    """Read a permission."""
+    return _permission(_permission_for(permission_id, 'read'))
+
+
+@_synchronized
+def delete_permission(permission_id):
+    """Delete a permission."""
+    _permission_for(permission_id, 'delete')
+    store = demo_store()
+    del store.permissions[permission_id]
+    for role in store.roles.values():
+        role['permissions'].pop(permission_id, None)
+    store.remove_object(permission_id)
+
+
+@_synchronized
+def list_permissions():
+    """List all permissions readable by the user."""
+    return _readable_rbac(demo_store().permissions, _permission)
+
+
+@_synchronized
+def store_permission(permission):
+    """Create a new permission."""
+    if 'permissions' not in _creatable_types():
+        raise StorageAuthError()
+    return demo_store().add_permission(
+        permission['description'], permission['action'],
+        permission['object_type'], permission['applies_to_all'],
+        _caller()['organization_id'])
+
+
+@_synchronized
+def add_object_to_permission(permission_id, uuid):
+    """Add an object to a permission."""
+    perm = _permission_for(permission_id, 'update')
+    uuid = str(uuid)
+    owner = demo_store().owners.get(uuid)
+    if (
+            owner is None or owner[0] != perm['object_type'] or
+            not _allowed(uuid, 'read')
+    ):
+        raise StorageAuthError()
+    if uuid in perm['objects']:
+        raise BadAPIRequest(
+            permission="Permission already acts upon object.")
+    perm['objects'][uuid] = _now()
+
+
+@_synchronized
+def remove_object_from_permission(permission_id, uuid):
+    """Remove an object from a permission."""
+    perm = _permission_for(permission_id, 'update')
+    if perm['applies_to_all']:
+        raise StorageAuthError()
+    perm['objects'].pop(str(uuid), None)
+
+
+@_synchronized
+def get_user_actions_on_object(object_id):
+    """Read the list of actions that the user can perform on object."""
+    actions = _actions(object_id)
+    if not actions:
+        raise StorageAuthError()
+    return list(actions)
+
+
+@_synchronized
+def get_user_creatable_types():
+    """Get the types of objects the user has permission to create."""
+    creatable = _creatable_types()
+    return [object_type for object_type in DEMO_USER_ACTIONS
+            if object_type in creatable]
+
+
+@_synchronized
+def list_actions_on_all_objects_of_type(object_type):
+    """Get a list of objects and the actions a user can take on them."""
+    out = []
+    for object_id, (type_, _) in demo_store().owners.items():
+        if type_ != object_type:
+            continue
+        actions = _actions(object_id)
+        if actions:
+            out.append({'object_id': object_id,
+                        'actions': sorted(actions)})
+    return out
+
+
+# Reports
+@_synchronized
+def list_reports():
+    """List the metadata of all reports the user has access to."""
+    return [_decode_report_parameters(
+        {key: value for key, value in report.items() if key != 'raw_report'})
+            for report in _readable('reports')]
+
+
+@_synchronized
+def read_pair_metadata(object_ids):
+    """Read the metadata used to check the compatibility of the objects
+    of report object pairs for many objects in one call."""
+    readers = {
+        'forecasts': read_forecast,
+        'cdf_forecasts': read_cdf_forecast_group,
+        'cdf_forecasts_singles': read_cdf_forecast,
+        'observations': read_observation,
+        'aggregates': read_aggregate,
+    }
+    out = {object_type: {} for object_type in PAIR_METADATA_FIELDS}
+    for object_id in map(str, object_ids):
+        for object_type, fields in PAIR_METADATA_FIELDS.items():
+            try:
+                obj = readers[object_type](object_id)
+            except StorageAuthError:
+                continue
+            out[object_type][object_id] = {key: obj[key] for key in fields}
+    return out
+
+
+@_synchronized
+def store_report(report):
+    """Store a report's metadata"""
+    report_id = generate_uuid()
+    parameters = report['report_parameters']
+    for pair in parameters.get('object_pairs', []):
+        for key in ('forecast', 'observation', 'aggregate',
+                    'reference_forecast'):
+            if pair.get(key) is not None:
+                _check(str(pair[key]), 'read')
+    metadata = {
+        'report_id': report_id, 'name': parameters['name'],
+        'report_parameters': load_json_replace_nan(
+            dump_json_replace_nan(parameters)),
+        'raw_report': None, 'status': 'pending'}
+    _create('reports', report_id, metadata)
+    demo_store().report_values[report_id] = {}
+    return report_id
+
+
+@_synchronized
+def read_report(report_id, include_values=False, sections=None):
+    """Read a report's metadata with the sections of the raw report and
+    optionally the values the user can read."""
+    report = dict(_read_object('reports', report_id))
+    if sections is None:
+        sections = RAW_REPORT_SECTIONS
+    stored = demo_store().report_sections.get(str(report_id))
+    if sections and stored is not None:
+        report['raw_report'] = {}
+        for section in sections:
+            report['raw_report'].update(load_json_replace_nan(
+                decompress_section(stored[section])))
+    report = _decode_report_parameters(report)
+    if include_values:
+        try:
+            report['values'] = read_report_values(report_id)
+        except StorageAuthError:
+            report['values'] = []
+    return report
+
+
+@_synchronized
+def delete_report(report_id):
+    """Delete a report."""
+    _delete('reports', report_id)
+    demo_store().report_values.pop(report_id, None)
+    demo_store().report_sections.pop(report_id, None)
+
+
+@_synchronized
+def store_report_values(report_id, object_id, values):
+    """Store the processed values of an object in a report."""
+    _check_type(report_id, 'reports')
+    _check(report_id, 'write_values')
+    value_id = generate_uuid()
+    demo_store().report_values[str(report_id)][value_id] = {
+        'id': value_id, 'object_id': str(object_id),
+        'processed_values': encode_processed_values(values)}
+    return value_id
+
+
+@_synchronized
+def read_report_values(report_id, limit=None, cursor=None, encoded=False):
+    """Returns all of the processed values in the report that the user
+    has access too, a page ordered by id if limit or cursor are given."""
+    _check_type(report_id, 'reports')
+    _check(report_id, 'read_values')
+    values = [dict(row)
+              for row in demo_store().report_values[str(report_id)].values()
+              if _allowed(row['object_id'], 'read_values')]
+    if limit is not None or cursor is not None:
+        values = sorted(values, key=lambda row: _sort_key(row['id']))
+        values = _filter_list(values, 'id', limit=limit, cursor=cursor)
+    convert = ensure_encoded if encoded else decode_processed_values
+    for row in values:
+        row['processed_values'] = convert(row['processed_values'])
+    return values
+
+
+@_synchronized
+def read_report_object_values(report_id, object_id, encoded=False):
+    """Returns the processed values of one object in the report."""
+    _check_type(report_id, 'reports')
+    _check(report_id, 'read_values')
+    _check(str(object_id), 'read_values')
+    values = sorted(
+        (dict(row) for row in
+         demo_store().report_values[str(report_id)].values()
+         if row['object_id'] == str(object_id)),
+        key=lambda row: _sort_key(row['id']))
+    convert = ensure_encoded if encoded else decode_processed_values
+    for row in values:
+        row['processed_values'] = convert(row['processed_values'])
+    return values
+
+
+@_synchronized
+def read_report_values_manifest(report_id):
+    """Lists the processed values in the report that the user has
+    access to with their size."""
+    _check_type(report_id, 'reports')
+    _check(report_id, 'read_values')
+    return [{'id': row['id'], 'object_id': row['object_id'],
+             'size': len(row['processed_values'])}
+            for row in sorted(
+                demo_store().report_values[str(report_id)].values(),
+                key=lambda row: _sort_key(row['id']))
+            if _allowed(row['object_id'], 'read_values')]
+
+
+def _report_for_update(report_id):
+    _check_type(report_id, 'reports')
+    _check(report_id, 'update')
+    return demo_store().objects['reports'][str(report_id)]
+
+
+@_synchronized
+def store_raw_report(report_id, raw_report):
+    """Store the raw report."""
+    report = _report_for_update(report_id)
+    demo_store().report_sections[str(report_id)] = _compress_raw_report(
+        raw_report)
+    report['modified_at'] = _now()
+
+
+@_synchronized
+def store_report_status(report_id, status):
+    """Set the status of a report."""
+    report = _report_for_update(report_id)
+    report['status'] = status
+    report['modified_at'] = _now()
+
+
+# Climate zones
+@_synchronized
+def list_zones():
+    """List all climate zones"""
+    return [{key: zone[key] for key in ('name', 'created_at',
+                                        'modified_at')}
+            for _, zone in sorted(demo_store().zones.items())]
+
+
+@_synchronized
+def read_climate_zone(zone):
+    """Read the GeoJSON for a zone"""
+    try:
+        return deepcopy(demo_store().zones[zone]['geojson'])
+    except KeyError:
+        raise StorageAuthError()
+
+
+@_synchronized
+def find_climate_zones(latitude, longitude):
+    """Find the climate zones the point is within"""
+    return [{key: zone[key] for key in ('name', 'created_at',
+                                        'modified_at')}
+            for _, zone in sorted(demo_store().zones.items())
+            if _in_geojson(longitude, latitude, zone['geojson'])]
+
+
+def _climate_zone_names(latitude, longitude):
+    return [zone['name'] for zone in find_climate_zones(latitude, longitude)]
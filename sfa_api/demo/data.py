@@ -0,0 +1,562 @@
+"""
+Metadata of the objects in the in-memory storage backend,
+:py:mod:`sfa_api.demo`. These match the test metadata in the MySQL
+test database so that tests may be run against either backend.
+"""
+import datetime as dt
+
+
+import pytz
+
+
+demo_sites = {
+    '123e4567-e89b-12d3-a456-426655440001': {
+        "elevation": 595.0,
+        "extra_parameters": (
+            '{"network_api_abbreviation": "AS","network": "University of Oregon SRML","network_api_id": "94040"}' # NOQA
+        ),
+        "latitude": 42.19,
+        "longitude": -122.7,
+        "modeling_parameters": {
+            "ac_capacity": None,
+            "ac_loss_factor": None,
+            "axis_azimuth": None,
+            "axis_tilt": None,
+            "backtrack": None,
+            "dc_capacity": None,
+            "dc_loss_factor": None,
+            "ground_coverage_ratio": None,
+            "max_rotation_angle": None,
+            "surface_azimuth": None,
+            "surface_tilt": None,
+            "temperature_coefficient": None,
+            "tracking_type": None
+        },
+        "name": "Weather Station",
+        "provider": "Organization 1",
+        "timezone": "Etc/GMT+8",
+        "site_id": '123e4567-e89b-12d3-a456-426655440001',
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 38)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 38)),
+        "climate_zones": ["Reference Region 2"]
+    },
+    'd2018f1d-82b1-422a-8ec4-4e8b3fe92a4a': {
+        "elevation": 786.0,
+        "extra_parameters": '{"network": "NREL MIDC"}',
+        "latitude": 32.22969,
+        "longitude": -110.95534,
+        "modeling_parameters": {
+            "ac_capacity": None,
+            "ac_loss_factor": None,
+            "axis_azimuth": None,
+            "axis_tilt": None,
+            "backtrack": None,
+            "dc_capacity": None,
+            "dc_loss_factor": None,
+            "ground_coverage_ratio": None,
+            "max_rotation_angle": None,
+            "surface_azimuth": None,
+            "surface_tilt": None,
+            "temperature_coefficient": None,
+            "tracking_type": None
+        },
+        "name": "Weather Station 1",
+        "provider": "Organization 1",
+        "timezone": "America/Phoenix",
+        "site_id": 'd2018f1d-82b1-422a-8ec4-4e8b3fe92a4a',
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 44)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 44)),
+        "climate_zones": ["Reference Region 3"]
+    },
+    '123e4567-e89b-12d3-a456-426655440002': {
+        "elevation": 786.0,
+        "extra_parameters": "",
+        "latitude": 43.73403,
+        "longitude": -96.62328,
+        "modeling_parameters": {
+            "ac_capacity": 0.015,
+            "ac_loss_factor": 0.0,
+            "axis_azimuth": None,
+            "axis_tilt": None,
+            "backtrack": None,
+            "dc_capacity": 0.015,
+            "dc_loss_factor": 0.0,
+            "ground_coverage_ratio": None,
+            "max_rotation_angle": None,
+            "surface_azimuth": 180.0,
+            "surface_tilt": 45.0,
+            "temperature_coefficient": -.2,
+            "tracking_type": "fixed"
+        },
+        "name": "Power Plant 1",
+        "provider": "Organization 1",
+        "timezone": "Etc/GMT+6",
+        "site_id": '123e4567-e89b-12d3-a456-426655440002',
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 46)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 44, 46)),
+        "climate_zones": ["Reference Region 5"]
+    }
+}
+
+
+demo_observations = {
+    "123e4567-e89b-12d3-a456-426655440000": {
+        "extra_parameters": (
+            '{"instrument": "Ascension Technology Rotating Shadowband Pyranometer",'  # NOQA
+            ' "network": "UO SRML"}'
+        ),
+        "name": "GHI Instrument 1",
+        "observation_id": "123e4567-e89b-12d3-a456-426655440000",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440001",
+        "variable": "ghi",
+        "interval_value_type": "interval_mean",
+        "interval_label": "beginning",
+        "interval_length": 5,
+        "uncertainty": 0.10,
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 39)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 39))
+    },
+    "9cfa4aa2-7d0f-4f6f-a1c1-47f75e1d226f": {
+        "extra_parameters": (
+            '{"instrument": "Ascension Technology Rotating Shadowband Pyranometer",'  # NOQA
+            ' "network": "UO SRML"}'
+        ),
+        "name": "DHI Instrument 1",
+        "observation_id": "9cfa4aa2-7d0f-4f6f-a1c1-47f75e1d226f",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440001",
+        "variable": "dhi",
+        "interval_value_type": "interval_mean",
+        "interval_label": "beginning",
+        "interval_length": 5,
+        "uncertainty": 0.10,
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 43)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 43))
+    },
+    "9ce9715c-bd91-47b7-989f-50bb558f1eb9": {
+        "extra_parameters": (
+            '{"instrument": "Ascension Technology Rotating Shadowband Pyranometer",' # NOQA
+            ' "network": "UO SRML"}'
+        ),
+        "name": "DNI Instrument 2",
+        "observation_id": "9ce9715c-bd91-47b7-989f-50bb558f1eb9",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440001",
+        "variable": "dni",
+        "interval_value_type": "interval_mean",
+        "interval_label": "beginning",
+        "interval_length": 5,
+        "uncertainty": 0.10,
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 48)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 48))
+    },
+    "e0da0dea-9482-4073-84de-f1b12c304d23": {
+        "extra_parameters": (
+            '{"instrument": "Kipp & Zonen CMP 22 Pyranometer",'
+            ' "network": "UO SRML"}'
+        ),
+        "name": "GHI Instrument 2",
+        "observation_id": "e0da0dea-9482-4073-84de-f1b12c304d23",
+        "provider": "Organization 1",
+        "site_id": "d2018f1d-82b1-422a-8ec4-4e8b3fe92a4a",
+        "variable": "ghi",
+        "interval_value_type": "interval_mean",
+        "interval_label": "beginning",
+        "interval_length": 5,
+        "uncertainty": 0.10,
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 55)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 1, 55))
+    },
+    "b1dfe2cb-9c8e-43cd-afcf-c5a6feaf81e2": {
+        "extra_parameters": (
+            '{"instrument": "Kipp & Zonen CMP 22 Pyranometer",'
+            ' "network": "NOAA"}'
+        ),
+        "name": "Sioux Falls, ghi",
+        "observation_id": "b1dfe2cb-9c8e-43cd-afcf-c5a6feaf81e2",
+        "provider": "Organization 1",
+        "site_id": "d2018f1d-82b1-422a-8ec4-4e8b3fe92a4a",
+        "variable": "ghi",
+        "interval_value_type": "interval_mean",
+        "interval_label": "beginning",
+        "interval_length": 5,
+        "uncertainty": 0.10,
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 2, 38)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 12, 2, 38))
+    },
+    '991d15ce-7f66-11ea-96ae-0242ac150002': {
+        'name': 'Weather Station Event Observation',
+        'variable': 'event',
+        'interval_value_type': 'instantaneous',
+        'interval_length': 5.0,
+        'interval_label': 'event',
+        'site_id': '123e4567-e89b-12d3-a456-426655440001',
+        'uncertainty': 1.0,
+        'observation_id': '991d15ce-7f66-11ea-96ae-0242ac150002',
+        'provider': 'Organization 1',
+        'created_at': pytz.utc.localize(dt.datetime(2019, 4, 14, 7, 00, 00)),
+        'modified_at': pytz.utc.localize(dt.datetime(2019, 4, 14, 7, 00, 00)),
+        'extra_parameters': ''}
+}
+
+
+demo_forecasts = {
+    '11c20780-76ae-4b11-bef1-7a75bdc784e3': {
+        "extra_parameters": "",
+        "forecast_id": "11c20780-76ae-4b11-bef1-7a75bdc784e3",
+        "name": "DA GHI",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440001",
+        "aggregate_id": None,
+        "variable": "ghi",
+        "issue_time_of_day": "06:00",
+        "interval_length": 5,
+        "run_length": 1440,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37))
+    },
+    'f8dd49fa-23e2-48a0-862b-ba0af6dec276': {
+        "extra_parameters": "",
+        "forecast_id": "f8dd49fa-23e2-48a0-862b-ba0af6dec276",
+        "name": "HA Power",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440002",
+        "aggregate_id": None,
+        "variable": "ac_power",
+        "issue_time_of_day": "12:00",
+        "run_length": 60,
+        "interval_length": 1,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 38)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 38))
+    },
+    '39220780-76ae-4b11-bef1-7a75bdc784e3': {
+        "extra_parameters": "",
+        "forecast_id": "39220780-76ae-4b11-bef1-7a75bdc784e3",
+        "name": "GHI Aggregate FX",
+        "provider": "Organization 1",
+        "site_id": None,
+        "aggregate_id": "458ffc27-df0b-11e9-b622-62adb5fd6af0",
+        "variable": "ghi",
+        "issue_time_of_day": "06:00",
+        "run_length": 1440,
+        "interval_length": 5,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37))
+    },
+    '49220780-76ae-4b11-bef1-7a75bdc784e3': {
+        "extra_parameters": "",
+        "forecast_id": "49220780-76ae-4b11-bef1-7a75bdc784e3",
+        "name": "GHI Aggregate FX 60",
+        "provider": "Organization 1",
+        "site_id": None,
+        "aggregate_id": "458ffc27-df0b-11e9-b622-62adb5fd6af0",
+        "variable": "ghi",
+        "issue_time_of_day": "00:00",
+        "run_length": 1440,
+        "interval_length": 60,
+        "interval_label": "beginning",
+        "lead_time_to_start": 0,
+        "interval_value_type": "interval_mean",
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 1, 11, 55, 37))
+    },
+    '24cbae4e-7ea6-11ea-86b1-0242ac150002': {
+        'name': 'Weather Station Event Forecast',
+        'issue_time_of_day': '05:00',
+        'lead_time_to_start': 60.0,
+        'interval_length': 5.0,
+        'run_length': 60.0,
+        'interval_label': 'event',
+        'interval_value_type': 'instantaneous',
+        'variable': 'event',
+        'forecast_id': '24cbae4e-7ea6-11ea-86b1-0242ac150002',
+        'site_id': '123e4567-e89b-12d3-a456-426655440001',
+        'aggregate_id': None,
+        'provider': 'Organization 1',
+        'extra_parameters': '',
+        'created_at': pytz.utc.localize(dt.datetime(2019, 4, 14, 7, 00, 00)),
+        'modified_at': pytz.utc.localize(dt.datetime(2019, 4, 14, 7, 00, 00)),
+    }
+}
+
+
+demo_single_cdf = {
+    '633f9396-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633f9396-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 5.0,
+        "parent": 'ef51e87c-50b9-11e9-8647-d663bd873d93',
+    },
+    '633f9864-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633f9864-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 20.0,
+        "parent": 'ef51e87c-50b9-11e9-8647-d663bd873d93',
+    },
+    '633f9b2a-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633f9b2a-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 50.0,
+        "parent": 'ef51e87c-50b9-11e9-8647-d663bd873d93',
+    },
+    '633f9d96-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633f9d96-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 80.0,
+        "parent": 'ef51e87c-50b9-11e9-8647-d663bd873d93',
+    },
+    '633fa548-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fa548-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 95.0,
+        "parent": 'ef51e87c-50b9-11e9-8647-d663bd873d93',
+    },
+    '633fa94e-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fa94e-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 0.0,
+        "parent": '058b182a-50ba-11e9-8647-d663bd873d93',
+    },
+    '633fabec-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fabec-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 5.0,
+        "parent": '058b182a-50ba-11e9-8647-d663bd873d93',
+
+    },
+    '633fae62-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fae62-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 10.0,
+        "parent": '058b182a-50ba-11e9-8647-d663bd873d93',
+    },
+    '633fb114-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fb114-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 15.0,
+        "parent": '058b182a-50ba-11e9-8647-d663bd873d93',
+    },
+    '633fb3a8-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '633fb3a8-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 20.0,
+        "parent": '058b182a-50ba-11e9-8647-d663bd873d93',
+    },
+    '733f9396-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '733f9396-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 10.0,
+        "parent": 'f6b620ca-f743-11e9-a34f-f4939feddd82'
+    },
+    '733f9864-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '733f9864-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 20.0,
+        "parent": 'f6b620ca-f743-11e9-a34f-f4939feddd82'
+    },
+    '733f9b2a-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '733f9b2a-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 50.0,
+        "parent": 'f6b620ca-f743-11e9-a34f-f4939feddd82'
+    },
+    '733f9d96-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '733f9d96-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 80.0,
+        "parent": 'f6b620ca-f743-11e9-a34f-f4939feddd82'
+    },
+    '733fa548-50bb-11e9-8647-d663bd873d93': {
+        "forecast_id": '733fa548-50bb-11e9-8647-d663bd873d93',
+        "constant_value": 100.0,
+        "parent": 'f6b620ca-f743-11e9-a34f-f4939feddd82'
+    },
+}
+
+
+def _get_constant_values(fxid):
+    out = demo_single_cdf[fxid].copy()
+    del out['parent']
+    return out
+
+
+demo_group_cdf = {
+    'ef51e87c-50b9-11e9-8647-d663bd873d93': {
+        "forecast_id": "ef51e87c-50b9-11e9-8647-d663bd873d93",
+        "name": "DA GHI",
+        "extra_parameters": "",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440001",
+        "aggregate_id": None,
+        "variable": "ghi",
+        "issue_time_of_day": "06:00",
+        "interval_length": 5,
+        "run_length": 1440,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "axis": "y",
+        "constant_values": [
+            _get_constant_values('633f9396-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633f9864-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633f9b2a-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633f9d96-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633fa548-50bb-11e9-8647-d663bd873d93')],
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 37)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 37))
+    },
+    '058b182a-50ba-11e9-8647-d663bd873d93': {
+        "forecast_id": "058b182a-50ba-11e9-8647-d663bd873d93",
+        "name": "HA Power",
+        "extra_parameters": "",
+        "provider": "Organization 1",
+        "site_id": "123e4567-e89b-12d3-a456-426655440002",
+        "aggregate_id": None,
+        "variable": "ac_power",
+        "issue_time_of_day": "12:00",
+        "run_length": 60,
+        "interval_length": 1,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "axis": "x",
+        "constant_values": [
+            _get_constant_values('633fb3a8-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633fb114-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633fae62-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633fabec-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('633fa94e-50bb-11e9-8647-d663bd873d93')],
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 38)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 38))
+    },
+    'f6b620ca-f743-11e9-a34f-f4939feddd82': {
+        "forecast_id": "f6b620ca-f743-11e9-a34f-f4939feddd82",
+        "name": "GHI Aggregate CDF FX",
+        "extra_parameters": "",
+        "provider": "Organization 1",
+        "site_id": None,
+        "aggregate_id": "458ffc27-df0b-11e9-b622-62adb5fd6af0",
+        "variable": "ghi",
+        "issue_time_of_day": "06:00",
+        "interval_length": 5,
+        "run_length": 1440,
+        "interval_label": "beginning",
+        "lead_time_to_start": 60,
+        "interval_value_type": "interval_mean",
+        "axis": "y",
+        "constant_values": [
+            _get_constant_values('733f9396-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('733f9864-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('733f9b2a-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('733f9d96-50bb-11e9-8647-d663bd873d93'),
+            _get_constant_values('733fa548-50bb-11e9-8647-d663bd873d93')],
+        "created_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 38)),
+        "modified_at": pytz.utc.localize(dt.datetime(2019, 3, 2, 14, 55, 38))
+    }
+}
+
+
+ca = dt.datetime(2019, 9, 25, 0, 0, tzinfo=dt.timezone.utc)
+ef = dt.datetime(2019, 1, 1, 0, 0, tzinfo=dt.timezone.utc)
+demo_aggregates = {
+    "458ffc27-df0b-11e9-b622-62adb5fd6af0": {
+        "aggregate_id": "458ffc27-df0b-11e9-b622-62adb5fd6af0",
+        "name": "Test Aggregate ghi",
+        "provider": "Organization 1",
+        "variable": "ghi",
+        "interval_label": "ending",
+        "interval_length": 60,
+        "interval_value_type": "interval_mean",
+        "aggregate_type": "mean",
+        "extra_parameters": "extra",
+        "description": "ghi agg",
+        "timezone": "America/Denver",
+        "created_at": dt.datetime(2019, 9, 24, 12, 0, tzinfo=dt.timezone.utc),
+        "modified_at": dt.datetime(2019, 9, 24, 12, 0, tzinfo=dt.timezone.utc),
+        "observations": [
+            {"observation_id": "123e4567-e89b-12d3-a456-426655440000",
+             "created_at": ca,
+             "effective_from": ef,
+             "observation_deleted_at": None,
+             "effective_until": None},
+            {"observation_id": "e0da0dea-9482-4073-84de-f1b12c304d23",
+             "created_at": ca,
+             "effective_from": ef,
+             "observation_deleted_at": None,
+             "effective_until": None},
+            {"observation_id": "b1dfe2cb-9c8e-43cd-afcf-c5a6feaf81e2",
+             "created_at": ca,
+             "effective_from": ef,
+             "observation_deleted_at": None,
+             "effective_until": None},
+        ]
+    },
+    "d3d1e8e5-df1b-11e9-b622-62adb5fd6af0": {
+        "aggregate_id": "d3d1e8e5-df1b-11e9-b622-62adb5fd6af0",
+        "name": "Test Aggregate dni",
+        "provider": "Organization 1",
+        "variable": "dni",
+        "interval_label": "ending",
+        "interval_length": 60,
+        "interval_value_type": "interval_mean",
+        "aggregate_type": "mean",
+        "extra_parameters": "extra",
+        "description": "dni agg",
+        "timezone": "America/Denver",
+        "created_at": dt.datetime(2019, 9, 24, 12, 0, tzinfo=dt.timezone.utc),
+        "modified_at": dt.datetime(2019, 9, 24, 12, 0, tzinfo=dt.timezone.utc),
+        "observations": [
+            {"observation_id": "95890740-824f-11e9-a81f-54bf64606445",
+             "created_at": ca,
+             "observation_deleted_at": None,
+             "effective_from": ef,
+             "effective_until": None},
+            {"observation_id": "9ce9715c-bd91-47b7-989f-50bb558f1eb9",
+             "created_at": ca,
+             "observation_deleted_at": None,
+             "effective_from": ef,
+             "effective_until": None}
+        ]
+    }
+}
+
+
+demo_reports = {
+    "9f290dd4-42b8-11ea-abdf-f4939feddd82": {
+        "report_id": "9f290dd4-42b8-11ea-abdf-f4939feddd82",
+        "name": "NREL MIDC OASIS GHI Forecast Analysis",
+        "provider": "Organization 1",
+        "report_parameters": {
+            "name": "NREL MIDC OASIS GHI Forecast Analysis",
+            "start": "2019-04-01T07:00:00Z",
+            "end": "2019-06-01T06:59:00Z",
+            "metrics": ["mae", "rmse"],
+            "filters": [{"quality_flags": ["USER FLAGGED"]}],
+            "categories": ["total", "date"],
+            "object_pairs": [
+                {"observation": "123e4567-e89b-12d3-a456-426655440000",
+                 "forecast": "11c20780-76ae-4b11-bef1-7a75bdc784e3"}]
+        },
+        "raw_report": {
+            "generated_at": "2019-07-01T12:00:00+00:00",
+            "timezone": "Etc/GMT+8",
+            "versions": [],
+            "plots": None,
+            "metrics": [],
+            "processed_forecasts_observations": [],
+            "messages": [{"message": "FAILED", "step": "dunno",
+                          "level": "error", "function": "fcn"}],
+            "data_checksum": None
+        },
+        "status": "failed",
+        "created_at": dt.datetime(2020, 1, 22, 13, 48,
+                                  tzinfo=dt.timezone.utc),
+        "modified_at": dt.datetime(2020, 1, 22, 13, 50,
+                                   tzinfo=dt.timezone.utc),
+    }
+}
+
+
+demo_report_values = {
+    "9f290dd4-42b8-11ea-abdf-f4939feddd82": [
+        {"id": "a2b6ed14-42d0-11ea-aa3c-f4939feddd82",
+         "object_id": "123e4567-e89b-12d3-a456-426655440000",
+         "processed_values": "superencodedvalues"}
+    ]
+}
@@ -28,7 +28,9 @@ from sfa_api.utils.request_handling import (validate_parsable_values,
                                             validate_index_period,
                                             validate_event_data,
                                             validate_forecast_values,
-                                            restrict_forecast_upload_window)
+                                            restrict_forecast_upload_window,
+                                            validate_list_arguments,
+                                            make_list_response)
 
 
 class AllForecastsView(MethodView):
@@ -38,6 +40,13 @@ class AllForecastsView(MethodView):
         summary: List forecasts
         tags:
         - Forecasts
+        parameters:
+        - list_limit
+        - list_cursor
+        - list_fields
+        - site_id_filter
+        - aggregate_id_filter
+        - variable_filter
         responses:
           200:
             description: Forecasts sucessfully retrieved.
@@ -47,12 +56,19 @@ class AllForecastsView(MethodView):
                   type: array
                   items:
                     $ref: '#/components/schemas/ForecastMetadata'
+          400:
+            $ref: '#/components/responses/400-BadRequest'
           401:
             $ref: '#/components/responses/401-Unauthorized'
+          404:
+            $ref: '#/components/responses/404-NotFound'
         """
+        list_args = validate_list_arguments(
+            ForecastSchema, ('site_id', 'aggregate_id', 'variable'))
         storage = get_storage()
-        forecasts = storage.list_forecasts()
-        return jsonify(ForecastSchema(many=True).dump(forecasts))
+        forecasts = storage.list_forecasts(**list_args)
+        return make_list_response(forecasts, ForecastSchema, list_args,
+                                  'forecast_id')
 
     def post(self, *args):
         """
@@ -450,6 +466,13 @@ class AllCDFForecastGroupsView(MethodView):
         description: List all probabilistic forecasts a user has access to.
         tags:
           - Probabilistic Forecasts
+        parameters:
+          - list_limit
+          - list_cursor
+          - list_fields
+          - site_id_filter
+          - aggregate_id_filter
+          - variable_filter
         responses:
           200:
             description: A list of probabilistic forecasts
@@ -459,16 +482,20 @@ class AllCDFForecastGroupsView(MethodView):
                   type: array
                   items:
                     $ref: '#/components/schemas/CDFForecastGroupMetadata'
+          400:
+            $ref: '#/components/responses/400-BadRequest'
           401:
             $ref: '#/components/responses/401-Unauthorized'
           404:
             $ref: '#/components/responses/404-NotFound'
         """
+        list_args = validate_list_arguments(
+            CDFForecastGroupSchema, ('site_id', 'aggregate_id', 'variable'))
         storage = get_storage()
-        cdf_forecast_groups = storage.list_cdf_forecast_groups()
-        return jsonify(
-            CDFForecastGroupSchema(many=True).dump(cdf_forecast_groups)
-        )
+        cdf_forecast_groups = storage.list_cdf_forecast_groups(**list_args)
+        return make_list_response(cdf_forecast_groups,
+                                  CDFForecastGroupSchema, list_args,
+                                  'forecast_id')
 
     def post(self, *args):
         """
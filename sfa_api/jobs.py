@@ -1,27 +1,84 @@
+import calendar
 from contextlib import contextmanager
+import datetime as dt
+from functools import partial
 import json
 import logging
+import time
+import uuid
+import zlib
 
 
 from cryptography.fernet import Fernet
-from flask import current_app, Flask
+from flask import current_app, Flask, has_app_context
 import pandas as pd
-from solarforecastarbiter.io import nwp
+from rq.timeouts import JobTimeoutException
+from solarforecastarbiter.io import api, nwp
 from solarforecastarbiter.io.utils import HiddenToken
 from solarforecastarbiter.reference_forecasts.main import (
     make_latest_nwp_forecasts, make_latest_persistence_forecasts,
     make_latest_probabilistic_persistence_forecasts)
 from solarforecastarbiter.reports.main import compute_report
-from solarforecastarbiter.validation.tasks import \
-    fetch_and_validate_all_observations
+from solarforecastarbiter.validation.tasks import (
+    fetch_and_validate_all_observations, fetch_and_validate_observation)
 
 
+from sfa_api.config import Config
 from sfa_api.utils.auth0_info import exchange_refresh_token
+from sfa_api.utils.in_process_api import in_process_api
+from sfa_api.utils.job_tokens import job_token_cache
+from sfa_api.utils.metrics import counter, histogram
 from sfa_api.utils.queuing import get_queue
 import sfa_api.utils.storage_interface as storage
 
 
 logger = logging.getLogger(__name__)
+# unix time of the latest modification of a job in the last sync and the
+# unix time each job was modified when it was last synced, see sync_jobs
+JOB_SYNC_WATERMARK_KEY = 'sfa:job_sync:watermark'
+JOB_SYNC_MODIFIED_KEY = 'sfa:job_sync:modified'
+JOB_SYNC_DURATION = histogram(
+    'sfa_api_job_sync_seconds',
+    'Time to sync MySQL jobs to the RQ scheduler by kind: full, '
+    'incremental, or checksum to check for deleted jobs',
+    ['kind'])
+JOB_SYNC_JOBS = counter(
+    'sfa_api_job_sync_jobs_total',
+    'Jobs handled when syncing MySQL jobs to the RQ scheduler by action: '
+    'read from MySQL, scheduled, or removed',
+    ['action'])
+# progress of a run of fan_out_validation and the observations that failed
+VALIDATION_RUN_KEY = 'sfa:validation_run:{}'
+VALIDATION_FAILED_KEY = 'sfa:validation_run:{}:failed'
+# runs whose chunks never finish, e.g. if a worker dies, are dropped after
+VALIDATION_RUN_TTL = 86400
+VALIDATION_CHUNKS = counter(
+    'sfa_api_validation_chunks_total',
+    'Chunks of observation validation by outcome: completed, retried '
+    'or failed after the last retry',
+    ['outcome'])
+VALIDATION_OBSERVATIONS = counter(
+    'sfa_api_validation_observations_total',
+    'Observations validated in runs of daily observation validation by '
+    'outcome: validated or failed',
+    ['outcome'])
+VALIDATION_RUN_DURATION = histogram(
+    'sfa_api_validation_run_seconds',
+    'Time from the start of a daily observation validation job until '
+    'its last chunk finishes',
+    buckets=(15, 60, 300, 900, 1800, 3600, 7200, float('inf')))
+
+
+def _exchange_token(user_id):
+    try:
+        enc_token = storage._call_procedure(
+            'fetch_token', (user_id,), with_current_user=False,
+        )[0]['token'].encode()
+    except IndexError:
+        raise KeyError(f'No token for {user_id} found')
+    f = Fernet(current_app.config['TOKEN_ENCRYPTION_KEY'])
+    refresh_token = f.decrypt(enc_token).decode()
+    return exchange_refresh_token(refresh_token)
 
 
 def exchange_token(user_id):
@@ -30,7 +87,8 @@ def exchange_token(user_id):
     exchange it for an access token. This requires the same
     TOKEN_ENCRYPTION_KEY that was used to encrypt the token along with
     the same AUTH0_CLIENT_ID and AUTH0_CLIENT_SECRET to do anything
-    useful with the refresh token.
+    useful with the refresh token. Access tokens are cached until
+    shortly before they expire, see :py:mod:`sfa_api.utils.job_tokens`.
 
     Parameters
     ----------
@@ -47,15 +105,8 @@ def exchange_token(user_id):
     KeyError
         If no token is found for user_id
     """
-    try:
-        enc_token = storage._call_procedure(
-            'fetch_token', (user_id,), with_current_user=False,
-        )[0]['token'].encode()
-    except IndexError:
-        raise KeyError(f'No token for {user_id} found')
-    f = Fernet(current_app.config['TOKEN_ENCRYPTION_KEY'])
-    refresh_token = f.decrypt(enc_token).decode()
-    access_token = exchange_refresh_token(refresh_token)
+    access_token = job_token_cache().get_or_exchange(
+        user_id, partial(_exchange_token, user_id))
     return HiddenToken(access_token)
 
 
@@ -141,13 +192,34 @@ def execute_job(name, job_type, user_id, **kwargs):
     ------
     ValueError
         If the job type is unsupported
+
+    Notes
+    -----
+    If config['IN_PROCESS_API'] is set, the requests of the job to the
+    API are served in this process, see
+    :py:mod:`sfa_api.utils.in_process_api`. If
+    config['VALIDATION_CHUNK_SIZE'] is greater than 0, daily observation
+    validation is split into jobs for chunks of observations, see
+    :py:func:`fan_out_validation`.
     """
     logger.info('Running job %s of type %s', name, job_type)
     token = exchange_token(user_id)
+    with in_process_api():
+        return _run_job(name, job_type, user_id, token, **kwargs)
+
+
+def _run_job(name, job_type, user_id, token, **kwargs):
     base_url = kwargs.get('base_url', None)
     if job_type == 'daily_observation_validation':
         start = utcnow() + pd.Timedelta(kwargs['start_td'])
         end = utcnow() + pd.Timedelta(kwargs['end_td'])
+        if (
+                has_app_context() and
+                current_app.config.get('VALIDATION_CHUNK_SIZE',
+                                       Config.VALIDATION_CHUNK_SIZE) > 0
+        ):
+            return fan_out_validation(
+                name, user_id, token, start, end, base_url=base_url)
         return fetch_and_validate_all_observations(
             token, start, end, base_url=base_url)
     elif job_type == 'reference_nwp':
@@ -170,6 +242,209 @@ def execute_job(name, job_type, user_id, **kwargs):
         raise ValueError(f'Job type {job_type} is not supported')
 
 
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def fan_out_validation(name, user_id, token, start, end, base_url=None):
+    """
+    Validate all the observations of the organization of the user by
+    queuing jobs that each validate up to config['VALIDATION_CHUNK_SIZE']
+    observations on config['SCHEDULER_QUEUE'] so that any scheduled worker
+    may run them. The progress of the run is kept in Redis and the chunk
+    that finishes last queues :py:func:`aggregate_validation_run`.
+
+    Parameters
+    ----------
+    name : str
+        Name of the job, used in logs
+    user_id : str
+        ID of the user the chunks run as
+    token : HiddenToken
+        Access token of the user to list the observations
+    start : datetime-like
+        Start time of the data to validate
+    end : datetime-like
+        End time of the data to validate
+    base_url : str, optional
+        URL of the API
+
+    Returns
+    -------
+    str or None
+        The ID of the run, or None if there are no observations
+    """
+    config = current_app.config
+    session = api.APISession(token, base_url=base_url)
+    organization = session.get_user_info()['organization']
+    observation_ids = [obs.observation_id
+                       for obs in session.list_observations()
+                       if obs.provider == organization]
+    if not observation_ids:
+        logger.info('No observations to validate for job %s', name)
+        return None
+    chunks = _chunks(observation_ids, int(config['VALIDATION_CHUNK_SIZE']))
+    run_id = str(uuid.uuid4())
+    queue = get_queue(config['SCHEDULER_QUEUE'])
+    key = VALIDATION_RUN_KEY.format(run_id)
+    # set before queuing since a synchronous queue runs the chunks at once
+    queue.connection.hset(key, mapping={
+        'name': name, 'pending': len(chunks), 'validated': 0,
+        'started': time.time()})
+    queue.connection.expire(key, VALIDATION_RUN_TTL)
+    logger.info('Validating %s observations in %s chunks for job %s',
+                len(observation_ids), len(chunks), name)
+    for chunk in chunks:
+        _enqueue_validation_chunk(queue, run_id, user_id, chunk, start, end,
+                                  base_url, 0)
+    return run_id
+
+
+def _enqueue_validation_chunk(queue, run_id, user_id, observation_ids,
+                              start, end, base_url, attempt):
+    queue.enqueue_call(
+        func=validate_observation_chunk,
+        args=(run_id, user_id, observation_ids, start, end),
+        kwargs={'base_url': base_url, 'attempt': attempt},
+        timeout=current_app.config.get('VALIDATION_CHUNK_TIMEOUT',
+                                       Config.VALIDATION_CHUNK_TIMEOUT),
+        result_ttl=0)
+
+
+def validate_observation_chunk(run_id, user_id, observation_ids, start, end,
+                               base_url=None, attempt=0):
+    """
+    Validate a chunk of observations of a run of
+    :py:func:`fan_out_validation`. Observations that fail, and those
+    left when the chunk times out, are queued in a new chunk up to
+    config['VALIDATION_CHUNK_RETRIES'] times.
+
+    Parameters
+    ----------
+    run_id : str
+        ID of the validation run
+    user_id : str
+        ID of the user to validate the observations as
+    observation_ids : list of str
+        Observations to validate
+    start : datetime-like
+        Start time of the data to validate
+    end : datetime-like
+        End time of the data to validate
+    base_url : str, optional
+        URL of the API
+    attempt : int
+        Number of times the observations have been retried
+    """
+    failed = []
+    timeout = None
+    # observations validated or failed before a timeout
+    done = 0
+    try:
+        try:
+            token = exchange_token(user_id)
+        except JobTimeoutException:
+            raise
+        except Exception:
+            logger.exception('Failed to get a token for validation run %s',
+                             run_id)
+            failed = list(observation_ids)
+            done = len(observation_ids)
+        else:
+            with in_process_api():
+                for observation_id in observation_ids:
+                    try:
+                        fetch_and_validate_observation(
+                            token, observation_id, start, end,
+                            only_missing=True, base_url=base_url)
+                    except JobTimeoutException:
+                        raise
+                    except Exception:
+                        logger.exception(
+                            'Failed to validate observation %s',
+                            observation_id)
+                        failed.append(observation_id)
+                    done += 1
+    except JobTimeoutException as e:
+        # the job is only interrupted once, so the observations left are
+        # retried in a new chunk before failing the job
+        logger.error('Validation chunk of run %s timed out', run_id)
+        timeout = e
+        failed.extend(observation_ids[done:])
+    validated = len(observation_ids) - len(failed)
+    retries = int(current_app.config.get('VALIDATION_CHUNK_RETRIES',
+                                         Config.VALIDATION_CHUNK_RETRIES))
+    if failed and attempt < retries:
+        VALIDATION_CHUNKS.labels(outcome='retried').inc()
+        queue = get_queue(current_app.config['SCHEDULER_QUEUE'])
+        queue.connection.hincrby(VALIDATION_RUN_KEY.format(run_id),
+                                 'validated', validated)
+        _enqueue_validation_chunk(queue, run_id, user_id, failed, start,
+                                  end, base_url, attempt + 1)
+    else:
+        VALIDATION_CHUNKS.labels(
+            outcome='failed' if failed else 'completed').inc()
+        _finish_validation_chunk(run_id, validated, failed)
+    if timeout is not None:
+        raise timeout
+
+
+def _finish_validation_chunk(run_id, validated, failed):
+    queue = get_queue(current_app.config['SCHEDULER_QUEUE'])
+    key = VALIDATION_RUN_KEY.format(run_id)
+    failed_key = VALIDATION_FAILED_KEY.format(run_id)
+    pipe = queue.connection.pipeline()
+    pipe.hincrby(key, 'validated', validated)
+    if failed:
+        pipe.rpush(failed_key, *failed)
+        pipe.expire(failed_key, VALIDATION_RUN_TTL)
+    pipe.hincrby(key, 'pending', -1)
+    pending = pipe.execute()[-1]
+    if pending == 0:
+        queue.enqueue_call(func=aggregate_validation_run, args=(run_id,))
+
+
+def aggregate_validation_run(run_id):
+    """
+    Record the outcome of a validation run once all of its chunks
+    have finished and remove the run from Redis.
+
+    Parameters
+    ----------
+    run_id : str
+        ID of the validation run
+
+    Returns
+    -------
+    dict
+        With the name of the job, the number of observations validated,
+        the IDs of the observations that failed, and the duration of
+        the run in seconds
+    """
+    connection = get_queue(current_app.config['SCHEDULER_QUEUE']).connection
+    key = VALIDATION_RUN_KEY.format(run_id)
+    failed_key = VALIDATION_FAILED_KEY.format(run_id)
+    pipe = connection.pipeline()
+    pipe.hgetall(key)
+    pipe.lrange(failed_key, 0, -1)
+    pipe.delete(key, failed_key)
+    run, failed, _ = pipe.execute()
+    run = {k.decode(): v.decode() for k, v in run.items()}
+    failed = [f.decode() for f in failed]
+    duration = time.time() - float(run['started'])
+    validated = int(run['validated'])
+    VALIDATION_RUN_DURATION.observe(duration)
+    VALIDATION_OBSERVATIONS.labels(outcome='validated').inc(validated)
+    VALIDATION_OBSERVATIONS.labels(outcome='failed').inc(len(failed))
+    if failed:
+        logger.error('Validation job %s failed to validate observations %s',
+                     run['name'], ', '.join(failed))
+    logger.info('Validation job %s validated %s observations in %.1f s',
+                run['name'], validated, duration)
+    return {'name': run['name'], 'validated': validated, 'failed': failed,
+            'duration': duration}
+
+
 def convert_sql_to_rq_job(sql_job, scheduler):
     """
     Convert between a job as stored in MySQL and a job for
@@ -211,6 +486,32 @@ def convert_sql_to_rq_job(sql_job, scheduler):
     )
 
 
+def _unix_time(modified_at):
+    # MySQL returns naive datetimes in UTC, the session time zone, which
+    # datetime.timestamp would take to be in the local time zone
+    return calendar.timegm(modified_at.utctimetuple())
+
+
+def _schedule_sql_job(sql_job, scheduler):
+    """Schedule the job and record when it was modified in MySQL"""
+    try:
+        convert_sql_to_rq_job(sql_job, scheduler)
+    except (ValueError, json.JSONDecodeError, KeyError) as e:
+        logger.error(
+            'Failed to schedule job %s with error %s',
+            sql_job, e)
+    else:
+        JOB_SYNC_JOBS.labels(action='scheduled').inc()
+        scheduler.connection.hset(JOB_SYNC_MODIFIED_KEY, sql_job['id'],
+                                  _unix_time(sql_job['modified_at']))
+
+
+def _advance_watermark(connection, sql_jobs, watermark=0):
+    watermark = max([watermark] + [_unix_time(j['modified_at'])
+                                   for j in sql_jobs])
+    connection.set(JOB_SYNC_WATERMARK_KEY, watermark)
+
+
 def schedule_jobs(scheduler):
     """
     Sync jobs between MySQL and RQ scheduler, adding new jobs
@@ -223,8 +524,10 @@ def schedule_jobs(scheduler):
         The scheduler instance to compare MySQL jobs with
     """
     logger.debug('Syncing MySQL and RQ jobs...')
+    start = time.perf_counter()
     sql_jobs = storage._call_procedure('list_jobs',
                                        with_current_user=False)
+    JOB_SYNC_JOBS.labels(action='read').inc(len(sql_jobs))
     rq_jobs = scheduler.get_jobs()
 
     sql_dict = {k['id']: k for k in sql_jobs}
@@ -236,7 +539,9 @@ def schedule_jobs(scheduler):
         scheduler.cancel(to_cancel)
         # make sure job removed from redis
         rq_dict[to_cancel].delete()
+        JOB_SYNC_JOBS.labels(action='removed').inc()
 
+    scheduler.connection.delete(JOB_SYNC_MODIFIED_KEY)
     for job_id, sql_job in sql_dict.items():
         if job_id in rq_dict:
             if (
@@ -246,13 +551,133 @@ def schedule_jobs(scheduler):
                 logger.info('Removing job %s', sql_job['name'])
                 scheduler.cancel(job_id)
             else:
-                continue  # pragma: no cover
-        try:
-            convert_sql_to_rq_job(sql_job, scheduler)
-        except (ValueError, json.JSONDecodeError, KeyError) as e:
-            logger.error(
-                'Failed to schedule job %s with error %s',
-                sql_job, e)
+                scheduler.connection.hset(
+                    JOB_SYNC_MODIFIED_KEY, job_id,
+                    _unix_time(sql_job['modified_at']))
+                continue
+        _schedule_sql_job(sql_job, scheduler)
+    _advance_watermark(scheduler.connection, sql_jobs)
+    JOB_SYNC_DURATION.labels(kind='full').observe(
+        time.perf_counter() - start)
+
+
+def schedule_modified_jobs(scheduler, watermark):
+    """
+    Sync the jobs modified in MySQL since the last sync to the RQ
+    scheduler. Deleted jobs are not found, see :py:func:`jobs_changed`.
+
+    Parameters
+    ----------
+    scheduler : rq_scheduler.Scheduler
+        The scheduler instance to add modified MySQL jobs to
+    watermark : int
+        Unix time of the latest modification of a job in the last sync
+    """
+    start = time.perf_counter()
+    since = dt.datetime.fromtimestamp(watermark, tz=dt.timezone.utc)
+    sql_jobs = storage._call_procedure('list_jobs_modified_since', since,
+                                       with_current_user=False)
+    JOB_SYNC_JOBS.labels(action='read').inc(len(sql_jobs))
+    if sql_jobs:
+        synced = scheduler.connection.hmget(
+            JOB_SYNC_MODIFIED_KEY, [j['id'] for j in sql_jobs])
+    else:
+        synced = []
+    for sql_job, synced_at in zip(sql_jobs, synced):
+        job_id = sql_job['id']
+        scheduled = job_id in scheduler
+        if (
+                scheduled and synced_at is not None and
+                int(synced_at) == _unix_time(sql_job['modified_at'])
+        ):
+            continue
+        if scheduled:
+            logger.info('Removing job %s', sql_job['name'])
+            scheduler.cancel(job_id)
+        _schedule_sql_job(sql_job, scheduler)
+    _advance_watermark(scheduler.connection, sql_jobs, watermark)
+    JOB_SYNC_DURATION.labels(kind='incremental').observe(
+        time.perf_counter() - start)
+
+
+def jobs_checksum(job_times):
+    """
+    Compute the checksum of jobs in the same way as the jobs_checksum
+    procedure in MySQL
+
+    Parameters
+    ----------
+    job_times : iterable of (str, int)
+        ID and unix time of the last modification of each job
+
+    Returns
+    -------
+    int
+    """
+    checksum = 0
+    for job_id, modified in job_times:
+        checksum ^= zlib.crc32(f'{job_id}:{modified}'.encode())
+    return checksum
+
+
+def jobs_changed(scheduler):
+    """
+    Check whether the jobs scheduled in RQ differ from those in MySQL
+    by comparing the count and checksum of the jobs and the time they
+    were modified, which catches jobs deleted from MySQL or RQ.
+
+    Parameters
+    ----------
+    scheduler : rq_scheduler.Scheduler
+
+    Returns
+    -------
+    bool
+    """
+    start = time.perf_counter()
+    sql = storage._call_procedure_for_single('jobs_checksum',
+                                             with_current_user=False)
+    connection = scheduler.connection
+    job_ids = connection.zrange(scheduler.scheduled_jobs_key, 0, -1)
+    if job_ids:
+        synced = connection.hmget(JOB_SYNC_MODIFIED_KEY, job_ids)
+    else:
+        synced = []
+    changed = (
+        len(job_ids) != sql['count'] or
+        None in synced or
+        jobs_checksum((id_.decode(), int(modified))
+                      for id_, modified in zip(job_ids, synced))
+        != (sql['checksum'] or 0)
+    )
+    JOB_SYNC_DURATION.labels(kind='checksum').observe(
+        time.perf_counter() - start)
+    return changed
+
+
+def sync_jobs(scheduler, check=False):
+    """
+    Sync jobs between MySQL and RQ scheduler. The first sync, and any
+    sync after a check finds that the jobs differ, goes through all jobs
+    with :py:func:`schedule_jobs`. Otherwise, only the jobs modified
+    since the last sync are read from MySQL.
+
+    Parameters
+    ----------
+    scheduler : rq_scheduler.Scheduler
+        The scheduler instance to sync MySQL jobs with
+    check : bool
+        Whether to check for deleted jobs with :py:func:`jobs_changed`
+    """
+    watermark = scheduler.connection.get(JOB_SYNC_WATERMARK_KEY)
+    if watermark is None:
+        schedule_jobs(scheduler)
+    elif check:
+        if jobs_changed(scheduler):
+            logger.info('MySQL and RQ jobs differ, syncing all jobs')
+            schedule_jobs(scheduler)
+    else:
+        schedule_modified_jobs(scheduler, int(watermark))
 
 
 @contextmanager
@@ -287,8 +712,19 @@ def make_job_app(config_file):
 class UpdateMixin:
     """
     Simple Mixin for rq_scheduler.Scheduler to sync SQL and RQ jobs
-    each time the Scheduler moves jobs to the run queue.
+    each time the Scheduler moves jobs to the run queue. Jobs are
+    checked for deletions every config['JOB_SYNC_CHECK_INTERVAL']
+    seconds, see :py:func:`sync_jobs`.
     """
+    _last_job_check = None
+
     def enqueue_jobs(self):
-        schedule_jobs(self)
+        now = time.monotonic()
+        interval = current_app.config.get('JOB_SYNC_CHECK_INTERVAL',
+                                          Config.JOB_SYNC_CHECK_INTERVAL)
+        check = (self._last_job_check is None or
+                 now - self._last_job_check >= interval)
+        if check:
+            self._last_job_check = now
+        sync_jobs(self, check=check)
         return super().enqueue_jobs()
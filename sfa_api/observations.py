@@ -11,11 +11,14 @@ from sfa_api.utils.auth import current_access_token
 from sfa_api.utils.storage import get_storage
 from sfa_api.utils.queuing import get_queue
 from sfa_api.utils.errors import BadAPIRequest
+from sfa_api.utils.timing import phase
 from sfa_api.utils.request_handling import (validate_parsable_values,
                                             validate_start_end,
                                             validate_observation_values,
                                             validate_index_period,
-                                            validate_event_data)
+                                            validate_event_data,
+                                            validate_list_arguments,
+                                            make_list_response)
 from sfa_api.utils.validators import ALLOWED_TIMEZONES
 from sfa_api.schema import (ObservationValuesSchema,
                             ObservationSchema,
@@ -35,6 +38,12 @@ class AllObservationsView(MethodView):
         description: List all observations that the user has access to.
         tags:
           - Observations
+        parameters:
+          - list_limit
+          - list_cursor
+          - list_fields
+          - site_id_filter
+          - variable_filter
         responses:
           200:
             description: A list of observations
@@ -44,12 +53,19 @@ class AllObservationsView(MethodView):
                   type: array
                   items:
                     $ref: '#/components/schemas/ObservationMetadata'
+          400:
+            $ref: '#/components/responses/400-BadRequest'
           401:
             $ref: '#/components/responses/401-Unauthorized'
+          404:
+            $ref: '#/components/responses/404-NotFound'
         """
+        list_args = validate_list_arguments(
+            ObservationSchema, ('site_id', 'variable'))
         storage = get_storage()
-        observations = storage.list_observations()
-        return jsonify(ObservationSchema(many=True).dump(observations))
+        observations = storage.list_observations(**list_args)
+        return make_list_response(observations, ObservationSchema,
+                                  list_args, 'observation_id')
 
     def post(self, *args):
         """
@@ -281,17 +297,18 @@ class ObservationValuesView(MethodView):
             observation_id, observation_df)
         if run_validation:
             q = get_queue()
-            q.enqueue(
-                tasks.fetch_and_validate_observation,
-                HiddenToken(current_access_token),
-                observation_id,
-                observation_df.index[0].isoformat(),
-                observation_df.index[-1].isoformat(),
-                base_url=(current_app.config['JOB_BASE_URL']
-                          or request.url_root.rstrip('/')),
-                result_ttl=0,
-                job_timeout=current_app.config['VALIDATION_JOB_TIMEOUT']
-            )
+            with phase('enqueue'):
+                q.enqueue(
+                    tasks.fetch_and_validate_observation,
+                    HiddenToken(current_access_token),
+                    observation_id,
+                    observation_df.index[0].isoformat(),
+                    observation_df.index[-1].isoformat(),
+                    base_url=(current_app.config['JOB_BASE_URL']
+                              or request.url_root.rstrip('/')),
+                    result_ttl=0,
+                    job_timeout=current_app.config['VALIDATION_JOB_TIMEOUT']
+                )
         return stored, 201
 
 
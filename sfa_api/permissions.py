@@ -147,7 +147,7 @@ class PermissionObjectManagementView(MethodView):
             $ref: '#/components/responses/404-NotFound'
         """
         storage = get_storage()
-        storage.add_object_to_permission(object_id, permission_id)
+        storage.add_object_to_permission(permission_id, object_id)
         return '', 204
 
     def delete(self, permission_id, object_id):
@@ -3,35 +3,83 @@ from flask import (
 from flask.views import MethodView
 from marshmallow import ValidationError
 from solarforecastarbiter.io.utils import HiddenToken
-from solarforecastarbiter.reports.main import compute_report
 
 
 from sfa_api import spec
 from sfa_api.utils.auth import current_access_token
 from sfa_api.utils.errors import BadAPIRequest, StorageAuthError
 from sfa_api.utils.queuing import get_queue
+from sfa_api.utils.report_jobs import enqueue_compute_report
+from sfa_api.utils.report_sections import RAW_REPORT_SECTIONS
+from sfa_api.utils.report_values import make_values_archive
+from sfa_api.utils.request_handling import (validate_list_arguments,
+                                            make_list_response,
+                                            add_next_page_link)
 from sfa_api.utils.storage import get_storage
+from sfa_api.utils.timing import phase
 from sfa_api.schema import (ReportPostSchema, ReportValuesPostSchema,
                             ReportSchema, SingleReportSchema,
-                            RawReportSchema)
+                            RawReportSchema, ReportValuesSchema,
+                            ReportValuesManifestSchema)
 
 
 REPORT_STATUS_OPTIONS = ['pending', 'failed', 'complete']
+REPORT_INCLUDE_OPTIONS = ['values']
+
+
+def _validate_options(arg, options):
+    parts = [part.strip() for part in
+             request.args.get(arg, '').split(',') if part.strip()]
+    unknown = set(parts) - set(options)
+    if unknown:
+        raise BadAPIRequest({arg: [
+            f'Unknown options: {", ".join(sorted(unknown))}. Must be one '
+            f'of {", ".join(options)}.']})
+    return parts
+
+
+def validate_report_include():
+    """Parse the comma separated include query parameter of a report
+    request into a list of the optional parts of the report to read.
+
+    Raises
+    ------
+    BadAPIRequest
+        If any of the parts is not one of REPORT_INCLUDE_OPTIONS.
+    """
+    return _validate_options('include', REPORT_INCLUDE_OPTIONS)
+
+
+def validate_report_sections():
+    """Parse the comma separated sections query parameter of a report
+    request into a list of the sections of the raw report to read, or
+    None to read all sections if the parameter is not given.
+
+    Raises
+    ------
+    BadAPIRequest
+        If any of the sections is not one of RAW_REPORT_SECTIONS.
+    """
+    if 'sections' not in request.args:
+        return None
+    return _validate_options('sections', RAW_REPORT_SECTIONS)
 
 
 def enqueue_report(report_id, base_url):
+    """Queue the computation of the report, unless it is already queued,
+    see sfa_api.utils.report_jobs"""
     alt_base_url = current_app.config.get('JOB_BASE_URL')
     if alt_base_url is not None:
         base_url = alt_base_url
     q = get_queue('reports')
-    q.enqueue(
-        compute_report,
-        HiddenToken(current_access_token),
-        report_id,
-        base_url=base_url,
-        result_ttl=0,
-        job_timeout=current_app.config['REPORT_JOB_TIMEOUT']
-    )
+    with phase('enqueue'):
+        return enqueue_compute_report(
+            q,
+            HiddenToken(current_access_token),
+            report_id,
+            base_url,
+            current_app.config['REPORT_JOB_TIMEOUT']
+        )
 
 
 class AllReportsView(MethodView):
@@ -111,6 +159,11 @@ class RecomputeReportView(MethodView):
         """
         ---
         summary: Recompute a report.
+        description: >-
+          Schedule the computation of a report. Nothing more is scheduled
+          if the report is waiting to be computed, and a report that is
+          being computed is computed once more when it finishes, however
+          many times it is recomputed in the meantime.
         tags:
           - Reports
         parameters:
@@ -151,10 +204,19 @@ class ReportView(MethodView):
         """
         ---
         summary: Get report metadata.
+        description: >-
+          Get the metadata and raw report of a report. The raw report
+          is stored in sections that can be requested separately with
+          the sections parameter, e.g. sections=metrics to read the
+          metrics without the much larger plots. The processed
+          values are only included when requested with include=values,
+          otherwise they can be read from /reports/{report_id}/values.
         tags:
           - Reports
         parameters:
         - report_id
+        - report_include
+        - report_sections
         responses:
           200:
             description: Successfully retrieved report metadata.
@@ -162,14 +224,22 @@ class ReportView(MethodView):
               application/json:
                 schema:
                   $ref: '#/components/schemas/SingleReportSchema'
+          400:
+            $ref: '#/components/responses/400-BadRequest'
           401:
             $ref: '#/components/responses/401-Unauthorized'
           404:
             $ref: '#components/responses/404-NotFound'
         """
+        include = validate_report_include()
+        sections = validate_report_sections()
         storage = get_storage()
-        report = storage.read_report(report_id)
-        return jsonify(SingleReportSchema().dump(report))
+        if 'values' in include:
+            report = storage.read_report(report_id, include_values=True,
+                                         sections=sections)
+            return jsonify(SingleReportSchema().dump(report))
+        report = storage.read_report(report_id, sections=sections)
+        return jsonify(ReportSchema().dump(report))
 
     def delete(self, report_id):
         """
@@ -254,25 +324,56 @@ class ReportValuesView(MethodView):
         """
         ---
         summary: Get the processed values used in a report
+        description: |
+          Get the processed values used in a report. Use limit to page
+          through the values of reports with many objects.
+
+          Processed values are stored compressed. Clients that accept
+          application/zip receive a zip archive with a manifest.json
+          member listing the id and object_id of each set of processed
+          values and a member named by each id holding the compressed
+          values as stored, see sfa_api.utils.report_values.
         tags:
         - Reports
         parameters:
         - report_id
+        - list_limit
+        - list_cursor
+        - list_fields
         responses:
           200:
             description: Successfully retrieved
             content:
               application/json:
                 schema:
-                  $ref: '#/components/schemas/ReportValuesSchema'
+                  type: array
+                  items:
+                    $ref: '#/components/schemas/ReportValuesSchema'
+              application/zip:
+                schema:
+                  type: string
+                  format: binary
+          400:
+            $ref: '#/components/responses/400-BadRequest'
           401:
             $ref: '#/components/responses/401-Unauthorized'
           404:
             $ref: '#/components/responses/404-NotFound'
         """
+        list_args = validate_list_arguments(ReportValuesSchema)
         storage = get_storage()
-        values = storage.read_report_values(report_id)
-        return jsonify(values)
+        accepts = request.accept_mimetypes.best_match(['application/json',
+                                                       'application/zip'])
+        if accepts == 'application/zip':
+            values = storage.read_report_values(
+                report_id, limit=list_args['limit'],
+                cursor=list_args['cursor'], encoded=True)
+            response = make_response(make_values_archive(values), 200)
+            response.mimetype = 'application/zip'
+            return add_next_page_link(response, values, list_args, 'id')
+        values = storage.read_report_values(
+            report_id, limit=list_args['limit'], cursor=list_args['cursor'])
+        return make_list_response(values, ReportValuesSchema, list_args, 'id')
 
     def post(self, report_id):
         """
@@ -317,6 +418,84 @@ class ReportValuesView(MethodView):
         return value_id, 201
 
 
+class ReportObjectValuesView(MethodView):
+    def get(self, report_id, object_id):
+        """
+        ---
+        summary: Get the processed values of one object in a report
+        description: >-
+          Get the processed values of one object used in a report.
+          Accepts application/json or application/zip like
+          /reports/{report_id}/values.
+        tags:
+        - Reports
+        parameters:
+        - report_id
+        - object_id
+        responses:
+          200:
+            description: Successfully retrieved
+            content:
+              application/json:
+                schema:
+                  type: array
+                  items:
+                    $ref: '#/components/schemas/ReportValuesSchema'
+              application/zip:
+                schema:
+                  type: string
+                  format: binary
+          401:
+            $ref: '#/components/responses/401-Unauthorized'
+          404:
+            $ref: '#/components/responses/404-NotFound'
+        """
+        storage = get_storage()
+        accepts = request.accept_mimetypes.best_match(['application/json',
+                                                       'application/zip'])
+        if accepts == 'application/zip':
+            values = storage.read_report_object_values(
+                report_id, object_id, encoded=True)
+            response = make_response(make_values_archive(values), 200)
+            response.mimetype = 'application/zip'
+            return response
+        values = storage.read_report_object_values(report_id, object_id)
+        return jsonify(ReportValuesSchema(many=True).dump(values))
+
+
+class ReportValuesManifestView(MethodView):
+    def get(self, report_id):
+        """
+        ---
+        summary: List the processed values in a report
+        description: >-
+          List the id, object_id, and size in bytes of the stored,
+          compressed processed values in a report without reading the
+          values. The values of each object can then be read from
+          /reports/{report_id}/values/{object_id}.
+        tags:
+        - Reports
+        parameters:
+        - report_id
+        responses:
+          200:
+            description: Successfully retrieved
+            content:
+              application/json:
+                schema:
+                  type: array
+                  items:
+                    $ref: '#/components/schemas/ReportValuesManifest'
+          401:
+            $ref: '#/components/responses/401-Unauthorized'
+          404:
+            $ref: '#/components/responses/404-NotFound'
+        """
+        storage = get_storage()
+        manifest = storage.read_report_values_manifest(report_id)
+        return jsonify(ReportValuesManifestSchema(many=True).dump(manifest))
+
+
 spec.components.parameter(
     'report_id', 'path',
     {
@@ -339,6 +518,33 @@ spec.components.parameter(
         'required': 'true',
         'name': 'status',
     })
+spec.components.parameter(
+    'report_include', 'query',
+    {
+        'schema': {
+            'type': 'string',
+        },
+        'description': ("Comma separated optional parts of the report to "
+                        "include, one of: "
+                        f"{', '.join(REPORT_INCLUDE_OPTIONS)}"),
+        'required': False,
+        'name': 'include',
+    })
+spec.components.parameter(
+    'report_sections', 'query',
+    {
+        'schema': {
+            'type': 'string',
+        },
+        'description': ("Comma separated sections of the raw report to "
+                        "read, any of: "
+                        f"{', '.join(RAW_REPORT_SECTIONS)}. All sections "
+                        "are read if not given. The summary section has "
+                        "every part of the raw report that is not in "
+                        "another section."),
+        'required': False,
+        'name': 'sections',
+    })
 
 reports_blp = Blueprint(
     'reports', 'reports', url_prefix='/reports',
@@ -363,6 +569,14 @@ reports_blp.add_url_rule(
     '/<uuid_str:report_id>/values',
     view_func=ReportValuesView.as_view('values')
 )
+reports_blp.add_url_rule(
+    '/<uuid_str:report_id>/values/manifest',
+    view_func=ReportValuesManifestView.as_view('values_manifest')
+)
+reports_blp.add_url_rule(
+    '/<uuid_str:report_id>/values/<uuid_str:object_id>',
+    view_func=ReportObjectValuesView.as_view('object_values')
+)
 reports_blp.add_url_rule(
     '/<uuid_str:report_id>/recompute',
     view_func=RecomputeReportView.as_view('recompute')
@@ -1,7 +1,7 @@
 from copy import deepcopy
 
 
-from marshmallow import validate, validates_schema
+from marshmallow import pre_load, validate, validates_schema
 from marshmallow.exceptions import ValidationError
 import pandas as pd
 import pytz
@@ -11,7 +11,7 @@ from sfa_api import spec, ma, json
 from sfa_api.utils.validators import (
     TimeFormat, UserstringValidator, TimezoneValidator, TimeLimitValidator,
     UncertaintyValidator, validate_if_event, ensure_pair_compatibility,
-    AggregateIntervalValidator)
+    load_pair_metadata, AggregateIntervalValidator)
 from solarforecastarbiter.datamodel import (
     ALLOWED_VARIABLES, ALLOWED_CATEGORIES, ALLOWED_DETERMINISTIC_METRICS,
     ALLOWED_EVENT_METRICS, ALLOWED_PROBABILISTIC_METRICS,
@@ -1456,6 +1456,15 @@ class ReportParameters(ma.Schema):
         required=True
     )
 
+    @pre_load
+    def load_object_pair_metadata(self, data, **kwargs):
+        # read the metadata of every object in one call instead of once
+        # for each object when each pair is validated
+        if isinstance(data, dict) and isinstance(
+                data.get('object_pairs'), list):
+            load_pair_metadata(data['object_pairs'])
+        return data
+
     @validates_schema
     def validate_cost(self, data, **kwargs):
         if (
@@ -1495,6 +1504,24 @@ class ReportValuesSchema(ReportValuesPostSchema):
     )
 
 
+@spec.define_schema('ReportValuesManifest')
+class ReportValuesManifestSchema(ma.Schema):
+    class Meta:
+        ordered = True
+    id = ma.UUID(
+        title="Report Value ID",
+        description="UUID for this set of processed values",
+    )
+    object_id = ma.UUID(
+        title="Object ID",
+        description="UUID of the original object"
+    )
+    size = ma.Integer(
+        title="Size",
+        description="Size in bytes of the stored, compressed values"
+    )
+
+
 # Currently, the marshmallow API Spec
 @spec.define_schema('ReportMetadata')
 class ReportPostSchema(ma.Schema):
@@ -9,6 +9,7 @@ from sfa_api.schema import (SiteSchema, SiteResponseSchema,
                             ForecastSchema, ObservationSchema,
                             CDFForecastGroupSchema)
 from sfa_api.utils.errors import BadAPIRequest
+from sfa_api.utils.serialization import dump_list
 from sfa_api.utils.storage import get_storage
 
 
@@ -34,7 +35,7 @@ class AllSitesView(MethodView):
         """
         storage = get_storage()
         sites = storage.list_sites()
-        return jsonify(SiteResponseSchema(many=True).dump(sites))
+        return jsonify(dump_list(SiteResponseSchema, sites))
 
     def post(self, *args):
         """
@@ -114,7 +115,7 @@ class AllSitesInZoneView(MethodView):
         """
         storage = get_storage()
         sites = storage.list_sites_in_zone(zone.replace('+', ' '))
-        return jsonify(SiteResponseSchema(many=True).dump(sites))
+        return jsonify(dump_list(SiteResponseSchema, sites))
 
 
 class SiteView(MethodView):
@@ -249,7 +250,7 @@ class SiteObservations(MethodView):
         """
         storage = get_storage()
         observations = storage.list_observations(site_id)
-        return jsonify(ObservationSchema(many=True).dump(observations))
+        return jsonify(dump_list(ObservationSchema, observations))
 
 
 class SiteForecasts(MethodView):
@@ -280,7 +281,7 @@ class SiteForecasts(MethodView):
         """
         storage = get_storage()
         forecasts = storage.list_forecasts(site_id=site_id)
-        return jsonify(ForecastSchema(many=True).dump(forecasts))
+        return jsonify(dump_list(ForecastSchema, forecasts))
 
 
 class SiteCDFForecastGroups(MethodView):
@@ -311,7 +312,7 @@ class SiteCDFForecastGroups(MethodView):
         """
         storage = get_storage()
         forecasts = storage.list_cdf_forecast_groups(site_id)
-        return jsonify(CDFForecastGroupSchema(many=True).dump(forecasts))
+        return jsonify(dump_list(CDFForecastGroupSchema, forecasts))
 
 
 spec.components.parameter(
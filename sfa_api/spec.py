@@ -99,7 +99,71 @@ spec_components = {
             'schema': {
                 'type': 'string',
             },
-        }
+        },
+        'list_limit': {
+            'name': 'limit',
+            'in': 'query',
+            'required': False,
+            'description': ('Maximum number of objects to return. When a '
+                            'full page is returned, the URL of the next '
+                            'page is given in the Link header.'),
+            'schema': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+        },
+        'list_cursor': {
+            'name': 'cursor',
+            'in': 'query',
+            'required': False,
+            'description': ('Only return objects listed after the object '
+                            'with this UUID. Objects are listed in order '
+                            'of their UUID.'),
+            'schema': {
+                'type': 'string',
+                'format': 'uuid',
+            },
+        },
+        'list_fields': {
+            'name': 'fields',
+            'in': 'query',
+            'required': False,
+            'description': ('Comma separated names of the fields to '
+                            'return for each object.'),
+            'schema': {
+                'type': 'string',
+            },
+        },
+        'site_id_filter': {
+            'name': 'site_id',
+            'in': 'query',
+            'required': False,
+            'description': 'Only return objects of the site with this UUID.',
+            'schema': {
+                'type': 'string',
+                'format': 'uuid',
+            },
+        },
+        'aggregate_id_filter': {
+            'name': 'aggregate_id',
+            'in': 'query',
+            'required': False,
+            'description': ('Only return objects of the aggregate with '
+                            'this UUID.'),
+            'schema': {
+                'type': 'string',
+                'format': 'uuid',
+            },
+        },
+        'variable_filter': {
+            'name': 'variable',
+            'in': 'query',
+            'required': False,
+            'description': 'Only return objects of this variable.',
+            'schema': {
+                'type': 'string',
+            },
+        },
     }
 }
 
@@ -0,0 +1,39 @@
+"""
+Fixtures to run the API tests against the in-memory storage backend of
+sfa_api.demo. The test modules in this directory import the tests of
+another module and list the tests that can only be run against the
+MySQL test database in DATABASE_ONLY.
+"""
+from flask import _request_ctx_stack
+import pytest
+
+
+from sfa_api import create_app
+from sfa_api.demo import DEMO_AUTH0_ID
+
+
+def pytest_collection_modifyitems(config, items):
+    for item in items:
+        module = getattr(item, 'module', None)
+        if item.originalname in getattr(module, 'DATABASE_ONLY', ()):
+            item.add_marker(pytest.mark.skip(
+                reason='Requires the MySQL test database'))
+
+
+@pytest.fixture()
+def app():
+    app = create_app('TestingConfig')
+    app.config['SFA_API_STATIC_DATA'] = True
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture()
+def api(app, mocker):
+    def add_user():
+        _request_ctx_stack.top.user = DEMO_AUTH0_ID
+        return True
+
+    verify = mocker.patch('sfa_api.utils.auth.verify_access_token')
+    verify.side_effect = add_user
+    yield app.test_client()
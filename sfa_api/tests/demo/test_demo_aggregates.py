@@ -0,0 +1,14 @@
+from sfa_api.tests.test_aggregates import *  # NOQA
+
+
+DATABASE_ONLY = (
+    # rely on the observation values in the test database
+    'test_get_aggregate_values',
+    'test_get_aggregate_values_startendtz',
+    'test_get_aggregate_values_csv',
+    'test_get_aggregate_values_422',
+    'test_get_aggregate_values_limited_effective',
+    'test_get_aggregate_values_no_data_after_effective',
+    'test_aggregate_values_interval_label',
+    'test_aggregate_values_inside_interval',
+)
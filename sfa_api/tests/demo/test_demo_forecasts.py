@@ -0,0 +1,15 @@
+from sfa_api.tests.test_forecast import *  # NOQA
+
+
+DATABASE_ONLY = (
+    # patch sfa_api.utils.storage_interface
+    'test_post_forecast_values_valid_json_restricted',
+    'test_post_forecast_values_valid_json_restricted_val',
+    'test_post_json_storage_call',
+    'test_post_forecast_values_bad_previous',
+    # rely on the values in the test database
+    'test_get_latest_forecast_value_200',
+    'test_get_forecast_timerange_200',
+    # patches the request outside of a request context
+    'test_post_forecast_too_large_from_header',
+)
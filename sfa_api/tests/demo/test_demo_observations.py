@@ -0,0 +1,13 @@
+from sfa_api.tests.test_observations import *  # NOQA
+
+
+DATABASE_ONLY = (
+    # patch sfa_api.utils.storage_interface
+    'test_post_json_storage_call',
+    'test_post_observation_values_bad_previous',
+    # rely on the values in the test database
+    'test_get_latest_observation_values_200',
+    'test_get_observation_timerange_200',
+    # patches the request outside of a request context
+    'test_post_observation_too_large_from_header',
+)
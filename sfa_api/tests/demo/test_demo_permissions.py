@@ -0,0 +1,4 @@
+from sfa_api.tests.rbac.test_permissions import *  # NOQA
+
+
+DATABASE_ONLY = ()
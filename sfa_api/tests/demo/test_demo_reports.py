@@ -0,0 +1,10 @@
+from sfa_api.tests.test_reports import *  # NOQA
+
+
+DATABASE_ONLY = (
+    # patch sfa_api.utils.storage_interface
+    'test_post_report_observation_mismatch',
+    'test_post_report_aggregate_mismatch',
+    'test_post_report_reference_mismatch',
+    'test_post_report_reference_cdf_mismatch',
+)
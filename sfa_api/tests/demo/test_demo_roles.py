@@ -0,0 +1,7 @@
+from sfa_api.tests.rbac.test_roles import *  # NOQA
+
+
+DATABASE_ONLY = (
+    # requires a user of another organization
+    'test_add_perm_to_role_external_role_admin_perm',
+)
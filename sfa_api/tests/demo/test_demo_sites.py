@@ -0,0 +1,4 @@
+from sfa_api.tests.test_sites import *  # NOQA
+
+
+DATABASE_ONLY = ()
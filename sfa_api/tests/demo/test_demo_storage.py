@@ -0,0 +1,135 @@
+import inspect
+
+
+from flask import _request_ctx_stack
+import numpy as np
+import pandas as pd
+import pytest
+
+
+import sfa_api.demo as demo
+from sfa_api.conftest import VALID_SITE_JSON
+from sfa_api.utils import storage_interface
+from sfa_api.utils.errors import StorageAuthError
+from sfa_api.utils.storage import get_storage
+
+
+# functions of storage_interface that only concern the MySQL connection
+DATABASE_HELPERS = (
+    'convert_datetime_utc', 'escape_datetime', 'escape_float_with_nan',
+    'escape_timestamp', 'get_cursor', 'invalidate_metadata',
+    'metadata_cache', 'mysql_connection', 'replica_pools', 'try_query')
+STORAGE_FUNCTIONS = [
+    name for name, func in inspect.getmembers(storage_interface,
+                                              inspect.isfunction)
+    if func.__module__ == storage_interface.__name__ and
+    not name.startswith('_') and name not in DATABASE_HELPERS]
+
+
+@pytest.mark.parametrize('name', STORAGE_FUNCTIONS)
+def test_same_signature(name):
+    expected = inspect.signature(getattr(storage_interface, name))
+    signature = inspect.signature(getattr(demo, name))
+    assert list(signature.parameters) == list(expected.parameters)
+    for param, expected_param in zip(signature.parameters.values(),
+                                     expected.parameters.values()):
+        assert param.kind == expected_param.kind
+        assert (param.default is param.empty) == (
+            expected_param.default is expected_param.empty)
+
+
+def test_get_storage(app):
+    assert get_storage() is demo
+
+
+@pytest.fixture()
+def user_context(app):
+    def fn(auth0_id):
+        _request_ctx_stack.top.user = auth0_id
+    with app.test_request_context():
+        fn(demo.DEMO_AUTH0_ID)
+        yield fn
+
+
+@pytest.fixture()
+def other_user(user_context):
+    store = demo.demo_store()
+    org_id = store.add_organization('Other Organization')
+    store.add_user('auth0|other', org_id)
+    return 'auth0|other'
+
+
+def test_valuestore_write():
+    store = demo.ValueStore(quality_flags=True)
+    store.write(pd.DataFrame(
+        {'value': [1.0, 2.0], 'quality_flag': [0, 1]},
+        index=pd.DatetimeIndex(['2019-01-01T00:05Z', '2019-01-01T00:00Z'])))
+    store.write(pd.DataFrame(
+        {'value': [3.0, np.nan], 'quality_flag': [2, 0]},
+        index=pd.DatetimeIndex(['2019-01-01T00:05Z', '2019-01-01T00:10Z'])))
+    out = store.read()
+    assert out.index.tz is not None
+    assert list(out.index) == list(pd.date_range(
+        '2019-01-01T00:00Z', freq='5min', periods=3))
+    np.testing.assert_array_equal(out['value'].values, [2.0, 3.0, np.nan])
+    assert list(out['quality_flag']) == [1, 2, 0]
+
+
+def test_valuestore_read_range():
+    store = demo.ValueStore()
+    index = pd.date_range('2019-01-01T00:00Z', freq='1h', periods=5)
+    store.write(pd.DataFrame({'value': range(5)}, index=index))
+    out = store.read(index[1], index[3])
+    assert list(out['value']) == [1, 2, 3]
+    assert 'quality_flag' not in out
+    assert list(store.latest()['value']) == [4]
+    assert store.time_range() == {
+        'min_timestamp': index[0].to_pydatetime(),
+        'max_timestamp': index[-1].to_pydatetime()}
+    assert store.previous_time(index[2]) == index[1]
+    assert store.previous_time(index[0]) is None
+
+
+def test_valuestore_empty():
+    store = demo.ValueStore()
+    assert store.read().empty
+    assert store.latest().empty
+    assert store.time_range() == {'min_timestamp': None,
+                                  'max_timestamp': None}
+
+
+def test_new_objects_in_applies_to_all(user_context):
+    site_id = demo.store_site(VALID_SITE_JSON)
+    assert demo.read_site(site_id)['provider'] == 'Organization 1'
+    assert 'delete' in demo.get_user_actions_on_object(site_id)
+
+
+def test_other_organization_denied(user_context, other_user, site_id):
+    user_context(other_user)
+    with pytest.raises(StorageAuthError):
+        demo.read_site(site_id)
+    with pytest.raises(StorageAuthError):
+        demo.delete_site(site_id)
+    assert demo.list_sites() == []
+
+
+def test_shared_object(user_context, other_user, site_id):
+    role_id = demo.store_role({'name': 'shared', 'description': 'share'})
+    perm_id = demo.store_permission({
+        'description': 'read site', 'action': 'read',
+        'object_type': 'sites', 'applies_to_all': False})
+    demo.add_object_to_permission(perm_id, site_id)
+    demo.add_permission_to_role(role_id, perm_id)
+    demo.add_role_to_user(demo.read_user_id(other_user), role_id)
+    user_context(other_user)
+    assert demo.read_site(site_id)['site_id'] == site_id
+    assert demo.get_user_actions_on_object(site_id) == ['read']
+    with pytest.raises(StorageAuthError):
+        demo.delete_site(site_id)
+
+
+def test_values_permission(user_context, other_user, observation_id):
+    assert demo.read_observation_values(observation_id).empty
+    user_context(other_user)
+    with pytest.raises(StorageAuthError):
+        demo.read_observation_values(observation_id)
@@ -21,6 +21,8 @@ def mock_email_funcs(mocker, auth0id, user_email, external_auth0id,
                  new=check)
     mocker.patch('sfa_api.users.get_email_of_user',
                  return_value=user_email)
+    mocker.patch('sfa_api.users.get_emails_of_users',
+                 new=lambda ids: {id_: user_email for id_ in ids})
 
 
 @pytest.fixture()
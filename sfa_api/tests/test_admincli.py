@@ -262,6 +262,29 @@ def test_list_all_users(app_cli_runner, dict_cursor, mocker):
         assert len(line.split('|')) == 6
 
 
+@pytest.fixture()
+def app_cli_runner_no_db():
+    app = create_app('AdminTestConfig')
+    with app.app_context():
+        yield app.test_cli_runner()
+
+
+def test_refresh_emails(app_cli_runner_no_db, mocker):
+    mocker.patch('sfa_api.utils.auth0_info.refresh_email_directory',
+                 return_value={'auth0|one': 'one', 'auth0|two': 'two'})
+    result = app_cli_runner_no_db.invoke(admincli.refresh_emails)
+    assert result.exit_code == 0
+    assert result.output == 'Stored the emails of 2 users.\n'
+
+
+def test_refresh_emails_fail(app_cli_runner_no_db, mocker):
+    mocker.patch('sfa_api.utils.auth0_info.refresh_email_directory',
+                 return_value={})
+    result = app_cli_runner_no_db.invoke(admincli.refresh_emails)
+    assert result.exit_code == 1
+    assert result.output == 'Failed to retrieve emails from Auth0\n'
+
+
 def test_list_all_organizations(app_cli_runner, dict_cursor):
     result = app_cli_runner.invoke(
         admincli.list_organizations,
@@ -348,6 +371,24 @@ def test_delete_user_user_dne(
     assert result.output == ('User does not exist\n')
 
 
+def test_delete_user_clears_existence_cache(
+        app_cli_runner, mocker, user_id, auth0id):
+    from sfa_api.utils.auth import user_existence_cache
+
+    def call_return(proc, *args, **kwargs):
+        if proc == 'list_all_users':
+            return [{'auth0_id': auth0id, 'id': user_id}]
+
+    mocker.patch('sfa_api.utils.storage_interface._call_procedure',
+                 new=call_return)
+    user_existence_cache().set(auth0id, True)
+    result = app_cli_runner.invoke(
+        admincli.delete_user,
+        [user_id] + auth_args)
+    assert result.output == (f'User {user_id} deleted successfully.\n')
+    assert user_existence_cache().get(auth0id) is None
+
+
 def test_create_job_user(app_cli_runner, mocker):
     org = 'Organization 1'
     create = mocker.patch('sfa_api.utils.auth0_info.create_user',
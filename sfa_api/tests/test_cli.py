@@ -3,6 +3,7 @@ import tempfile
 
 
 from click.testing import CliRunner
+from flask import current_app
 import pytest
 
 
@@ -40,6 +41,23 @@ def test_worker_log(mocker):
     w.assert_called
 
 
+def test_worker_app_context(mocker):
+    w = mocker.patch('rq.Worker')
+    config = {}
+
+    def f(*args, **kwargs):
+        config.update(current_app.config)
+
+    w.return_value.work = f
+    runner = CliRunner()
+    with tempfile.NamedTemporaryFile('w') as f:
+        f.write('IN_PROCESS_API = "ProductionConfig"')
+        f.flush()
+        r = runner.invoke(cli.cli, ['worker', f.name])
+    assert r.exit_code == 0
+    assert config['IN_PROCESS_API'] == 'ProductionConfig'
+
+
 def test_devserver(mocker):
     app = mocker.patch.object(sfa_api, 'create_app')
     runner = CliRunner()
@@ -88,3 +106,29 @@ def test_scheduler(mocker):
         r = runner.invoke(cli.cli, ['scheduler', f.name])
     assert r.exit_code == 0
     run.assert_called
+
+
+def test_profile(mocker, tmp_path):
+    mocker.patch('sfa_api.utils.profiling.load_profile',
+                 return_value=b'profile')
+    output = tmp_path / 'out.prof'
+    runner = CliRunner()
+    r = runner.invoke(cli.cli, ['profile', '-c', 'TestingConfig',
+                                '6ff2ea78-c3d0-4a64-a0f8-4fa1b7c1d4d4',
+                                str(output)])
+    assert r.exit_code == 0
+    assert output.read_bytes() == b'profile'
+
+
+@pytest.mark.parametrize('profile_id,code,message', [
+    ('6ff2ea78-c3d0-4a64-a0f8-4fa1b7c1d4d4', 1, 'No profile'),
+    ('notauuid', 2, 'must be a UUID'),
+])
+def test_profile_missing(tmp_path, profile_id, code, message):
+    output = tmp_path / 'out.prof'
+    runner = CliRunner()
+    r = runner.invoke(cli.cli, ['profile', '-c', 'TestingConfig',
+                                profile_id, str(output)])
+    assert r.exit_code == code
+    assert message in r.output
+    assert not output.exists()
@@ -125,6 +125,38 @@ def test_get_forecast_links(api, forecast_id):
     assert '_links' in response
 
 
+def test_list_forecasts_paged(api):
+    all_fx = api.get('/forecasts/single/', base_url=BASE_URL).get_json()
+    seen = []
+    r = api.get('/forecasts/single/?limit=2&fields=forecast_id',
+                base_url=BASE_URL)
+    while True:
+        assert r.status_code == 200
+        seen.extend(fx['forecast_id'] for fx in r.get_json())
+        link = r.headers.get('Link')
+        if not link:
+            break
+        # the link is an absolute url that includes BASE_URL
+        r = api.get(link[link.index('<') + 1:link.index('>')])
+    assert sorted(seen) == sorted(fx['forecast_id'] for fx in all_fx)
+
+
+def test_list_forecasts_filter_by_aggregate(api, aggregate_id):
+    r = api.get(f'/forecasts/single/?aggregate_id={aggregate_id}',
+                base_url=BASE_URL)
+    assert r.status_code == 200
+    response = r.get_json()
+    assert len(response) > 0
+    for fx in response:
+        assert fx['aggregate_id'] == aggregate_id
+
+
+def test_list_forecasts_filter_missing_site(api, missing_id):
+    r = api.get(f'/forecasts/single/?site_id={missing_id}',
+                base_url=BASE_URL)
+    assert r.status_code == 404
+
+
 @pytest.mark.parametrize('fx_id', demo_forecasts.keys())
 def test_get_forecast_metadata_links(api, fx_id):
     r = api.get(f'/forecasts/single/{fx_id}/metadata',
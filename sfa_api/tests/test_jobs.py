@@ -1,15 +1,22 @@
+import calendar
 import datetime as dt
 import tempfile
 import time
 
 
+from cryptography.fernet import Fernet
+from fakeredis import FakeStrictRedis
+from flask import Flask
+from jose import jwt
 import pytest
-from rq import SimpleWorker
+from rq import Queue, SimpleWorker
 from rq.timeouts import JobTimeoutException
 from rq_scheduler import Scheduler
+from solarforecastarbiter.reports import main as reports_main
 
 
 from sfa_api import jobs
+from sfa_api.utils.in_process_api import InProcessAPISession
 from sfa_api.utils.queuing import get_queue
 from sfa_api.conftest import _make_sql_app, _make_nocommit_cursor
 
@@ -45,6 +52,22 @@ def test_exchange_token_dne(app):
         jobs.exchange_token('1190950a-7cca-11e9-a81f-54bf64606445')
 
 
+def test_exchange_token_cached(mocker, userid):
+    key = Fernet.generate_key()
+    mocker.patch('sfa_api.jobs.storage._call_procedure', return_value=[
+        {'token': Fernet(key).encrypt(b'refresh').decode()}])
+    access = jwt.encode({'sub': 'auth0|job', 'exp': time.time() + 3600},
+                        'secret', algorithm='HS256')
+    exchange = mocker.patch('sfa_api.jobs.exchange_refresh_token',
+                            return_value=access)
+    app = Flask('jobs')
+    app.config.update(TOKEN_ENCRYPTION_KEY=key, USE_FAKE_REDIS=True)
+    with app.app_context():
+        assert jobs.exchange_token(userid).token == access
+        assert jobs.exchange_token(userid).token == access
+    exchange.assert_called_once_with('refresh')
+
+
 def test_make_job_app(mocker):
     with tempfile.NamedTemporaryFile(mode='w') as f:
         f.write('SCHEDULER_QUEUE = "scheduled_jobsq"')
@@ -135,6 +158,170 @@ def test_schedule_jobs_err(mocker, queue, sql_job):
     assert log.error.called
 
 
+@pytest.fixture()
+def fake_scheduler():
+    queue = Queue('scheduler', connection=FakeStrictRedis())
+    return Scheduler(queue=queue, connection=queue.connection)
+
+
+def _utc_seconds(value):
+    # like UNIX_TIMESTAMP in a MySQL session in UTC
+    return calendar.timegm(value.utctimetuple())
+
+
+@pytest.fixture()
+def sql_jobs(mocker, sql_job):
+    """Patch the procedures that read jobs to return the jobs in the
+    returned list"""
+    out = [sql_job]
+
+    def call(procedure, *args, **kwargs):
+        if procedure == 'list_jobs':
+            return list(out)
+        elif procedure == 'list_jobs_modified_since':
+            since = _utc_seconds(args[0])
+            return [j for j in out if _utc_seconds(j['modified_at']) >= since]
+        elif procedure == 'jobs_checksum':
+            return [{'count': len(out), 'checksum': jobs.jobs_checksum(
+                (j['id'], _utc_seconds(j['modified_at'])) for j in out)
+                or None}]
+        raise ValueError(procedure)
+
+    mocker.patch('sfa_api.jobs.storage._call_procedure', side_effect=call)
+    return out
+
+
+def test_schedule_jobs_records_sync(fake_scheduler, sql_jobs, sql_job):
+    jobs.schedule_jobs(fake_scheduler)
+    conn = fake_scheduler.connection
+    assert int(conn.get(jobs.JOB_SYNC_WATERMARK_KEY)) == 1546344000
+    assert conn.hgetall(jobs.JOB_SYNC_MODIFIED_KEY) == {
+        sql_job['id'].encode(): b'1546344000'}
+
+
+def test_schedule_jobs_err_not_recorded(fake_scheduler, sql_jobs, sql_job):
+    sql_job['schedule'] = {}
+    jobs.schedule_jobs(fake_scheduler)
+    conn = fake_scheduler.connection
+    assert conn.hgetall(jobs.JOB_SYNC_MODIFIED_KEY) == {}
+    assert jobs.jobs_changed(fake_scheduler)
+
+
+def test_sync_jobs_first_sync(fake_scheduler, sql_jobs, sql_job, mocker):
+    full = mocker.spy(jobs, 'schedule_jobs')
+    jobs.sync_jobs(fake_scheduler)
+    assert full.call_count == 1
+    assert sql_job['id'] in fake_scheduler
+    jobs.sync_jobs(fake_scheduler)
+    assert full.call_count == 1
+
+
+def test_sync_jobs_modified(fake_scheduler, sql_jobs, sql_job, mocker):
+    jobs.sync_jobs(fake_scheduler)
+    cancel = mocker.spy(fake_scheduler, 'cancel')
+    call = jobs.storage._call_procedure
+    jobs.sync_jobs(fake_scheduler)
+    assert call.call_args[0] == (
+        'list_jobs_modified_since', sql_job['modified_at'])
+    assert not cancel.called
+
+    modified = sql_job.copy()
+    modified['modified_at'] = dt.datetime(2019, 2, 1,
+                                          tzinfo=dt.timezone.utc)
+    new = sql_job.copy()
+    new['id'] = '1f1b3c8a-7cca-11e9-a81f-54bf64606445'
+    new['name'] = 'New job'
+    new['modified_at'] = modified['modified_at']
+    sql_jobs[:] = [modified, new]
+    jobs.sync_jobs(fake_scheduler)
+    assert cancel.call_count == 1
+    rq_jobs = {j.id: j for j in fake_scheduler.get_jobs()}
+    assert set(rq_jobs) == {sql_job['id'], new['id']}
+    assert rq_jobs[sql_job['id']].meta['last_modified_in_sql'] == (
+        modified['modified_at'])
+    assert int(fake_scheduler.connection.get(
+        jobs.JOB_SYNC_WATERMARK_KEY)) == 1548979200
+    assert not jobs.jobs_changed(fake_scheduler)
+
+
+def test_sync_jobs_check(fake_scheduler, sql_jobs, mocker):
+    jobs.sync_jobs(fake_scheduler)
+    full = mocker.spy(jobs, 'schedule_jobs')
+    modified = mocker.spy(jobs, 'schedule_modified_jobs')
+    jobs.sync_jobs(fake_scheduler, check=True)
+    assert not full.called
+    assert not modified.called
+
+    sql_jobs.clear()
+    jobs.sync_jobs(fake_scheduler)
+    assert len(list(fake_scheduler.get_jobs())) == 1
+    jobs.sync_jobs(fake_scheduler, check=True)
+    assert full.call_count == 1
+    assert list(fake_scheduler.get_jobs()) == []
+
+
+def test_jobs_changed_rq_job_deleted(fake_scheduler, sql_jobs, sql_job):
+    jobs.sync_jobs(fake_scheduler)
+    assert not jobs.jobs_changed(fake_scheduler)
+    fake_scheduler.cancel(sql_job['id'])
+    assert jobs.jobs_changed(fake_scheduler)
+
+
+@pytest.fixture()
+def local_timezone(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/Denver')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_sync_jobs_local_timezone(fake_scheduler, sql_jobs, sql_job,
+                                  local_timezone):
+    # MySQL returns naive datetimes in UTC
+    sql_job['modified_at'] = dt.datetime(2019, 1, 1, 12)
+    jobs.sync_jobs(fake_scheduler)
+    conn = fake_scheduler.connection
+    assert int(conn.get(jobs.JOB_SYNC_WATERMARK_KEY)) == 1546344000
+    assert conn.hgetall(jobs.JOB_SYNC_MODIFIED_KEY) == {
+        sql_job['id'].encode(): b'1546344000'}
+    assert not jobs.jobs_changed(fake_scheduler)
+    call = jobs.storage._call_procedure
+    jobs.sync_jobs(fake_scheduler)
+    assert call.call_args[0] == (
+        'list_jobs_modified_since',
+        dt.datetime(2019, 1, 1, 12, tzinfo=dt.timezone.utc))
+
+
+def test_jobs_checksum():
+    assert jobs.jobs_checksum([]) == 0
+    assert jobs.jobs_checksum([('a', 1), ('b', 2)]) == (
+        jobs.jobs_checksum([('b', 2), ('a', 1)]))
+    assert jobs.jobs_checksum([('a', 1)]) != jobs.jobs_checksum([('a', 2)])
+
+
+def test_update_mixin_check_interval(fake_scheduler, mocker):
+    sync = mocker.patch('sfa_api.jobs.sync_jobs')
+    mocker.patch('rq_scheduler.Scheduler.enqueue_jobs')
+    now = mocker.patch('sfa_api.jobs.time.monotonic', return_value=1000)
+
+    class US(jobs.UpdateMixin, Scheduler):
+        pass
+
+    sch = US(queue=Queue('scheduler', connection=fake_scheduler.connection),
+             connection=fake_scheduler.connection)
+    app = Flask('jobs')
+    app.config['JOB_SYNC_CHECK_INTERVAL'] = 60
+    with app.app_context():
+        sch.enqueue_jobs()
+        now.return_value = 1030
+        sch.enqueue_jobs()
+        now.return_value = 1060
+        sch.enqueue_jobs()
+    assert [c[1]['check'] for c in sync.call_args_list] == [
+        True, False, True]
+
+
 def test_convert_sql_job_to_rq_job(sql_job, mocker):
     scheduler = mocker.MagicMock()
     jobs.convert_sql_to_rq_job(sql_job, scheduler)
@@ -189,6 +376,175 @@ def test_execute_job(jtype, params, func, mocker, userid):
     assert ret.called
 
 
+def test_execute_job_in_process_api(mocker, userid):
+    mocker.patch('sfa_api.jobs.exchange_token',
+                 return_value='token')
+
+    def check_session(*args):
+        assert issubclass(reports_main.APISession, InProcessAPISession)
+
+    compute = mocker.patch('sfa_api.jobs.compute_report',
+                           side_effect=check_session)
+    app = Flask('jobs')
+    app.config['IN_PROCESS_API'] = 'TestingConfig'
+    setattr(app, 'in_process_api_app', mocker.MagicMock())
+    with app.app_context():
+        jobs.execute_job('test', 'periodic_report', userid, report_id='id')
+    assert compute.called
+    assert not issubclass(reports_main.APISession, InProcessAPISession)
+
+
+@pytest.fixture()
+def validation_app():
+    app = Flask('jobs')
+    app.config.update(USE_FAKE_REDIS=True, SCHEDULER_QUEUE='scheduler',
+                      VALIDATION_CHUNK_SIZE=2)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture()
+def validation_session(mocker):
+    session = mocker.MagicMock()
+    session.get_user_info.return_value = {'organization': 'Org'}
+    session.list_observations.return_value = [
+        mocker.MagicMock(observation_id=id_, provider=provider)
+        for id_, provider in (('a', 'Org'), ('b', 'Org'), ('x', 'Other'),
+                              ('c', 'Org'), ('d', 'Org'), ('e', 'Org'))]
+    mocker.patch('sfa_api.jobs.api.APISession', return_value=session)
+    mocker.patch('sfa_api.jobs.exchange_token', return_value='token')
+    return session
+
+
+def test_execute_job_fan_out_validation(validation_app, validation_session,
+                                        mocker, userid):
+    calls = []
+
+    def validate(token, observation_id, *args, **kwargs):
+        calls.append(observation_id)
+        if observation_id == 'd' or calls.count(observation_id) == 1 and (
+                observation_id == 'b'):
+            raise ValueError
+    validate_one = mocker.patch('sfa_api.jobs.fetch_and_validate_observation',
+                                side_effect=validate)
+    validate_all = mocker.patch(
+        'sfa_api.jobs.fetch_and_validate_all_observations')
+    log = mocker.patch('sfa_api.jobs.logger')
+    run_id = jobs.execute_job('test', 'daily_observation_validation', userid,
+                              start_td='-1d', end_td='0h')
+    assert not validate_all.called
+    assert validate_one.call_args[1]['only_missing']
+    assert sorted(calls) == ['a', 'b', 'b', 'c', 'd', 'd', 'd', 'e']
+    log.error.assert_called_once_with(
+        'Validation job %s failed to validate observations %s', 'test', 'd')
+    summaries = [c for c in log.info.call_args_list
+                 if c[0][0].startswith('Validation job %s validated')]
+    assert len(summaries) == 1
+    assert summaries[0][0][1:3] == ('test', 4)
+    conn = get_queue('scheduler').connection
+    assert conn.keys(jobs.VALIDATION_RUN_KEY.format(run_id) + '*') == []
+
+
+def test_execute_job_fan_out_validation_no_retries(
+        validation_app, validation_session, mocker, userid):
+    validation_app.config['VALIDATION_CHUNK_RETRIES'] = 0
+    validate = mocker.patch('sfa_api.jobs.fetch_and_validate_observation',
+                            side_effect=ValueError)
+    log = mocker.patch('sfa_api.jobs.logger')
+    jobs.execute_job('test', 'daily_observation_validation', userid,
+                     start_td='-1d', end_td='0h')
+    assert validate.call_count == 5
+    log.error.assert_called_once()
+    assert log.error.call_args[0][2].split(', ') == [
+        'a', 'b', 'c', 'd', 'e']
+
+
+def test_execute_job_fan_out_validation_token_fails(
+        validation_app, validation_session, mocker, userid):
+    validation_app.config['VALIDATION_CHUNK_RETRIES'] = 1
+    mocker.patch('sfa_api.jobs.exchange_token',
+                 side_effect=['token', KeyError, 'token', 'token', 'token',
+                              'token'])
+    validate = mocker.patch('sfa_api.jobs.fetch_and_validate_observation')
+    log = mocker.patch('sfa_api.jobs.logger')
+    jobs.execute_job('test', 'daily_observation_validation', userid,
+                     start_td='-1d', end_td='0h')
+    assert validate.call_count == 5
+    assert not log.error.called
+
+
+def test_execute_job_fan_out_validation_no_observations(
+        validation_app, validation_session, mocker, userid):
+    validation_session.list_observations.return_value = []
+    enqueue = mocker.spy(jobs, '_enqueue_validation_chunk')
+    assert jobs.execute_job('test', 'daily_observation_validation', userid,
+                            start_td='-1d', end_td='0h') is None
+    assert not enqueue.called
+
+
+def test_execute_job_fan_out_validation_disabled(
+        validation_app, validation_session, mocker, userid):
+    validation_app.config['VALIDATION_CHUNK_SIZE'] = 0
+    validate_all = mocker.patch(
+        'sfa_api.jobs.fetch_and_validate_all_observations')
+    jobs.execute_job('test', 'daily_observation_validation', userid,
+                     start_td='-1d', end_td='0h')
+    assert validate_all.called
+
+
+@pytest.mark.parametrize('attempt,retried', [(0, True), (2, False)])
+def test_validate_observation_chunk_timeout(validation_app, mocker, attempt,
+                                            retried):
+    mocker.patch('sfa_api.jobs.exchange_token', return_value='token')
+    validate = mocker.patch(
+        'sfa_api.jobs.fetch_and_validate_observation',
+        side_effect=[None, JobTimeoutException('timed out'), None])
+    enqueue = mocker.patch('sfa_api.jobs._enqueue_validation_chunk')
+    conn = get_queue('scheduler').connection
+    key = jobs.VALIDATION_RUN_KEY.format('run')
+    conn.hset(key, mapping={'name': 'test', 'pending': 2, 'validated': 0,
+                            'started': time.time()})
+    with pytest.raises(JobTimeoutException):
+        jobs.validate_observation_chunk('run', 'user', ['a', 'b', 'c'],
+                                        'start', 'end', attempt=attempt)
+    # no observations are validated after the timeout
+    assert validate.call_count == 2
+    assert conn.hget(key, 'validated') == b'1'
+    if retried:
+        assert enqueue.call_args[0][3] == ['b', 'c']
+        assert enqueue.call_args[0][-1] == attempt + 1
+        assert conn.hget(key, 'pending') == b'2'
+    else:
+        assert not enqueue.called
+        assert conn.lrange(jobs.VALIDATION_FAILED_KEY.format('run'),
+                           0, -1) == [b'b', b'c']
+        assert conn.hget(key, 'pending') == b'1'
+
+
+def test_validate_observation_chunk_token_timeout(validation_app, mocker):
+    mocker.patch('sfa_api.jobs.exchange_token',
+                 side_effect=JobTimeoutException('timed out'))
+    enqueue = mocker.patch('sfa_api.jobs._enqueue_validation_chunk')
+    with pytest.raises(JobTimeoutException):
+        jobs.validate_observation_chunk('run', 'user', ['a', 'b'],
+                                        'start', 'end')
+    assert enqueue.call_args[0][3] == ['a', 'b']
+
+
+def test_aggregate_validation_run(validation_app):
+    conn = get_queue('scheduler').connection
+    conn.hset(jobs.VALIDATION_RUN_KEY.format('run'), mapping={
+        'name': 'test', 'pending': 0, 'validated': 3,
+        'started': time.time() - 10})
+    conn.rpush(jobs.VALIDATION_FAILED_KEY.format('run'), 'a', 'b')
+    out = jobs.aggregate_validation_run('run')
+    assert out['name'] == 'test'
+    assert out['validated'] == 3
+    assert out['failed'] == ['a', 'b']
+    assert 10 <= out['duration'] < 20
+    assert conn.keys('sfa:validation_run:*') == []
+
+
 def test_full_run_through(app, queue, mocker):
     mocker.patch('sfa_api.jobs.exchange_token', return_value='token')
     validate = mocker.patch('sfa_api.jobs.fetch_and_validate_all_observations')
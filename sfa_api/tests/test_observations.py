@@ -91,6 +91,38 @@ def test_get_observation_links_404(api, bad_id):
     assert r.status_code == 404
 
 
+def test_list_observations_paged(api):
+    r = api.get('/observations/?limit=1&fields=name,_links',
+                base_url=BASE_URL)
+    assert r.status_code == 200
+    response = r.get_json()
+    assert len(response) == 1
+    assert set(response[0].keys()) == {'name', '_links'}
+    assert 'rel="next"' in r.headers['Link']
+    assert 'cursor=' in r.headers['Link']
+
+
+def test_list_observations_filtered(api, observation_id):
+    obs = demo_observations[observation_id]
+    r = api.get(f'/observations/?site_id={obs["site_id"]}'
+                f'&variable={obs["variable"]}',
+                base_url=BASE_URL)
+    assert r.status_code == 200
+    response = r.get_json()
+    assert observation_id in [o['observation_id'] for o in response]
+    for o in response:
+        assert o['site_id'] == obs['site_id']
+        assert o['variable'] == obs['variable']
+
+
+@pytest.mark.parametrize('query', [
+    'limit=0', 'cursor=bad', 'fields=notafield', 'variable=bad',
+    'site_id=bad'])
+def test_list_observations_bad_request(api, query):
+    r = api.get(f'/observations/?{query}', base_url=BASE_URL)
+    assert r.status_code == 400
+
+
 def test_get_observation_metadata(api, observation_id):
     r = api.get(f'/observations/{observation_id}/metadata',
                 base_url=BASE_URL)
@@ -1,7 +1,10 @@
 from copy import deepcopy
 import hashlib
+from io import BytesIO
 import itertools
+import json
 import math
+import zipfile
 
 
 import pytest
@@ -13,6 +16,8 @@ from solarforecastarbiter.datamodel import (
 from sfa_api.conftest import (BASE_URL, demo_observations, demo_aggregates,
                               demo_forecasts, demo_group_cdf)
 from sfa_api.schema import ALLOWED_METRICS
+from sfa_api.utils.report_values import decode_processed_values
+from sfa_api.utils.storage import get_storage
 
 
 @pytest.fixture()
@@ -33,6 +38,20 @@ def test_post_report(api, report_post_json, mocked_queuing):
     assert 'Location' in res.headers
 
 
+def test_post_report_reads_pair_metadata_once(api, report_post_json,
+                                              mocked_queuing, mocker):
+    with api.application.app_context():
+        storage = get_storage()
+    read = mocker.spy(storage, 'read_pair_metadata')
+    report = deepcopy(report_post_json)
+    report['report_parameters']['object_pairs'] *= 20
+    res = api.post('/reports/',
+                   base_url=BASE_URL,
+                   json=report)
+    assert res.status_code == 201
+    assert read.call_count == 1
+
+
 def test_get_report(api, new_report):
     report_id = new_report()
     res = api.get(f'/reports/{report_id}',
@@ -150,6 +169,23 @@ def test_get_report_cost(api, new_report,
     assert len(report['report_parameters']['costs']) > 0
 
 
+def test_get_report_bad_include(api, new_report):
+    report_id = new_report()
+    res = api.get(f'/reports/{report_id}?include=values,plots',
+                  base_url=BASE_URL)
+    assert res.status_code == 400
+    assert res.json == {'errors': {'include': [
+        'Unknown options: plots. Must be one of values.']}}
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=a', 'cursor=bad'])
+def test_read_report_values_bad_page(api, new_report, query):
+    report_id = new_report()
+    res = api.get(f'/reports/{report_id}/values?{query}',
+                  base_url=BASE_URL)
+    assert res.status_code == 400
+
+
 def test_get_report_dne(api, missing_id):
     res = api.get(f'/reports/{missing_id}',
                   base_url=BASE_URL)
@@ -194,12 +230,25 @@ def test_post_report_values(api, new_report, values, report_json_w_cdf):
             value_ids.append(res.data.decode())
 
     values_res = api.get(
-        f'/reports/{report_id}',
+        f'/reports/{report_id}?include=values',
         base_url=BASE_URL)
     report_with_values = values_res.get_json()
     out_ids = [v['id'] for v in report_with_values['values']]
     assert len(out_ids) == 2 * len(object_pairs)
     assert out_ids == value_ids
+    report_res = api.get(f'/reports/{report_id}', base_url=BASE_URL)
+    assert 'values' not in report_res.get_json()
+
+    paged_ids = []
+    r = api.get(f'/reports/{report_id}/values?limit=3', base_url=BASE_URL)
+    while True:
+        assert r.status_code == 200
+        paged_ids.extend(v['id'] for v in r.get_json())
+        link = r.headers.get('Link')
+        if not link:
+            break
+        r = api.get(link[link.index('<') + 1:link.index('>')])
+    assert sorted(paged_ids) == sorted(value_ids)
 
 
 @pytest.mark.parametrize('values', REPORT_VALUESET[:1])
@@ -242,6 +291,94 @@ def test_read_report_values(api, new_report, values, report_post_json):
     assert report_values[0]['processed_values'] == values
 
 
+def test_read_report_values_zip(api, new_report, report_post_json):
+    report_id = new_report()
+    obj_id = report_post_json['report_parameters']['object_pairs'][0][
+        'observation']
+    values = REPORT_VALUESET[0]
+    res = api.post(f'/reports/{report_id}/values',
+                   base_url=BASE_URL,
+                   json={'object_id': obj_id, 'processed_values': values})
+    value_id = res.data.decode()
+    res = api.get(f'/reports/{report_id}/values',
+                  headers={'Accept': 'application/zip'},
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    assert res.mimetype == 'application/zip'
+    archive = zipfile.ZipFile(BytesIO(res.data))
+    assert {'id': value_id, 'object_id': obj_id} in json.loads(
+        archive.read('manifest.json'))
+    assert decode_processed_values(archive.read(value_id)) == values
+
+
+@pytest.fixture()
+def report_with_values(api, new_report, report_post_json):
+    report_id = new_report()
+    value_ids = {}
+    for pair in report_post_json['report_parameters']['object_pairs']:
+        for key in ('forecast', 'observation'):
+            res = api.post(f'/reports/{report_id}/values',
+                           base_url=BASE_URL,
+                           json={'object_id': pair[key],
+                                 'processed_values': REPORT_VALUESET[0]})
+            value_ids[res.data.decode()] = pair[key]
+    return report_id, value_ids
+
+
+def test_read_report_object_values(api, report_with_values):
+    report_id, value_ids = report_with_values
+    value_id, object_id = list(value_ids.items())[0]
+    res = api.get(f'/reports/{report_id}/values/{object_id}',
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    assert res.json == [{'id': value_id, 'object_id': object_id,
+                         'processed_values': REPORT_VALUESET[0]}]
+
+
+def test_read_report_object_values_zip(api, report_with_values):
+    report_id, value_ids = report_with_values
+    value_id, object_id = list(value_ids.items())[0]
+    res = api.get(f'/reports/{report_id}/values/{object_id}',
+                  headers={'Accept': 'application/zip'},
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    assert res.mimetype == 'application/zip'
+    archive = zipfile.ZipFile(BytesIO(res.data))
+    assert json.loads(archive.read('manifest.json')) == [
+        {'id': value_id, 'object_id': object_id}]
+    assert decode_processed_values(archive.read(value_id)) == (
+        REPORT_VALUESET[0])
+
+
+def test_read_report_object_values_dne(api, missing_id, report_with_values):
+    report_id, value_ids = report_with_values
+    object_id = list(value_ids.values())[0]
+    res = api.get(f'/reports/{missing_id}/values/{object_id}',
+                  base_url=BASE_URL)
+    assert res.status_code == 404
+
+
+def test_read_report_values_manifest(api, report_with_values):
+    report_id, value_ids = report_with_values
+    res = api.get(f'/reports/{report_id}/values/manifest',
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    manifest = res.json
+    assert {m['id']: m['object_id'] for m in manifest} == value_ids
+    values = api.get(f'/reports/{report_id}/values',
+                     headers={'Accept': 'application/zip'},
+                     base_url=BASE_URL)
+    archive = zipfile.ZipFile(BytesIO(values.data))
+    for m in manifest:
+        assert m['size'] == archive.getinfo(m['id']).file_size
+
+
+def test_read_report_values_manifest_dne(api, missing_id):
+    res = api.get(f'/reports/{missing_id}/values/manifest',
+                  base_url=BASE_URL)
+    assert res.status_code == 404
+
+
 def test_post_raw_report(api, new_report, raw_report_json):
     report_id = new_report()
     res = api.post(f'/reports/{report_id}/raw',
@@ -273,6 +410,46 @@ def test_post_raw_report_chksum(api, new_report, raw_report_json, chksum):
     assert report_with_raw['raw_report'] == post
 
 
+@pytest.mark.parametrize('sections,keys', [
+    ('metrics', ['metrics']),
+    ('metrics,data_checksum', ['data_checksum', 'metrics']),
+    ('summary', ['generated_at', 'messages',
+                 'processed_forecasts_observations', 'timezone',
+                 'versions']),
+])
+def test_get_report_sections(api, new_report, raw_report_json, sections,
+                             keys):
+    report_id = new_report()
+    api.post(f'/reports/{report_id}/raw', base_url=BASE_URL,
+             json=raw_report_json)
+    res = api.get(f'/reports/{report_id}?sections={sections}',
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    raw_report = res.json['raw_report']
+    assert sorted(raw_report) == keys
+    assert raw_report == {key: raw_report_json[key] for key in keys}
+
+
+def test_get_report_no_sections(api, new_report, raw_report_json):
+    report_id = new_report()
+    api.post(f'/reports/{report_id}/raw', base_url=BASE_URL,
+             json=raw_report_json)
+    res = api.get(f'/reports/{report_id}?sections=',
+                  base_url=BASE_URL)
+    assert res.status_code == 200
+    assert res.json['raw_report'] is None
+
+
+def test_get_report_bad_sections(api, new_report):
+    report_id = new_report()
+    res = api.get(f'/reports/{report_id}?sections=metrics,values',
+                  base_url=BASE_URL)
+    assert res.status_code == 400
+    assert res.json == {'errors': {'sections': [
+        'Unknown options: values. Must be one of summary, metrics, '
+        'plots, data_checksum.']}}
+
+
 def test_delete_report(api, new_report):
     report_id = new_report()
     res = api.get(f'/reports/{report_id}',
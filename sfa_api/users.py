@@ -6,7 +6,7 @@ from sfa_api import spec
 from sfa_api.schema import (UserSchema, ActionList, ALLOWED_OBJECT_TYPES,
                             UserCreatePerms, ActionsOnTypeList)
 from sfa_api.utils.auth0_info import (
-    get_email_of_user, get_auth0_id_of_user)
+    get_email_of_user, get_emails_of_users, get_auth0_id_of_user)
 from sfa_api.utils.errors import StorageAuthError, BadAPIRequest
 from sfa_api.utils.storage import get_storage
 
@@ -33,8 +33,9 @@ class AllUsersView(MethodView):
         """
         storage = get_storage()
         users = storage.list_users()
+        emails = get_emails_of_users([u['auth0_id'] for u in users])
         for u in users:
-            u['email'] = get_email_of_user(u['auth0_id'])
+            u['email'] = emails[u['auth0_id']]
         return jsonify(UserSchema(many=True).dump(users))
 
 
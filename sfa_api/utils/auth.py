@@ -5,10 +5,14 @@ flask-jwt-extended because we only need to verify valid tokens
 and not issue any. We use python-jose instead of pyjwt because
 it is better documented and is not missing any JWT features.
 """
+from hashlib import sha256
 from json.decoder import JSONDecodeError
 from functools import wraps
+import logging
+import time
+
+
 import requests
-from urllib3 import Retry
 
 
 from flask import (request, Response, current_app, render_template,
@@ -17,23 +21,157 @@ from jose import jwt, jwk
 from werkzeug.local import LocalProxy
 
 
+from sfa_api.utils.caching import TTLCache
+from sfa_api.utils.jwks import get_jwt_key
+from sfa_api.utils.timing import timed
+
+
 current_user = LocalProxy(
     lambda: getattr(_request_ctx_stack.top, 'user', ''))
 current_jwt_claims = LocalProxy(
     lambda: getattr(_request_ctx_stack.top, 'jwt_claims', None))
 current_access_token = LocalProxy(
     lambda: getattr(_request_ctx_stack.top, 'access_token', ''))
+# WSGI environ key marking requests of RQ jobs served in the worker process
+# by sfa_api.utils.in_process_api. Headers can not set it since they are
+# added to the environ with an HTTP_ prefix.
+IN_PROCESS_ENVIRON_KEY = 'sfa_api.in_process'
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedTokenCache(TTLCache):
+    """
+    Bounded, least-recently-used cache of the claims of access tokens
+    that have already been verified. Entries are keyed by a hash of the
+    token and are dropped once the token expires.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of verified tokens to keep. If 0, nothing is cached.
+    redis_conn : redis.Redis, optional
+        If provided, verified claims are also stored in Redis so they can
+        be shared between processes. The connection must decode responses.
+
+    Notes
+    -----
+    Only tokens that were successfully verified are stored so an
+    invalid token always goes through full verification.
+    """
+    def __init__(self, maxsize=1024, redis_conn=None):
+        super().__init__(maxsize, ttl=None, redis_conn=redis_conn,
+                         redis_prefix='verified_jwt:')
+
+    @staticmethod
+    def make_key(token, audience, issuer):
+        """Hash the token along with the audience and issuer it was
+        verified against"""
+        return sha256(
+            '\n'.join((audience, issuer, token)).encode()).hexdigest()
+
+    def now(self):
+        return time.time()
+
+    def expiration(self, claims, now):
+        """Verified claims are valid until the 'exp' claim passes"""
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)):
+            return None
+        return exp
+
+
+def verified_token_cache():
+    """Get the cache of verified access tokens for the application,
+    creating it on first use. The size is set by config['JWT_CACHE_SIZE']
+    and Redis is used to share verified tokens between processes
+    if config['JWT_CACHE_USE_REDIS'] is True.
+    """
+    if not hasattr(current_app, 'verified_token_cache'):
+        config = current_app.config
+        redis_conn = None
+        if config.get('JWT_CACHE_USE_REDIS', False):
+            from sfa_api.utils.auth0_info import token_redis_connection
+            redis_conn = token_redis_connection()
+        cache = VerifiedTokenCache(int(config.get('JWT_CACHE_SIZE', 1024)),
+                                   redis_conn)
+        setattr(current_app, 'verified_token_cache', cache)
+    return getattr(current_app, 'verified_token_cache')
+
+
+def user_existence_cache():
+    """Get the cache of auth0 IDs of users known to exist in the database,
+    creating it on first use. Entries expire after
+    config['USER_EXISTS_CACHE_TTL'] seconds and Redis is used to share the
+    cache between processes if config['USER_EXISTS_CACHE_USE_REDIS'] is True.
+    """
+    if not hasattr(current_app, 'user_existence_cache'):
+        config = current_app.config
+        redis_conn = None
+        if config.get('USER_EXISTS_CACHE_USE_REDIS', False):
+            from sfa_api.utils.auth0_info import token_redis_connection
+            redis_conn = token_redis_connection()
+        cache = TTLCache(int(config.get('USER_EXISTS_CACHE_SIZE', 4096)),
+                         float(config.get('USER_EXISTS_CACHE_TTL', 300)),
+                         redis_conn, redis_prefix='user_exists:')
+        setattr(current_app, 'user_existence_cache', cache)
+    return getattr(current_app, 'user_existence_cache')
+
+
+@timed('verify_token')
+def decode_access_token(token):
+    """Verify the access token and return its claims, using
+    previously verified claims if available.
+
+    Parameters
+    ----------
+    token : str
+        The encoded JSON web token
+
+    Returns
+    -------
+    dict
+        The claims of the token
+
+    Raises
+    ------
+    jose.JWTError
+        If the token could not be verified
+    """
+    audience = current_app.config['AUTH0_AUDIENCE']
+    issuer = current_app.config['AUTH0_BASE_URL'] + '/'
+    cache = verified_token_cache()
+    key = cache.make_key(token, audience, issuer)
+    claims = cache.get(key)
+    if claims is None:
+        claims = jwt.decode(
+            token,
+            key=get_jwt_key(token),
+            audience=audience,
+            issuer=issuer)
+        cache.set(key, claims)
+    return claims
 
 
 def verify_access_token():
     auth = request.headers.get('Authorization', '').split(' ')
     try:
         assert auth[0] == 'Bearer'
-        token = jwt.decode(
-            auth[1],
-            key=current_app.config['JWT_KEY'],
-            audience=current_app.config['AUTH0_AUDIENCE'],
-            issuer=current_app.config['AUTH0_BASE_URL'] + '/')
+        if request.environ.get(IN_PROCESS_ENVIRON_KEY, False):
+            # requests of jobs in the worker process carry a token that was
+            # verified when received, either by the API when the job was
+            # queued or by Auth0 when exchanged, so only the claims, like
+            # exp, are checked since the token may have expired while the
+            # job was queued
+            token = jwt.decode(auth[1], key=None,
+                               options={'verify_signature': False,
+                                        'verify_aud': False})
+        else:
+            token = decode_access_token(auth[1])
+    except requests.exceptions.RequestException as e:
+        logger.error('Unable to load keys to verify token: %r', e)
+        return False
     except (jwt.JWTError,
             jwk.JWKError,
             jwt.ExpiredSignatureError,
@@ -67,27 +205,17 @@ def request_user_info():
     requests.exceptions.HTTPError
         If the request fails after 5 retries.
     """
-    session = requests.Session()
-    session.headers = {
-        'Authorization': f'Bearer {current_access_token}',
-    }
-    retries = Retry(
-        total=5, connect=3, read=3, status=3,
-        status_forcelist=[408, 500, 502, 503, 504],
-        backoff_factor=0.2,
-        respect_retry_after_header=True,
-    )
-    base_url = current_app.config['AUTH0_BASE_URL']
-    adapter = requests.adapters.HTTPAdapter(max_retries=retries)
-    session.mount(base_url, adapter)
-
-    info_request = session.get(base_url + '/userinfo', timeout=3.0)
-
+    from sfa_api.utils.auth0_info import auth0_request
+    info_request = auth0_request(
+        'GET', '/userinfo', 'userinfo',
+        headers={'Authorization': f'Bearer {current_access_token}'},
+        timeout=3.0)
     info_request.raise_for_status()
     user_info = info_request.json()
     return user_info
 
 
+@timed('user_existence')
 def validate_user_existence():
     """Ensures users exist in both auth0 and the database
     Returns
@@ -103,7 +231,14 @@ def validate_user_existence():
     to be deleted in auth0 and still carry a valid token. In order
     to avoid adding that use back to our database, we return false
     if the request for user info fails.
+
+    Users that are known to exist are cached by auth0 ID (see
+    :py:func:`user_existence_cache`) to avoid a database call on every
+    request.
     """
+    cache = user_existence_cache()
+    if cache.get(str(current_user)):
+        return True
     from sfa_api.utils.storage import get_storage
     storage = get_storage()
     if not storage.user_exists():
@@ -117,6 +252,7 @@ def validate_user_existence():
                 # is yet to be verified
                 return False
             storage.create_new_user()
+    cache.set(str(current_user), True)
     return True
 
 
@@ -1,19 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
 import secrets
 import string
+import time
 
 
 from flask import current_app
 from jose import jwt, jwk
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
 
 
+from sfa_api.utils.jwks import get_jwt_key
+from sfa_api.utils.metrics import histogram
 from sfa_api.utils.queuing import make_redis_connection
 
 
 logger = logging.getLogger(__name__)
 
 
+# seconds to keep emails and auth0 IDs in Redis
+EMAIL_TTL = 86400
+
+
+AUTH0_REQUEST_TIME = histogram(
+    'sfa_api_auth0_request_seconds',
+    'Time spent on requests to Auth0, including retries',
+    ['endpoint', 'method', 'status'])
+
+
+def auth0_session():
+    """Get the requests.Session used for all requests to Auth0. The
+    session is stored on the application so connections are kept alive
+    and reused. Up to config['AUTH0_POOL_SIZE'] connections are pooled
+    and idempotent requests are retried on connection errors and
+    408, 500, 502, 503, and 504 responses.
+    """
+    if not hasattr(current_app, 'auth0_session'):
+        config = current_app.config
+        retries = Retry(
+            total=5, connect=3, read=3, status=3,
+            status_forcelist=[408, 500, 502, 503, 504],
+            backoff_factor=0.2,
+            respect_retry_after_header=True,
+            # return the last response so raise_for_status gives HTTPError
+            raise_on_status=False,
+        )
+        pool_size = int(config.get('AUTH0_POOL_SIZE', 10))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retries)
+        session = requests.Session()
+        session.mount(config['AUTH0_BASE_URL'], adapter)
+        setattr(current_app, 'auth0_session', session)
+    return getattr(current_app, 'auth0_session')
+
+
+def auth0_request(method, path, endpoint, **kwargs):
+    """
+    Make a request to Auth0 using the shared session and record how
+    long it took.
+
+    Parameters
+    ----------
+    method : str
+        HTTP method of the request
+    path : str
+        Path of the request relative to config['AUTH0_BASE_URL']
+    endpoint : str
+        Short name of the Auth0 endpoint used to label the latency metric.
+        Should not include any user specific information.
+    **kwargs
+        Passed to requests.Session.request. The timeout defaults to
+        config['AUTH0_TIMEOUT'].
+
+    Returns
+    -------
+    requests.Response
+    """
+    config = current_app.config
+    kwargs.setdefault('timeout', float(config.get('AUTH0_TIMEOUT', 10.0)))
+    status = 'error'
+    start = time.perf_counter()
+    try:
+        resp = auth0_session().request(
+            method, config['AUTH0_BASE_URL'] + path, **kwargs)
+        status = str(resp.status_code)
+        return resp
+    finally:
+        duration = time.perf_counter() - start
+        AUTH0_REQUEST_TIME.labels(endpoint, method, status).observe(duration)
+        logger.debug('Auth0 %s %s returned %s in %.3f s', method, endpoint,
+                     status, duration)
+
+
 def token_redis_connection():
     """Make a connection to Redis and the database specified by
     config['AUTH0_REDIS_DB']. The connection is stored on the
@@ -48,7 +128,7 @@ def get_fresh_auth0_management_token():
                'audience': current_app.config['AUTH0_BASE_URL'] + '/api/v2/',
                'grant_type': 'client_credentials'
                }
-    req = requests.post(current_app.config['AUTH0_BASE_URL'] + '/oauth/token',
+    req = auth0_request('POST', '/oauth/token', 'oauth_token',
                         headers={'content-type': 'application/json'},
                         json=payload)
     req.raise_for_status()
@@ -77,13 +157,14 @@ def check_if_token_is_valid(token):
     try:
         jwt.decode(
             token,
-            key=current_app.config['JWT_KEY'],
+            key=get_jwt_key(token),
             audience=current_app.config['AUTH0_BASE_URL'] + '/api/v2/',
             issuer=current_app.config['AUTH0_BASE_URL'] + '/')
     except (jwt.JWTError,
             jwk.JWKError,
             jwt.ExpiredSignatureError,
             jwt.JWTClaimsError,
+            requests.exceptions.RequestException,
             AttributeError,
             AssertionError,
             IndexError):
@@ -122,25 +203,33 @@ def _verify_auth0_id(auth0_id):
         raise ValueError('Invalid auth0 ID')
 
 
+def _fetch_email_of_user(auth0_id, token):
+    """Request the email of the user from Auth0, returning None
+    if it could not be retrieved"""
+    headers = {'content-type': 'application/json',
+               'authorization': f'Bearer {token}'}
+    req = auth0_request(
+        'GET', '/api/v2/users/' + auth0_id, 'get_user',
+        params={'fields': 'email',
+                'include_fields': 'true'},
+        headers=headers)
+    if req.status_code == 200:
+        return req.json()['email']
+    else:
+        logger.error('Failed to retrieve email from Auth0: %s %s',
+                     req.status_code, req.text)
+        return None
+
+
 def _get_email_of_user(auth0_id, redis_conn, token,
                        config):
     # email is PII, but easy to clear db
     email = redis_conn.get(auth0_id)
     if email is None:
-        headers = {'content-type': 'application/json',
-                   'authorization': f'Bearer {token}'}
-        req = requests.get(
-            config['AUTH0_BASE_URL'] + '/api/v2/users/' + auth0_id,
-            params={'fields': 'email',
-                    'include_fields': 'true'},
-            headers=headers)
-        if req.status_code == 200:
-            email = req.json()['email']
-            # expire in 1 day
-            redis_conn.set(auth0_id, email, ex=86400)
+        email = _fetch_email_of_user(auth0_id, token)
+        if email is not None:
+            redis_conn.set(auth0_id, email, ex=EMAIL_TTL)
         else:
-            logger.error('Failed to retrieve email from Auth0: %s %s',
-                         req.status_code, req.text)
             email = 'Unable to retrieve'
     return email
 
@@ -170,33 +259,146 @@ def get_email_of_user(auth0_id):
         current_app.config)
 
 
-def _get_all_emails(token, config, page=0, per_page=100):
+def _read_cached_emails(auth0_ids, redis_conn):
+    """Read the emails of all auth0_ids from Redis in a single MGET"""
+    if len(auth0_ids) == 0:
+        return {}
+    return {aid: email for aid, email in zip(
+        auth0_ids, redis_conn.mget(auth0_ids)) if email is not None}
+
+
+def _store_emails(emails, redis_conn):
+    """Store a dict of auth0_id: email in Redis in a single pipeline"""
+    pipe = redis_conn.pipeline(transaction=False)
+    for auth0_id, email in emails.items():
+        pipe.set(auth0_id, email, ex=EMAIL_TTL)
+    pipe.execute()
+
+
+def _fetch_emails_concurrently(auth0_ids, redis_conn, token, config):
+    """Request the emails of auth0_ids from Auth0 with up to
+    config['AUTH0_MAX_CONCURRENT_REQUESTS'] requests at once and return
+    those that were retrieved within config['AUTH0_EMAIL_LOOKUP_TIMEOUT']
+    seconds. Requests that finish later still store the email in Redis.
+    """
+    app = current_app._get_current_object()
+
+    def fetch(auth0_id):
+        with app.app_context():
+            email = _fetch_email_of_user(auth0_id, token)
+        if email is not None:
+            redis_conn.set(auth0_id, email, ex=EMAIL_TTL)
+        return email
+
+    max_workers = min(len(auth0_ids),
+                      int(config.get('AUTH0_MAX_CONCURRENT_REQUESTS', 8)))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(fetch, aid): aid for aid in auth0_ids}
+    done, not_done = wait(
+        futures, timeout=float(config.get('AUTH0_EMAIL_LOOKUP_TIMEOUT', 5)))
+    # don't wait on the stragglers
+    executor.shutdown(wait=False)
+    if not_done:
+        logger.warning('Timed out retrieving %s emails from Auth0',
+                       len(not_done))
+    emails = {}
+    for fut in done:
+        try:
+            email = fut.result()
+        except requests.exceptions.RequestException as e:
+            logger.error('Failed to retrieve email from Auth0: %r', e)
+            continue
+        if email is not None:
+            emails[futures[fut]] = email
+    return emails
+
+
+def get_emails_of_users(auth0_ids):
+    """
+    Get the emails of many users given their auth0 IDs. Emails
+    stored in Redis are read with one request and only the missing
+    emails are requested from Auth0, concurrently and with a bounded
+    wait.
+
+    Parameters
+    ----------
+    auth0_ids : list of str
+        The auth0 IDs of the users
+
+    Returns
+    -------
+    dict
+        With auth0_id keys and email values. The email is 'Unable to
+        retrieve' if it was not found.
+
+    Raises
+    ------
+    ValueError
+        If any auth0 ID is not valid
+    """
+    list(map(_verify_auth0_id, auth0_ids))
+    unique_ids = list(dict.fromkeys(auth0_ids))
+    redis_conn = token_redis_connection()
+    emails = _read_cached_emails(unique_ids, redis_conn)
+    missing = [aid for aid in unique_ids if aid not in emails]
+    if missing:
+        token = auth0_token()
+        if token is not None:
+            emails.update(_fetch_emails_concurrently(
+                missing, redis_conn, token, current_app.config))
+    return {aid: emails.get(aid, 'Unable to retrieve') for aid in auth0_ids}
+
+
+def _get_all_emails(token, config, per_page=100):
     headers = {'content-type': 'application/json',
                'authorization': f'Bearer {token}'}
-    req = requests.get(
-        config['AUTH0_BASE_URL'] + '/api/v2/users',
-        params={'fields': 'user_id,email',
-                'include_fields': 'true',
-                'include_totals': 'true',
-                'page': page,
-                'per_page': per_page,
-                },
-        headers=headers)
-    if req.status_code == 200:
+    emails = {}
+    page = 0
+    while True:
+        req = auth0_request(
+            'GET', '/api/v2/users', 'list_users',
+            params={'fields': 'user_id,email',
+                    'include_fields': 'true',
+                    'include_totals': 'true',
+                    'page': page,
+                    'per_page': per_page,
+                    },
+            headers=headers)
+        if req.status_code != 200:
+            logger.error('Failed to retrieve emails from Auth0: %s %s',
+                         req.status_code, req.text)
+            return {}
         rj = req.json()
-        emails = {u['user_id']: u['email'] for u in rj['users']}
-        if rj['total'] > (page + 1) * per_page:
-            emails.update(_get_all_emails(token, config, page+1, per_page))
-    else:
-        logger.error('Failed to retrieve emails from Auth0: %s %s',
-                     req.status_code, req.text)
-        emails = {}
+        emails.update({u['user_id']: u['email'] for u in rj['users']})
+        page += 1
+        if rj['total'] <= page * per_page:
+            return emails
+
+
+def refresh_email_directory():
+    """
+    Request the emails of all users in the Auth0 tenant and store
+    them in Redis. This pages through every user of the tenant, so it
+    is meant to be run periodically from the admin cli and not while
+    handling a request.
+
+    Returns
+    -------
+    dict
+        With auth0_id keys and email values
+    """
+    emails = _get_all_emails(token=auth0_token(), config=current_app.config)
+    if emails:
+        _store_emails(emails, token_redis_connection())
     return emails
 
 
 def list_user_emails(auth0_ids):
     """
-    Get the emails of all users with the given ids
+    Get the emails of all users with the given ids. Emails not stored
+    in Redis are requested from Auth0 one user at a time, see
+    :py:func:`get_emails_of_users`. Run :py:func:`refresh_email_directory`
+    beforehand to store the emails of all users at once.
 
     Parameters
     ----------
@@ -213,12 +415,7 @@ def list_user_emails(auth0_ids):
     ValueError
         If any auth0 ID is not valid
     """
-
-    list(map(_verify_auth0_id, auth0_ids))
-    token = auth0_token()
-    config = current_app.config
-    emails = _get_all_emails(token=token, config=config)
-    return {aid: emails.get(aid, 'Unable to retrieve') for aid in auth0_ids}
+    return get_emails_of_users(auth0_ids)
 
 
 def _get_auth0_id_of_user(email, redis_conn, token,
@@ -228,8 +425,8 @@ def _get_auth0_id_of_user(email, redis_conn, token,
     if user_id is None:
         headers = {'content-type': 'application/json',
                    'authorization': f'Bearer {token}'}
-        req = requests.get(
-            config['AUTH0_BASE_URL'] + '/api/v2/users-by-email',
+        req = auth0_request(
+            'GET', '/api/v2/users-by-email', 'users_by_email',
             params={'fields': 'user_id',
                     'email': email.lower(),
                     'include_fields': 'true'},
@@ -242,8 +439,7 @@ def _get_auth0_id_of_user(email, redis_conn, token,
                 user_id = 'Unable to retrieve'
             else:
                 user_id = userjson[0]['user_id']
-                # expire in 1 day
-                redis_conn.set(email, user_id, ex=86400)
+                redis_conn.set(email, user_id, ex=EMAIL_TTL)
         else:
             logger.error('Failed to retrieve user_id from Auth0: %s %s',
                          req.status_code, req.text)
@@ -307,15 +503,14 @@ def create_user(email, password, verified=False):
         If the request to the Auth0 API fails
     """
     token = auth0_token()
-    config = current_app.config
     body = {'email': email,
             'password': password,
             'email_verified': verified,
             'connection': 'Username-Password-Authentication'}
     headers = {'content-type': 'application/json',
                'authorization': f'Bearer {token}'}
-    req = requests.post(
-        config['AUTH0_BASE_URL'] + '/api/v2/users',
+    req = auth0_request(
+        'POST', '/api/v2/users', 'create_user',
         json=body,
         headers=headers)
     req.raise_for_status()
@@ -352,10 +547,7 @@ def get_refresh_token(email, password):
             'audience': current_app.config['AUTH0_AUDIENCE'],
             'scope': 'offline_access'
             }
-    req = requests.post(
-        current_app.config['AUTH0_BASE_URL'] + '/oauth/token',
-        json=body
-    )
+    req = auth0_request('POST', '/oauth/token', 'oauth_token', json=body)
     req.raise_for_status()
     return req.json()['refresh_token']
 
@@ -388,10 +580,7 @@ def get_access_token(email, password):
             'client_secret': current_app.config['AUTH0_CLIENT_SECRET'],
             'audience': current_app.config['AUTH0_AUDIENCE'],
             }
-    req = requests.post(
-        current_app.config['AUTH0_BASE_URL'] + '/oauth/token',
-        json=body
-    )
+    req = auth0_request('POST', '/oauth/token', 'oauth_token', json=body)
     req.raise_for_status()
     return req.json()['access_token']
 
@@ -421,9 +610,7 @@ def exchange_refresh_token(refresh_token):
             'audience': current_app.config['AUTH0_AUDIENCE'],
             'refresh_token': refresh_token
             }
-    req = requests.post(
-        current_app.config['AUTH0_BASE_URL'] + '/oauth/token',
-        json=body)
+    req = auth0_request('POST', '/oauth/token', 'oauth_token', json=body)
     req.raise_for_status()
     return req.json()['access_token']
 
@@ -448,7 +635,6 @@ def get_password_reset_link(email):
         If the request to the Auth0 API fails
     """
     token = auth0_token()
-    config = current_app.config
     auth0_id = get_auth0_id_of_user(email)
     body = {'user_id': auth0_id,
             'ttl_sec': 86400 * 7,  # link will live for 7 days
@@ -457,8 +643,8 @@ def get_password_reset_link(email):
             }
     headers = {'content-type': 'application/json',
                'authorization': f'Bearer {token}'}
-    req = requests.post(
-        config['AUTH0_BASE_URL'] + '/api/v2/tickets/password-change',
+    req = auth0_request(
+        'POST', '/api/v2/tickets/password-change', 'password_change',
         json=body,
         headers=headers)
     req.raise_for_status()
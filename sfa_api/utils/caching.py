@@ -0,0 +1,180 @@
+"""
+Small, process-local caches with optional Redis backing that are
+used to avoid repeating database and network calls on every request.
+"""
+from collections import OrderedDict
+import json
+import logging
+from threading import Lock
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def _now():
+    # for mocking
+    return time.monotonic()
+
+
+class TTLCache:
+    """
+    Bounded, least-recently-used cache where every entry expires a fixed
+    time after it is set.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries to keep in memory. If 0, nothing is
+        kept in memory.
+    ttl : float
+        Number of seconds an entry is valid for.
+    redis_conn : redis.Redis, optional
+        If provided, entries are also stored in Redis with the same TTL
+        so they are shared between processes. Values are stored as JSON
+        unless :py:meth:`dumps` is overridden.
+    redis_prefix : str
+        Prefix added to keys stored in Redis.
+
+    Notes
+    -----
+    Failures to communicate with Redis are logged and treated as a
+    cache miss so that the cache never causes a request to fail.
+
+    Subclasses may override :py:meth:`expiration` to compute when each
+    entry expires from its value, along with :py:meth:`now` if the
+    expiration is not relative to the monotonic clock, and
+    :py:meth:`dumps` and :py:meth:`loads` to change how values are
+    stored in Redis.
+    """
+    def __init__(self, maxsize=1024, ttl=300, redis_conn=None,
+                 redis_prefix='cache:'):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_conn = redis_conn
+        self.redis_prefix = redis_prefix
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def now(self):
+        """The current time on the clock expirations are measured by"""
+        return _now()
+
+    def expiration(self, value, now):
+        """Time at which value set at now expires, or None if the value
+        should not be cached"""
+        return now + self.ttl
+
+    def dumps(self, value):
+        """Serialize value to store it in Redis"""
+        return json.dumps(value)
+
+    def loads(self, data):
+        """Deserialize a value read from Redis, or return None if it
+        can not be read"""
+        return json.loads(data)
+
+    def get(self, key, default=None, now=None):
+        """Get the value for key, or default if missing or expired"""
+        value, source = self._lookup(key, now)
+        if source is None:
+            return default
+        return value
+
+    def set(self, key, value, now=None):
+        """Store value for key until it expires"""
+        now = now or self.now()
+        expires = self.expiration(value, now)
+        if expires is None or expires <= now:
+            return
+        with self._lock:
+            self._set_local(key, value, expires)
+        if self.redis_conn is not None:
+            try:
+                self.redis_conn.set(self.redis_prefix + key,
+                                    self.dumps(value),
+                                    ex=max(int(expires - now), 1))
+            except Exception as e:
+                logger.warning('Failed to store %s in Redis: %r', key, e)
+
+    def delete(self, key):
+        """Remove key from the cache, including from Redis"""
+        with self._lock:
+            self._cache.pop(key, None)
+        if self.redis_conn is not None:
+            try:
+                self.redis_conn.delete(self.redis_prefix + key)
+            except Exception as e:
+                logger.warning('Failed to delete %s from Redis: %r', key, e)
+
+    def clear(self):
+        """Remove all entries held in memory"""
+        with self._lock:
+            self._cache.clear()
+
+    def delete_matching(self, predicate):
+        """Remove all entries held in memory whose key satisfies
+        predicate. Entries in Redis are not removed."""
+        with self._lock:
+            for key in [k for k in self._cache if predicate(k)]:
+                del self._cache[key]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def stats(self):
+        """Return a dict with the size, hits, misses, and hit rate"""
+        return {'size': len(self), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate}
+
+    def _lookup(self, key, now=None):
+        """Get the value for key and where it was found, memory or
+        redis, or (None, None) if missing or expired"""
+        now = now or self.now()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], 'memory'
+                del self._cache[key]
+        value = self._get_from_redis(key)
+        expires = None if value is None else self.expiration(value, now)
+        with self._lock:
+            if expires is None or expires <= now:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            self._set_local(key, value, expires)
+        return value, 'redis'
+
+    def _set_local(self, key, value, expires):
+        if self.maxsize <= 0:
+            return
+        self._cache[key] = (expires, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _get_from_redis(self, key):
+        if self.redis_conn is None:
+            return None
+        try:
+            value = self.redis_conn.get(self.redis_prefix + key)
+        except Exception as e:
+            logger.warning('Failed to read %s from Redis: %r', key, e)
+            return None
+        if value is None:
+            return None
+        return self.loads(value)
+
+    def __len__(self):
+        return len(self._cache)
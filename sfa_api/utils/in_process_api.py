@@ -0,0 +1,131 @@
+"""
+Serve the API requests of RQ jobs with the API app in the worker process.
+
+The jobs run by RQ workers, like computing a report or making reference
+forecasts, use a :py:class:`solarforecastarbiter.io.api.APISession` to
+read and post data through this API. When config['IN_PROCESS_API'] is set
+to the name of a class in :py:mod:`sfa_api.config`, the sessions created
+by a job inside :py:func:`in_process_api` pass their requests directly to
+an API app created with that config in the worker instead of sending them
+over the network. The requests are handled by the same views and stored
+procedures as any other request, so the user of the access token is
+subject to the same permissions. The signature of the token is not
+verified again, but its claims are, so an expired token is rejected.
+"""
+from contextlib import contextmanager
+from io import BytesIO
+import logging
+from urllib.parse import urlsplit
+
+
+from flask import current_app, has_app_context
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from solarforecastarbiter.io import api
+from solarforecastarbiter.reports import main as reports_main
+from solarforecastarbiter.validation import tasks as validation_tasks
+
+
+from sfa_api.utils.auth import IN_PROCESS_ENVIRON_KEY
+
+
+logger = logging.getLogger(__name__)
+# modules of solarforecastarbiter that create the APISession of a job
+_SESSION_MODULES = (api, reports_main, validation_tasks)
+# set from the request body by the test client
+_SKIP_HEADERS = ('Content-Length',)
+
+
+class InProcessAdapter(requests.adapters.BaseAdapter):
+    """
+    Transport adapter for a requests session that sends requests to a
+    Flask app in this process.
+
+    Parameters
+    ----------
+    app : flask.Flask
+        The API app to handle the requests.
+    """
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.client = app.test_client()
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        url = urlsplit(request.url)
+        headers = {k: v for k, v in request.headers.items()
+                   if k not in _SKIP_HEADERS}
+        resp = self.client.open(
+            url.path,
+            base_url=f'{url.scheme}://{url.netloc}',
+            method=request.method,
+            query_string=url.query,
+            headers=headers,
+            data=request.body,
+            environ_base={IN_PROCESS_ENVIRON_KEY: True},
+            buffered=True,
+        )
+        response = requests.Response()
+        response.status_code = resp.status_code
+        response.reason = resp.status.partition(' ')[2]
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = BytesIO(resp.get_data())
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class InProcessAPISession(api.APISession):
+    """
+    APISession that sends all requests to its base_url to the
+    app attribute of the class instead of over the network.
+    """
+    app = None
+
+    def __init__(self, access_token, default_timeout=(10, 60),
+                 base_url=None):
+        super().__init__(access_token, default_timeout=default_timeout,
+                         base_url=base_url)
+        self.mount(self.base_url, InProcessAdapter(self.app))
+
+
+def in_process_app():
+    """Get the API app that serves the requests of jobs, creating it
+    with the config named by config['IN_PROCESS_API'] on first use.
+    """
+    if not hasattr(current_app, 'in_process_api_app'):
+        from sfa_api import create_app
+        setattr(current_app, 'in_process_api_app',
+                create_app(current_app.config['IN_PROCESS_API']))
+    return getattr(current_app, 'in_process_api_app')
+
+
+@contextmanager
+def in_process_api():
+    """
+    Context-manager to serve the APISessions created by
+    solarforecastarbiter with the app from :py:func:`in_process_app`
+    if config['IN_PROCESS_API'] is set. Otherwise, the sessions send
+    their requests over the network as usual.
+    """
+    if not has_app_context() or not current_app.config.get('IN_PROCESS_API'):
+        yield
+        return
+    session_class = type('InProcessAPISession', (InProcessAPISession,),
+                         {'app': in_process_app()})
+    originals = [(module, module.APISession) for module in _SESSION_MODULES]
+    logger.debug('Serving API requests in process')
+    for module, _ in originals:
+        module.APISession = session_class
+    try:
+        yield
+    finally:
+        for module, original in originals:
+            module.APISession = original
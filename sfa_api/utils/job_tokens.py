@@ -0,0 +1,227 @@
+"""
+Cache of the access tokens that jobs run with. Exchanging the refresh
+token of a job user for an access token requires a request to Auth0, so
+access tokens are kept until shortly before they expire, in memory and
+encrypted in Redis to share them between workers. Only one thread of
+all workers exchanges the token of a user at a time while the others
+wait for the new token.
+"""
+from contextlib import contextmanager
+import logging
+from threading import Lock
+import time
+import uuid
+
+
+from cryptography.fernet import Fernet, InvalidToken
+from flask import current_app
+from jose import jwt
+from redis import WatchError
+
+
+from sfa_api.config import Config
+from sfa_api.utils.caching import TTLCache
+from sfa_api.utils.metrics import counter
+from sfa_api.utils.queuing import make_redis_connection
+
+
+logger = logging.getLogger(__name__)
+JOB_TOKEN_REQUESTS = counter(
+    'sfa_api_job_token_requests_total',
+    'Access tokens requested for jobs by where the token came from: '
+    'memory, redis, or exchange with Auth0',
+    ['source'])
+
+
+class JobTokenCache(TTLCache):
+    """
+    Cache of access tokens keyed by the ID of the job user.
+
+    Parameters
+    ----------
+    fernet : cryptography.fernet.Fernet
+        Encrypts the tokens stored in Redis.
+    redis_conn : redis.Redis, optional
+        If provided, tokens are shared between processes through Redis.
+    margin : float
+        Tokens are dropped this many seconds before they expire so that
+        a job does not start with a token about to expire.
+    lock_timeout : float
+        Seconds to wait for another process exchanging the token of the
+        same user, and the longest the lock is held.
+    maxsize : int
+        Maximum number of tokens to keep in memory.
+
+    Notes
+    -----
+    Failures to communicate with Redis are logged and treated as a cache
+    miss, or as an acquired lock, so the cache never causes a job to fail.
+    """
+    lock_prefix = 'job_token_lock:'
+    poll_interval = 0.1
+
+    def __init__(self, fernet, redis_conn=None, margin=300,
+                 lock_timeout=30, maxsize=1024):
+        super().__init__(maxsize, ttl=None, redis_conn=redis_conn,
+                         redis_prefix='job_token:')
+        self.fernet = fernet
+        self.margin = margin
+        self.lock_timeout = lock_timeout
+        self._user_locks = {}
+        self._user_locks_lock = Lock()
+
+    def now(self):
+        return time.time()
+
+    def expiration(self, token, now):
+        """Tokens are dropped margin seconds before the 'exp' claim"""
+        try:
+            exp = jwt.get_unverified_claims(token).get('exp')
+        except jwt.JWTError:
+            return None
+        if not isinstance(exp, (int, float)):
+            return None
+        return exp - self.margin
+
+    def dumps(self, token):
+        return self.fernet.encrypt(token.encode())
+
+    def loads(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        try:
+            return self.fernet.decrypt(data).decode()
+        except InvalidToken:
+            logger.warning('Failed to decrypt job token from Redis')
+            return None
+
+    def get(self, user_id, default=None, now=None):
+        """Get the access token of the user or default if missing or
+        about to expire"""
+        token, source = self._lookup(user_id, now)
+        if source is None:
+            return default
+        JOB_TOKEN_REQUESTS.labels(source=source).inc()
+        return token
+
+    def get_or_exchange(self, user_id, exchange):
+        """
+        Get the access token of the user, calling exchange to get a new
+        token if none is cached.
+
+        Parameters
+        ----------
+        user_id : str
+            ID of the job user
+        exchange : function
+            Called with no arguments to get a new access token
+
+        Returns
+        -------
+        str
+            The access token
+        """
+        token = self.get(user_id)
+        if token is not None:
+            return token
+        with self._user_lock(user_id):
+            token = self.get(user_id)
+            if token is not None:
+                return token
+            lock = self._acquire_redis_lock(user_id)
+            try:
+                # another process may have exchanged the token while
+                # this one waited for the lock
+                token = self.get(user_id)
+                if token is None:
+                    JOB_TOKEN_REQUESTS.labels(source='exchange').inc()
+                    token = exchange()
+                    self.set(user_id, token)
+            finally:
+                self._release_redis_lock(user_id, lock)
+        return token
+
+    @contextmanager
+    def _user_lock(self, user_id):
+        """Hold the lock of the user in this process, which is dropped
+        once no thread holds or waits for it"""
+        with self._user_locks_lock:
+            entry = self._user_locks.setdefault(user_id, [Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._user_locks_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._user_locks[user_id]
+
+    def _acquire_redis_lock(self, user_id):
+        """Wait until no other process is exchanging the token of the
+        user and return the value of the lock, or None if the lock could
+        not be acquired"""
+        if self.redis_conn is None:
+            return None
+        key = self.lock_prefix + user_id
+        value = str(uuid.uuid4())
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while not self.redis_conn.set(key, value, nx=True,
+                                          ex=max(int(self.lock_timeout), 1)):
+                if time.monotonic() >= deadline:
+                    logger.warning('Timed out waiting for the job token '
+                                   'of user %s', user_id)
+                    return None
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            logger.warning('Failed to lock job token in Redis: %r', e)
+            return None
+        return value
+
+    def _release_redis_lock(self, user_id, value):
+        if value is None:
+            return
+        key = self.lock_prefix + user_id
+        try:
+            with self.redis_conn.pipeline() as pipe:
+                pipe.watch(key)
+                current = pipe.get(key)
+                if current in (value, value.encode()):
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+        except WatchError:
+            # the lock expired and was taken by another process
+            pass
+        except Exception as e:
+            logger.warning('Failed to unlock job token in Redis: %r', e)
+
+
+def job_token_cache():
+    """Get the cache of access tokens of job users for the application,
+    creating it on first use. Tokens are encrypted in Redis with
+    config['TOKEN_ENCRYPTION_KEY'] unless config['JOB_TOKEN_USE_REDIS']
+    is False and are dropped config['JOB_TOKEN_EXPIRY_MARGIN'] seconds
+    before they expire. Workers load only their config file, so settings
+    missing from it are taken from sfa_api.config.Config.
+    """
+    if not hasattr(current_app, 'job_token_cache'):
+        config = current_app.config
+
+        def setting(name):
+            return config.get(name, getattr(Config, name))
+
+        redis_conn = None
+        if setting('JOB_TOKEN_USE_REDIS'):
+            if config.get('USE_FAKE_REDIS', False):
+                from fakeredis import FakeStrictRedis
+                redis_conn = FakeStrictRedis()
+            else:
+                redis_conn = make_redis_connection(config)
+        cache = JobTokenCache(
+            Fernet(config['TOKEN_ENCRYPTION_KEY']), redis_conn,
+            float(setting('JOB_TOKEN_EXPIRY_MARGIN')),
+            float(setting('JOB_TOKEN_LOCK_TIMEOUT')))
+        setattr(current_app, 'job_token_cache', cache)
+    return getattr(current_app, 'job_token_cache')
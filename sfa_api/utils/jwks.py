@@ -0,0 +1,256 @@
+"""
+Lazily load and cache the JSON Web Key Set (JWKS) used to verify
+access tokens issued by Auth0. Keys are only fetched when the first
+token is verified instead of when the configuration is imported, so
+processes that never verify a token never contact Auth0.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from threading import Lock, Thread
+import time
+
+
+from flask import current_app
+from jose import jwt
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSProvider:
+    """
+    Provide the JWKS, loading it on first use from (in order) memory,
+    Redis, a local file, and finally the network. Keys fetched from the
+    network are written back to Redis and the local file.
+
+    Parameters
+    ----------
+    url : str
+        URL of the JWKS, e.g. https://tenant.auth0.com/.well-known/jwks.json
+    path : str, optional
+        Path to a JSON file with the JWKS. If the file exists it is used to
+        seed the keys, and it is updated whenever the keys are fetched.
+    redis_conn : redis.Redis, optional
+        Redis connection used to share the keys between processes.
+    min_refresh_interval : float
+        Minimum number of seconds between fetches from the network when
+        a token signed by an unknown key is encountered.
+    refresh_wait : float
+        Maximum number of seconds to wait for a background refresh
+        to finish before verifying with the keys already loaded.
+    timeout : float
+        Timeout of the request for the JWKS.
+    """
+    redis_key = 'jwks'
+    redis_ttl = 86400
+
+    def __init__(self, url, path=None, redis_conn=None,
+                 min_refresh_interval=300, refresh_wait=3.0, timeout=5.0):
+        self.url = url
+        self.path = path
+        self.redis_conn = redis_conn
+        self.min_refresh_interval = min_refresh_interval
+        self.refresh_wait = refresh_wait
+        self.timeout = timeout
+        self._keys = None
+        self._last_fetch = None
+        self._refresh_thread = None
+        self._lock = Lock()
+
+    @property
+    def kids(self):
+        """Key IDs of the currently loaded keys"""
+        if self._keys is None:
+            return set()
+        return {k.get('kid') for k in self._keys.get('keys', [])}
+
+    def get_keys(self, token=None):
+        """
+        Get the JWKS to verify token with.
+
+        Parameters
+        ----------
+        token : str, optional
+            If the key ID in the token header is not one of the loaded keys,
+            the keys are refreshed in the background and, if the refresh
+            finishes within refresh_wait seconds, the new keys are returned.
+
+        Returns
+        -------
+        dict
+            The JWKS
+
+        Raises
+        ------
+        requests.exceptions.RequestException
+            If no keys could be loaded from any source
+        """
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._keys = self._load()
+        if token is not None and self._has_unknown_kid(token):
+            thread = self.refresh_in_background()
+            if thread is not None:
+                thread.join(self.refresh_wait)
+        return self._keys
+
+    def _has_unknown_kid(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.JWTError:
+            # invalid tokens fail verification anyway
+            return False
+        return kid is not None and kid not in self.kids
+
+    def refresh_in_background(self):
+        """Fetch the keys from the network in a background thread unless
+        a refresh is already running or happened recently.
+
+        Returns
+        -------
+        threading.Thread or None
+            The thread doing the refresh or None if no refresh was started
+        """
+        with self._lock:
+            if (
+                    self._refresh_thread is not None and
+                    self._refresh_thread.is_alive()
+            ):
+                return self._refresh_thread
+            if (
+                    self._last_fetch is not None and
+                    time.monotonic() - self._last_fetch <
+                    self.min_refresh_interval
+            ):
+                return None
+            # set here so failures also back off
+            self._last_fetch = time.monotonic()
+            thread = Thread(target=self.refresh, daemon=True)
+            thread.start()
+            self._refresh_thread = thread
+        return thread
+
+    def refresh(self):
+        """Fetch the keys from the network and update all caches"""
+        try:
+            keys = self._fetch()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error('Failed to refresh JWKS: %r', e)
+            return
+        self._keys = keys
+
+    def _load(self):
+        keys = self._load_from_redis()
+        if keys is None:
+            keys = self._load_from_file()
+            if keys is not None:
+                self._store_in_redis(keys)
+        if keys is None:
+            self._last_fetch = time.monotonic()
+            keys = self._fetch()
+        return keys
+
+    def _fetch(self):
+        logger.info('Fetching JWKS from %s', self.url)
+        req = requests.get(self.url, timeout=self.timeout)
+        req.raise_for_status()
+        keys = req.json()
+        if 'keys' not in keys:
+            raise ValueError('No keys in JWKS response')
+        self._store_in_redis(keys)
+        self._store_in_file(keys)
+        return keys
+
+    def _load_from_redis(self):
+        if self.redis_conn is None:
+            return None
+        try:
+            keys = self.redis_conn.get(self.redis_key)
+        except Exception as e:
+            logger.warning('Failed to read JWKS from Redis: %r', e)
+            return None
+        if keys is None:
+            return None
+        return json.loads(keys)
+
+    def _store_in_redis(self, keys):
+        if self.redis_conn is None:
+            return
+        try:
+            self.redis_conn.set(self.redis_key, json.dumps(keys),
+                                ex=self.redis_ttl)
+        except Exception as e:
+            logger.warning('Failed to store JWKS in Redis: %r', e)
+
+    def _load_from_file(self):
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                keys = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning('Failed to read JWKS from %s: %r', self.path, e)
+            return None
+        if 'keys' not in keys:
+            return None
+        return keys
+
+    def _store_in_file(self, keys):
+        if self.path is None:
+            return
+        path = Path(self.path)
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(keys, f)
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning('Failed to write JWKS to %s: %r', self.path, e)
+
+
+def jwks_provider():
+    """Get the JWKSProvider for the application, creating it on first use.
+    The keys are seeded from and saved to config['JWKS_FILE'] if set
+    and shared in the auth0 Redis database if config['JWKS_USE_REDIS']
+    is True.
+    """
+    if not hasattr(current_app, 'jwks_provider'):
+        config = current_app.config
+        redis_conn = None
+        if config.get('JWKS_USE_REDIS', False):
+            from sfa_api.utils.auth0_info import token_redis_connection
+            redis_conn = token_redis_connection()
+        provider = JWKSProvider(
+            config['AUTH0_BASE_URL'] + '/.well-known/jwks.json',
+            path=config.get('JWKS_FILE'),
+            redis_conn=redis_conn)
+        setattr(current_app, 'jwks_provider', provider)
+    return getattr(current_app, 'jwks_provider')
+
+
+def get_jwt_key(token=None):
+    """Get the key(s) to verify a token issued by Auth0. A key set
+    explicitly in config['JWT_KEY'] takes precedence over the JWKS
+    provided by :py:func:`jwks_provider`.
+
+    Parameters
+    ----------
+    token : str, optional
+        The token that will be verified, used to refresh the keys if
+        it was signed with an unknown key.
+
+    Returns
+    -------
+    dict
+        The JWKS or key
+    """
+    key = current_app.config.get('JWT_KEY')
+    if key is not None:
+        return key
+    return jwks_provider().get_keys(token)
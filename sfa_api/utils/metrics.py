@@ -0,0 +1,45 @@
+"""
+Prometheus metrics for parts of the API that are not covered by the
+per-URL metrics from prometheus_flask_exporter. prometheus_client is an
+optional dependency (installed with the 'metrics' extra); when it is
+missing, metrics are silently discarded. When the
+prometheus_multiproc_dir environment variable is set, as in
+gunicorn_config.py, prometheus_client aggregates metrics from all
+worker processes.
+"""
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+
+class _NoopMetric:
+    """Stand-in for a metric when prometheus_client is not installed"""
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    """Make a prometheus_client.Histogram, or a no-op stand-in if
+    prometheus_client is not available"""
+    if prometheus_client is None:  # pragma: no cover
+        return _NoopMetric()
+    kwargs = {}
+    if buckets is not None:
+        kwargs['buckets'] = buckets
+    return prometheus_client.Histogram(name, documentation, labelnames,
+                                       **kwargs)
+
+
+def counter(name, documentation, labelnames=()):
+    """Make a prometheus_client.Counter, or a no-op stand-in if
+    prometheus_client is not available"""
+    if prometheus_client is None:  # pragma: no cover
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
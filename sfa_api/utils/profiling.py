@@ -0,0 +1,251 @@
+"""
+Profile individual requests on demand. Users whose auth0 ids are in
+config['PROFILE_USERS'] may send the header ``X-Profile: 1`` to have
+their request profiled with cProfile. The profile is stored, in the
+marshal format read by :py:class:`pstats.Stats`, in
+config['PROFILE_DIR'] if set or otherwise in Redis for
+config['PROFILE_TTL'] seconds. The ID of the profile is returned in the
+``X-Profile-Id`` response header and the profile can be retrieved with
+:py:func:`load_profile` or ``sfa-api profile``.
+
+At most config['PROFILE_MAX_CONCURRENT'] requests are profiled at once
+by each worker; requests over the limit are served without profiling.
+When running under gevent, the profiler is paused whenever the greenlet
+serving the profiled request switches out so that other requests are
+not included in the profile. greenlet only allows a single trace
+function per thread, so one trace function is installed while any
+request is profiled and it notifies each active profiler of switches.
+"""
+import cProfile
+import logging
+import marshal
+from pathlib import Path
+from threading import BoundedSemaphore, Lock
+import uuid
+
+
+from flask import _request_ctx_stack, current_app, request
+
+
+try:
+    import greenlet
+except ImportError:  # pragma: no cover
+    greenlet = None
+
+
+logger = logging.getLogger(__name__)
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+
+# profilers of the greenlets serving profiled requests, notified of
+# switches by _trace_switches
+_active_profilers = set()
+_active_lock = Lock()
+# trace function installed before _trace_switches, called after it
+_previous_trace = None
+
+
+def _trace_switches(event, args):
+    for profiler in list(_active_profilers):
+        profiler._switch(event, args)
+    if _previous_trace is not None:
+        _previous_trace(event, args)
+
+
+def _add_active_profiler(profiler):
+    global _previous_trace
+    with _active_lock:
+        if not _active_profilers:
+            _previous_trace = greenlet.settrace(_trace_switches)
+        _active_profilers.add(profiler)
+
+
+def _remove_active_profiler(profiler):
+    global _previous_trace
+    with _active_lock:
+        if profiler not in _active_profilers:
+            return
+        _active_profilers.discard(profiler)
+        if not _active_profilers:
+            greenlet.settrace(_previous_trace)
+            _previous_trace = None
+
+
+class RequestProfiler:
+    """
+    Wraps a cProfile.Profile that is only enabled while the greenlet that
+    started it is running, if greenlet is available.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.greenlet = None
+
+    def start(self):
+        if greenlet is not None:
+            self.greenlet = greenlet.getcurrent()
+            _add_active_profiler(self)
+        try:
+            self.profile.enable()
+        except ValueError:
+            # another profiler is active
+            self._remove_trace()
+            raise
+
+    def stop(self):
+        self.profile.disable()
+        self._remove_trace()
+
+    def _remove_trace(self):
+        if self.greenlet is not None:
+            _remove_active_profiler(self)
+            self.greenlet = None
+
+    def _switch(self, event, args):
+        if event in ('switch', 'throw'):
+            origin, target = args
+            if origin is self.greenlet:
+                self.profile.disable()
+            elif target is self.greenlet:
+                self.profile.enable()
+
+    def dumps(self):
+        """The profile in the marshal format read by pstats.Stats"""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+def _profile_semaphore():
+    if not hasattr(current_app, 'profile_semaphore'):
+        semaphore = BoundedSemaphore(
+            current_app.config['PROFILE_MAX_CONCURRENT'])
+        setattr(current_app, 'profile_semaphore', semaphore)
+    return getattr(current_app, 'profile_semaphore')
+
+
+def profile_redis_connection():
+    """Make a connection to the Redis database profiles are stored in.
+    The connection is stored on the application for reuse.
+    """
+    if not hasattr(current_app, 'profile_redis_conn'):
+        if current_app.config.get('USE_FAKE_REDIS', False):
+            from fakeredis import FakeStrictRedis
+            conn = FakeStrictRedis()
+        else:
+            from sfa_api.utils.queuing import make_redis_connection
+            conn = make_redis_connection(current_app.config)
+        setattr(current_app, 'profile_redis_conn', conn)
+    return getattr(current_app, 'profile_redis_conn')
+
+
+def _redis_key(profile_id):
+    return f'profile:{profile_id}'
+
+
+def store_profile(profile_id, data):
+    directory = current_app.config.get('PROFILE_DIR')
+    if directory:
+        path = Path(directory) / f'{profile_id}.prof'
+        path.write_bytes(data)
+    else:
+        profile_redis_connection().set(
+            _redis_key(profile_id), data,
+            ex=current_app.config['PROFILE_TTL'])
+
+
+def load_profile(profile_id):
+    """
+    Load a stored profile.
+
+    Parameters
+    ----------
+    profile_id : str
+        The ID from the X-Profile-Id header of the profiled request.
+
+    Returns
+    -------
+    bytes or None
+        The profile, which can be written to a file and read with
+        pstats.Stats, or None if there is no profile with the ID.
+
+    Raises
+    ------
+    ValueError
+        If profile_id is not a UUID
+    """
+    profile_id = str(uuid.UUID(profile_id))
+    directory = current_app.config.get('PROFILE_DIR')
+    if directory:
+        path = Path(directory) / f'{profile_id}.prof'
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+    return profile_redis_connection().get(_redis_key(profile_id))
+
+
+def _may_profile():
+    if request.headers.get(PROFILE_HEADER, '') not in ('1', 'true'):
+        return False
+    users = [u.strip() for u in
+             current_app.config.get('PROFILE_USERS', '').split(',')]
+    user = getattr(_request_ctx_stack.top, 'user', '')
+    return bool(user) and user in users
+
+
+def start_profiling():
+    """Start profiling the request if it was requested by an allowed
+    user. Must run after the user is authenticated."""
+    if not _may_profile():
+        return
+    semaphore = _profile_semaphore()
+    if not semaphore.acquire(blocking=False):
+        logger.info('Too many profiled requests, not profiling %s',
+                    request.path)
+        return
+    profiler = RequestProfiler()
+    try:
+        profiler.start()
+    except ValueError as e:
+        semaphore.release()
+        logger.warning('Unable to profile %s: %r', request.path, e)
+        return
+    _request_ctx_stack.top.profiler = profiler
+
+
+def _stop_profiler():
+    ctx = _request_ctx_stack.top
+    profiler = getattr(ctx, 'profiler', None)
+    if profiler is None:
+        return None
+    ctx.profiler = None
+    profiler.stop()
+    _profile_semaphore().release()
+    return profiler
+
+
+def finish_profiling(response):
+    profiler = _stop_profiler()
+    if profiler is None:
+        return response
+    profile_id = str(uuid.uuid4())
+    try:
+        store_profile(profile_id, profiler.dumps())
+    except Exception as e:
+        logger.error('Failed to store profile: %r', e)
+    else:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def _teardown_profiling(exc):
+    # stop a profiler left running by an unhandled exception
+    _stop_profiler()
+
+
+def register_profiling(app):
+    """Stop profiling after each request, profiling is started by
+    :py:func:`start_profiling` which must be registered after
+    authentication."""
+    app.after_request(finish_profiling)
+    app.teardown_request(_teardown_profiling)
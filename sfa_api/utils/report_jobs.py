@@ -0,0 +1,260 @@
+"""
+Queuing of report computations so that there is at most one compute_report
+job for each report. The ID of the active job of a report is kept in Redis
+under :py:data:`ACTIVE_KEY`. A request to compute a report that has a
+queued job does nothing, since the queued job will compute the current
+report. A request while the job is running stores its access token under
+:py:data:`RERUN_KEY`, encrypted with config['TOKEN_ENCRYPTION_KEY'], and
+however many requests arrive while it runs, the job queues a single new
+computation of the report with the token of the latest request when it
+finishes. Without config['TOKEN_ENCRYPTION_KEY'] the rerun can not be
+stored and such requests are skipped. Jobs are saved before the key
+pointing to them is set so that a request never finds a key without its
+job.
+"""
+import datetime as dt
+import logging
+import time
+import uuid
+
+
+from cryptography.fernet import Fernet, InvalidToken
+from flask import current_app
+from redis import WatchError
+from rq import Queue, get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+from solarforecastarbiter.io.utils import HiddenToken
+from solarforecastarbiter.reports.main import compute_report
+
+
+from sfa_api.utils.in_process_api import in_process_api
+from sfa_api.utils.metrics import counter, histogram
+
+
+logger = logging.getLogger(__name__)
+ACTIVE_KEY = 'sfa:report_job:{}'
+RERUN_KEY = 'sfa:report_rerun:{}'
+# the keys only outlive their job if a worker dies, they are otherwise
+# replaced once the job they point to is no longer queued or running
+KEY_TTL = 86400
+REPORT_JOB_REQUESTS = counter(
+    'sfa_api_report_job_requests_total',
+    'Requests to compute a report by outcome: enqueued, deduplicated '
+    'while a job is queued, rerun after the running job, or skipped '
+    'while a job is running without a TOKEN_ENCRYPTION_KEY',
+    ['outcome'])
+REPORT_QUEUE_WAIT = histogram(
+    'sfa_api_report_queue_wait_seconds',
+    'Time compute_report jobs wait in the queue',
+    buckets=(1, 5, 15, 60, 300, 900, 3600, float('inf')))
+REPORT_COMPUTE_DURATION = histogram(
+    'sfa_api_report_compute_seconds',
+    'Time to compute a report',
+    buckets=(5, 15, 60, 120, 300, 600, 1200, 3600, float('inf')))
+_PENDING = (JobStatus.QUEUED, JobStatus.DEFERRED, JobStatus.SCHEDULED)
+
+
+def _job_status(connection, job_id):
+    if job_id is None:
+        return None
+    try:
+        return Job.fetch(job_id.decode(), connection=connection).get_status()
+    except NoSuchJobError:
+        return None
+
+
+def _create_job(queue, access_token, report_id, base_url, job_timeout):
+    """Save a queued compute_report_job that is not yet in the queue, so
+    that the key pointing to it can be set before it is enqueued with
+    :py:func:`_enqueue`"""
+    job = queue.create_job(
+        compute_report_job,
+        args=(access_token, report_id),
+        kwargs={'base_url': base_url},
+        job_id=f'compute_report-{report_id}-{uuid.uuid4()}',
+        result_ttl=0,
+        timeout=job_timeout
+    )
+    job.save()
+    return job
+
+
+def _enqueue(queue, job, access_token, report_id, base_url, job_timeout):
+    queue.enqueue(
+        compute_report_job,
+        access_token,
+        report_id,
+        base_url=base_url,
+        job_id=job.id,
+        result_ttl=0,
+        job_timeout=job_timeout
+    )
+
+
+def _fernet():
+    return Fernet(current_app.config['TOKEN_ENCRYPTION_KEY'])
+
+
+def _encrypt_token(access_token):
+    token = getattr(access_token, 'token', access_token)
+    return _fernet().encrypt(token.encode())
+
+
+def _decrypt_token(encrypted):
+    """The access token stored with a rerun or None if it can not be
+    decrypted"""
+    try:
+        return HiddenToken(_fernet().decrypt(encrypted).decode())
+    except InvalidToken:
+        return None
+
+
+def enqueue_compute_report(queue, access_token, report_id, base_url,
+                           job_timeout):
+    """
+    Queue the computation of a report unless it is already queued.
+
+    Parameters
+    ----------
+    queue : rq.Queue
+    access_token : solarforecastarbiter.io.utils.HiddenToken
+        Token the job uses to read and post the report.
+    report_id : str
+    base_url : str
+        URL of the API for the job.
+    job_timeout : int
+        Seconds the computation may run.
+
+    Returns
+    -------
+    str
+        enqueued if a job was queued, deduplicated if a job of the report
+        was already queued, rerun if the running job of the report
+        will queue another computation when it finishes, or skipped if
+        the job is running and config['TOKEN_ENCRYPTION_KEY'] is not set
+        to store the access token of the rerun.
+    """
+    connection = queue.connection
+    active_key = ACTIVE_KEY.format(report_id)
+    rerun_key = RERUN_KEY.format(report_id)
+    job = None
+    while True:
+        with connection.pipeline() as pipe:
+            try:
+                pipe.watch(active_key)
+                status = _job_status(connection, pipe.get(active_key))
+                if status in _PENDING:
+                    outcome = 'deduplicated'
+                elif status == JobStatus.STARTED:
+                    if current_app.config['TOKEN_ENCRYPTION_KEY'] is None:
+                        outcome = 'skipped'
+                    else:
+                        outcome = 'rerun'
+                else:
+                    outcome = 'enqueued'
+                    if job is None:
+                        job = _create_job(queue, access_token, report_id,
+                                          base_url, job_timeout)
+                pipe.multi()
+                if outcome == 'rerun':
+                    pipe.set(rerun_key, _encrypt_token(access_token),
+                             ex=KEY_TTL)
+                elif outcome == 'enqueued':
+                    pipe.set(active_key, job.id, ex=KEY_TTL)
+                    pipe.delete(rerun_key)
+                pipe.execute()
+            except WatchError:
+                continue
+        break
+    REPORT_JOB_REQUESTS.labels(outcome=outcome).inc()
+    if outcome == 'skipped':
+        logger.warning('TOKEN_ENCRYPTION_KEY is not set, so report %s is '
+                       'not computed again after its running job',
+                       report_id)
+    if outcome == 'enqueued':
+        _enqueue(queue, job, access_token, report_id, base_url, job_timeout)
+    elif job is not None:
+        # created before another request queued a job
+        job.delete()
+    return outcome
+
+
+def _finish(job, report_id, base_url):
+    """Release the report, or queue its rerun with the access token of
+    the latest request if one was requested"""
+    connection = job.connection
+    queue = Queue(job.origin, connection=connection)
+    active_key = ACTIVE_KEY.format(report_id)
+    rerun_key = RERUN_KEY.format(report_id)
+    rerun_job = None
+    while True:
+        access_token = None
+        with connection.pipeline() as pipe:
+            try:
+                pipe.watch(active_key, rerun_key)
+                active = pipe.get(active_key)
+                if active is None or active.decode() != job.id:
+                    break
+                encrypted = pipe.get(rerun_key)
+                if encrypted is not None:
+                    access_token = _decrypt_token(encrypted)
+                    if access_token is None:
+                        logger.error('Unable to decrypt the access token '
+                                     'to rerun report %s', report_id)
+                    elif rerun_job is None:
+                        rerun_job = _create_job(queue, access_token,
+                                                report_id, base_url,
+                                                job.timeout)
+                pipe.multi()
+                if access_token is not None:
+                    pipe.set(active_key, rerun_job.id, ex=KEY_TTL)
+                else:
+                    pipe.delete(active_key)
+                pipe.delete(rerun_key)
+                pipe.execute()
+            except WatchError:
+                # a new request may have replaced the access token
+                if rerun_job is not None:
+                    rerun_job.delete()
+                    rerun_job = None
+                continue
+        break
+    if access_token is not None:
+        logger.info('Rerunning report %s', report_id)
+        _enqueue(queue, rerun_job, access_token, report_id, base_url,
+                 job.timeout)
+    elif rerun_job is not None:
+        rerun_job.delete()
+
+
+def compute_report_job(access_token, report_id, base_url=None):
+    """
+    Compute a report as the job queued by
+    :py:func:`enqueue_compute_report`, recording the time the job waited
+    in the queue and the time to compute the report.
+
+    Parameters
+    ----------
+    access_token : solarforecastarbiter.io.utils.HiddenToken
+    report_id : str
+    base_url : str or None
+
+    Returns
+    -------
+    str
+        The ID of the report.
+    """
+    job = get_current_job()
+    wait = (dt.datetime.utcnow() - job.enqueued_at).total_seconds()
+    REPORT_QUEUE_WAIT.observe(wait)
+    start = time.perf_counter()
+    try:
+        with in_process_api():
+            return compute_report(access_token, report_id, base_url=base_url)
+    finally:
+        duration = time.perf_counter() - start
+        REPORT_COMPUTE_DURATION.observe(duration)
+        logger.info('Report %s waited %.1f s in the queue and was computed '
+                    'in %.1f s', report_id, wait, duration)
+        _finish(job, report_id, base_url)
@@ -0,0 +1,96 @@
+"""
+Sectioned, compressed storage of raw reports. The plots of a raw report
+are usually much larger than the rest of it, so the raw report is split
+into sections that are compressed and stored separately, and views that
+only need the metrics or the summary read only those sections.
+
+Each section is the JSON object of the keys of the raw report in the
+section, compressed in the format of the MySQL COMPRESS function, the
+length of the uncompressed string as a little-endian 32 bit integer
+followed by the zlib compressed string, so that the sections can also be
+read and written in SQL.
+"""
+import struct
+import zlib
+
+
+# keys of the raw report in each section, the summary holds all keys
+# that are not in another section
+SECTION_KEYS = {
+    'metrics': ('metrics',),
+    'plots': ('plots',),
+    'data_checksum': ('data_checksum',),
+}
+RAW_REPORT_SECTIONS = ('summary', *SECTION_KEYS)
+_LENGTH = struct.Struct('<I')
+
+
+def split_raw_report(raw_report):
+    """
+    Split a raw report into sections.
+
+    Parameters
+    ----------
+    raw_report : dict
+
+    Returns
+    -------
+    dict
+        The dict of the keys of raw_report in each of
+        RAW_REPORT_SECTIONS keyed by the section.
+    """
+    out = {section: {key: raw_report[key] for key in keys
+                     if key in raw_report}
+           for section, keys in SECTION_KEYS.items()}
+    other_keys = {key for keys in SECTION_KEYS.values() for key in keys}
+    out['summary'] = {key: value for key, value in raw_report.items()
+                      if key not in other_keys}
+    return {section: out[section] for section in RAW_REPORT_SECTIONS}
+
+
+def select_sections(raw_report, sections):
+    """The keys of raw_report in sections"""
+    split = split_raw_report(raw_report)
+    out = {}
+    for section in sections:
+        out.update(split[section])
+    return out
+
+
+def compress_section(section):
+    """
+    Compress the JSON string of a section like MySQL COMPRESS.
+
+    Parameters
+    ----------
+    section : str
+
+    Returns
+    -------
+    bytes
+    """
+    data = section.encode()
+    if not data:
+        return b''
+    return _LENGTH.pack(len(data)) + zlib.compress(data)
+
+
+def decompress_section(data):
+    """
+    Decompress a section made by :py:func:`compress_section` or MySQL
+    COMPRESS.
+
+    Parameters
+    ----------
+    data : bytes
+
+    Returns
+    -------
+    str
+    """
+    data = bytes(data)
+    if not data:
+        return ''
+    # COMPRESS may append a '.' after the zlib stream, which the
+    # decompressor leaves in unused_data
+    return zlib.decompressobj().decompress(data[_LENGTH.size:]).decode()
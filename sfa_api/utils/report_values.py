@@ -0,0 +1,211 @@
+"""
+Compact storage of the processed values of reports. Clients post the
+processed values of each object as the JSON string made by
+:py:func:`solarforecastarbiter.io.utils.serialize_timeseries`, which is
+several times larger than the data it holds. Before storage, the string
+is parsed into numpy columns, the timestamps as differences in seconds
+and the values as 64 bit numbers, whose bytes are shuffled so that
+zlib compresses them well. Strings that can not be stored as columns
+without changing their meaning are stored as compressed text.
+
+A payload is :py:data:`MAGIC`, a version byte, and the zlib compressed
+body. The body is the length of a JSON header as a little-endian 32 bit
+integer, the header, and the arrays described by the header. Values
+stored before this encoding was introduced are plain JSON and are read
+as is.
+"""
+from io import BytesIO
+import json
+import struct
+import zipfile
+import zlib
+
+
+import numpy as np
+import pandas as pd
+
+
+MAGIC = b'\x89SFV'
+VERSION = 1
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+def _shuffle(arr):
+    """Group the nth bytes of each element together"""
+    return np.ascontiguousarray(
+        arr.astype(arr.dtype.newbyteorder('<')).view(np.uint8).reshape(
+            -1, arr.dtype.itemsize).T).tobytes()
+
+
+def _unshuffle(data, dtype, length):
+    dtype = np.dtype(dtype).newbyteorder('<')
+    return np.frombuffer(data, dtype=np.uint8).reshape(
+        dtype.itemsize, length).T.copy().view(dtype).ravel()
+
+
+def _column_dtype(values):
+    if all(type(v) is int for v in values):
+        return 'int64'
+    if all(v is None or type(v) in (int, float) for v in values):
+        return 'float64'
+    return None
+
+
+def _parse_timeseries(values):
+    """The header and arrays of serialized timeseries or None"""
+    try:
+        parsed = json.loads(values)
+    except ValueError:
+        return None
+    if (
+            not isinstance(parsed, dict) or
+            list(parsed.keys()) != ['schema', 'data'] or
+            not isinstance(parsed['schema'], dict) or
+            not isinstance(parsed['data'], list) or
+            not parsed['data'] or
+            not all(isinstance(r, dict) for r in parsed['data'])
+    ):
+        return None
+    records = parsed['data']
+    keys = list(records[0].keys())
+    if not keys or keys[0] != 'timestamp':
+        return None
+    # records that differ from the first are caught by the check of
+    # the decoded values in encode_processed_values
+    try:
+        # numpy parses the UTC timestamps, without the Z, much faster
+        # than pandas
+        seconds = np.array([r['timestamp'][:-1] for r in records],
+                           dtype='datetime64[s]').astype('int64')
+        columns = []
+        arrays = [np.diff(seconds, prepend=0)]
+        for key in keys[1:]:
+            column = [r[key] for r in records]
+            dtype = _column_dtype(column)
+            if dtype is None:
+                return None
+            arrays.append(np.array(
+                [np.nan if v is None else v for v in column], dtype=dtype))
+            columns.append([key, dtype])
+    except (KeyError, OverflowError, TypeError, ValueError):
+        return None
+    header = {'format': 'timeseries', 'schema': parsed['schema'],
+              'length': len(records), 'columns': columns}
+    return header, arrays, parsed
+
+
+def _pack(header, blocks):
+    header_bytes = json.dumps(header).encode()
+    body = b''.join([_HEADER_LENGTH.pack(len(header_bytes)), header_bytes,
+                     *blocks])
+    return MAGIC + bytes([VERSION]) + zlib.compress(body)
+
+
+def _unpack(payload):
+    if payload[len(MAGIC)] != VERSION:
+        raise ValueError(
+            f'Unsupported processed values version {payload[len(MAGIC)]}')
+    body = zlib.decompress(payload[len(MAGIC) + 1:])
+    (length,) = _HEADER_LENGTH.unpack_from(body)
+    start = _HEADER_LENGTH.size + length
+    return json.loads(body[_HEADER_LENGTH.size:start]), body[start:]
+
+
+def is_encoded(payload):
+    """Whether payload was made by :py:func:`encode_processed_values`"""
+    return bytes(payload[:len(MAGIC)]) == MAGIC
+
+
+def encode_processed_values(values):
+    """
+    Encode processed values for storage.
+
+    Parameters
+    ----------
+    values : str
+        The processed values posted by a client, normally made by
+        solarforecastarbiter.io.utils.serialize_timeseries.
+
+    Returns
+    -------
+    bytes
+        The compressed payload, which :py:func:`decode_processed_values`
+        turns back into a string with the same JSON data as values.
+    """
+    timeseries = _parse_timeseries(values)
+    if timeseries is not None:
+        header, arrays, parsed = timeseries
+        payload = _pack(header, [_shuffle(arr) for arr in arrays])
+        # timestamps with fractional seconds or other formats and
+        # values that pandas would write differently can't be stored
+        # as columns
+        if json.loads(decode_processed_values(payload)) == parsed:
+            return payload
+    return _pack({'format': 'text'}, [values.encode()])
+
+
+def decode_processed_values(payload):
+    """
+    Decode stored processed values to the JSON string posted by clients.
+
+    Parameters
+    ----------
+    payload : bytes
+        Made by :py:func:`encode_processed_values` or the UTF-8 encoded
+        string of values stored before the encoding was introduced.
+
+    Returns
+    -------
+    str
+    """
+    if not is_encoded(payload):
+        return bytes(payload).decode()
+    header, data = _unpack(bytes(payload))
+    if header['format'] == 'text':
+        return data.decode()
+    length = header['length']
+    size = 8 * length
+    seconds = np.cumsum(_unshuffle(data[:size], 'int64', length))
+    # formatting the timestamps with numpy is much faster than having
+    # pandas format a tz-aware column
+    df = pd.DataFrame({'timestamp': np.datetime_as_string(
+        seconds.astype('datetime64[s]'), unit='s', timezone='UTC')})
+    for i, (name, dtype) in enumerate(header['columns']):
+        df[name] = _unshuffle(data[size * (i + 1):size * (i + 2)], dtype,
+                              length)
+    jsonvals = df.to_json(orient='records', double_precision=10)
+    return '{"schema":' + json.dumps(header['schema']) + ',"data":' + \
+        jsonvals + '}'
+
+
+def ensure_encoded(payload):
+    """Encode stored values that predate the encoding"""
+    if is_encoded(payload):
+        return bytes(payload)
+    return encode_processed_values(bytes(payload).decode())
+
+
+def make_values_archive(values):
+    """
+    Make a zip archive of the encoded processed values of a report.
+
+    Parameters
+    ----------
+    values : list of dict
+        Processed values with keys id, object_id, and processed_values,
+        the encoded payload.
+
+    Returns
+    -------
+    bytes
+        A zip archive with a member named by the id of each set of
+        processed values holding the payload as stored, and a
+        manifest.json member listing the id and object_id of each.
+    """
+    out = BytesIO()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr('manifest.json', json.dumps(
+            [{'id': v['id'], 'object_id': v['object_id']} for v in values]))
+        for value in values:
+            zf.writestr(value['id'], value['processed_values'])
+    return out.getvalue()
@@ -2,20 +2,24 @@ from collections import defaultdict
 from io import StringIO
 import json
 import re
+from uuid import UUID
 
 
-from flask import request, current_app
+from flask import request, current_app, jsonify, url_for
 import numpy as np
 import pandas as pd
-from solarforecastarbiter.datamodel import Forecast, Site
+from solarforecastarbiter.datamodel import ALLOWED_VARIABLES, Forecast, Site
 from solarforecastarbiter.reference_forecasts import utils as fx_utils
 from werkzeug.exceptions import RequestEntityTooLarge
 
 
 from sfa_api.utils.errors import (
     BadAPIRequest, NotFoundException, StorageAuthError)
+from sfa_api.utils.serialization import dump_list
+from sfa_api.utils.timing import phase, timed
 
 
+@timed('validate')
 def validate_observation_values(observation_df, quality_flag_range=(0, 1)):
     """
     Validate the columns of an observation value DataFrame.
@@ -143,6 +147,7 @@ def parse_json(json_str):
     return value_df
 
 
+@timed('parse')
 def parse_values(decoded_data, mimetype):
     """Attempts to parse a string of data into a DataFrame based on MIME type.
 
@@ -240,11 +245,12 @@ def validate_parsable_values():
     content_length = int(request.headers.get('Content-Length', 0))
     if (content_length > current_app.config['MAX_CONTENT_LENGTH']):
         raise RequestEntityTooLarge
-    if request.mimetype == 'multipart/form-data':
-        decoded_data, mimetype = decode_file_in_request_body()
-    else:
-        decoded_data = request.get_data(as_text=True)
-        mimetype = request.mimetype
+    with phase('decode'):
+        if request.mimetype == 'multipart/form-data':
+            decoded_data, mimetype = decode_file_in_request_body()
+        else:
+            decoded_data = request.get_data(as_text=True)
+            mimetype = request.mimetype
     value_df = parse_values(decoded_data, mimetype)
     return value_df
 
@@ -319,6 +325,7 @@ def validate_start_end():
     return start, end
 
 
+@timed('validate')
 def validate_index_period(index, interval_length, previous_time):
     """
     Validate that the index conforms to interval_length.
@@ -370,6 +377,7 @@ def validate_index_period(index, interval_length, previous_time):
         raise BadAPIRequest({'timestamp': errors})
 
 
+@timed('validate')
 def validate_forecast_values(forecast_df):
     """Validates that posted values are parseable and of the expectedtypes.
 
@@ -513,6 +521,7 @@ def validate_latitude_longitude():
     return lat, lon
 
 
+@timed('validate')
 def validate_event_data(data):
     """
     Validate that the data is either 0 or 1
@@ -531,3 +540,134 @@ def validate_event_data(data):
         indx = isbool.reset_index()[~isbool.values].index.astype('str')
         raise BadAPIRequest({'value': [
             'Invalid event values at locations %s' % ', '.join(indx)]})
+
+
+# the list procedures take limit as a signed 32 bit integer
+MAX_LIST_LIMIT = 2**31 - 1
+
+
+def _parse_uuid_arg(name, errors):
+    value = request.args.get(name, None)
+    if value is None:
+        return None
+    try:
+        UUID(value)
+    except ValueError:
+        errors.update({name: ['Must be a UUID']})
+    return value
+
+
+def validate_list_arguments(schema, filters=()):
+    """Parse the pagination, filter, and projection query parameters
+    of an endpoint that lists metadata.
+
+    Parameters
+    ----------
+    schema: marshmallow.Schema subclass
+        Schema used to dump the listed objects. Requested fields must be
+        fields of this schema.
+    filters: tuple of str
+        The filters supported by the endpoint, any of 'site_id',
+        'aggregate_id', and 'variable'.
+
+    Returns
+    -------
+    dict
+        Keyword arguments for the storage list function with keys limit,
+        cursor, fields, and each of the filters.
+
+    Raises
+    ------
+    BadAPIRequest
+        If any of the query parameters are invalid.
+    """
+    errors = {}
+    out = {}
+    limit = request.args.get('limit', None)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            errors.update({'limit': ['Must be an integer']})
+        else:
+            if limit < 1 or limit > MAX_LIST_LIMIT:
+                errors.update({'limit': [
+                    f'Must be within [1, {MAX_LIST_LIMIT}]']})
+    out['limit'] = limit
+    out['cursor'] = _parse_uuid_arg('cursor', errors)
+    fields = request.args.get('fields', None)
+    if fields is not None:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = set(fields) - set(schema().fields.keys())
+        if unknown:
+            errors.update({'fields': [
+                f'Unknown fields: {", ".join(sorted(unknown))}']})
+        elif not fields:
+            errors.update({'fields': ['Must provide at least one field']})
+    out['fields'] = fields
+    for filter_ in ('site_id', 'aggregate_id'):
+        if filter_ in filters:
+            out[filter_] = _parse_uuid_arg(filter_, errors)
+    if 'variable' in filters:
+        variable = request.args.get('variable', None)
+        if variable is not None and variable not in ALLOWED_VARIABLES:
+            errors.update({'variable': ['Not a valid variable']})
+        out['variable'] = variable
+    if errors:
+        raise BadAPIRequest(errors)
+    return out
+
+
+def make_list_response(objects, schema, list_args, id_field):
+    """Make the JSON response of an endpoint that lists metadata. When
+    a full page was returned, a Link header with the URL of the next page
+    is added.
+
+    Parameters
+    ----------
+    objects: list of dict
+        The objects to dump.
+    schema: marshmallow.Schema subclass
+        Schema used to dump the objects.
+    list_args: dict
+        The arguments returned by :py:func:`validate_list_arguments`.
+    id_field: str
+        Name of the field that identifies objects and is used as the
+        cursor of the next page.
+
+    Returns
+    -------
+    flask.Response
+    """
+    response = jsonify(
+        dump_list(schema, objects, only=list_args['fields']))
+    return add_next_page_link(response, objects, list_args, id_field)
+
+
+def add_next_page_link(response, objects, list_args, id_field):
+    """Add a Link header with the URL of the next page to the response
+    of a paged endpoint when a full page was returned.
+
+    Parameters
+    ----------
+    response: flask.Response
+    objects: list of dict
+        The objects in the response.
+    list_args: dict
+        The arguments returned by :py:func:`validate_list_arguments`.
+    id_field: str
+        Name of the field that identifies objects and is used as the
+        cursor of the next page.
+
+    Returns
+    -------
+    flask.Response
+    """
+    limit = list_args['limit']
+    if limit is not None and len(objects) == limit:
+        args = request.args.to_dict()
+        args['cursor'] = objects[-1][id_field]
+        next_url = url_for(request.endpoint, _external=True,
+                           **request.view_args, **args)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
@@ -0,0 +1,152 @@
+"""
+Fast serialization of lists of metadata. Dumping a list with
+``Schema(many=True).dump`` looks up every field of every object through
+marshmallow's generic accessors and calls :py:func:`flask.url_for` for
+each of the hyperlinks of every object, which dominates the time to
+list thousands of objects. :py:func:`dump_list` produces the same output
+while resolving the fields once per list and building each hyperlink
+from a URL template made with a single call to url_for.
+"""
+import re
+
+
+from flask import url_for
+from flask_marshmallow.fields import Hyperlinks, URLFor, _tpl
+from marshmallow import missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from werkzeug.routing import BuildError
+
+
+# values that can be substituted into a URL template without quoting
+_URL_SAFE_VALUE = re.compile(r'^[0-9A-Za-z-]+$')
+
+
+class _URLTemplate:
+    """The URL of a URLFor field with placeholders in place of the
+    values taken from the object being serialized"""
+    def __init__(self, field):
+        self.field = field
+        self.placeholders = []
+        # flask-marshmallow 0.12 moved the url_for arguments from
+        # params to values
+        values = getattr(field, 'values', None)
+        if values is None:
+            values = field.params
+        params = {}
+        for i, (name, attr_tpl) in enumerate(values.items()):
+            attr_name = _tpl(str(attr_tpl))
+            if attr_name:
+                if '.' in attr_name:
+                    raise ValueError('Nested attributes are not supported')
+                placeholder = f'SFAPARAM{i}X'
+                self.placeholders.append((placeholder, attr_name))
+                params[name] = placeholder
+            else:
+                params[name] = attr_tpl
+        self.url = url_for(field.endpoint, **params)
+
+    def render(self, key, obj):
+        url = self.url
+        for placeholder, attr_name in self.placeholders:
+            value = obj.get(attr_name, missing)
+            if value is None:
+                return None
+            if (
+                    not isinstance(value, str) or
+                    _URL_SAFE_VALUE.match(value) is None
+            ):
+                return self.field.serialize(key, obj)
+            url = url.replace(placeholder, value)
+        return url
+
+
+def _compile_links(schema):
+    """Replace the URLFor fields in a Hyperlinks schema with templates"""
+    if isinstance(schema, dict):
+        return {k: _compile_links(v) for k, v in schema.items()}
+    if isinstance(schema, (list, tuple)):
+        return [_compile_links(v) for v in schema]
+    if isinstance(schema, URLFor):
+        return _URLTemplate(schema)
+    return schema
+
+
+def _render_links(compiled, key, obj):
+    if isinstance(compiled, dict):
+        return {k: _render_links(v, key, obj) for k, v in compiled.items()}
+    if isinstance(compiled, list):
+        return [_render_links(v, key, obj) for v in compiled]
+    if isinstance(compiled, _URLTemplate):
+        return compiled.render(key, obj)
+    return compiled
+
+
+def _compile_field(attr_name, field):
+    """Make a function of (obj) returning the serialized value of the
+    field or missing"""
+    if isinstance(field, (URLFor, Hyperlinks)):
+        try:
+            if isinstance(field, URLFor):
+                compiled = _URLTemplate(field)
+            else:
+                compiled = _compile_links(field.schema)
+        except (AttributeError, BuildError, ValueError):
+            return lambda obj: field.serialize(attr_name, obj)
+        return lambda obj: _render_links(compiled, attr_name, obj)
+
+    if (
+            field.attribute is not None or
+            field.default is not missing or
+            '.' in attr_name
+    ):
+        return lambda obj: field.serialize(attr_name, obj)
+
+    serialize = field._serialize
+
+    def get(obj):
+        value = obj.get(attr_name, missing)
+        if value is missing:
+            return missing
+        return serialize(value, attr_name, obj)
+    return get
+
+
+def dump_list(schema_class, objects, only=None):
+    """
+    Serialize a list of objects, equivalent to
+    ``schema_class(many=True, only=only).dump(objects)``.
+
+    Parameters
+    ----------
+    schema_class: marshmallow.Schema subclass
+        Schema used to dump the objects.
+    objects: list of dict
+        The objects to dump.
+    only: list of str, optional
+        Names of the fields to include, all fields if None.
+
+    Returns
+    -------
+    list of dict
+    """
+    schema = schema_class(many=True, only=only)
+    if (
+            schema._has_processors(PRE_DUMP) or
+            schema._has_processors(POST_DUMP) or
+            not all(isinstance(obj, dict) for obj in objects)
+    ):
+        return schema.dump(objects)
+    fields = [
+        (field.data_key if field.data_key is not None else attr_name,
+         _compile_field(attr_name, field))
+        for attr_name, field in schema.dump_fields.items()
+    ]
+    out = []
+    for obj in objects:
+        ser = {}
+        for key, get in fields:
+            value = get(obj)
+            if value is not missing:
+                ser[key] = value
+        out.append(ser)
+    return out
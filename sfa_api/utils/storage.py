@@ -5,10 +5,14 @@ def get_storage():
     """Return a handle to the storage interface object.
     See sfa_api.utils.storage_interface.
 
-    A non-persistent, in-memory storage backend can be used
-    for development by setting the 'STATIC_DATA' config variable.
+    A non-persistent, in-memory storage backend, sfa_api.demo, can be
+    used for development by setting the 'SFA_API_STATIC_DATA' config
+    variable.
     """
     if not hasattr(current_app, 'storage'):
-        import sfa_api.utils.storage_interface as storage
+        if current_app.config.get('SFA_API_STATIC_DATA', False):
+            import sfa_api.demo as storage
+        else:
+            import sfa_api.utils.storage_interface as storage
         current_app.storage = storage
     return current_app.storage
@@ -8,14 +8,17 @@ from contextlib import contextmanager
 from copy import deepcopy
 import datetime as dt
 from functools import partial
+import logging
 import math
 import random
 import re
+from threading import Lock
+import time
 import uuid
 
 
 from cryptography.fernet import Fernet
-from flask import current_app
+from flask import current_app, _request_ctx_stack
 import numpy as np
 import pandas as pd
 import pymysql
@@ -27,11 +30,21 @@ from sqlalchemy.pool import QueuePool
 
 from sfa_api import schema, json
 from sfa_api.utils import auth0_info
-from sfa_api.utils.auth import current_user
+from sfa_api.utils.auth import current_user, user_existence_cache
+from sfa_api.utils.caching import TTLCache
 from sfa_api.utils.errors import (StorageAuthError, DeleteRestrictionError,
                                   BadAPIRequest)
+from sfa_api.utils.metrics import counter, histogram
+from sfa_api.utils.report_values import (encode_processed_values,
+                                         decode_processed_values,
+                                         ensure_encoded)
+from sfa_api.utils.report_sections import (
+    RAW_REPORT_SECTIONS, split_raw_report, select_sections,
+    compress_section, decompress_section)
+from sfa_api.utils.timing import phase, timed
 
 
+logger = logging.getLogger(__name__)
 # min and max timestamps storable in mysql
 MINTIMESTAMP = pd.Timestamp('19700101T000001Z')
 MAXTIMESTAMP = pd.Timestamp('20380119T031407Z')
@@ -53,6 +66,74 @@ POWER_VARIABLES = ['ac_power', 'dc_power', 'poa_global', 'curtailment',
                    'availability']
 
 
+METADATA_CACHE_REQUESTS = counter(
+    'sfa_api_metadata_cache_requests_total',
+    'Reads of object metadata by cache result',
+    ('object_type', 'result'))
+MYSQL_POOL_WAIT = histogram(
+    'sfa_api_mysql_pool_wait_seconds',
+    'Time spent waiting for a connection from the pool',
+    ('procedure',),
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5,
+             5, 10))
+MYSQL_EXECUTE_TIME = histogram(
+    'sfa_api_mysql_execute_seconds',
+    'Time spent executing a stored procedure or query',
+    ('procedure',))
+MYSQL_FETCH_TIME = histogram(
+    'sfa_api_mysql_fetch_seconds',
+    'Time spent fetching the results of a stored procedure or query',
+    ('procedure',))
+MYSQL_ROWS = histogram(
+    'sfa_api_mysql_rows',
+    'Number of rows returned by a stored procedure or query',
+    ('procedure',),
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000))
+MYSQL_ERRORS = counter(
+    'sfa_api_mysql_errors_total',
+    'MySQL errors raised by stored procedures or queries by error code',
+    ('procedure', 'code'))
+
+
+def _schema_fields(schema_class, exclude=()):
+    return tuple(key for key in schema_class().fields.keys()
+                 if key not in exclude)
+
+
+# Field names used to build the metadata dicts from database rows. These
+# are computed once since instantiating a schema for every row is slow.
+MODELING_PARAMETERS_FIELDS = _schema_fields(schema.ModelingParameters)
+SITE_FIELDS = _schema_fields(schema.SiteResponseSchema,
+                             ('modeling_parameters',))
+OBSERVATION_FIELDS = _schema_fields(schema.ObservationSchema, ('_links',))
+FORECAST_FIELDS = _schema_fields(schema.ForecastSchema, ('_links',))
+CDF_FORECAST_FIELDS = _schema_fields(schema.CDFForecastSchema,
+                                     ('_links', 'modified_at'))
+CDF_FORECAST_GROUP_FIELDS = _schema_fields(
+    schema.CDFForecastGroupSchema, ('_links', 'constant_values'))
+AGGREGATE_FIELDS = _schema_fields(schema.AggregateSchema, ('observations',))
+# metadata of each type of object returned by read_pair_metadata, the
+# fields used to check the compatibility of report object pairs
+_PAIR_FIELDS = ('variable', 'interval_label', 'interval_length')
+PAIR_METADATA_FIELDS = {
+    'forecasts': ('forecast_id', *_PAIR_FIELDS, 'site_id', 'aggregate_id'),
+    'cdf_forecasts': ('forecast_id', *_PAIR_FIELDS, 'site_id',
+                      'aggregate_id', 'axis'),
+    'cdf_forecasts_singles': ('forecast_id', 'parent', *_PAIR_FIELDS,
+                              'site_id', 'aggregate_id', 'axis',
+                              'constant_value'),
+    'observations': ('observation_id', *_PAIR_FIELDS, 'site_id'),
+    'aggregates': ('aggregate_id', *_PAIR_FIELDS),
+}
+_PAIR_ID_FIELDS = {
+    'forecasts': 'forecast_id',
+    'cdf_forecasts': 'forecast_id',
+    'cdf_forecasts_singles': 'forecast_id',
+    'observations': 'observation_id',
+    'aggregates': 'aggregate_id',
+}
+
+
 def generate_uuid():
     """Generate a version 1 UUID and ensure clock_seq is random"""
     return str(uuid.uuid1(clock_seq=random.SystemRandom().getrandbits(14)))
@@ -114,7 +195,7 @@ def convert_datetime_utc(obj):
     return pytz.utc.localize(unlocalized)
 
 
-def _make_sql_connection_partial():
+def _make_sql_connection_partial(host=None):
     config = current_app.config
     conv = converters.conversions.copy()
     # either convert decimals to floats, or add decimals to schema
@@ -127,7 +208,7 @@ def _make_sql_connection_partial():
     conv[dt.datetime] = escape_datetime
     conv[float] = escape_float_with_nan
     connect_kwargs = {
-        'host': config['MYSQL_HOST'],
+        'host': host or config['MYSQL_HOST'],
         'port': int(config['MYSQL_PORT']),
         'user': config['MYSQL_USER'],
         'password': config['MYSQL_PASSWORD'],
@@ -143,28 +224,129 @@ def _make_sql_connection_partial():
     return getconn
 
 
-def mysql_connection():
+def _make_pool(host=None):
+    getconn = _make_sql_connection_partial(host)
+    # use create engine to make pool in order to properly set dialect
+    return create_engine('mysql+pymysql://',
+                         creator=getconn,
+                         poolclass=QueuePool,
+                         pool_recycle=3600,
+                         pool_pre_ping=True).pool
+
+
+class ReplicaPool:
+    """
+    Connection pool for a read replica that tracks how far the replica
+    lags behind the primary.
+
+    Parameters
+    ----------
+    host : str
+        Host of the replica.
+    pool : sqlalchemy.pool.Pool
+        Pool of connections to the replica.
+    max_lag : float
+        The replica is not used when replication is stopped or it is more
+        than this many seconds behind the primary.
+    check_interval : float
+        Seconds between checks of the replication lag.
+    """
+    def __init__(self, host, pool, max_lag, check_interval):
+        self.host = host
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self._last_check = None
+        self._lock = Lock()
+
+    @property
+    def usable(self):
+        """Whether the replica is caught up enough to be read from,
+        checking the lag first if the last check is too old"""
+        now = time.monotonic()
+        if (
+                self._last_check is None or
+                now - self._last_check >= self.check_interval
+        ):
+            # only one thread checks while the others use the last result
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._last_check = now
+                    self.lag = self._read_lag()
+                finally:
+                    self._lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def _read_lag(self):
+        try:
+            connection = self.pool.connect()
+        except Exception as e:
+            logger.warning('Failed to connect to replica %s: %r',
+                           self.host, e)
+            return None
+        try:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)
+            cursor.execute('SHOW SLAVE STATUS')
+            status = cursor.fetchone()
+        except Exception as e:
+            logger.warning('Failed to read the status of replica %s: %r',
+                           self.host, e)
+            return None
+        finally:
+            connection.close()
+        if status is None:
+            logger.warning('%s is not a replica', self.host)
+            return None
+        # None when replication is stopped
+        return status['Seconds_Behind_Master']
+
+    def connect(self):
+        return self.pool.connect()
+
+
+def replica_pools():
+    """Get a :py:class:`ReplicaPool` for each host in
+    config['MYSQL_REPLICA_HOSTS'], creating them on first use"""
+    if not hasattr(current_app, 'mysql_replicas'):
+        config = current_app.config
+        hosts = [h.strip() for h in
+                 config.get('MYSQL_REPLICA_HOSTS', '').split(',')
+                 if h.strip()]
+        replicas = [
+            ReplicaPool(host, _make_pool(host),
+                        config['MYSQL_REPLICA_MAX_LAG'],
+                        config['MYSQL_REPLICA_LAG_CHECK_INTERVAL'])
+            for host in hosts]
+        setattr(current_app, 'mysql_replicas', replicas)
+    return getattr(current_app, 'mysql_replicas')
+
+
+def mysql_connection(replica=False):
+    """Get a connection from the pool for the primary database or, if
+    replica is True, from the pool of a randomly chosen replica that is
+    not lagging too far behind. Falls back to the primary when no replica
+    is configured or usable."""
+    if replica:
+        replicas = [r for r in replica_pools() if r.usable]
+        if replicas:
+            return random.choice(replicas).connect()
     if not hasattr(current_app, 'mysql_connection'):
-        getconn = _make_sql_connection_partial()
-        # use create engine to make pool in order to properly set dialect
-        mysqlpool = create_engine('mysql+pymysql://',
-                                  creator=getconn,
-                                  poolclass=QueuePool,
-                                  pool_recycle=3600,
-                                  pool_pre_ping=True).pool
-        current_app.mysql_connection = mysqlpool
+        current_app.mysql_connection = _make_pool()
     return current_app.mysql_connection.connect()
 
 
 @contextmanager
-def get_cursor(cursor_type, commit=True):
+def get_cursor(cursor_type, commit=True, replica=False, label='query'):
     if cursor_type == 'standard':
         cursorclass = pymysql.cursors.Cursor
     elif cursor_type == 'dict':
         cursorclass = pymysql.cursors.DictCursor
     else:
         raise AttributeError('cursor_type must be standard or dict')
-    connection = mysql_connection()
+    start = time.perf_counter()
+    connection = mysql_connection(replica=replica)
+    MYSQL_POOL_WAIT.labels(label).observe(time.perf_counter() - start)
     cursor = connection.cursor(cursor=cursorclass)
     try:
         yield cursor
@@ -178,12 +360,14 @@ def get_cursor(cursor_type, commit=True):
         connection.close()
 
 
-def try_query(query_cmd):
+def try_query(query_cmd, label='query'):
+    start = time.perf_counter()
     try:
         query_cmd()
     except (pymysql.err.OperationalError, pymysql.err.IntegrityError,
             pymysql.err.InternalError) as e:
         ecode = e.args[0]
+        MYSQL_ERRORS.labels(label, str(ecode)).inc()
         if ecode == 1142 or ecode == 1143 or ecode == 1411 or ecode == 1216:
             raise StorageAuthError(e.args[1])
         elif ecode == 1451 or ecode == 1217:
@@ -192,6 +376,88 @@ def try_query(query_cmd):
             raise BadAPIRequest({'error': e.args[1]})
         else:
             raise
+    finally:
+        MYSQL_EXECUTE_TIME.labels(label).observe(time.perf_counter() - start)
+
+
+def _fetchall(cursor, label='query'):
+    start = time.perf_counter()
+    result = cursor.fetchall()
+    MYSQL_FETCH_TIME.labels(label).observe(time.perf_counter() - start)
+    MYSQL_ROWS.labels(label).observe(len(result))
+    return result
+
+
+# Procedures that only read data and may be sent to a read replica.
+# Procedures that read data in preparation for a write, like
+# read_metadata_for_value_write, must see the latest data and are not
+# included.
+READ_ONLY_PROCEDURES = frozenset((
+    'find_cdf_forecast_gaps',
+    'find_cdf_single_forecast_gaps',
+    'find_climate_zones',
+    'find_forecast_gaps',
+    'find_observation_gaps',
+    'find_unflagged_observation_dates',
+    'get_current_user_info',
+    'get_user_actions_on_object',
+    'get_user_creatable_types',
+    'list_actions_on_all_objects_of_type',
+    'list_aggregates',
+    'list_cdf_forecasts_groups_filtered',
+    'list_cdf_forecasts_singles',
+    'list_climate_zones',
+    'list_forecasts_filtered',
+    'list_observations_filtered',
+    'list_permissions',
+    'list_reports',
+    'list_roles',
+    'list_sites',
+    'list_sites_in_zone',
+    'list_users',
+    'read_aggregate',
+    'read_aggregate_values',
+    'read_cdf_forecast_time_range',
+    'read_cdf_forecast_values',
+    'read_cdf_forecasts_group',
+    'read_cdf_forecasts_single',
+    'read_climate_zone',
+    'read_forecast',
+    'read_forecast_time_range',
+    'read_forecast_values',
+    'read_latest_cdf_forecast_value',
+    'read_latest_forecast_value',
+    'read_latest_observation_value',
+    'read_observation',
+    'read_observation_time_range',
+    'read_observation_values',
+    'read_pair_metadata',
+    'read_permission',
+    'read_report',
+    'read_report_object_values',
+    'read_report_sections',
+    'read_report_values',
+    'read_report_values_manifest',
+    'read_report_values_page',
+    'read_role',
+    'read_site',
+    'read_user',
+    'read_user_id',
+))
+
+
+def _use_replica(procedure_name):
+    """Whether a procedure may be sent to a read replica. Once a
+    procedure that is not read-only is called during a request, all
+    later procedures of the request go to the primary so that the
+    request reads its own writes."""
+    ctx = _request_ctx_stack.top
+    if ctx is None:
+        return False
+    if procedure_name not in READ_ONLY_PROCEDURES:
+        ctx.read_primary = True
+        return False
+    return not getattr(ctx, 'read_primary', False)
 
 
 def _call_procedure(
@@ -201,15 +467,17 @@ def _call_procedure(
     Will not handle OUT or INOUT parameters without first setting
     local variables and retrieving from those variables
     """
-    with get_cursor(cursor_type) as cursor:
+    replica = _use_replica(procedure_name)
+    with phase(procedure_name), get_cursor(
+            cursor_type, replica=replica, label=procedure_name) as cursor:
         if with_current_user:
             new_args = (current_user, *args)
         else:
             new_args = args
         query = f'CALL {procedure_name}({",".join(["%s"] * len(new_args))})'
         query_cmd = partial(cursor.execute, query, new_args)
-        try_query(query_cmd)
-        return cursor.fetchall()
+        try_query(query_cmd, procedure_name)
+        return _fetchall(cursor, procedure_name)
 
 
 def _call_procedure_for_single(procedure_name, *args, cursor_type='dict',
@@ -225,37 +493,81 @@ def _call_procedure_for_single(procedure_name, *args, cursor_type='dict',
     return result
 
 
+def metadata_cache():
+    """Get the process-local cache of object metadata, creating it on
+    first use. Entries are keyed by (user, object_id), so access is still
+    checked by the database the first time each user reads an object, and
+    expire after config['METADATA_CACHE_TTL'] seconds. The cache is
+    disabled when config['METADATA_CACHE_SIZE'] is 0. Use
+    ``metadata_cache().stats()`` to inspect the hit rate."""
+    if not hasattr(current_app, 'metadata_cache'):
+        config = current_app.config
+        cache = TTLCache(maxsize=config.get('METADATA_CACHE_SIZE', 4096),
+                         ttl=config.get('METADATA_CACHE_TTL', 30))
+        setattr(current_app, 'metadata_cache', cache)
+    return getattr(current_app, 'metadata_cache')
+
+
+def _read_cached_metadata(object_type, object_id, read):
+    """Return a copy of the cached metadata of object_id for the current
+    user, calling read() to get and cache the metadata when missing"""
+    cache = metadata_cache()
+    key = (str(current_user), object_id)
+    metadata = cache.get(key)
+    if metadata is None:
+        METADATA_CACHE_REQUESTS.labels(object_type, 'miss').inc()
+        metadata = read()
+        cache.set(key, metadata)
+    else:
+        METADATA_CACHE_REQUESTS.labels(object_type, 'hit').inc()
+    # callers may modify the returned dict
+    return deepcopy(metadata)
+
+
+def invalidate_metadata(object_id=None):
+    """Remove the cached metadata of object_id for all users in this
+    process, or all cached metadata if object_id is None. Other
+    processes keep their entries until the TTL passes."""
+    cache = metadata_cache()
+    if object_id is None:
+        cache.clear()
+    else:
+        cache.delete_matching(lambda key: key[1] == object_id)
+
+
 def _set_modeling_parameters(site_dict):
-    out = {}
-    modeling_parameters = {}
-    for key in schema.ModelingParameters().fields.keys():
-        modeling_parameters[key] = site_dict[key]
-    for key in schema.SiteResponseSchema().fields.keys():
-        if key == 'modeling_parameters':
-            out[key] = modeling_parameters
-        else:
-            out[key] = site_dict[key]
+    out = {key: site_dict[key] for key in SITE_FIELDS}
+    out['modeling_parameters'] = {
+        key: site_dict[key] for key in MODELING_PARAMETERS_FIELDS}
     return out
 
 
 def _set_observation_parameters(observation_dict):
-    out = {}
-    for key in schema.ObservationSchema().fields.keys():
-        if key in ('_links',):
-            continue
-        out[key] = observation_dict[key]
-    return out
+    return {key: observation_dict[key] for key in OBSERVATION_FIELDS}
 
 
 def _set_forecast_parameters(forecast_dict):
-    out = {}
-    for key in schema.ForecastSchema().fields.keys():
-        if key in ('_links', ):
-            continue
-        out[key] = forecast_dict[key]
-    return out
+    return {key: forecast_dict[key] for key in FORECAST_FIELDS}
+
+
+def _with_extra(fields):
+    """Whether extra_parameters must be read for a list limited to fields"""
+    return fields is None or 'extra_parameters' in fields
+
+
+def _project(objects, fields, id_field):
+    """Limit each dict in objects to fields and the id_field. The
+    site_id and aggregate_id are also kept when _links is requested
+    since the links are built from them."""
+    if fields is None:
+        return objects
+    keep = set(fields) | {id_field}
+    if '_links' in keep:
+        keep |= {'site_id', 'aggregate_id'}
+    return [{k: v for k, v in obj.items() if k in keep} for obj in objects]
 
 
+@timed('serialize')
 def _process_df_into_json(df, rounding=8):
     """Processes a Dataframe with DatetimeIndex and 'value' column
     (with optional 'quality_flag' column) into a json string of the
@@ -431,6 +743,7 @@ def update_observation(observation_id, *, name=None, uncertainty=None,
     _call_procedure(
         'update_observation', observation_id, name,
         uncertainty, extra_parameters, null_uncertainty)
+    invalidate_metadata(observation_id)
 
 
 def read_observation(observation_id):
@@ -447,8 +760,10 @@ def read_observation(observation_id):
         The Observation's metadata or None if the Observation
         does not exist.
     """
-    observation = _set_observation_parameters(
-        _call_procedure_for_single('read_observation', observation_id))
+    observation = _read_cached_metadata(
+        'observations', observation_id,
+        lambda: _set_observation_parameters(
+            _call_procedure_for_single('read_observation', observation_id)))
     return observation
 
 
@@ -466,9 +781,11 @@ def delete_observation(observation_id):
         If the user does not have permission to delete the observation
     """
     _call_procedure('delete_observation', observation_id)
+    invalidate_metadata(observation_id)
 
 
-def list_observations(site_id=None):
+def list_observations(site_id=None, variable=None, limit=None, cursor=None,
+                      fields=None):
     """Lists all observations a user has access to.
 
     Parameters
@@ -476,11 +793,25 @@ def list_observations(site_id=None):
     site_id: string
         UUID of Site, when supplied returns only Observations
         made for this Site.
+    variable: string
+        When supplied, returns only Observations of this variable.
+    limit: int
+        Maximum number of Observations to return.
+    cursor: string
+        UUID of an Observation, when supplied returns only Observations
+        after this Observation. Used with limit to page through the
+        Observations.
+    fields: list
+        Names of the fields to return. extra_parameters is only read
+        from the database when included. The observation_id is kept as
+        well to page with, but API responses include only the requested
+        fields.
 
     Returns
     -------
     list
-        List of dictionaries of Observation metadata.
+        List of dictionaries of Observation metadata ordered by
+        observation_id.
 
     Raises
     ------
@@ -488,12 +819,11 @@ def list_observations(site_id=None):
         If the user does not have access to observations with site_id or
         no observations exists for that id
     """
-    if site_id is not None:
-        read_site(site_id)
     observations = [_set_observation_parameters(obs)
-                    for obs in _call_procedure('list_observations')
-                    if site_id is None or obs['site_id'] == site_id]
-    return observations
+                    for obs in _call_procedure(
+                        'list_observations_filtered', site_id, variable,
+                        cursor, limit, _with_extra(fields))]
+    return _project(observations, fields, 'observation_id')
 
 
 # Forecasts
@@ -652,6 +982,7 @@ def update_forecast(forecast_id, *, name=None, extra_parameters=None):
     """
     _call_procedure(
         'update_forecast', forecast_id, name, extra_parameters)
+    invalidate_metadata(forecast_id)
 
 
 def read_forecast(forecast_id):
@@ -668,8 +999,10 @@ def read_forecast(forecast_id):
         The Forecast's metadata or None if the Forecast
         does not exist.
     """
-    forecast = _set_forecast_parameters(
-        _call_procedure_for_single('read_forecast', forecast_id))
+    forecast = _read_cached_metadata(
+        'forecasts', forecast_id,
+        lambda: _set_forecast_parameters(
+            _call_procedure_for_single('read_forecast', forecast_id)))
     return forecast
 
 
@@ -687,9 +1020,11 @@ def delete_forecast(forecast_id):
         If the user cannot delete the Forecast
     """
     _call_procedure('delete_forecast', forecast_id)
+    invalidate_metadata(forecast_id)
 
 
-def list_forecasts(site_id=None, aggregate_id=None):
+def list_forecasts(site_id=None, aggregate_id=None, variable=None,
+                   limit=None, cursor=None, fields=None):
     """Lists all Forecasts a user has access to.
 
     Parameters
@@ -700,24 +1035,42 @@ def list_forecasts(site_id=None, aggregate_id=None):
     aggregate_id: string
         UUID of the aggregate, when supplied returns only
         forecasts made for this aggregate.
+    variable: string
+        When supplied, returns only Forecasts of this variable.
+    limit: int
+        Maximum number of Forecasts to return.
+    cursor: string
+        UUID of a Forecast, when supplied returns only Forecasts
+        after this Forecast. Used with limit to page through the
+        Forecasts.
+    fields: list
+        Names of the fields to return. extra_parameters is only read
+        from the database when included. The forecast_id is kept as
+        well to page with, but API responses include only the requested
+        fields.
 
     Returns
     -------
     list
-        List of dictionaries of Forecast metadata.
+        List of dictionaries of Forecast metadata ordered by
+        forecast_id.
+
+    Raises
+    ------
+    StorageAuthError
+        If the user does not have access to the site or aggregate
+
+    Notes
+    -----
+    Filters are combined, so when both site_id and aggregate_id are
+    supplied no forecasts are returned since a forecast is made for
+    either a site or an aggregate.
     """
-    if site_id is not None:
-        read_site(site_id)
-    if aggregate_id is not None:
-        read_aggregate(aggregate_id)
     forecasts = [_set_forecast_parameters(fx)
-                 for fx in _call_procedure('list_forecasts')
-                 if (
-                     (site_id is None and aggregate_id is None) or
-                     (site_id and fx['site_id'] == site_id) or
-                     (aggregate_id and fx['aggregate_id'] == aggregate_id)
-    )]
-    return forecasts
+                 for fx in _call_procedure(
+                     'list_forecasts_filtered', site_id, aggregate_id,
+                     variable, cursor, limit, _with_extra(fields))]
+    return _project(forecasts, fields, 'forecast_id')
 
 
 def read_site(site_id):
@@ -738,8 +1091,10 @@ def read_site(site_id):
     StorageAuthError
         If the user does not have access to the site_id or it doesn't exist
     """
-    site = _set_modeling_parameters(
-        _call_procedure_for_single('read_site', site_id))
+    site = _read_cached_metadata(
+        'sites', site_id,
+        lambda: _set_modeling_parameters(
+            _call_procedure_for_single('read_site', site_id)))
     return site
 
 
@@ -804,6 +1159,7 @@ def update_site(
         backtrack, max_rotation_angle, dc_loss_factor,
         ac_loss_factor
     )
+    invalidate_metadata(site_id)
 
 
 def delete_site(site_id):
@@ -822,6 +1178,7 @@ def delete_site(site_id):
         If the site cannote be delete because other objects depend on it
     """
     _call_procedure('delete_site', site_id)
+    invalidate_metadata(site_id)
 
 
 def list_sites():
@@ -961,14 +1318,8 @@ def store_cdf_forecast(cdf_forecast):
 
 
 def _set_cdf_forecast_parameters(forecast_dict):
-    out = {}
-    for key in schema.CDFForecastSchema().fields.keys():
-        if key in ('_links', ):
-            continue
-        elif key == 'modified_at':
-            out[key] = forecast_dict['created_at']
-        else:
-            out[key] = forecast_dict[key]
+    out = {key: forecast_dict[key] for key in CDF_FORECAST_FIELDS}
+    out['modified_at'] = forecast_dict['created_at']
     return out
 
 
@@ -1081,18 +1432,10 @@ def store_cdf_forecast_group(cdf_forecast_group):
 
 
 def _set_cdf_group_forecast_parameters(forecast_dict):
-    out = {}
-    for key in schema.CDFForecastGroupSchema().fields.keys():
-        if key in ('_links', ):
-            continue
-        elif key == 'constant_values':
-            out[key] = []
-            constant_vals = forecast_dict['constant_values']
-            for single_id, val in constant_vals.items():
-                out[key].append({'forecast_id': single_id,
-                                 'constant_value': val})
-        else:
-            out[key] = forecast_dict[key]
+    out = {key: forecast_dict[key] for key in CDF_FORECAST_GROUP_FIELDS}
+    out['constant_values'] = [
+        {'forecast_id': single_id, 'constant_value': val}
+        for single_id, val in forecast_dict['constant_values'].items()]
     return out
 
 
@@ -1148,7 +1491,8 @@ def delete_cdf_forecast_group(forecast_id):
     _call_procedure('delete_cdf_forecasts_group', forecast_id)
 
 
-def list_cdf_forecast_groups(site_id=None, aggregate_id=None):
+def list_cdf_forecast_groups(site_id=None, aggregate_id=None, variable=None,
+                             limit=None, cursor=None, fields=None):
     """Lists all CDF Forecast Groups a user has access to.
 
     Parameters
@@ -1159,24 +1503,43 @@ def list_cdf_forecast_groups(site_id=None, aggregate_id=None):
     aggregate_id:
         UUID of aggregate, when supplied returns only CDF Forecast
         Groups made for this aggregate.
+    variable: string
+        When supplied, returns only CDF Forecast Groups of this variable.
+    limit: int
+        Maximum number of CDF Forecast Groups to return.
+    cursor: string
+        UUID of a CDF Forecast Group, when supplied returns only
+        groups after this group. Used with limit to page through
+        the CDF Forecast Groups.
+    fields: list
+        Names of the fields to return. extra_parameters is only read
+        from the database when included. The forecast_id is kept as
+        well to page with, but API responses include only the requested
+        fields.
 
     Returns
     -------
     list
-        List of dictionaries of CDF Forecast Group metadata.
+        List of dictionaries of CDF Forecast Group metadata ordered by
+        forecast_id.
+
+    Raises
+    ------
+    StorageAuthError
+        If the user does not have access to the site or aggregate
+
+    Notes
+    -----
+    Filters are combined, so when both site_id and aggregate_id are
+    supplied no forecasts are returned since a forecast is made for
+    either a site or an aggregate.
     """
-    if site_id is not None:
-        read_site(site_id)
-    if aggregate_id is not None:
-        read_aggregate(aggregate_id)
     forecasts = [_set_cdf_group_forecast_parameters(fx)
-                 for fx in _call_procedure('list_cdf_forecasts_groups')
-                 if (
-                     (site_id is None and aggregate_id is None) or
-                     (site_id and fx['site_id'] == site_id) or
-                     (aggregate_id and fx['aggregate_id'] == aggregate_id)
-    )]
-    return forecasts
+                 for fx in _call_procedure(
+                     'list_cdf_forecasts_groups_filtered', site_id,
+                     aggregate_id, variable, cursor, limit,
+                     _with_extra(fields))]
+    return _project(forecasts, fields, 'forecast_id')
 
 
 def list_users():
@@ -1228,6 +1591,8 @@ def remove_role_from_user(user_id, role_id):
     # the user could use this to determine if a user_id exists
     _call_procedure('remove_role_from_user',
                     role_id, user_id)
+    # access may have been revoked from any object
+    invalidate_metadata()
 
 
 def add_role_to_user(user_id, role_id):
@@ -1343,6 +1708,7 @@ def delete_role(role_id):
 
     """
     _call_procedure('delete_role', role_id)
+    invalidate_metadata()
 
 
 def add_permission_to_role(role_id, permission_id):
@@ -1391,6 +1757,7 @@ def remove_permission_from_role(role_id, permission_id):
           permission.
     """
     _call_procedure('remove_permission_from_role', permission_id, role_id)
+    invalidate_metadata()
 
 
 def read_permission(permission_id):
@@ -1430,6 +1797,7 @@ def delete_permission(permission_id):
         or the permission does not exist.
     """
     _call_procedure('delete_permission', permission_id)
+    invalidate_metadata()
 
 
 def list_permissions():
@@ -1500,7 +1868,7 @@ def add_object_to_permission(permission_id, uuid):
     """
     try:
         _call_procedure('add_object_to_permission',
-                        permission_id, uuid)
+                        uuid, permission_id)
     except pymysql.err.IntegrityError as e:
         ecode = e.args[0]
         if ecode == 1062:
@@ -1528,6 +1896,7 @@ def remove_object_from_permission(permission_id, uuid):
     """
     _call_procedure('remove_object_from_permission',
                     uuid, permission_id)
+    invalidate_metadata(uuid)
 
 
 def _decode_report_parameters(report):
@@ -1556,6 +1925,35 @@ def list_reports():
     return [_decode_report_parameters(r) for r in reports]
 
 
+def read_pair_metadata(object_ids):
+    """Read the metadata used to check the compatibility of the objects
+    of report object pairs for many objects in one call.
+
+    Parameters
+    ----------
+    object_ids: list of str
+        UUIDs of forecasts, probabilistic forecast groups and constant
+        values, observations and aggregates.
+
+    Returns
+    -------
+    dict
+        The fields of PAIR_METADATA_FIELDS of the objects the user can
+        read, keyed by object type and then by UUID. Objects that do not
+        exist or that the user can not read are left out.
+    """
+    out = {object_type: {} for object_type in PAIR_METADATA_FIELDS}
+    object_ids = [str(object_id) for object_id in object_ids]
+    if not object_ids:
+        return out
+    for row in _call_procedure('read_pair_metadata', json.dumps(object_ids)):
+        object_type = row['object_type']
+        row[_PAIR_ID_FIELDS[object_type]] = row['id']
+        out[object_type][row['id']] = {
+            key: row[key] for key in PAIR_METADATA_FIELDS[object_type]}
+    return out
+
+
 def store_report(report):
     """Store a report's metadata
 
@@ -1586,17 +1984,26 @@ def store_report(report):
     return report_id
 
 
-def read_report(report_id):
+def read_report(report_id, include_values=False, sections=None):
     """
     Parameters
     ----------
     report_id
         UUID of the report to read.
+    include_values: bool
+        Whether to also read the processed values of the report, which
+        may be much larger than the metadata.
+    sections: list of str or None
+        The sections of the raw report to read, from
+        sfa_api.utils.report_sections.RAW_REPORT_SECTIONS. All sections
+        are read when None.
 
     Returns
     -------
     dict
-        A dictionary of Report metadata.
+        A dictionary of Report metadata. The raw report only has the
+        keys of the requested sections. The processed values the user
+        can read are under the 'values' key when include_values is True.
 
     Raises
     ------
@@ -1604,13 +2011,20 @@ def read_report(report_id):
         If the report does not exist, or the the user does not have
         permission to read the report.
     """
-    report = _decode_report_parameters(
-        _call_procedure_for_single('read_report', report_id))
-    try:
-        report_values = read_report_values(report_id)
-    except StorageAuthError:
-        report_values = []
-    report['values'] = report_values
+    if sections is None:
+        sections = RAW_REPORT_SECTIONS
+    report = _call_procedure_for_single('read_report', report_id)
+    if sections:
+        report['raw_report'] = _read_raw_report(report, sections)
+    else:
+        report['raw_report'] = None
+    report = _decode_report_parameters(report)
+    if include_values:
+        try:
+            report_values = read_report_values(report_id)
+        except StorageAuthError:
+            report_values = []
+        report['values'] = report_values
     return report
 
 
@@ -1639,7 +2053,8 @@ def store_report_values(report_id, object_id, values):
     object_id: str
         UUID of the original object
     values: str
-        Temporary string values field
+        The serialized processed values, stored compressed, see
+        sfa_api.utils.report_values.
 
     Returns
     -------
@@ -1655,15 +2070,14 @@ def store_report_values(report_id, object_id, values):
         - If the user does not have access to the report.
     """
     uuid = generate_uuid()
-    # encode values? Should values be a dataframe?
-    # temporary dump to json and encode so we can pack this in a blob
-    values_bytes = values.encode()
+    with phase('encode'):
+        values_bytes = encode_processed_values(values)
     _call_procedure('store_report_values', uuid, str(report_id),
                     str(object_id), values_bytes)
     return uuid
 
 
-def read_report_values(report_id):
+def read_report_values(report_id, limit=None, cursor=None, encoded=False):
     """Returns all of the processed values in the report that the user has
     access too.
 
@@ -1671,26 +2085,100 @@ def read_report_values(report_id):
     ----------
     report_id: str
         UUID of the report associated with the data.
+    limit: int
+        Maximum number of processed values to return.
+    cursor: str
+        UUID of processed values, when supplied returns only the
+        processed values after these. Used with limit to page through
+        the processed values of the report.
+    encoded: bool
+        Return the processed values as the compressed bytes made by
+        sfa_api.utils.report_values.encode_processed_values instead of
+        the serialized string.
 
     Returns
     -------
     list
         List of processed data dicts containing a unique id, report_id,
-        original object_id and values in some serialized form.
+        original object_id and values in some serialized form. When
+        limit or cursor are supplied, the list is ordered by id.
 
     Raises
     ------
     StorageAuthError
         If the user does not have access to the report.
     """
-    values = _call_procedure('read_report_values', report_id)
-    # decode values?
-    # temporary decode from bytes
-    for row in values:
-        row['processed_values'] = row['processed_values'].decode()
+    if limit is None and cursor is None:
+        values = _call_procedure('read_report_values', report_id)
+    else:
+        values = _call_procedure('read_report_values_page', report_id,
+                                 cursor, limit)
+    convert = ensure_encoded if encoded else decode_processed_values
+    with phase('decode'):
+        for row in values:
+            row['processed_values'] = convert(row['processed_values'])
+    return values
+
+
+def read_report_object_values(report_id, object_id, encoded=False):
+    """Returns the processed values of one object in the report.
+
+    Parameters
+    ----------
+    report_id: str
+        UUID of the report associated with the data.
+    object_id: str
+        UUID of the original object.
+    encoded: bool
+        Return the processed values as the compressed bytes made by
+        sfa_api.utils.report_values.encode_processed_values instead of
+        the serialized string.
+
+    Returns
+    -------
+    list
+        List of processed data dicts containing a unique id, original
+        object_id and values in some serialized form, ordered by id.
+        Empty if no values of the object are stored in the report.
+
+    Raises
+    ------
+    StorageAuthError
+        If the user does not have access to the report or to the values
+        of the object.
+    """
+    values = _call_procedure('read_report_object_values', report_id,
+                             object_id)
+    convert = ensure_encoded if encoded else decode_processed_values
+    with phase('decode'):
+        for row in values:
+            row['processed_values'] = convert(row['processed_values'])
     return values
 
 
+def read_report_values_manifest(report_id):
+    """Lists the processed values in the report that the user has access
+    to without reading the values.
+
+    Parameters
+    ----------
+    report_id: str
+        UUID of the report associated with the data.
+
+    Returns
+    -------
+    list
+        List of dicts with the id, object_id, and size in bytes of the
+        stored processed values, ordered by id.
+
+    Raises
+    ------
+    StorageAuthError
+        If the user does not have access to the report.
+    """
+    return _call_procedure('read_report_values_manifest', report_id)
+
+
 def store_raw_report(report_id, raw_report):
     """
     Parameters
@@ -1698,16 +2186,35 @@ def store_raw_report(report_id, raw_report):
     report_id: str
         UUID of the report associated with the data.
     raw_report: dict
-        dict representation of the raw report.
+        dict representation of the raw report, stored in separately
+        compressed sections, see sfa_api.utils.report_sections.
 
     Raises
     ------
     StorageAuthError
         If the user does not have permission to update the report
     """
-    json_raw_report = dump_json_replace_nan(raw_report)
-    _call_procedure('store_raw_report', report_id,
-                    json_raw_report)
+    sections = split_raw_report(raw_report)
+    _call_procedure(
+        'store_raw_report_sections', report_id,
+        *[compress_section(dump_json_replace_nan(sections[section]))
+          for section in RAW_REPORT_SECTIONS])
+
+
+def _read_raw_report(report, sections):
+    """The sections of the raw report of report, read from the legacy
+    raw_report column when it was stored there"""
+    if report['raw_report'] is not None:
+        return select_sections(report['raw_report'], sections)
+    rows = _call_procedure('read_report_sections', report['report_id'],
+                           ','.join(sections))
+    if not rows:
+        return None
+    raw_report = {}
+    for row in sorted(rows, key=lambda r: sections.index(r['section'])):
+        raw_report.update(load_json_replace_nan(
+            decompress_section(row['data'])))
+    return raw_report
 
 
 def store_report_status(report_id, status):
@@ -1735,14 +2242,15 @@ def get_current_user_info():
 
 def create_new_user():
     user_id = _call_procedure_for_single('create_user_if_not_exists')
+    user_existence_cache().set(str(current_user), True)
     return user_id
 
 
 def user_exists():
-    with get_cursor('dict') as cursor:
+    with get_cursor('dict', label='does_user_exist') as cursor:
         query = 'SELECT does_user_exist(%s)'
         query_cmd = partial(cursor.execute, query, (current_user))
-        try_query(query_cmd)
+        try_query(query_cmd, 'does_user_exist')
         exists = cursor.fetchone()
     return exists.get(f"does_user_exist('{current_user}')") == 1
 
@@ -1909,21 +2417,17 @@ def update_aggregate(aggregate_id, *, name=None, description=None,
 
 
 def _set_aggregate_parameters(aggregate_dict):
-    out = {}
-    for key in schema.AggregateSchema().fields.keys():
-        if key == 'observations':
-            out[key] = []
-            for obs in aggregate_dict['observations']:
-                for tkey in ('created_at', 'observation_deleted_at',
-                             'effective_until', 'effective_from'):
-                    if obs[tkey] is not None:
-                        keydt = dt.datetime.fromisoformat(obs[tkey])
-                        if keydt.tzinfo is None:
-                            keydt = pytz.utc.localize(keydt)
-                        obs[tkey] = keydt
-                out[key].append(obs)
-        else:
-            out[key] = aggregate_dict[key]
+    out = {key: aggregate_dict[key] for key in AGGREGATE_FIELDS}
+    out['observations'] = []
+    for obs in aggregate_dict['observations']:
+        for tkey in ('created_at', 'observation_deleted_at',
+                     'effective_until', 'effective_from'):
+            if obs[tkey] is not None:
+                keydt = dt.datetime.fromisoformat(obs[tkey])
+                if keydt.tzinfo is None:
+                    keydt = pytz.utc.localize(keydt)
+                obs[tkey] = keydt
+        out['observations'].append(obs)
     return out
 
 
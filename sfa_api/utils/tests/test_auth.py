@@ -1,6 +1,7 @@
 import pytest
 from json.decoder import JSONDecodeError
 
+from flask import _request_ctx_stack
 from requests.exceptions import HTTPError
 
 from sfa_api.utils import auth
@@ -139,3 +140,129 @@ def test_request_user_info_failure(sql_app, user_id):
     with pytest.raises(HTTPError):
         auth.request_user_info()
     ctx.pop()
+
+
+def test_verified_token_cache_get_set():
+    cache = auth.VerifiedTokenCache(maxsize=2)
+    key = cache.make_key('token', 'aud', 'iss')
+    assert cache.get(key, now=100) is None
+    claims = {'sub': 'auth0|user', 'exp': 200}
+    cache.set(key, claims, now=100)
+    assert cache.get(key, now=150) == claims
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_verified_token_cache_expired():
+    cache = auth.VerifiedTokenCache()
+    cache.set('key', {'exp': 200}, now=100)
+    assert len(cache) == 1
+    assert cache.get('key', now=200) is None
+    assert len(cache) == 0
+    assert cache.misses == 1
+
+
+@pytest.mark.parametrize('claims', [
+    {'sub': 'noexp'},
+    {'exp': 'string'},
+    {'exp': 50},
+])
+def test_verified_token_cache_not_stored(claims):
+    cache = auth.VerifiedTokenCache()
+    cache.set('key', claims, now=100)
+    assert len(cache) == 0
+
+
+def test_verified_token_cache_lru():
+    cache = auth.VerifiedTokenCache(maxsize=2)
+    cache.set('a', {'exp': 200}, now=100)
+    cache.set('b', {'exp': 200}, now=100)
+    assert cache.get('a', now=100) is not None
+    cache.set('c', {'exp': 200}, now=100)
+    assert len(cache) == 2
+    assert cache.get('b', now=100) is None
+    assert cache.get('a', now=100) is not None
+    assert cache.get('c', now=100) is not None
+
+
+def test_verified_token_cache_disabled():
+    cache = auth.VerifiedTokenCache(maxsize=0)
+    cache.set('a', {'exp': 200}, now=100)
+    assert cache.get('a', now=100) is None
+
+
+def test_verified_token_cache_make_key():
+    key = auth.VerifiedTokenCache.make_key('token', 'aud', 'iss')
+    assert 'token' not in key
+    assert key != auth.VerifiedTokenCache.make_key('token', 'other', 'iss')
+
+
+def test_verified_token_cache_redis():
+    from fakeredis import FakeStrictRedis
+    conn = FakeStrictRedis(decode_responses=True)
+    cache = auth.VerifiedTokenCache(redis_conn=conn)
+    now = 1e9
+    claims = {'sub': 'auth0|user', 'exp': now + 100}
+    cache.set('key', claims, now=now)
+    assert conn.ttl(cache.redis_prefix + 'key') > 0
+    other = auth.VerifiedTokenCache(redis_conn=conn)
+    assert other.get('key', now=now) == claims
+    assert other.hits == 1
+    # now stored locally too
+    assert len(other) == 1
+
+
+def test_decode_access_token_cached(app, mocker):
+    mocker.patch('sfa_api.utils.auth.get_jwt_key')
+    decode = mocker.patch('sfa_api.utils.auth.jwt.decode',
+                          return_value={'sub': 'auth0|user',
+                                        'exp': 1e12})
+    with app.test_request_context():
+        assert auth.decode_access_token('token')['sub'] == 'auth0|user'
+        assert auth.decode_access_token('token')['sub'] == 'auth0|user'
+        assert decode.call_count == 1
+        cache = auth.verified_token_cache()
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+
+def test_decode_access_token_invalid_not_cached(app, mocker):
+    mocker.patch('sfa_api.utils.auth.get_jwt_key')
+    decode = mocker.patch('sfa_api.utils.auth.jwt.decode',
+                          side_effect=auth.jwt.JWTError)
+    with app.test_request_context():
+        for _ in range(2):
+            with pytest.raises(auth.jwt.JWTError):
+                auth.decode_access_token('token')
+        assert decode.call_count == 2
+        assert len(auth.verified_token_cache()) == 0
+
+
+def test_validate_user_existence_cached(app, mocked_user_exists_storage):
+    exists, user_info, create_user = mocked_user_exists_storage(
+        user_exists=True)
+    with app.test_request_context():
+        _request_ctx_stack.top.user = 'auth0|cacheduser'
+        assert auth.validate_user_existence()
+        assert auth.validate_user_existence()
+        assert exists.call_count == 1
+        assert auth.user_existence_cache().get('auth0|cacheduser')
+
+
+def test_validate_user_existence_not_cached(app, mocked_user_exists_storage):
+    exists, user_info, create_user = mocked_user_exists_storage(
+        user_exists=False, verified=False)
+    with app.test_request_context():
+        _request_ctx_stack.top.user = 'auth0|unverified'
+        assert not auth.validate_user_existence()
+        assert not auth.validate_user_existence()
+        assert exists.call_count == 2
+        assert auth.user_existence_cache().get('auth0|unverified') is None
+
+
+def test_user_existence_cache_redis(app):
+    app.config['USER_EXISTS_CACHE_USE_REDIS'] = True
+    with app.app_context():
+        cache = auth.user_existence_cache()
+        assert cache.redis_conn is not None
+        assert cache.ttl == app.config['USER_EXISTS_CACHE_TTL']
@@ -1,4 +1,5 @@
 import re
+import threading
 
 
 import pytest
@@ -20,6 +21,40 @@ def test_token_redis_connection(running_app):
     assert isinstance(r, Redis)
 
 
+def test_auth0_session(running_app):
+    session = auth0_info.auth0_session()
+    assert isinstance(session, requests.Session)
+    assert auth0_info.auth0_session() is session
+    adapter = session.get_adapter(
+        running_app.config['AUTH0_BASE_URL'] + '/userinfo')
+    assert adapter.max_retries.total == 5
+    assert adapter._pool_maxsize == 10
+
+
+def test_auth0_request(running_app, requests_mock, mocker):
+    observe = mocker.patch.object(auth0_info, 'AUTH0_REQUEST_TIME')
+    running_app.config['AUTH0_TIMEOUT'] = 2.0
+    send = mocker.spy(auth0_info.auth0_session(), 'request')
+    requests_mock.register_uri(
+        'GET', 'https://solarforecastarbiter.auth0.com/userinfo',
+        status_code=401)
+    resp = auth0_info.auth0_request('GET', '/userinfo', 'userinfo')
+    assert resp.status_code == 401
+    assert send.call_args[1]['timeout'] == 2.0
+    observe.labels.assert_called_with('userinfo', 'GET', '401')
+    assert observe.labels.return_value.observe.called
+
+
+def test_auth0_request_error(running_app, requests_mock, mocker):
+    observe = mocker.patch.object(auth0_info, 'AUTH0_REQUEST_TIME')
+    requests_mock.register_uri(
+        'GET', 'https://solarforecastarbiter.auth0.com/userinfo',
+        exc=requests.exceptions.ConnectTimeout)
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        auth0_info.auth0_request('GET', '/userinfo', 'userinfo')
+    observe.labels.assert_called_with('userinfo', 'GET', 'error')
+
+
 def test_get_fresh_auth0_management_token(running_app, requests_mock):
     mocked = requests_mock.register_uri(
         'POST', 'https://solarforecastarbiter.auth0.com/oauth/token',
@@ -167,24 +202,139 @@ def test_get_email_of_user_http_err(running_app, auth0id,
 def test_list_user_emails(running_app, auth0id, email,
                           requests_mock, token_set,
                           email_in_redis):
-    requests_mock.register_uri(
+    def respond(request, context):
+        if request.path.endswith('one'):
+            return {'email': 'second'}
+        context.status_code = 404
+        return {}
+
+    mocked = requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'),
+        json=respond)
+    ids = [auth0id, 'auth0|one', 'auth0|what']
+    out = auth0_info.list_user_emails(ids)
+    assert out == {auth0id: email, 'auth0|one': 'second',
+                   'auth0|what': 'Unable to retrieve'}
+    # only the missing users are requested, never the full user list
+    assert mocked.call_count == 2
+    assert not any(r.path.endswith('/users')
+                   for r in mocked.request_history)
+
+
+def test_list_user_emails_all_in_redis(running_app, auth0id, email,
+                                       requests_mock, email_in_redis):
+    mocked = requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'))
+    out = auth0_info.list_user_emails([auth0id])
+    assert out == {auth0id: email}
+    assert not mocked.called
+
+
+def test_refresh_email_directory(running_app, requests_mock, token_set):
+    mocked = requests_mock.register_uri(
         'GET',
         re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'),
         [{'content': (
-            b'{"users":[{"email": "' + email.encode() +
-            b'", "user_id": "' + auth0id.encode() +
-            b'"}], "total": 300}')},
+            b'{"users":[{"email": "first", "user_id": "auth0|zero"}],'
+            b'"total": 250}')},
          {'content': (
-             b'{"users":[{"email": "second", "user_id": "auth0|one"},'
-             b'{"email": "third", "user_id": "auth0|ooasdd"}],'
-             b'"total": 300}')},
-         {'status_code': 401}
-         ]
-    )
-    ids = [auth0id, 'auth0|one', 'auth0|ooasdd', 'auth0|what']
-    out = auth0_info.list_user_emails(ids)
-    assert set(out.values()) == {
-        email, 'second', 'third', 'Unable to retrieve'}
+             b'{"users":[{"email": "second", "user_id": "auth0|one"}],'
+             b'"total": 250}')},
+         {'content': (
+             b'{"users":[{"email": "third", "user_id": "auth0|two"}],'
+             b'"total": 250}')},
+         {'status_code': 401}])
+    out = auth0_info.refresh_email_directory()
+    assert out == {'auth0|zero': 'first', 'auth0|one': 'second',
+                   'auth0|two': 'third'}
+    assert [r.qs['page'] for r in mocked.request_history] == [
+        ['0'], ['1'], ['2']]
+    r = auth0_info.token_redis_connection()
+    assert r.get('auth0|two') == 'third'
+    assert 90000 > r.ttl('auth0|two') > 80000
+
+
+def test_refresh_email_directory_http_err(running_app, requests_mock,
+                                          token_set):
+    requests_mock.register_uri(
+        'GET',
+        re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'),
+        [{'content': (
+            b'{"users":[{"email": "first", "user_id": "auth0|zero"}],'
+            b'"total": 250}')},
+         {'status_code': 401}])
+    assert auth0_info.refresh_email_directory() == {}
+    assert auth0_info.token_redis_connection().get('auth0|zero') is None
+
+
+def test_get_emails_of_users(running_app, auth0id, email, requests_mock,
+                             token_set, email_in_redis):
+    def respond(request, context):
+        if request.path.endswith('one'):
+            return {'email': 'second'}
+        else:
+            context.status_code = 404
+            return {}
+
+    mocked = requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'),
+        json=respond)
+    ids = [auth0id, 'auth0|one', 'auth0|what', 'auth0|one']
+    out = auth0_info.get_emails_of_users(ids)
+    assert out == {auth0id: email, 'auth0|one': 'second',
+                   'auth0|what': 'Unable to retrieve'}
+    # only misses requested, once each
+    assert mocked.call_count == 2
+    r = auth0_info.token_redis_connection()
+    assert r.get('auth0|one') == 'second'
+    assert r.get('auth0|what') is None
+
+
+def test_get_emails_of_users_all_in_redis(
+        running_app, auth0id, email, requests_mock, email_in_redis):
+    mocked = requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'))
+    assert auth0_info.get_emails_of_users([auth0id]) == {auth0id: email}
+    assert auth0_info.get_emails_of_users([]) == {}
+    assert not mocked.called
+
+
+def test_get_emails_of_users_no_token(running_app, mocker, requests_mock):
+    mocker.patch('sfa_api.utils.auth0_info.auth0_token', return_value=None)
+    mocked = requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'))
+    assert auth0_info.get_emails_of_users(['auth0|one']) == {
+        'auth0|one': 'Unable to retrieve'}
+    assert not mocked.called
+
+
+def test_get_emails_of_users_timeout(running_app, mocker, token_set):
+    running_app.config['AUTH0_EMAIL_LOOKUP_TIMEOUT'] = 0.01
+    release = threading.Event()
+
+    def slow(auth0_id, token):
+        release.wait(5)
+        return 'late'
+
+    mocker.patch('sfa_api.utils.auth0_info._fetch_email_of_user',
+                 new=slow)
+    out = auth0_info.get_emails_of_users(['auth0|slow'])
+    assert out == {'auth0|slow': 'Unable to retrieve'}
+    release.set()
+
+
+def test_get_emails_of_users_request_error(
+        running_app, requests_mock, token_set):
+    requests_mock.register_uri(
+        'GET', re.compile(running_app.config['AUTH0_BASE_URL'] + '/.*'),
+        exc=requests.exceptions.ConnectTimeout)
+    assert auth0_info.get_emails_of_users(['auth0|one']) == {
+        'auth0|one': 'Unable to retrieve'}
+
+
+def test_get_emails_of_users_invalid(running_app):
+    with pytest.raises(ValueError):
+        auth0_info.get_emails_of_users(['auth0|one', 'bad'])
 
 
 def test_list_user_emails_invalid(running_app, auth0id):
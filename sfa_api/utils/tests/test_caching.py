@@ -0,0 +1,123 @@
+from fakeredis import FakeStrictRedis
+import pytest
+
+
+from sfa_api.utils import caching
+
+
+@pytest.fixture()
+def now(mocker):
+    now = mocker.patch('sfa_api.utils.caching._now', return_value=100.0)
+    return now
+
+
+def test_ttlcache_get_set(now):
+    cache = caching.TTLCache(ttl=10)
+    assert cache.get('key') is None
+    assert cache.get('key', 'default') == 'default'
+    cache.set('key', {'a': 1})
+    assert cache.get('key') == {'a': 1}
+    assert cache.hits == 1
+    assert cache.misses == 2
+    assert cache.hit_rate == 1 / 3
+
+
+def test_ttlcache_expired(now):
+    cache = caching.TTLCache(ttl=10)
+    cache.set('key', True)
+    now.return_value = 109.9
+    assert cache.get('key')
+    now.return_value = 110.0
+    assert cache.get('key') is None
+    assert len(cache) == 0
+
+
+def test_ttlcache_lru(now):
+    cache = caching.TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_ttlcache_disabled(now):
+    cache = caching.TTLCache(maxsize=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def test_ttlcache_delete_clear(now):
+    cache = caching.TTLCache()
+    cache.set('a', 1)
+    cache.set('b', 1)
+    cache.delete('a')
+    cache.delete('notthere')
+    assert cache.get('a') is None
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttlcache_stats(now):
+    cache = caching.TTLCache(maxsize=5)
+    assert cache.hit_rate == 0.0
+    cache.set('a', 1)
+    cache.get('a')
+    assert cache.stats() == {'size': 1, 'maxsize': 5, 'hits': 1,
+                             'misses': 0, 'hit_rate': 1.0}
+
+
+def test_ttlcache_redis(now):
+    conn = FakeStrictRedis(decode_responses=True)
+    cache = caching.TTLCache(ttl=30, redis_conn=conn, redis_prefix='test:')
+    cache.set('a', [1, 2])
+    assert 0 < conn.ttl('test:a') <= 30
+    other = caching.TTLCache(redis_conn=conn, redis_prefix='test:')
+    assert other.get('a') == [1, 2]
+    assert len(other) == 1
+    other.delete('a')
+    assert conn.get('test:a') is None
+
+
+def test_ttlcache_redis_failure(now, mocker):
+    conn = mocker.MagicMock()
+    conn.get.side_effect = ConnectionError
+    conn.set.side_effect = ConnectionError
+    conn.delete.side_effect = ConnectionError
+    cache = caching.TTLCache(redis_conn=conn)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    cache.delete('a')
+    assert cache.get('a') is None
+
+
+def test_ttlcache_delete_matching():
+    cache = caching.TTLCache(maxsize=10, ttl=10)
+    cache.set(('a', 1), 'a1')
+    cache.set(('b', 1), 'b1')
+    cache.set(('a', 2), 'a2')
+    cache.delete_matching(lambda key: key[1] == 1)
+    assert len(cache) == 1
+    assert cache.get(('a', 2)) == 'a2'
+
+
+class _ExpiringCache(caching.TTLCache):
+    def expiration(self, value, now):
+        return value.get('until')
+
+
+def test_ttlcache_expiration(now):
+    cache = _ExpiringCache()
+    cache.set('a', {'until': 150.0})
+    cache.set('b', {'until': 50.0})
+    cache.set('c', {})
+    assert len(cache) == 1
+    now.return_value = 149.0
+    assert cache.get('a') == {'until': 150.0}
+    now.return_value = 150.0
+    assert cache.get('a') is None
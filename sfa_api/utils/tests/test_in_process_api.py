@@ -0,0 +1,146 @@
+import time
+
+
+from flask import Flask
+from jose import jwt
+import pytest
+import requests
+from solarforecastarbiter.io import api
+from solarforecastarbiter.reports import main as reports_main
+from solarforecastarbiter.validation import tasks as validation_tasks
+
+
+from sfa_api import create_app
+from sfa_api.demo import DEMO_AUTH0_ID
+from sfa_api.utils import auth
+from sfa_api.utils.in_process_api import (
+    InProcessAPISession, in_process_api, in_process_app)
+
+
+BASE_URL = 'https://api.test'
+
+
+@pytest.fixture()
+def api_app():
+    app = create_app('TestingConfig')
+    app.config['SFA_API_STATIC_DATA'] = True
+    return app
+
+
+@pytest.fixture()
+def job_app(api_app):
+    app = Flask('jobs')
+    app.config['IN_PROCESS_API'] = 'TestingConfig'
+    setattr(app, 'in_process_api_app', api_app)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture()
+def token():
+    return jwt.encode({'sub': DEMO_AUTH0_ID}, 'notverified',
+                      algorithm='HS256')
+
+
+@pytest.fixture()
+def no_http(mocker):
+    return mocker.patch('requests.adapters.HTTPAdapter.send',
+                        side_effect=AssertionError('Sent over HTTP'))
+
+
+def test_in_process_api(job_app, token, no_http, observation_id):
+    with in_process_api():
+        session = api.APISession(token, base_url=BASE_URL)
+        assert isinstance(session, InProcessAPISession)
+        obs = session.get_observation(observation_id)
+    assert obs.observation_id == observation_id
+    assert not no_http.called
+
+
+def test_in_process_api_missing(job_app, token, no_http, missing_id):
+    with in_process_api():
+        session = api.APISession(token, base_url=BASE_URL)
+        with pytest.raises(requests.exceptions.HTTPError) as e:
+            session.get_observation(missing_id)
+    assert e.value.response.status_code == 404
+
+
+def test_in_process_api_unknown_user(job_app, no_http, mocker,
+                                     observation_id):
+    mocker.patch('sfa_api.utils.auth.request_user_info',
+                 side_effect=requests.exceptions.HTTPError)
+    token = jwt.encode({'sub': 'auth0|unknown'}, 'notverified',
+                       algorithm='HS256')
+    with in_process_api():
+        session = api.APISession(token, base_url=BASE_URL)
+        with pytest.raises(requests.exceptions.HTTPError) as e:
+            session.get_observation(observation_id)
+    assert e.value.response.status_code == 401
+
+
+@pytest.mark.parametrize('module', [api, reports_main, validation_tasks])
+def test_in_process_api_restores(job_app, module):
+    original = module.APISession
+    with pytest.raises(ValueError):
+        with in_process_api():
+            assert issubclass(module.APISession, InProcessAPISession)
+            raise ValueError
+    assert module.APISession is original
+
+
+def test_in_process_api_not_configured(job_app):
+    job_app.config['IN_PROCESS_API'] = None
+    original = api.APISession
+    with in_process_api():
+        assert api.APISession is original
+
+
+def test_in_process_api_no_app():
+    original = api.APISession
+    with in_process_api():
+        assert api.APISession is original
+
+
+def test_in_process_app(mocker):
+    create = mocker.patch('sfa_api.create_app')
+    app = Flask('jobs')
+    app.config['IN_PROCESS_API'] = 'ProductionConfig'
+    with app.app_context():
+        assert in_process_app() is create.return_value
+        assert in_process_app() is create.return_value
+    create.assert_called_once_with('ProductionConfig')
+
+
+def test_verify_access_token_in_process(api_app, token):
+    with api_app.test_request_context(
+            headers={'Authorization': f'Bearer {token}'},
+            environ_base={auth.IN_PROCESS_ENVIRON_KEY: True}):
+        assert auth.verify_access_token()
+        assert auth.current_user == DEMO_AUTH0_ID
+        assert auth.current_access_token == token
+
+
+def test_verify_access_token_not_in_process(api_app, token, mocker):
+    mocker.patch('sfa_api.utils.auth.get_jwt_key', return_value='otherkey')
+    with api_app.test_request_context(
+            headers={'Authorization': f'Bearer {token}'}):
+        assert not auth.verify_access_token()
+
+
+def test_verify_access_token_in_process_expired(api_app):
+    token = jwt.encode({'sub': DEMO_AUTH0_ID, 'exp': time.time() - 10},
+                       'notverified', algorithm='HS256')
+    with api_app.test_request_context(
+            headers={'Authorization': f'Bearer {token}'},
+            environ_base={auth.IN_PROCESS_ENVIRON_KEY: True}):
+        assert not auth.verify_access_token()
+
+
+def test_in_process_api_expired_token(job_app, no_http, observation_id):
+    token = jwt.encode({'sub': DEMO_AUTH0_ID, 'exp': time.time() - 10},
+                       'notverified', algorithm='HS256')
+    with in_process_api():
+        session = api.APISession(token, base_url=BASE_URL)
+        with pytest.raises(requests.exceptions.HTTPError) as e:
+            session.get_observation(observation_id)
+    assert e.value.response.status_code == 401
@@ -0,0 +1,187 @@
+from threading import Thread
+import time
+
+
+from cryptography.fernet import Fernet
+from fakeredis import FakeServer, FakeStrictRedis
+from flask import Flask
+from jose import jwt
+import pytest
+
+
+from sfa_api.utils import job_tokens
+
+
+KEY = b'eKfeo832hn8nQ_3K69YDniBbHqbqpIxUNRstrv225c8='
+USER = '0c90950a-7cca-11e9-a81f-54bf64606445'
+
+
+def make_token(expires_in=3600):
+    return jwt.encode({'sub': 'auth0|job', 'exp': time.time() + expires_in},
+                      'secret', algorithm='HS256')
+
+
+@pytest.fixture()
+def server():
+    return FakeServer()
+
+
+@pytest.fixture()
+def make_cache(server):
+    def make(**kwargs):
+        return job_tokens.JobTokenCache(
+            Fernet(KEY), FakeStrictRedis(server=server), **kwargs)
+    return make
+
+
+@pytest.fixture()
+def exchange(mocker):
+    return mocker.MagicMock(side_effect=lambda: make_token())
+
+
+def test_get_or_exchange(make_cache, exchange):
+    cache = make_cache()
+    token = cache.get_or_exchange(USER, exchange)
+    assert cache.get_or_exchange(USER, exchange) == token
+    assert exchange.call_count == 1
+
+
+def test_get_or_exchange_shared(make_cache, exchange, server):
+    token = make_cache().get_or_exchange(USER, exchange)
+    assert make_cache().get_or_exchange(USER, exchange) == token
+    assert exchange.call_count == 1
+    stored = FakeStrictRedis(server=server).get('job_token:' + USER)
+    assert token.encode() not in stored
+    assert Fernet(KEY).decrypt(stored).decode() == token
+
+
+def test_get_or_exchange_other_user(make_cache, exchange):
+    cache = make_cache()
+    assert cache.get_or_exchange(USER, exchange) != cache.get_or_exchange(
+        'other', exchange)
+    assert exchange.call_count == 2
+
+
+@pytest.mark.parametrize('token', [
+    make_token(expires_in=100),
+    make_token(expires_in=-10),
+    'notajwt',
+    jwt.encode({'sub': 'auth0|job'}, 'secret', algorithm='HS256'),
+])
+def test_get_or_exchange_not_cached(make_cache, mocker, token):
+    exchange = mocker.MagicMock(return_value=token)
+    cache = make_cache(margin=300)
+    assert cache.get_or_exchange(USER, exchange) == token
+    assert cache.get_or_exchange(USER, exchange) == token
+    assert exchange.call_count == 2
+
+
+def test_get_expired(make_cache):
+    cache = make_cache(margin=300)
+    token = make_token(expires_in=600)
+    cache.set(USER, token)
+    assert cache.get(USER) == token
+    assert cache.get(USER, now=time.time() + 301) is None
+    cache.clear()
+    assert cache.get(USER, now=time.time() + 301) is None
+
+
+def test_get_wrong_key(make_cache, server):
+    make_cache().set(USER, make_token())
+    other = job_tokens.JobTokenCache(
+        Fernet(Fernet.generate_key()), FakeStrictRedis(server=server))
+    assert other.get(USER) is None
+
+
+def test_get_or_exchange_single_flight(make_cache, mocker, server):
+    def slow_exchange():
+        time.sleep(0.2)
+        return make_token()
+
+    exchange = mocker.MagicMock(side_effect=slow_exchange)
+    caches = [make_cache(), make_cache()]
+    tokens = []
+    threads = [Thread(target=lambda c=c: tokens.append(
+        c.get_or_exchange(USER, exchange))) for c in caches * 3]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert exchange.call_count == 1
+    assert len(set(tokens)) == 1
+    assert FakeStrictRedis(server=server).get(
+        'job_token_lock:' + USER) is None
+    # the locks of users are dropped once the token is exchanged
+    assert all(c._user_locks == {} for c in caches)
+
+
+def test_get_or_exchange_lock_timeout(make_cache, exchange, server):
+    FakeStrictRedis(server=server).set('job_token_lock:' + USER, 'other')
+    cache = make_cache(lock_timeout=0.2)
+    assert cache.get_or_exchange(USER, exchange) is not None
+    assert exchange.call_count == 1
+    # the lock of the other process is left alone
+    assert FakeStrictRedis(server=server).get(
+        'job_token_lock:' + USER) == b'other'
+
+
+def test_get_or_exchange_exchange_fails(make_cache, server):
+    cache = make_cache()
+    with pytest.raises(KeyError):
+        cache.get_or_exchange(USER, lambda: {}['missing'])
+    assert FakeStrictRedis(server=server).get(
+        'job_token_lock:' + USER) is None
+    assert cache._user_locks == {}
+
+
+def test_get_or_exchange_redis_error(exchange, mocker):
+    redis_conn = mocker.MagicMock()
+    redis_conn.get.side_effect = ConnectionError
+    redis_conn.set.side_effect = ConnectionError
+    cache = job_tokens.JobTokenCache(Fernet(KEY), redis_conn)
+    token = cache.get_or_exchange(USER, exchange)
+    assert cache.get_or_exchange(USER, exchange) == token
+    assert exchange.call_count == 1
+
+
+def test_get_or_exchange_no_redis(exchange):
+    cache = job_tokens.JobTokenCache(Fernet(KEY))
+    token = cache.get_or_exchange(USER, exchange)
+    assert cache.get_or_exchange(USER, exchange) == token
+    assert exchange.call_count == 1
+
+
+@pytest.mark.parametrize('use_redis', [True, False])
+def test_job_token_cache(use_redis):
+    app = Flask('jobs')
+    app.config.update(TOKEN_ENCRYPTION_KEY=KEY, USE_FAKE_REDIS=True,
+                      JOB_TOKEN_USE_REDIS=use_redis,
+                      JOB_TOKEN_EXPIRY_MARGIN=60)
+    with app.app_context():
+        cache = job_tokens.job_token_cache()
+        assert job_tokens.job_token_cache() is cache
+    assert cache.margin == 60
+    # missing settings are taken from Config
+    assert cache.lock_timeout == 30
+    assert (cache.redis_conn is not None) == use_redis
+
+
+def test_job_token_cache_default_redis():
+    app = Flask('jobs')
+    app.config.update(TOKEN_ENCRYPTION_KEY=KEY, USE_FAKE_REDIS=True)
+    with app.app_context():
+        cache = job_tokens.job_token_cache()
+    assert cache.margin == 300
+    assert cache.redis_conn is not None
+
+
+def test_get_source(make_cache, mocker):
+    requests = mocker.patch.object(job_tokens, 'JOB_TOKEN_REQUESTS')
+    token = make_token()
+    make_cache().set(USER, token)
+    cache = make_cache()
+    assert cache.get(USER) == token
+    assert cache.get(USER) == token
+    assert cache.get('other') is None
+    assert [c[1]['source'] for c in requests.labels.call_args_list] == [
+        'redis', 'memory']
@@ -0,0 +1,123 @@
+import json
+
+
+from fakeredis import FakeStrictRedis
+from jose import jwt
+import pytest
+import requests
+
+
+from sfa_api.utils import jwks
+
+
+URL = 'https://solarforecastarbiter.auth0.com/.well-known/jwks.json'
+KEYS = {'keys': [{'kid': 'key1', 'kty': 'RSA'}]}
+NEW_KEYS = {'keys': [{'kid': 'key1', 'kty': 'RSA'},
+                     {'kid': 'key2', 'kty': 'RSA'}]}
+
+
+def make_token(kid):
+    return jwt.encode({'sub': 'me'}, 'secret', headers={'kid': kid})
+
+
+@pytest.fixture()
+def mocked_jwks(requests_mock):
+    return requests_mock.register_uri('GET', URL, json=KEYS)
+
+
+def test_provider_lazy(mocked_jwks):
+    provider = jwks.JWKSProvider(URL)
+    assert not mocked_jwks.called
+    assert provider.get_keys() == KEYS
+    assert provider.get_keys() == KEYS
+    assert mocked_jwks.call_count == 1
+    assert provider.kids == {'key1'}
+
+
+def test_provider_fetch_fail(requests_mock):
+    requests_mock.register_uri('GET', URL, status_code=500)
+    provider = jwks.JWKSProvider(URL)
+    with pytest.raises(requests.exceptions.HTTPError):
+        provider.get_keys()
+
+
+def test_provider_seed_from_file(tmp_path, mocked_jwks):
+    path = tmp_path / 'jwks.json'
+    path.write_text(json.dumps(NEW_KEYS))
+    provider = jwks.JWKSProvider(URL, path=str(path))
+    assert provider.get_keys() == NEW_KEYS
+    assert not mocked_jwks.called
+
+
+@pytest.mark.parametrize('content', ['notjson', '{"other": 1}'])
+def test_provider_bad_file(tmp_path, mocked_jwks, content):
+    path = tmp_path / 'jwks.json'
+    path.write_text(content)
+    provider = jwks.JWKSProvider(URL, path=str(path))
+    assert provider.get_keys() == KEYS
+    assert mocked_jwks.called
+    # replaced by the fetched keys
+    assert json.loads(path.read_text()) == KEYS
+
+
+def test_provider_saves_file(tmp_path, mocked_jwks):
+    path = tmp_path / 'jwks.json'
+    provider = jwks.JWKSProvider(URL, path=str(path))
+    provider.get_keys()
+    assert json.loads(path.read_text()) == KEYS
+
+
+def test_provider_redis(mocked_jwks):
+    conn = FakeStrictRedis(decode_responses=True)
+    provider = jwks.JWKSProvider(URL, redis_conn=conn)
+    provider.get_keys()
+    assert json.loads(conn.get('jwks')) == KEYS
+    other = jwks.JWKSProvider(URL, redis_conn=conn)
+    assert other.get_keys() == KEYS
+    assert mocked_jwks.call_count == 1
+
+
+def test_provider_unknown_kid_refresh(requests_mock):
+    mocked = requests_mock.register_uri(
+        'GET', URL, [{'json': KEYS}, {'json': NEW_KEYS}])
+    provider = jwks.JWKSProvider(URL, min_refresh_interval=0)
+    assert provider.get_keys(make_token('key1')) == KEYS
+    assert mocked.call_count == 1
+    assert provider.get_keys(make_token('key2')) == NEW_KEYS
+    assert mocked.call_count == 2
+
+
+def test_provider_unknown_kid_rate_limited(mocked_jwks):
+    provider = jwks.JWKSProvider(URL, min_refresh_interval=300)
+    provider.get_keys()
+    assert provider.get_keys(make_token('other')) == KEYS
+    assert mocked_jwks.call_count == 1
+
+
+def test_provider_invalid_token_no_refresh(mocked_jwks):
+    provider = jwks.JWKSProvider(URL, min_refresh_interval=0)
+    provider.get_keys('notatoken')
+    assert mocked_jwks.call_count == 1
+
+
+def test_provider_refresh_failure_keeps_keys(requests_mock):
+    requests_mock.register_uri(
+        'GET', URL, [{'json': KEYS}, {'status_code': 500}])
+    provider = jwks.JWKSProvider(URL, min_refresh_interval=0)
+    provider.get_keys()
+    provider.refresh()
+    assert provider.get_keys() == KEYS
+
+
+def test_get_jwt_key_config(app):
+    app.config['JWT_KEY'] = {'keys': []}
+    with app.app_context():
+        assert jwks.get_jwt_key() == {'keys': []}
+
+
+def test_get_jwt_key_provider(app, mocked_jwks, tmp_path):
+    app.config['JWT_KEY'] = None
+    app.config['JWKS_FILE'] = str(tmp_path / 'jwks.json')
+    with app.app_context():
+        assert jwks.get_jwt_key() == KEYS
+        assert jwks.jwks_provider().path == app.config['JWKS_FILE']
@@ -0,0 +1,155 @@
+import pstats
+
+
+from flask import _request_ctx_stack
+import pytest
+
+
+from sfa_api import create_app
+from sfa_api.utils import profiling
+
+
+@pytest.fixture()
+def profiling_app():
+    app = create_app('TestingConfig')
+    app.config['PROFILE_USERS'] = 'auth0|admin'
+
+    def set_user():
+        _request_ctx_stack.top.user = _request_ctx_stack.top.request.args.get(
+            'user', 'auth0|admin')
+
+    app.before_request(set_user)
+    app.before_request(profiling.start_profiling)
+
+    def view():
+        sum(range(1000))
+        return 'ok'
+
+    def error():
+        raise ValueError
+
+    app.add_url_rule('/profiled', 'profiled', view)
+    app.add_url_rule('/error', 'error', error)
+    return app
+
+
+def get(app, path='/profiled', profile='1', **params):
+    return app.test_client().get(
+        path, base_url='https://localhost', query_string=params,
+        headers={'X-Profile': profile})
+
+
+def test_profile_redis(profiling_app, tmp_path):
+    res = get(profiling_app)
+    assert res.status_code == 200
+    profile_id = res.headers['X-Profile-Id']
+    with profiling_app.app_context():
+        data = profiling.load_profile(profile_id)
+    path = tmp_path / 'out.prof'
+    path.write_bytes(data)
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == 'view' for func in stats.stats)
+
+
+def test_profile_dir(profiling_app, tmp_path):
+    profiling_app.config['PROFILE_DIR'] = str(tmp_path)
+    res = get(profiling_app)
+    profile_id = res.headers['X-Profile-Id']
+    assert (tmp_path / f'{profile_id}.prof').exists()
+    with profiling_app.app_context():
+        assert profiling.load_profile(profile_id) is not None
+        assert profiling.load_profile(
+            '6ff2ea78-c3d0-4a64-a0f8-4fa1b7c1d4d4') is None
+
+
+def test_load_profile_not_uuid(profiling_app):
+    with profiling_app.app_context():
+        with pytest.raises(ValueError):
+            profiling.load_profile('../../etc/passwd')
+
+
+@pytest.mark.parametrize('profile,user', [
+    ('', 'auth0|admin'),
+    ('0', 'auth0|admin'),
+    ('1', 'auth0|other'),
+    ('1', ''),
+])
+def test_not_profiled(profiling_app, profile, user):
+    res = get(profiling_app, profile=profile, user=user)
+    assert res.status_code == 200
+    assert 'X-Profile-Id' not in res.headers
+
+
+def test_profile_concurrency_limit(profiling_app):
+    with profiling_app.app_context():
+        semaphore = profiling._profile_semaphore()
+    assert semaphore.acquire(blocking=False)
+    res = get(profiling_app)
+    assert 'X-Profile-Id' not in res.headers
+    semaphore.release()
+    res = get(profiling_app)
+    assert 'X-Profile-Id' in res.headers
+
+
+def test_profile_released_on_error(profiling_app):
+    with pytest.raises(ValueError):
+        get(profiling_app, path='/error')
+    with profiling_app.app_context():
+        semaphore = profiling._profile_semaphore()
+    assert semaphore.acquire(blocking=False)
+    semaphore.release()
+
+
+def test_profile_store_failure(profiling_app, mocker):
+    mocker.patch('sfa_api.utils.profiling.store_profile',
+                 side_effect=ConnectionError)
+    res = get(profiling_app)
+    assert res.status_code == 200
+    assert 'X-Profile-Id' not in res.headers
+
+
+def test_request_profiler_greenlet_switch(mocker):
+    greenlet = pytest.importorskip('greenlet')
+    profiler = profiling.RequestProfiler()
+    profiler.start()
+    try:
+        other = greenlet.greenlet(lambda: sum(range(10)))
+        other.switch()
+    finally:
+        profiler.stop()
+    profiler.profile.create_stats()
+    assert not any(func[2] == '<lambda>' for func in profiler.profile.stats)
+
+
+def test_request_profiler_overlapping_greenlets():
+    greenlet = pytest.importorskip('greenlet')
+    events = []
+
+    def previous(event, args):
+        events.append(event)
+
+    original = greenlet.settrace(previous)
+    try:
+        first = profiling.RequestProfiler()
+        second = profiling.RequestProfiler()
+
+        def run_second():
+            second.start()
+            main.switch()
+            second.stop()
+
+        main = greenlet.getcurrent()
+        other = greenlet.greenlet(run_second)
+        first.start()
+        other.switch()
+        # stop in the order the profilers were started, not LIFO
+        first.stop()
+        assert profiling._active_profilers == {second}
+        other.switch()
+        assert other.dead
+        assert not profiling._active_profilers
+        assert greenlet.gettrace() is previous
+        # the trace function installed before is still called
+        assert 'switch' in events
+    finally:
+        greenlet.settrace(original)
@@ -0,0 +1,186 @@
+from cryptography.fernet import Fernet
+from fakeredis import FakeStrictRedis
+from flask import Flask
+import pytest
+from rq import Queue, SimpleWorker
+from rq.job import JobStatus
+
+
+from sfa_api.utils import report_jobs
+
+
+REPORT_ID = '9f290dd4-42b8-11ea-abdf-f4939feddd82'
+
+
+@pytest.fixture(autouse=True)
+def app():
+    app = Flask('reports')
+    app.config['TOKEN_ENCRYPTION_KEY'] = (
+        b'eKfeo832hn8nQ_3K69YDniBbHqbqpIxUNRstrv225c8=')
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture()
+def queue():
+    return Queue('reports', connection=FakeStrictRedis())
+
+
+@pytest.fixture()
+def compute(mocker):
+    return mocker.patch('sfa_api.utils.report_jobs.compute_report',
+                        return_value=REPORT_ID)
+
+
+def _enqueue(queue, token='token'):
+    return report_jobs.enqueue_compute_report(
+        queue, token, REPORT_ID, 'https://api', 600)
+
+
+def _active_job(queue):
+    job_id = queue.connection.get(report_jobs.ACTIVE_KEY.format(REPORT_ID))
+    return queue.fetch_job(job_id.decode())
+
+
+def _work(queue):
+    SimpleWorker([queue], connection=queue.connection).work(burst=True)
+
+
+def test_enqueue_compute_report(queue):
+    assert _enqueue(queue) == 'enqueued'
+    job = _active_job(queue)
+    assert queue.job_ids == [job.id]
+    assert job.func == report_jobs.compute_report_job
+    assert job.args == ('token', REPORT_ID)
+    assert job.kwargs == {'base_url': 'https://api'}
+    assert job.timeout == 600
+
+
+def test_enqueue_compute_report_deduplicated(queue):
+    assert _enqueue(queue) == 'enqueued'
+    assert _enqueue(queue) == 'deduplicated'
+    assert _enqueue(queue) == 'deduplicated'
+    assert len(queue) == 1
+
+
+def test_enqueue_compute_report_rerun(queue, compute):
+    _enqueue(queue)
+    _active_job(queue).set_status(JobStatus.STARTED)
+    assert _enqueue(queue, 'second') == 'rerun'
+    assert _enqueue(queue, 'latest') == 'rerun'
+    assert b'latest' not in queue.connection.get(
+        report_jobs.RERUN_KEY.format(REPORT_ID))
+    assert len(queue) == 1
+    _work(queue)
+    assert compute.call_count == 2
+    assert compute.call_args_list[0][0][0] == 'token'
+    # the rerun uses the token of the latest request
+    assert compute.call_args[0][0].token == 'latest'
+    assert compute.call_args[0][1:] == (REPORT_ID,)
+    assert compute.call_args[1] == {'base_url': 'https://api'}
+    assert queue.connection.get(
+        report_jobs.ACTIVE_KEY.format(REPORT_ID)) is None
+    assert queue.connection.get(
+        report_jobs.RERUN_KEY.format(REPORT_ID)) is None
+
+
+def test_enqueue_compute_report_rerun_bad_token(queue, compute, app):
+    _enqueue(queue)
+    _active_job(queue).set_status(JobStatus.STARTED)
+    assert _enqueue(queue) == 'rerun'
+    app.config['TOKEN_ENCRYPTION_KEY'] = Fernet.generate_key()
+    _work(queue)
+    assert compute.call_count == 1
+    assert queue.connection.get(
+        report_jobs.ACTIVE_KEY.format(REPORT_ID)) is None
+    assert queue.connection.get(
+        report_jobs.RERUN_KEY.format(REPORT_ID)) is None
+
+
+def test_enqueue_compute_report_rerun_no_key(queue, compute, app,
+                                             caplog):
+    app.config['TOKEN_ENCRYPTION_KEY'] = None
+    _enqueue(queue)
+    _active_job(queue).set_status(JobStatus.STARTED)
+    assert _enqueue(queue) == 'skipped'
+    assert 'TOKEN_ENCRYPTION_KEY is not set' in caplog.text
+    assert queue.connection.get(
+        report_jobs.RERUN_KEY.format(REPORT_ID)) is None
+    _work(queue)
+    assert compute.call_count == 1
+    assert queue.connection.get(
+        report_jobs.ACTIVE_KEY.format(REPORT_ID)) is None
+
+
+def test_enqueue_compute_report_concurrent(queue, mocker):
+    # a request arriving after the active key is set, but before the job
+    # is in the queue, finds the job and does not queue another one
+    outcomes = []
+    enqueue = queue.enqueue
+
+    def concurrent_enqueue(*args, **kwargs):
+        outcomes.append(_enqueue(queue))
+        return enqueue(*args, **kwargs)
+
+    mocker.patch.object(queue, 'enqueue', side_effect=concurrent_enqueue)
+    assert _enqueue(queue) == 'enqueued'
+    assert outcomes == ['deduplicated']
+    assert len(queue) == 1
+
+
+def test_enqueue_compute_report_watch_error(queue, mocker):
+    # the job created for a request is removed if another request queued
+    # a job in the meantime
+    other = queue.create_job(report_jobs.compute_report_job,
+                             job_id='other')
+    job_status = report_jobs._job_status
+
+    def status(connection, job_id):
+        if job_id is None:
+            other.save()
+            connection.set(report_jobs.ACTIVE_KEY.format(REPORT_ID),
+                           other.id)
+        return job_status(connection, job_id)
+
+    mocker.patch.object(report_jobs, '_job_status', side_effect=status)
+    assert _enqueue(queue) == 'deduplicated'
+    assert len(queue) == 0
+    assert queue.connection.keys('rq:job:*') == [other.key]
+
+
+def test_enqueue_compute_report_after_finish(queue, compute):
+    _enqueue(queue)
+    _work(queue)
+    assert compute.call_count == 1
+    assert _enqueue(queue) == 'enqueued'
+    assert len(queue) == 1
+
+
+@pytest.mark.parametrize('status', [JobStatus.FAILED, JobStatus.FINISHED,
+                                    None])
+def test_enqueue_compute_report_stale(queue, status):
+    _enqueue(queue)
+    job = _active_job(queue)
+    if status is None:
+        job.delete()
+    else:
+        job.set_status(status)
+    assert _enqueue(queue) == 'enqueued'
+    assert _active_job(queue).id != job.id
+
+
+def test_compute_report_job_failed(queue, compute):
+    compute.side_effect = ValueError
+    _enqueue(queue)
+    _work(queue)
+    assert queue.connection.get(
+        report_jobs.ACTIVE_KEY.format(REPORT_ID)) is None
+    assert _enqueue(queue) == 'enqueued'
+
+
+def test_compute_report_job_sync(compute):
+    queue = Queue('reports', is_async=False, connection=FakeStrictRedis())
+    assert _enqueue(queue) == 'enqueued'
+    assert compute.call_count == 1
+    assert queue.connection.get(
+        report_jobs.ACTIVE_KEY.format(REPORT_ID)) is None
@@ -0,0 +1,56 @@
+import json
+import zlib
+
+
+import pytest
+
+
+from sfa_api.utils import report_sections
+
+
+def test_split_raw_report(raw_report_json):
+    split = report_sections.split_raw_report(raw_report_json)
+    assert list(split) == list(report_sections.RAW_REPORT_SECTIONS)
+    assert split['metrics'] == {'metrics': []}
+    assert split['plots'] == {'plots': None}
+    assert split['data_checksum'] == {'data_checksum': None}
+    assert set(split['summary']) == {
+        'generated_at', 'timezone', 'versions',
+        'processed_forecasts_observations', 'messages'}
+    joined = {}
+    for section in split.values():
+        joined.update(section)
+    assert joined == raw_report_json
+
+
+def test_split_raw_report_missing_keys():
+    split = report_sections.split_raw_report({'a': 1, 'metrics': [2]})
+    assert split == {'summary': {'a': 1}, 'metrics': {'metrics': [2]},
+                     'plots': {}, 'data_checksum': {}}
+
+
+@pytest.mark.parametrize('sections,keys', [
+    (['metrics'], {'metrics'}),
+    (['plots', 'data_checksum'], {'plots', 'data_checksum'}),
+    ([], set()),
+])
+def test_select_sections(raw_report_json, sections, keys):
+    assert report_sections.select_sections(raw_report_json, sections) == {
+        key: raw_report_json[key] for key in keys}
+
+
+@pytest.mark.parametrize('section', [
+    '', '{}', json.dumps({'plots': {'script': 'x' * 10000}}),
+    '{"messages": "ends with space "}'])
+def test_compress_section(section):
+    data = report_sections.compress_section(section)
+    assert report_sections.decompress_section(data) == section
+
+
+def test_compress_section_mysql_format():
+    section = '{"metrics": []}'
+    data = report_sections.compress_section(section)
+    assert int.from_bytes(data[:4], 'little') == len(section)
+    assert zlib.decompress(data[4:]).decode() == section
+    # COMPRESS adds a . to results that end with a space
+    assert report_sections.decompress_section(data + b'.') == section
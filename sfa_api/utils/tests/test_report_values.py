@@ -0,0 +1,95 @@
+from io import BytesIO
+import json
+import zipfile
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from solarforecastarbiter.io.utils import serialize_timeseries
+
+
+from sfa_api.utils import report_values
+
+
+@pytest.fixture()
+def series():
+    index = pd.date_range('2019-01-01T00:00Z', freq='5min', periods=2000)
+    ser = pd.Series(np.random.default_rng(0).random(len(index)) * 1000,
+                    index=index)
+    ser.iloc[3] = np.nan
+    return ser
+
+
+def _format(payload):
+    return report_values._unpack(payload)[0]['format']
+
+
+def test_encode_series(series):
+    values = serialize_timeseries(series)
+    payload = report_values.encode_processed_values(values)
+    assert report_values.is_encoded(payload)
+    assert _format(payload) == 'timeseries'
+    assert len(payload) < len(values) / 2
+    assert report_values.decode_processed_values(payload) == values
+
+
+def test_encode_dataframe(series):
+    df = pd.DataFrame({'value': series, 'quality_flag': 2},
+                      index=series.index)
+    values = serialize_timeseries(df)
+    payload = report_values.encode_processed_values(values)
+    assert _format(payload) == 'timeseries'
+    assert report_values.decode_processed_values(payload) == values
+
+
+@pytest.mark.parametrize('values', [
+    "['replace', 'with', 'real', 'data']",
+    '{"schema":{},"data":[]}',
+    '[1, 2]',
+    '{"schema":{},"data":[{"timestamp":"2019-01-01T00:00:00.5Z",'
+    '"value":1.0}]}',
+    '{"schema":{},"data":[{"timestamp":"2019-01-01T00:00:00+00:00",'
+    '"value":1.0}]}',
+    '{"schema":{},"data":[{"timestamp":"2019-01-01T00:00:00Z",'
+    '"value":true}]}',
+    '{"schema":{},"data":[{"timestamp":"2019-01-01T00:00:00Z",'
+    '"value":1.0},{"timestamp":"2019-01-01T00:05:00Z","other":1.0}]}',
+    '{"schema":{},"data":[{"timestamp":"2019-01-01T00:00:00Z",'
+    '"value":99999999999999999999}]}',
+])
+def test_encode_text(values):
+    payload = report_values.encode_processed_values(values)
+    assert _format(payload) == 'text'
+    assert report_values.decode_processed_values(payload) == values
+
+
+def test_decode_unencoded():
+    assert report_values.decode_processed_values(b'[1, 2]') == '[1, 2]'
+
+
+def test_decode_unsupported_version():
+    payload = bytearray(report_values.encode_processed_values('[]'))
+    payload[len(report_values.MAGIC)] = 0
+    with pytest.raises(ValueError):
+        report_values.decode_processed_values(bytes(payload))
+
+
+def test_ensure_encoded(series):
+    values = serialize_timeseries(series)
+    payload = report_values.encode_processed_values(values)
+    assert report_values.ensure_encoded(payload) == payload
+    assert report_values.ensure_encoded(values.encode()) == payload
+
+
+def test_make_values_archive():
+    values = [
+        {'id': 'a', 'object_id': 'b',
+         'processed_values': report_values.encode_processed_values('1')},
+        {'id': 'c', 'object_id': 'd',
+         'processed_values': report_values.encode_processed_values('2')}]
+    archive = zipfile.ZipFile(
+        BytesIO(report_values.make_values_archive(values)))
+    assert json.loads(archive.read('manifest.json')) == [
+        {'id': 'a', 'object_id': 'b'}, {'id': 'c', 'object_id': 'd'}]
+    assert report_values.decode_processed_values(archive.read('c')) == '2'
@@ -7,6 +7,7 @@ from werkzeug.exceptions import RequestEntityTooLarge
 
 from sfa_api.conftest import (
     VALID_FORECAST_JSON, VALID_CDF_FORECAST_JSON, demo_forecasts)
+from sfa_api.schema import ObservationSchema
 from sfa_api.utils import request_handling
 from sfa_api.utils.errors import (
     BadAPIRequest, StorageAuthError, NotFoundException)
@@ -593,3 +594,68 @@ def test_validate_event_data_bad(data, exp):
         err.value.errors['value'][0].split('locations ')[1].split(',')
     ]
     assert exp == locs
+
+
+@pytest.mark.parametrize('url,filters,expected', [
+    ('/observations/', (),
+     {'limit': None, 'cursor': None, 'fields': None}),
+    ('/observations/?limit=10&cursor=9f657636-7e49-11e9-b77f-0a580a8003e9',
+     ('site_id', 'variable'),
+     {'limit': 10, 'cursor': '9f657636-7e49-11e9-b77f-0a580a8003e9',
+      'fields': None, 'site_id': None, 'variable': None}),
+    ('/observations/?fields=name,%20variable&variable=ghi',
+     ('variable',),
+     {'limit': None, 'cursor': None, 'fields': ['name', 'variable'],
+      'variable': 'ghi'}),
+    ('/observations/?site_id=123e4198-78f5-11e9-b1ba-0a580a8003e9'
+     '&aggregate_id=458ffc27-df0b-11e9-b622-62adb5fd6af0',
+     ('site_id', 'aggregate_id'),
+     {'limit': None, 'cursor': None, 'fields': None,
+      'site_id': '123e4198-78f5-11e9-b1ba-0a580a8003e9',
+      'aggregate_id': '458ffc27-df0b-11e9-b622-62adb5fd6af0'}),
+])
+def test_validate_list_arguments(app, url, filters, expected):
+    with app.test_request_context(url):
+        out = request_handling.validate_list_arguments(
+            ObservationSchema, filters)
+    assert out == expected
+
+
+@pytest.mark.parametrize('query,key', [
+    ('limit=0', 'limit'),
+    ('limit=ten', 'limit'),
+    (f'limit={2**31}', 'limit'),
+    ('cursor=notauuid', 'cursor'),
+    ('fields=name,nofield', 'fields'),
+    ('fields=,', 'fields'),
+    ('site_id=notauuid', 'site_id'),
+    ('variable=notavariable', 'variable'),
+])
+def test_validate_list_arguments_invalid(app, query, key):
+    with app.test_request_context(f'/observations/?{query}'):
+        with pytest.raises(BadAPIRequest) as err:
+            request_handling.validate_list_arguments(
+                ObservationSchema, ('site_id', 'variable'))
+    assert key in err.value.errors
+
+
+@pytest.mark.parametrize('limit,link', [
+    (None, False), (3, False), (2, True)])
+def test_make_list_response(app, limit, link):
+    objects = [
+        {'observation_id': '9f657636-7e49-11e9-b77f-0a580a8003e9',
+         'name': 'a'},
+        {'observation_id': '9f657636-7e49-11e9-b77f-0a580a8003e0',
+         'name': 'b'}]
+    list_args = {'limit': limit, 'cursor': None, 'fields': ['name']}
+    with app.test_request_context('/observations/?fields=name'):
+        resp = request_handling.make_list_response(
+            objects, ObservationSchema, list_args, 'observation_id')
+    assert resp.get_json() == [{'name': 'a'}, {'name': 'b'}]
+    if link:
+        assert resp.headers['Link'].endswith('; rel="next"')
+        assert 'cursor=9f657636-7e49-11e9-b77f-0a580a8003e0' in (
+            resp.headers['Link'])
+        assert 'fields=name' in resp.headers['Link']
+    else:
+        assert 'Link' not in resp.headers
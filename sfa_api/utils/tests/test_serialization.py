@@ -0,0 +1,159 @@
+from flask_marshmallow.fields import Hyperlinks, URLFor
+import pytest
+
+
+from sfa_api import create_app, schema
+from sfa_api.conftest import (
+    demo_sites, demo_observations, demo_forecasts, demo_single_cdf,
+    demo_group_cdf, demo_aggregates)
+from sfa_api.utils import serialization, storage_interface
+from sfa_api.utils.serialization import dump_list
+
+
+@pytest.mark.parametrize('schema_class,objects', [
+    (schema.SiteResponseSchema, demo_sites),
+    (schema.ObservationSchema, demo_observations),
+    (schema.ForecastSchema, demo_forecasts),
+    (schema.CDFForecastSchema, demo_single_cdf),
+    (schema.CDFForecastGroupSchema, demo_group_cdf),
+    (schema.AggregateSchema, demo_aggregates),
+])
+@pytest.mark.parametrize('only', [None, ('name', '_links')])
+def test_dump_list(app, schema_class, objects, only):
+    objects = list(objects.values())
+    if only is not None and '_links' not in schema_class().fields:
+        only = ('name',)
+    with app.test_request_context():
+        expected = schema_class(many=True, only=only).dump(objects)
+        assert dump_list(schema_class, objects, only=only) == expected
+
+
+def test_dump_list_empty(app):
+    with app.test_request_context():
+        assert dump_list(schema.ForecastSchema, []) == []
+
+
+def test_dump_list_links(app):
+    forecast = demo_forecasts['f8dd49fa-23e2-48a0-862b-ba0af6dec276'].copy()
+    forecast['site_id'] = None
+    forecast['aggregate_id'] = '458ffc27-df0b-11e9-b622-62adb5fd6af0'
+    with app.test_request_context():
+        out = dump_list(schema.ForecastSchema, [forecast])
+    links = out[0]['_links']
+    assert links['site'] is None
+    assert links['aggregate'] == (
+        'http://localhost/aggregates/458ffc27-df0b-11e9-b622-62adb5fd6af0')
+
+
+def test_dump_list_unsafe_link_value(app):
+    zones = [{'name': 'Reference Region 1', 'created_at': None,
+              'modified_at': None},
+             {'name': 'Reference-Region-2', 'created_at': None,
+              'modified_at': None}]
+    with app.test_request_context():
+        expected = schema.ZoneListSchema(many=True).dump(zones)
+        assert dump_list(schema.ZoneListSchema, zones) == expected
+
+
+def test_dump_list_missing_key(app):
+    forecast = demo_forecasts['f8dd49fa-23e2-48a0-862b-ba0af6dec276'].copy()
+    del forecast['extra_parameters']
+    with app.test_request_context():
+        out = dump_list(schema.ForecastSchema, [forecast])
+        assert out == schema.ForecastSchema(many=True).dump([forecast])
+    assert 'extra_parameters' not in out[0]
+
+
+# schemas dumped with dump_list from the metadata dicts that storage
+# builds with the *_FIELDS tuples, along with the keys added separately
+_STORAGE_SCHEMAS = [
+    (schema.SiteResponseSchema, demo_sites,
+     storage_interface.SITE_FIELDS, ('modeling_parameters',)),
+    (schema.ObservationSchema, demo_observations,
+     storage_interface.OBSERVATION_FIELDS, ()),
+    (schema.ForecastSchema, demo_forecasts,
+     storage_interface.FORECAST_FIELDS, ()),
+    (schema.CDFForecastSchema, demo_single_cdf,
+     storage_interface.CDF_FORECAST_FIELDS, ()),
+    (schema.CDFForecastGroupSchema, demo_group_cdf,
+     storage_interface.CDF_FORECAST_GROUP_FIELDS, ('constant_values',)),
+    (schema.AggregateSchema, demo_aggregates,
+     storage_interface.AGGREGATE_FIELDS, ('observations',)),
+]
+
+
+@pytest.mark.parametrize('schema_class,objects,fields,extra',
+                         _STORAGE_SCHEMAS)
+def test_dump_list_matches_schema_dump(app, schema_class, objects, fields,
+                                       extra):
+    # the fast path relies on private APIs of marshmallow and
+    # flask-marshmallow, so compare every field against a regular dump
+    # to catch a change of behavior when either is upgraded
+    objects = [{k: obj[k] for k in (*fields, *extra) if k in obj}
+               for obj in objects.values()]
+    with app.test_request_context():
+        for only in [None] + [(f,) for f in schema_class().fields]:
+            expected = schema_class(many=True, only=only).dump(objects)
+            assert dump_list(schema_class, objects, only=only) == expected
+
+
+def test_dump_list_matches_schema_dump_report_values(app, report_values):
+    values = [dict(report_values, id='9f290dd4-42b8-11ea-abdf-f4939feddd82')]
+    with app.test_request_context():
+        expected = schema.ReportValuesSchema(many=True).dump(values)
+        assert dump_list(schema.ReportValuesSchema, values) == expected
+
+
+def test_dump_list_private_apis():
+    # private attributes the fast path depends on
+    assert callable(serialization._tpl)
+    assert serialization._tpl('<site_id>') == 'site_id'
+    assert serialization._tpl('site_id') is None
+    for schema_class, *_ in _STORAGE_SCHEMAS:
+        instance = schema_class(many=True)
+        assert callable(instance._has_processors)
+        for field in instance.dump_fields.values():
+            assert callable(field._serialize)
+            if isinstance(field, Hyperlinks):
+                links = list(field.schema.values())
+            else:
+                links = [field]
+            for link in links:
+                if isinstance(link, URLFor):
+                    assert isinstance(link.endpoint, str)
+                    values = getattr(link, 'values', None)
+                    if values is None:
+                        values = link.params
+                    assert isinstance(values, dict)
+
+
+@pytest.fixture()
+def app_no_db():
+    app = create_app('TestingConfig')
+    with app.app_context():
+        yield app
+
+
+def _url_field(attr):
+    field = URLFor('forecasts.metadata', forecast_id='<forecast_id>')
+    arguments = {'forecast_id': '<forecast_id>'}
+    for name in ('params', 'values'):
+        if hasattr(field, name):
+            delattr(field, name)
+    if attr is not None:
+        setattr(field, attr, arguments)
+    return field
+
+
+@pytest.mark.parametrize('attr', ['params', 'values', None])
+def test_dump_list_url_for_arguments(app_no_db, mocker, attr):
+    # the url_for arguments are in params before flask-marshmallow
+    # 0.12 and in values after, anything else uses URLFor.serialize
+    field = _url_field(attr)
+    serialize = mocker.patch.object(
+        field, 'serialize',
+        return_value='/forecasts/single/a/metadata')
+    with app_no_db.test_request_context():
+        get = serialization._compile_field('_links', field)
+        assert get({'forecast_id': 'a'}) == '/forecasts/single/a/metadata'
+    assert serialize.called is (attr is None)
@@ -1,6 +1,8 @@
 import datetime as dt
 import json
 import math
+from pathlib import Path
+import re
 import uuid
 
 
@@ -8,6 +10,7 @@ from cryptography.fernet import Fernet
 import numpy as np
 import pandas as pd
 import pandas.testing as pdt
+from prometheus_client import REGISTRY
 import pytest
 import pymysql
 
@@ -17,6 +20,9 @@ from sfa_api.conftest import (
     demo_sites, demo_observations, demo_forecasts, demo_single_cdf,
     demo_group_cdf, demo_aggregates, generate_randoms, _make_nocommit_cursor)
 from sfa_api.utils import storage_interface
+from sfa_api.utils.report_sections import (RAW_REPORT_SECTIONS,
+                                           select_sections)
+from sfa_api.utils.report_values import decode_processed_values, is_encoded
 
 
 TESTINDICES = {
@@ -101,6 +107,40 @@ def test_try_query_raises():
         storage_interface.try_query(f)
 
 
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_try_query_error_metrics():
+    def f():
+        raise pymysql.err.OperationalError(1142, 'denied')
+    before = _sample('sfa_api_mysql_errors_total', procedure='read_thing',
+                     code='1142')
+    with pytest.raises(storage_interface.StorageAuthError):
+        storage_interface.try_query(f, 'read_thing')
+    assert _sample('sfa_api_mysql_errors_total', procedure='read_thing',
+                   code='1142') == before + 1
+
+
+def test_call_procedure_metrics(mocker):
+    app = create_app('TestingConfig')
+    conn = mocker.patch('sfa_api.utils.storage_interface.mysql_connection')
+    cursor = conn.return_value.cursor.return_value
+    cursor.fetchall.return_value = [{'a': 1}] * 3
+    names = ('sfa_api_mysql_pool_wait_seconds_count',
+             'sfa_api_mysql_execute_seconds_count',
+             'sfa_api_mysql_fetch_seconds_count',
+             'sfa_api_mysql_rows_count',
+             'sfa_api_mysql_rows_sum')
+    before = [_sample(n, procedure='metric_proc') for n in names]
+    with app.app_context():
+        out = storage_interface._call_procedure(
+            'metric_proc', 'id', with_current_user=False)
+    assert len(out) == 3
+    after = [_sample(n, procedure='metric_proc') for n in names]
+    assert [a - b for a, b in zip(after, before)] == [1, 1, 1, 1, 3]
+
+
 def test_get_cursor_and_timezone(sql_app):
     with storage_interface.get_cursor('standard') as cursor:
         cursor.execute('SELECT @@session.time_zone')
@@ -162,6 +202,39 @@ def test_list_observations_invalid_site(sql_app, user):
         storage_interface.list_observations(str(uuid.uuid1()))
 
 
+def test_list_observations_filter_by_site_and_variable(sql_app, user):
+    obs = list(demo_observations.values())[0]
+    observations = storage_interface.list_observations(
+        site_id=obs['site_id'], variable=obs['variable'])
+    assert len(observations) > 0
+    for o in observations:
+        assert o['site_id'] == obs['site_id']
+        assert o['variable'] == obs['variable']
+
+
+def test_list_observations_paged(sql_app, user):
+    observations = storage_interface.list_observations()
+    pages = []
+    cursor = None
+    while True:
+        page = storage_interface.list_observations(limit=2, cursor=cursor)
+        if not page:
+            break
+        assert len(page) <= 2
+        pages.extend(page)
+        cursor = page[-1]['observation_id']
+    assert len(pages) == len(observations)
+    assert ({o['observation_id'] for o in pages} ==
+            {o['observation_id'] for o in observations})
+
+
+def test_list_observations_fields(sql_app, user):
+    observations = storage_interface.list_observations(fields=['name'])
+    assert len(observations) > 0
+    for obs in observations:
+        assert set(obs.keys()) == {'observation_id', 'name'}
+
+
 @pytest.mark.parametrize('observation_id', demo_observations.keys())
 def test_read_observation(sql_app, user, observation_id):
     observation = storage_interface.read_observation(observation_id)
@@ -496,6 +569,39 @@ def test_list_forecasts_filter_by_aggregate(sql_app, user, aggregate_id):
         assert fx['aggregate_id'] == aggregate_id
 
 
+def test_list_forecasts_invalid_aggregate(sql_app, user):
+    with pytest.raises(storage_interface.StorageAuthError):
+        storage_interface.list_forecasts(aggregate_id=str(uuid.uuid1()))
+
+
+def test_list_forecasts_filter_by_variable(sql_app, user):
+    forecasts = storage_interface.list_forecasts(variable='ac_power')
+    assert len(forecasts) > 0
+    for fx in forecasts:
+        assert fx['variable'] == 'ac_power'
+
+
+def test_list_forecasts_limit_cursor(sql_app, user):
+    forecasts = storage_interface.list_forecasts()
+    ids = sorted(fx['forecast_id'] for fx in forecasts)
+    first = storage_interface.list_forecasts(limit=1)
+    assert len(first) == 1
+    rest = storage_interface.list_forecasts(
+        cursor=first[0]['forecast_id'])
+    assert len(rest) == len(forecasts) - 1
+    assert first[0]['forecast_id'] not in {fx['forecast_id'] for fx in rest}
+    assert set(ids) == {fx['forecast_id'] for fx in first + rest}
+
+
+def test_list_forecasts_fields_without_extra(sql_app, user):
+    forecasts = storage_interface.list_forecasts(
+        fields=['name', 'extra_parameters'])
+    assert any(fx['extra_parameters'] for fx in forecasts)
+    forecasts = storage_interface.list_forecasts(fields=['name'])
+    for fx in forecasts:
+        assert set(fx.keys()) == {'forecast_id', 'name'}
+
+
 @pytest.mark.parametrize('forecast_id', demo_forecasts.keys())
 def test_read_forecast(sql_app, user, forecast_id):
     forecast = storage_interface.read_forecast(forecast_id)
@@ -1407,6 +1513,43 @@ def test_read_aggregate(sql_app, user, aggregate_id):
     assert aggregate == demo_aggregates[aggregate_id]
 
 
+def test_read_pair_metadata(sql_app, user, forecast_id, observation_id,
+                            cdf_forecast_group_id, cdf_forecast_id,
+                            aggregate_id, missing_id):
+    out = storage_interface.read_pair_metadata([
+        forecast_id, observation_id, cdf_forecast_group_id,
+        cdf_forecast_id, aggregate_id, missing_id])
+    assert list(out) == list(storage_interface.PAIR_METADATA_FIELDS)
+    assert {k: list(v) for k, v in out.items()} == {
+        'forecasts': [forecast_id], 'observations': [observation_id],
+        'cdf_forecasts': [cdf_forecast_group_id],
+        'cdf_forecasts_singles': [cdf_forecast_id],
+        'aggregates': [aggregate_id]}
+    readers = {
+        'forecasts': storage_interface.read_forecast,
+        'observations': storage_interface.read_observation,
+        'cdf_forecasts': storage_interface.read_cdf_forecast_group,
+        'cdf_forecasts_singles': storage_interface.read_cdf_forecast,
+        'aggregates': storage_interface.read_aggregate}
+    for object_type, objects in out.items():
+        for object_id, metadata in objects.items():
+            full = readers[object_type](object_id)
+            assert metadata == {
+                k: full[k]
+                for k in storage_interface.PAIR_METADATA_FIELDS[object_type]}
+
+
+def test_read_pair_metadata_invalid_user(sql_app, invalid_user, forecast_id,
+                                         observation_id):
+    out = storage_interface.read_pair_metadata([forecast_id, observation_id])
+    assert all(objects == {} for objects in out.values())
+
+
+def test_read_pair_metadata_empty(sql_app, user):
+    out = storage_interface.read_pair_metadata([])
+    assert all(objects == {} for objects in out.values())
+
+
 def test_read_aggregate_invalid_aggregate(sql_app, user):
     with pytest.raises(storage_interface.StorageAuthError):
         storage_interface.read_aggregate(str(uuid.uuid1()))
@@ -1818,14 +1961,45 @@ def test_store_report_denied(sql_app, invalid_user, report_parameters):
 
 
 def test_read_report(sql_app, report, user, reportid):
+    out = storage_interface.read_report(reportid, include_values=True)
+    assert out == report
+
+
+def test_read_report_no_values(sql_app, report, user, reportid):
     out = storage_interface.read_report(reportid)
+    assert 'values' not in out
+    report.pop('values')
     assert out == report
 
 
+@pytest.mark.parametrize('sections', [
+    ['metrics'], ['plots', 'data_checksum'], ['summary'], []])
+def test_read_report_sections(sql_app, report, user, reportid, sections):
+    out = storage_interface.read_report(reportid, sections=sections)
+    exp = report['raw_report']
+    if sections:
+        assert out['raw_report'] == select_sections(exp, sections)
+    else:
+        assert out['raw_report'] is None
+
+
+def test_read_report_legacy_raw_report(sql_app, report, user, reportid,
+                                       nocommit_cursor):
+    raw_report = report['raw_report'].copy()
+    raw_report['generated_at'] = raw_report['generated_at'].isoformat()
+    storage_interface._call_procedure(
+        'store_raw_report', reportid,
+        storage_interface.dump_json_replace_nan(raw_report))
+    out = storage_interface.read_report(reportid, sections=['metrics'])
+    assert out['raw_report'] == {'metrics': []}
+    out = storage_interface.read_report(reportid)
+    assert out['raw_report'] == report['raw_report']
+
+
 def test_read_report_values_missing(sql_app, report, user, reportid,
                                     remove_perms_from_current_role):
     remove_perms_from_current_role('read_values', 'reports')
-    out = storage_interface.read_report(reportid)
+    out = storage_interface.read_report(reportid, include_values=True)
     assert out['report_parameters'] == report['report_parameters']
     assert out['values'] != report['values']
     assert out['values'] == []
@@ -1870,6 +2044,61 @@ def test_read_report_values(sql_app, user, reportid, report):
     assert out == report['values']
 
 
+def test_store_report_values_encoded(sql_app, user, reportid,
+                                     report_values, nocommit_cursor):
+    newid = storage_interface.store_report_values(
+        reportid, report_values['object_id'],
+        report_values['processed_values'])
+    vals = storage_interface.read_report_values(reportid, encoded=True)
+    stored = [v for v in vals if v['id'] == newid][0]
+    assert is_encoded(stored['processed_values'])
+    assert decode_processed_values(stored['processed_values']) == (
+        report_values['processed_values'])
+
+
+def test_read_report_values_paged(sql_app, user, reportid, report_values,
+                                  nocommit_cursor):
+    storage_interface.store_report_values(
+        reportid, report_values['object_id'],
+        report_values['processed_values'])
+    first = storage_interface.read_report_values(reportid, limit=1)
+    assert len(first) == 1
+    rest = storage_interface.read_report_values(
+        reportid, cursor=first[0]['id'])
+    assert len(rest) == 1
+    assert sorted(v['id'] for v in first + rest) == sorted(
+        v['id'] for v in storage_interface.read_report_values(reportid))
+
+
+def test_read_report_object_values(sql_app, user, reportid, report):
+    object_id = report['values'][0]['object_id']
+    out = storage_interface.read_report_object_values(reportid, object_id)
+    assert out == [v for v in report['values']
+                   if v['object_id'] == object_id]
+
+
+def test_read_report_object_values_denied(sql_app, invalid_user, reportid,
+                                          report):
+    with pytest.raises(storage_interface.StorageAuthError):
+        storage_interface.read_report_object_values(
+            reportid, report['values'][0]['object_id'])
+
+
+def test_read_report_values_manifest(sql_app, user, reportid, report):
+    out = storage_interface.read_report_values_manifest(reportid)
+    # the values of the test report are stored unencoded
+    assert sorted(out, key=lambda v: v['id']) == sorted([
+        {'id': v['id'], 'object_id': v['object_id'],
+         'size': len(v['processed_values'].encode())}
+        for v in report['values']], key=lambda v: v['id'])
+
+
+def test_read_report_values_manifest_denied(sql_app, invalid_user,
+                                            reportid):
+    with pytest.raises(storage_interface.StorageAuthError):
+        storage_interface.read_report_values_manifest(reportid)
+
+
 def test_read_report_values_denied(sql_app, invalid_user, reportid):
     with pytest.raises(storage_interface.StorageAuthError):
         storage_interface.read_report_values(reportid)
@@ -1888,6 +2117,21 @@ def test_store_raw_report(sql_app, user, nocommit_cursor, reportid,
     assert raw == exp
 
 
+def test_store_raw_report_sections(sql_app, user, nocommit_cursor,
+                                   reportid, raw_report_json):
+    rr = raw_report_json.copy()
+    rr['plots'] = {'script': 'x' * 10000, 'figures': []}
+    storage_interface.store_raw_report(reportid, rr)
+    nocommit_cursor.execute(
+        'SELECT section, LENGTH(data) FROM arbiter_data.report_sections '
+        'WHERE report_id = UUID_TO_BIN(%s, 1)', reportid)
+    sizes = dict(nocommit_cursor.fetchall())
+    assert set(sizes) == set(RAW_REPORT_SECTIONS)
+    assert sizes['plots'] < 1000
+    rep = storage_interface.read_report(reportid, sections=['plots'])
+    assert rep['raw_report'] == {'plots': rr['plots']}
+
+
 def test_store_raw_report_denied(
         sql_app, invalid_user, nocommit_cursor, reportid, raw_report_json):
     with pytest.raises(storage_interface.StorageAuthError):
@@ -2348,3 +2592,219 @@ def test_list_actions_on_all_objects_of_type(
     # each object has the same permissions
     for o in object_list:
         assert o['actions'].sort() == expected_actions.sort()
+
+
+@pytest.fixture()
+def cached_metadata_app(app):
+    app.config['METADATA_CACHE_SIZE'] = 10
+    if hasattr(app, 'metadata_cache'):
+        delattr(app, 'metadata_cache')
+    yield app
+    delattr(app, 'metadata_cache')
+
+
+@pytest.fixture()
+def cache_user(app):
+    def push(user):
+        ctx = app.test_request_context()
+        ctx.user = user
+        ctx.push()
+        return ctx
+    ctxs = []
+    yield lambda user: ctxs.append(push(user))
+    for ctx in reversed(ctxs):
+        ctx.pop()
+
+
+def test_read_forecast_cached(cached_metadata_app, cache_user, mocker):
+    forecast_id = list(demo_forecasts.keys())[0]
+    single = mocker.patch(
+        'sfa_api.utils.storage_interface._call_procedure_for_single',
+        return_value=demo_forecasts[forecast_id])
+    cache_user('user0')
+    first = storage_interface.read_forecast(forecast_id)
+    first['name'] = 'changed'
+    second = storage_interface.read_forecast(forecast_id)
+    assert single.call_count == 1
+    assert second == demo_forecasts[forecast_id]
+    stats = storage_interface.metadata_cache().stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    # other users are checked by the database
+    cache_user('user1')
+    storage_interface.read_forecast(forecast_id)
+    assert single.call_count == 2
+
+
+def test_read_site_not_cached_on_error(cached_metadata_app, cache_user,
+                                       mocker):
+    single = mocker.patch(
+        'sfa_api.utils.storage_interface._call_procedure_for_single',
+        side_effect=storage_interface.StorageAuthError)
+    cache_user('user0')
+    for _ in range(2):
+        with pytest.raises(storage_interface.StorageAuthError):
+            storage_interface.read_site(str(uuid.uuid1()))
+    assert single.call_count == 2
+
+
+@pytest.mark.parametrize('func,args', [
+    ('update_observation', {'name': 'new'}),
+    ('delete_observation', {}),
+])
+def test_observation_cache_invalidated(cached_metadata_app, cache_user,
+                                       mocker, func, args):
+    observation_id = list(demo_observations.keys())[0]
+    single = mocker.patch(
+        'sfa_api.utils.storage_interface._call_procedure_for_single',
+        return_value=demo_observations[observation_id])
+    mocker.patch('sfa_api.utils.storage_interface._call_procedure')
+    cache_user('user0')
+    storage_interface.read_observation(observation_id)
+    cache_user('user1')
+    storage_interface.read_observation(observation_id)
+    assert len(storage_interface.metadata_cache()) == 2
+    getattr(storage_interface, func)(observation_id, **args)
+    assert len(storage_interface.metadata_cache()) == 0
+    storage_interface.read_observation(observation_id)
+    assert single.call_count == 3
+
+
+def test_metadata_cache_cleared_on_role_removal(
+        cached_metadata_app, cache_user, mocker):
+    forecast_id = list(demo_forecasts.keys())[0]
+    mocker.patch(
+        'sfa_api.utils.storage_interface._call_procedure_for_single',
+        return_value=demo_forecasts[forecast_id])
+    mocker.patch('sfa_api.utils.storage_interface._call_procedure')
+    cache_user('user0')
+    storage_interface.read_forecast(forecast_id)
+    assert len(storage_interface.metadata_cache()) == 1
+    storage_interface.remove_role_from_user(
+        str(uuid.uuid1()), str(uuid.uuid1()))
+    assert len(storage_interface.metadata_cache()) == 0
+
+
+def test_metadata_cache_disabled(app, cache_user, mocker):
+    # TestingConfig disables the cache
+    forecast_id = list(demo_forecasts.keys())[0]
+    single = mocker.patch(
+        'sfa_api.utils.storage_interface._call_procedure_for_single',
+        return_value=demo_forecasts[forecast_id])
+    cache_user('user0')
+    storage_interface.read_forecast(forecast_id)
+    storage_interface.read_forecast(forecast_id)
+    assert single.call_count == 2
+
+
+@pytest.fixture()
+def replica_app(mocker):
+    app = create_app('TestingConfig')
+    app.config['MYSQL_REPLICA_HOSTS'] = 'replica0, replica1,'
+    mocker.patch('sfa_api.utils.storage_interface._make_pool',
+                 side_effect=lambda host=None: mocker.Mock())
+    with app.app_context():
+        yield app
+
+
+def test_replica_pools(replica_app):
+    replicas = storage_interface.replica_pools()
+    assert [r.host for r in replicas] == ['replica0', 'replica1']
+    assert storage_interface.replica_pools() is replicas
+
+
+def test_replica_pools_none(replica_app):
+    replica_app.config['MYSQL_REPLICA_HOSTS'] = ''
+    assert storage_interface.replica_pools() == []
+
+
+def test_mysql_connection_replica(replica_app, mocker):
+    lag = mocker.patch.object(storage_interface.ReplicaPool, '_read_lag',
+                              return_value=0)
+    conn = storage_interface.mysql_connection(replica=True)
+    assert conn in [r.pool.connect.return_value
+                    for r in storage_interface.replica_pools()]
+    # only checked once per interval
+    storage_interface.mysql_connection(replica=True)
+    storage_interface.mysql_connection(replica=True)
+    assert lag.call_count == 2
+
+
+@pytest.mark.parametrize('lag', [None, 5.1])
+def test_mysql_connection_replica_lagging(replica_app, mocker, lag):
+    mocker.patch.object(storage_interface.ReplicaPool, '_read_lag',
+                        return_value=lag)
+    conn = storage_interface.mysql_connection(replica=True)
+    assert conn is replica_app.mysql_connection.connect.return_value
+    assert all(not r.pool.connect.called
+               for r in storage_interface.replica_pools())
+
+
+def test_replica_pool_usable_rechecks(mocker):
+    now = mocker.patch('sfa_api.utils.storage_interface.time.monotonic',
+                       return_value=100.0)
+    replica = storage_interface.ReplicaPool('replica', mocker.Mock(), 5, 10)
+    lag = mocker.patch.object(replica, '_read_lag', return_value=10)
+    assert not replica.usable
+    lag.return_value = 1
+    now.return_value = 109.0
+    assert not replica.usable
+    now.return_value = 110.0
+    assert replica.usable
+    assert lag.call_count == 2
+
+
+def test_replica_pool_read_lag(mocker):
+    pool = mocker.Mock()
+    cursor = pool.connect.return_value.cursor.return_value
+    cursor.fetchone.return_value = {'Seconds_Behind_Master': 3}
+    replica = storage_interface.ReplicaPool('replica', pool, 5, 10)
+    assert replica._read_lag() == 3
+    cursor.execute.assert_called_with('SHOW SLAVE STATUS')
+    assert pool.connect.return_value.close.called
+
+
+@pytest.mark.parametrize('status,error', [
+    (None, None),
+    ({'Seconds_Behind_Master': None}, None),
+    (None, pymysql.err.OperationalError(1227, 'Access denied')),
+])
+def test_replica_pool_read_lag_unknown(mocker, status, error):
+    pool = mocker.Mock()
+    cursor = pool.connect.return_value.cursor.return_value
+    cursor.fetchone.return_value = status
+    cursor.execute.side_effect = error
+    replica = storage_interface.ReplicaPool('replica', pool, 5, 10)
+    assert replica._read_lag() is None
+    assert not replica.usable
+
+
+def test_call_procedure_replica_routing(replica_app, mocker):
+    get_cursor = mocker.patch('sfa_api.utils.storage_interface.get_cursor')
+    with replica_app.test_request_context():
+        storage_interface._call_procedure('read_site', 'id')
+        assert get_cursor.call_args[1]['replica']
+        storage_interface._call_procedure('store_site', 'id')
+        assert not get_cursor.call_args[1]['replica']
+        # read your writes for the rest of the request
+        storage_interface._call_procedure('read_site', 'id')
+        assert not get_cursor.call_args[1]['replica']
+    with replica_app.test_request_context():
+        storage_interface._call_procedure('list_sites')
+        assert get_cursor.call_args[1]['replica']
+
+
+def test_call_procedure_no_request_uses_primary(replica_app, mocker):
+    get_cursor = mocker.patch('sfa_api.utils.storage_interface.get_cursor')
+    storage_interface._call_procedure('read_site', 'id',
+                                      with_current_user=False)
+    assert not get_cursor.call_args[1]['replica']
+
+
+def test_read_only_procedures_exist():
+    migrations = Path(__file__).parents[3] / 'datastore' / 'migrations'
+    defined = set()
+    for path in migrations.glob('*.up.sql'):
+        defined |= set(re.findall(r'PROCEDURE\s+(?:\w+\.)?`?(\w+)`?\s*\(',
+                                  path.read_text(errors='replace')))
+    assert storage_interface.READ_ONLY_PROCEDURES <= defined
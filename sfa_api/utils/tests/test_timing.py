@@ -0,0 +1,101 @@
+from flask import _request_ctx_stack
+from prometheus_client import REGISTRY
+import pytest
+
+
+from sfa_api import create_app
+from sfa_api.utils import timing
+
+
+@pytest.fixture()
+def timing_app(mocker):
+    app = create_app('TestingConfig')
+
+    @timing.timed('work')
+    def work():
+        pass
+
+    def view(name):
+        work()
+        work()
+        with timing.phase('other'):
+            pass
+        _request_ctx_stack.top.user = 'auth0|admin'
+        return 'ok'
+
+    app.add_url_rule('/timing/<name>', 'timing', view)
+    return app
+
+
+def get(app):
+    return app.test_client().get('/timing/x', base_url='https://localhost')
+
+
+def test_phase(timing_app, mocker):
+    mocker.patch('sfa_api.utils.timing.time.perf_counter',
+                 side_effect=[1.0, 1.5, 2.0, 2.25])
+    with timing_app.test_request_context():
+        with timing.phase('a'):
+            pass
+        with timing.phase('a'):
+            pass
+        assert _request_ctx_stack.top.phase_timings == {'a': 0.75}
+
+
+def test_phase_exception(timing_app):
+    with timing_app.test_request_context():
+        with pytest.raises(ValueError):
+            with timing.phase('a'):
+                raise ValueError
+        assert 'a' in _request_ctx_stack.top.phase_timings
+
+
+def test_phase_outside_request():
+    with timing.phase('a'):
+        pass
+
+
+def test_timed_keeps_name():
+    @timing.timed('a')
+    def func(x):
+        """doc"""
+        return x
+    assert func(1) == 1
+    assert func.__name__ == 'func'
+    assert func.__doc__ == 'doc'
+
+
+def test_no_server_timing_header(timing_app):
+    res = get(timing_app)
+    assert res.status_code == 200
+    assert 'Server-Timing' not in res.headers
+
+
+def test_server_timing_header_all(timing_app):
+    timing_app.config['SERVER_TIMING'] = True
+    res = get(timing_app)
+    metrics = [m.split(';')[0]
+               for m in res.headers['Server-Timing'].split(', ')]
+    assert metrics == ['work', 'other', 'total']
+
+
+@pytest.mark.parametrize('users,shown', [
+    ('auth0|admin', True),
+    ('auth0|other, auth0|admin', True),
+    ('auth0|other', False),
+    ('', False),
+])
+def test_server_timing_header_users(timing_app, users, shown):
+    timing_app.config['SERVER_TIMING_USERS'] = users
+    res = get(timing_app)
+    assert ('Server-Timing' in res.headers) is shown
+
+
+def test_phase_histogram(timing_app):
+    def count():
+        return REGISTRY.get_sample_value(
+            'sfa_api_request_phase_seconds_count',
+            {'url_rule': '/timing/<name>', 'phase': 'work'}) or 0
+    before = count()
+    get(timing_app)
+    assert count() == before + 1
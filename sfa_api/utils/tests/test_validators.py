@@ -1,5 +1,6 @@
 from copy import deepcopy
 import datetime as dt
+import uuid
 
 
 from marshmallow.exceptions import ValidationError
@@ -7,10 +8,10 @@ import pytest
 import pytz
 
 
+from sfa_api import create_app
 from sfa_api.conftest import (VALID_OBS_JSON, VALID_FORECAST_JSON,
                               VALID_CDF_FORECAST_JSON, VALID_FORECAST_AGG_JSON,
                               VALID_AGG_JSON)
-from sfa_api.utils.errors import StorageAuthError
 from sfa_api.utils import validators
 
 
@@ -148,17 +149,24 @@ VALID_EVENT_OBS_JSON.update({
 })
 
 
+def _pair_metadata(fx=None, obs=None, agg=None, ref_fx=None):
+    # the str of each dict is its id in the pairs of the tests
+    forecasts = {str(f): f for f in (fx, ref_fx) if f is not None}
+    return {
+        'forecasts': forecasts,
+        'cdf_forecasts': forecasts,
+        'cdf_forecasts_singles': forecasts,
+        'observations': {str(obs): obs} if obs is not None else {},
+        'aggregates': {str(agg): agg} if agg is not None else {},
+    }
+
+
 @pytest.fixture()
 def mock_reads(mocker):
     def fn(fx=None, obs=None, agg=None, ref_fx=None):
         storage_mock = mocker.MagicMock()
-        storage_mock.read_forecast = mocker.MagicMock(side_effect=[fx, ref_fx])
-        storage_mock.read_cdf_forecast_group = mocker.MagicMock(
-            side_effect=[fx, ref_fx])
-        storage_mock.read_cdf_forecast = mocker.MagicMock(
-            side_effect=[fx, ref_fx])
-        storage_mock.read_observation = mocker.MagicMock(return_value=obs)
-        storage_mock.read_aggregate = mocker.MagicMock(return_value=agg)
+        storage_mock.read_pair_metadata = mocker.MagicMock(
+            return_value=_pair_metadata(fx, obs, agg, ref_fx))
         mocker.patch('sfa_api.utils.validators.get_storage',
                      return_value=storage_mock)
         return storage_mock
@@ -386,28 +394,14 @@ def test_ensure_pair_compatibility_agg_obs_errors(
 def mock_reads_with_failure(mocker):
     def fn(failure, fx=None, obs=None, agg=None, ref_fx=None):
         storage_mock = mocker.MagicMock()
-        if failure == 'forecast':
-            forecast_se = [StorageAuthError, ref_fx]
-        elif failure == 'reference_forecast':
-            forecast_se = [fx, StorageAuthError]
-        else:
-            forecast_se = [fx, ref_fx]
-        storage_mock.read_forecast = mocker.MagicMock(
-            side_effect=forecast_se)
-        storage_mock.read_cdf_forecast_group = mocker.MagicMock(
-            side_effect=forecast_se)
-        storage_mock.read_cdf_forecast = mocker.MagicMock(
-            side_effect=forecast_se)
-        if failure == 'observation':
-            storage_mock.read_observation = mocker.MagicMock(
-                side_effect=StorageAuthError)
-        else:
-            storage_mock.read_observation = mocker.MagicMock(return_value=obs)
-        if failure == 'aggregate':
-            storage_mock.read_aggregate = mocker.MagicMock(
-                side_effect=StorageAuthError)
-        else:
-            storage_mock.read_aggregate = mocker.MagicMock(return_value=agg)
+        metadata = _pair_metadata(fx, obs, agg, ref_fx)
+        # objects that don't exist or can't be read are left out
+        failed = {'forecast': fx, 'reference_forecast': ref_fx,
+                  'observation': obs, 'aggregate': agg}[failure]
+        for objects in metadata.values():
+            objects.pop(str(failed), None)
+        storage_mock.read_pair_metadata = mocker.MagicMock(
+            return_value=metadata)
         mocker.patch('sfa_api.utils.validators.get_storage',
                      return_value=storage_mock)
         return storage_mock
@@ -446,6 +440,52 @@ def test_ensure_pair_compatibility_object_dne(
     assert errors[failure_mode] == 'Does not exist.'
 
 
+@pytest.fixture()
+def pair_ids(mocker):
+    fx_id, obs_id = str(uuid.uuid1()), str(uuid.uuid1())
+    storage_mock = mocker.MagicMock()
+    storage_mock.read_pair_metadata = mocker.MagicMock(return_value={
+        'forecasts': {fx_id: VALID_FORECAST_JSON},
+        'observations': {obs_id: VALID_OBS_JSON}})
+    mocker.patch('sfa_api.utils.validators.get_storage',
+                 return_value=storage_mock)
+    return fx_id, obs_id, storage_mock
+
+
+@pytest.fixture()
+def validation_app():
+    return create_app('TestingConfig')
+
+
+def test_load_pair_metadata(validation_app, pair_ids):
+    fx_id, obs_id, storage_mock = pair_ids
+    pairs = [{'forecast': fx_id, 'observation': obs_id},
+             {'forecast': fx_id.upper(), 'observation': 'notauuid',
+              'reference_forecast': None},
+             'notapair']
+    pair = {'forecast': uuid.UUID(fx_id), 'observation': uuid.UUID(obs_id),
+            'forecast_type': 'forecast'}
+    with validation_app.test_request_context():
+        validators.load_pair_metadata(pairs)
+        for _ in range(3):
+            validators.ensure_pair_compatibility(pair)
+    storage_mock.read_pair_metadata.assert_called_once_with(
+        sorted([fx_id, obs_id]))
+
+
+def test_ensure_pair_compatibility_reads_missing(validation_app, mocker,
+                                                 pair_ids):
+    fx_id, obs_id, storage_mock = pair_ids
+    pair = {'forecast': uuid.UUID(fx_id), 'observation': uuid.UUID(obs_id),
+            'forecast_type': 'forecast'}
+    with validation_app.test_request_context():
+        validators.load_pair_metadata([{'forecast': fx_id}])
+        validators.ensure_pair_compatibility(pair)
+        validators.ensure_pair_compatibility(pair)
+    assert storage_mock.read_pair_metadata.call_args_list == [
+        mocker.call([fx_id]), mocker.call([obs_id])]
+
+
 @pytest.mark.parametrize("data", [13, 17, 52])
 def test_AggregateIntervalValidator_errors(data):
     with pytest.raises(ValidationError):
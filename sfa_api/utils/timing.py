@@ -0,0 +1,99 @@
+"""
+Time the phases of a request, e.g. authentication, parsing, validation,
+and each stored procedure, to find where a slow request spends its time.
+The time of each phase is exported as a Prometheus histogram labelled
+by the URL rule and phase, and returned in a Server-Timing header to
+users in config['SERVER_TIMING_USERS'] or to everyone if
+config['SERVER_TIMING'] is True.
+
+Phases may be nested, e.g. the stored procedures called while checking
+that a user exists, so the phase times may add up to more than the
+total time of the request.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import time
+
+
+from flask import _request_ctx_stack, current_app, request
+
+
+from sfa_api.utils.metrics import histogram
+
+
+REQUEST_PHASE_TIME = histogram(
+    'sfa_api_request_phase_seconds',
+    'Time spent in each phase of a request',
+    ('url_rule', 'phase'))
+
+
+@contextmanager
+def phase(name):
+    """Context manager that adds the time spent in the block to the
+    phase called name of the current request. Does nothing outside of
+    a request.
+    """
+    ctx = _request_ctx_stack.top
+    if ctx is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = getattr(ctx, 'phase_timings', None)
+        if timings is None:
+            timings = ctx.phase_timings = {}
+        timings[name] = timings.get(name, 0) + elapsed
+
+
+def timed(name):
+    """Decorator that adds the time spent in the function to the phase
+    called name of the current request"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_timing():
+    _request_ctx_stack.top.request_start = time.perf_counter()
+
+
+def _show_server_timing():
+    config = current_app.config
+    if config.get('SERVER_TIMING', False):
+        return True
+    users = [u.strip() for u in
+             config.get('SERVER_TIMING_USERS', '').split(',')]
+    user = getattr(_request_ctx_stack.top, 'user', '')
+    return bool(user) and user in users
+
+
+def _finish_timing(response):
+    ctx = _request_ctx_stack.top
+    timings = getattr(ctx, 'phase_timings', {})
+    url_rule = (request.url_rule.rule if request.url_rule is not None
+                else 'none')
+    for name, elapsed in timings.items():
+        REQUEST_PHASE_TIME.labels(url_rule, name).observe(elapsed)
+    if _show_server_timing():
+        start = getattr(ctx, 'request_start', None)
+        metrics = [f'{name};dur={elapsed * 1000:.2f}'
+                   for name, elapsed in timings.items()]
+        if start is not None:
+            total = time.perf_counter() - start
+            metrics.append(f'total;dur={total * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(metrics)
+    return response
+
+
+def register_request_timing(app):
+    """Start timing each request before any other before_request
+    function and report the phase times after the request"""
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timing)
+    app.after_request(_finish_timing)
@@ -1,15 +1,16 @@
 import datetime as dt
 import re
 import time
+import uuid
 
 
+from flask import _request_ctx_stack
 from marshmallow.validate import Validator
 from marshmallow.exceptions import ValidationError
 import pandas as pd
 import pytz
 
 
-from sfa_api.utils.errors import StorageAuthError
 from sfa_api.utils.storage import get_storage
 
 
@@ -228,9 +229,66 @@ def _ensure_forecast_reference_compatibility(
     return reference_errors
 
 
+# storage type of the forecasts of each forecast_type of an object pair
+FORECAST_OBJECT_TYPES = {
+    'forecast': 'forecasts',
+    'event_forecast': 'forecasts',
+    'probabilistic_forecast': 'cdf_forecasts',
+    'probabilistic_forecast_constant_value': 'cdf_forecasts_singles',
+}
+PAIR_OBJECT_FIELDS = ('forecast', 'observation', 'aggregate',
+                      'reference_forecast')
+
+
+def _pair_metadata(object_ids):
+    """The metadata of report object pairs keyed by object type and
+    UUID. The metadata of all object_ids not yet read in this request is
+    read from storage in one call and kept for the rest of the request.
+    """
+    ctx = _request_ctx_stack.top
+    lookup = getattr(ctx, 'pair_metadata', None)
+    if lookup is None:
+        lookup = {'read': set(), 'metadata': {}}
+        if ctx is not None:
+            ctx.pair_metadata = lookup
+    missing = {str(object_id) for object_id in object_ids
+               if object_id is not None} - lookup['read']
+    if missing:
+        read = get_storage().read_pair_metadata(sorted(missing))
+        for object_type, objects in read.items():
+            lookup['metadata'].setdefault(object_type, {}).update(objects)
+        lookup['read'] |= missing
+    return lookup['metadata']
+
+
+def load_pair_metadata(object_pairs):
+    """Read the metadata of all of the objects of object_pairs, as
+    posted by a client, in one call so that validating each pair with
+    :py:func:`ensure_pair_compatibility` does not read from storage.
+    IDs that are not UUIDs are left for the schema to report.
+
+    Parameters
+    ----------
+    object_pairs: list
+        The object_pairs of the report parameters before validation.
+    """
+    object_ids = set()
+    for pair in object_pairs:
+        if not isinstance(pair, dict):
+            continue
+        for field in PAIR_OBJECT_FIELDS:
+            try:
+                object_ids.add(str(uuid.UUID(pair.get(field))))
+            except (AttributeError, TypeError, ValueError):
+                continue
+    _pair_metadata(object_ids)
+
+
 def ensure_pair_compatibility(data):
     """Ensures compatibility between forecast and observation/aggregate.
     Assumes that fields have been validated and required fields exist.
+    The metadata of the objects comes from the lookup of the request,
+    see :py:func:`load_pair_metadata`.
 
 
     Parameters
@@ -244,8 +302,6 @@ def ensure_pair_compatibility(data):
         If forecast and it's observation, aggregate or reference forecast
         are not compatible.
     """
-    storage = get_storage()
-
     errors = {}
 
     forecast_id = str(data['forecast'])
@@ -261,25 +317,16 @@ def ensure_pair_compatibility(data):
     # determine the type of forecast in the pair
     forecast_type = data['forecast_type']
 
-    if forecast_type == 'forecast' or forecast_type == 'event_forecast':
-        forecast_loader = storage.read_forecast
-    elif forecast_type == 'probabilistic_forecast':
-        forecast_loader = storage.read_cdf_forecast_group
-    elif forecast_type == 'probabilistic_forecast_constant_value':
-        forecast_loader = storage.read_cdf_forecast
-    try:
-        forecast = forecast_loader(forecast_id)
-    except StorageAuthError:
+    metadata = _pair_metadata(
+        [forecast_id, observation_id, aggregate_id, reference_forecast_id])
+    forecasts = metadata.get(FORECAST_OBJECT_TYPES[forecast_type], {})
+    forecast = forecasts.get(forecast_id)
+    if forecast is None:
         raise ValidationError({'forecast': 'Does not exist.'})
 
-    observation = None
-    aggregate = None
-    reference_forecast = None
-
     if observation_id is not None:
-        try:
-            observation = storage.read_observation(observation_id)
-        except StorageAuthError:
+        observation = metadata.get('observations', {}).get(observation_id)
+        if observation is None:
             obs_errors = 'Does not exist.'
         else:
             obs_errors = _ensure_forecast_measurement_compatibility(
@@ -288,9 +335,8 @@ def ensure_pair_compatibility(data):
             errors['observation'] = obs_errors
 
     if aggregate_id is not None:
-        try:
-            aggregate = storage.read_aggregate(aggregate_id)
-        except StorageAuthError:
+        aggregate = metadata.get('aggregates', {}).get(aggregate_id)
+        if aggregate is None:
             agg_errors = 'Does not exist.'
         else:
             agg_errors = _ensure_forecast_measurement_compatibility(
@@ -299,9 +345,8 @@ def ensure_pair_compatibility(data):
             errors['aggregate'] = agg_errors
 
     if reference_forecast_id is not None:
-        try:
-            reference_forecast = forecast_loader(reference_forecast_id)
-        except StorageAuthError:
+        reference_forecast = forecasts.get(reference_forecast_id)
+        if reference_forecast is None:
             reference_errors = 'Does not exist.'
         else:
             reference_errors = _ensure_forecast_reference_compatibility(